@@ -0,0 +1,97 @@
+#!/usr/bin/python
+'''Measure how the planning work of Git2SC.plan_update scales with the
+number of pages of the space.
+
+A directory of small html files, that need no converter, is planned
+against a git2sc.fake.FakeConfluenceServer where the pages of the
+directories and of half of the files already exist. The time per page
+should stay flat as the number of pages grows.
+
+    PYTHONPATH=. python benchmarks/index_scaling.py --sizes 1000 10000 100000
+'''
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+from git2sc.fake import FakeConfluenceServer
+from git2sc.git2sc import NO_README, Git2SC
+
+SPACE = 'BENCH'
+
+
+def synthetic_space(path, confluence, pages, fan_out):
+    '''Write the html files of a tree with the desired number of files in
+    path, and add to confluence the pages of its directories and of half of
+    its files'''
+
+    for index in range(pages // fan_out):
+        directory = 'dir_{}'.format(index)
+        os.makedirs(os.path.join(path, directory))
+        directory_id = confluence._add_page(
+            directory,
+            NO_README,
+            confluence.homepage_id,
+        )
+        for file_index in range(fan_out):
+            title = '{}_file_{}'.format(directory, file_index)
+            html = '<p>{}</p>'.format(title)
+            with open(os.path.join(path, directory, title + '.html'), 'w') \
+                    as f:
+                f.write(html)
+            if file_index < fan_out // 2:
+                confluence._add_page(title, html, directory_id)
+
+
+def measure(pages, fan_out):
+    '''Return the seconds that the plan of a space of pages takes and the
+    plan'''
+
+    path = tempfile.mkdtemp()
+    try:
+        with FakeConfluenceServer(space=SPACE) as server:
+            synthetic_space(path, server.confluence, pages, fan_out)
+            git2sc = Git2SC(
+                server.url,
+                'bench:bench',
+                SPACE,
+                markdown_engine='native',
+            )
+            start = time.perf_counter()
+            plan = git2sc.plan_update(path, [])
+            return time.perf_counter() - start, plan
+    finally:
+        shutil.rmtree(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--sizes',
+        type=int,
+        nargs='*',
+        default=[1000, 10000, 100000],
+        help='Number of pages of each run',
+    )
+    parser.add_argument(
+        '--fan-out',
+        type=int,
+        default=50,
+        help='Number of files per directory',
+    )
+    args = parser.parse_args()
+
+    print('{:>10} {:>10} {:>14}'.format('pages', 'seconds', 'us per page'))
+    for pages in args.sizes:
+        elapsed, _ = measure(pages, args.fan_out)
+        print('{:>10} {:>10.3f} {:>14.2f}'.format(
+            pages,
+            elapsed,
+            elapsed / pages * 1e6,
+        ))
+
+
+if __name__ == '__main__':
+    main()
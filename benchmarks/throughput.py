@@ -0,0 +1,270 @@
+#!/usr/bin/python
+'''Measure the end to end throughput of the upload and sync of git2sc
+against a local fake Confluence.
+
+A synthetic documentation repository is uploaded to an empty space of a
+git2sc.fake.FakeConfluenceServer, part of its files are changed and then it
+is synced. For each phase it prints the pages processed per second, the
+requests sent per page and the peak memory of git2sc. Each phase runs in a
+new python process, so its peak memory doesn't include the fake server nor
+the previous phases.
+
+    PYTHONPATH=. python benchmarks/throughput.py --depth 3 --fan-out 4 \\
+        --files 20 --latency 0.02 --throttle-every 100
+'''
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import resource
+import traceback
+import multiprocessing
+
+from git2sc.fake import FakeConfluenceServer, change_files, generate_repository
+from git2sc.git2sc import Git2SC, MARKDOWN_ENGINES
+from git2sc.state import SyncState
+
+SPACE = 'BENCH'
+
+
+def peak_memory():
+    '''Return the peak resident memory of the process in MB'''
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports it in KB and macOS in bytes
+    if sys.platform == 'darwin':
+        return peak / 1024 / 1024
+    return peak / 1024
+
+
+def run_phase(phase, api_url, path, options, results):
+    '''Upload or sync path in a fresh process and send its measures to the
+    results queue'''
+
+    try:
+        state = None
+        if options['state'] is not None:
+            state = SyncState(options['state'], SPACE)
+        start = time.perf_counter()
+        g = Git2SC(
+            api_url,
+            'bench:bench',
+            SPACE,
+            pool_size=max(options['workers'], 10),
+            state=state,
+            markdown_engine=options['markdown_engine'],
+        )
+        if phase == 'upload':
+            g.directory_full_upload(
+                path,
+                ['.git'],
+                workers=options['workers'],
+                jobs=options['jobs'],
+            )
+        else:
+            g.directory_update(
+                path,
+                ['.git'],
+                workers=options['workers'],
+                jobs=options['jobs'],
+            )
+        results.put({
+            'seconds': time.perf_counter() - start,
+            'stats': dict(g.stats),
+            'throttled': g.throttle.throttled,
+            'peak_memory': peak_memory(),
+        })
+    except Exception:
+        results.put({'error': traceback.format_exc()})
+
+
+def measure(phase, server, path, options):
+    '''Run a phase in a new process and return its measures'''
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    requests_before = sum(server.confluence.requests.values())
+    process = context.Process(
+        target=run_phase,
+        args=(phase, server.url, path, options, results),
+    )
+    process.start()
+    result = results.get()
+    process.join()
+    if 'error' in result:
+        raise RuntimeError(
+            'The {} failed:\n{}'.format(phase, result['error']),
+        )
+    result['requests'] = \
+        sum(server.confluence.requests.values()) - requests_before
+    stats = result['stats']
+    result['pages'] = sum(
+        stats.get(stat, 0) for stat in ('created', 'updated', 'skipped')
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--depth',
+        type=int,
+        default=2,
+        help='Levels of subdirectories of the synthetic repository',
+    )
+    parser.add_argument(
+        '--fan-out',
+        type=int,
+        default=4,
+        help='Number of subdirectories of each directory',
+    )
+    parser.add_argument(
+        '--files',
+        type=int,
+        default=20,
+        help='Number of documents of each directory',
+    )
+    parser.add_argument(
+        '--file-size',
+        type=int,
+        default=4096,
+        help='Approximate size of each document in bytes',
+    )
+    parser.add_argument(
+        '--adoc-ratio',
+        type=float,
+        default=0.0,
+        help='Fraction of the documents that are asciidoc, they need '
+        'asciidoctor',
+    )
+    parser.add_argument(
+        '--changed',
+        type=float,
+        default=0.1,
+        help='Fraction of the documents changed before the sync',
+    )
+    parser.add_argument(
+        '--repository',
+        type=str,
+        default=None,
+        help='Benchmark this directory instead of a synthetic repository',
+    )
+    parser.add_argument(
+        '--latency',
+        type=float,
+        default=0.0,
+        help='Seconds that the fake confluence takes to answer each request',
+    )
+    parser.add_argument(
+        '--throttle-every',
+        type=int,
+        default=0,
+        help='Answer with a 429 one out of this many requests',
+    )
+    parser.add_argument(
+        '--retry-after',
+        type=int,
+        default=0,
+        help='Retry-After of the throttled requests in seconds',
+    )
+    parser.add_argument(
+        '--max-page-size',
+        type=int,
+        default=100,
+        help='Maximum number of pages of each listing batch',
+    )
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=int,
+        default=8,
+        help='Number of pages to create or update in parallel',
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        default=os.cpu_count(),
+        help='Number of files to convert in parallel',
+    )
+    parser.add_argument(
+        '--markdown-engine',
+        choices=MARKDOWN_ENGINES,
+        default='native',
+        help='Engine that converts the markdown files',
+    )
+    parser.add_argument(
+        '--state',
+        action='store_true',
+        help='Use a sync state database in the upload and the sync',
+    )
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'docs')
+    try:
+        if args.repository is None:
+            counts = generate_repository(
+                path,
+                depth=args.depth,
+                fan_out=args.fan_out,
+                files=args.files,
+                file_size=args.file_size,
+                adoc_ratio=args.adoc_ratio,
+            )
+            print('Generated {directories} directories and {documents} '
+                  'documents'.format(**counts))
+        else:
+            # The copy is changed before the sync
+            shutil.copytree(args.repository, path)
+        options = {
+            'workers': args.workers,
+            'jobs': args.jobs,
+            'markdown_engine': args.markdown_engine,
+            'state': None,
+        }
+        if args.state:
+            options['state'] = os.path.join(directory, 'state.sqlite')
+
+        with FakeConfluenceServer(
+            space=SPACE,
+            latency=args.latency,
+            throttle_every=args.throttle_every,
+            retry_after=args.retry_after,
+            max_page_size=args.max_page_size,
+        ) as server:
+            results = [('upload', measure('upload', server, path, options))]
+            changed = change_files(path, args.changed)
+            print('Changed {} documents before the sync'.format(changed))
+            results.append(('sync', measure('sync', server, path, options)))
+    finally:
+        shutil.rmtree(directory)
+
+    print('{:>8} {:>8} {:>9} {:>9} {:>14} {:>10} {:>10}'.format(
+        'phase',
+        'pages',
+        'seconds',
+        'pages/s',
+        'requests/page',
+        'throttled',
+        'peak MB',
+    ))
+    for phase, result in results:
+        pages = max(result['pages'], 1)
+        print('{:>8} {:>8} {:>9.2f} {:>9.1f} {:>14.2f} {:>10} {:>10.1f}'
+              .format(
+                  phase,
+                  result['pages'],
+                  result['seconds'],
+                  result['pages'] / result['seconds'],
+                  result['requests'] / pages,
+                  result['throttled'],
+                  result['peak_memory'],
+              ))
+
+
+if __name__ == '__main__':
+    main()
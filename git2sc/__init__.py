@@ -17,26 +17,68 @@
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
 import os
-from git2sc.git2sc import Git2SC
+import sys
+import logging
+from git2sc.git import MissingObject
+from git2sc.git2sc import Git2SC, TooManyDeletions
+from git2sc.cache import HtmlCache, default_cache_path
+from git2sc.plan import StalePlan, SyncPlan
+from git2sc.journal import Journal, JournalMismatch, default_journal_path
+from git2sc.metrics import PushError, openmetrics, push, write_textfile
+from git2sc.workers import WarmConverters
+from git2sc.state import SyncState, default_state_path
 from git2sc.cli import load_parser
 
 
-def main():
-    parser = load_parser()
-    args = parser.parse_args()
-    try:
-        api_url = os.environ['GIT2SC_API_URL']
-    except KeyError:
-        print('GIT2SC_API_URL environmental variable not set')
+def print_conversion_errors(g):
+    '''Print the files that couldn't be converted and the reason'''
+
+    for file_path, error in sorted(g.conversion_errors.items()):
+        print('Error converting {}: {}'.format(file_path, error))
+
+
+def print_deletions(g):
+    '''Print the pages deleted by a sync and how long each batch took'''
+
+    for batch in g.deletions:
+        for page_id, title in batch['pages']:
+            print('Deleted {} ({})'.format(title, page_id))
+        print('Deleted {} pages at depth {} in {:.2f}s'.format(
+            len(batch['pages']),
+            batch['depth'],
+            batch['seconds'],
+        ))
+
+
+def print_report(g, args):
+    '''Print the run report, or write it as json if --report has a path'''
+
+    if args.report is None:
         return
+    if args.report == '-':
+        print(g.report.format(args.slowest))
+    else:
+        g.report.save(args.report, args.slowest)
 
-    try:
-        auth = os.environ['GIT2SC_AUTH']
-    except KeyError:
-        print('GIT2SC_AUTH environmental variable not set')
+
+def export_metrics(g, args):
+    '''Write the metrics of the run for the node exporter and push them to
+    the Pushgateway if they are asked'''
+
+    if args.metrics is None and args.pushgateway is None:
         return
+    text = openmetrics(g)
+    if args.metrics is not None:
+        write_textfile(args.metrics, text)
+    if args.pushgateway is not None:
+        try:
+            push(args.pushgateway, args.space, text)
+        except PushError as error:
+            print(error)
+
 
-    g = Git2SC(api_url, auth, args.space)
+def run_subcommand(g, args):
+    '''Run the subcommand of the command line with a Git2SC object'''
 
     if args.subcommand == 'article':
         if args.article_command == 'delete':
@@ -52,9 +94,152 @@ def main():
                 g.create_page(args.title, html, args.parent_id)
 
     elif args.subcommand == 'upload':
-        g.directory_full_upload(args.path, args.exclude, args.parent_id)
+        journal = Journal(
+            args.journal or default_journal_path(args.space),
+            resume=args.resume,
+        )
+        try:
+            g.directory_full_upload(
+                args.path,
+                args.exclude,
+                args.parent_id,
+                workers=args.workers,
+                jobs=args.jobs,
+                converter_limits=dict(args.converter_limit or []),
+                journal=journal,
+                ref=args.ref,
+            )
+        except (JournalMismatch, MissingObject) as error:
+            journal.close()
+            print(error)
+            sys.exit(1)
+        journal.remove()
+        print_conversion_errors(g)
+        print(g.summary())
     elif args.subcommand == 'sync':
-        g.directory_update(args.path, args.exclude)
+        try:
+            if args.incremental:
+                g.directory_incremental_update(
+                    args.path,
+                    args.exclude,
+                    args.parent_id,
+                    since=args.since,
+                    workers=args.workers,
+                    jobs=args.jobs,
+                    converter_limits=dict(args.converter_limit or []),
+                    max_deletes=args.max_deletes,
+                )
+            else:
+                g.directory_update(
+                    args.path,
+                    args.exclude,
+                    args.parent_id,
+                    workers=args.workers,
+                    jobs=args.jobs,
+                    converter_limits=dict(args.converter_limit or []),
+                    max_deletes=args.max_deletes,
+                    ref=args.ref,
+                )
+        except (TooManyDeletions, MissingObject) as error:
+            print(error)
+            sys.exit(1)
+        print_deletions(g)
+        print_conversion_errors(g)
+        print(g.summary())
+    elif args.subcommand == 'plan':
+        try:
+            plan = g.plan_update(
+                args.path,
+                args.exclude,
+                args.parent_id,
+                jobs=args.jobs,
+                converter_limits=dict(args.converter_limit or []),
+                ref=args.ref,
+            )
+        except MissingObject as error:
+            print(error)
+            sys.exit(1)
+        if args.output is not None:
+            plan.save(args.output)
+        print_conversion_errors(g)
+        print(plan.summary())
+    elif args.subcommand == 'apply':
+        plan = SyncPlan.load(args.plan)
+        if plan.space != args.space:
+            print('The plan {} belongs to the space {}'.format(
+                args.plan,
+                plan.space,
+            ))
+            sys.exit(1)
+        try:
+            g.apply_plan(
+                plan,
+                workers=args.workers,
+                max_deletes=args.max_deletes,
+            )
+        except (StalePlan, TooManyDeletions) as error:
+            print(error)
+            sys.exit(1)
+        print_deletions(g)
+        print(g.summary())
+
+
+def main():
+    parser = load_parser()
+    args = parser.parse_args()
+    if args.subcommand == 'sync' and args.incremental and \
+            args.ref is not None:
+        parser.error("--ref can't be used with --incremental")
+    logging.basicConfig(format='%(message)s')
+    try:
+        api_url = os.environ['GIT2SC_API_URL']
+    except KeyError:
+        print('GIT2SC_API_URL environmental variable not set')
+        sys.exit(1)
+
+    try:
+        auth = os.environ['GIT2SC_AUTH']
+    except KeyError:
+        print('GIT2SC_AUTH environmental variable not set')
+        sys.exit(1)
+
+    state = None
+    if not args.no_state:
+        state = SyncState(
+            args.state or default_state_path(args.space),
+            args.space,
+        )
+
+    cache = None
+    if not args.no_cache:
+        cache = HtmlCache(
+            args.cache or default_cache_path(),
+            max_size=args.cache_size * 1024 * 1024,
+        )
+
+    warm_converters = None
+    if not args.no_warm_converters:
+        warm_converters = WarmConverters()
+
+    g = Git2SC(
+        api_url,
+        auth,
+        args.space,
+        state=state,
+        cache=cache,
+        warm_converters=warm_converters,
+        markdown_engine=args.markdown_engine,
+        rate_limit=args.rate_limit,
+        gitignore=not args.no_gitignore,
+    )
+
+    try:
+        run_subcommand(g, args)
+    finally:
+        print_report(g, args)
+        export_metrics(g, args)
+        if warm_converters is not None:
+            warm_converters.close()
 
 
 if __name__ == "__main__":
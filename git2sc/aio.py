@@ -0,0 +1,657 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from urllib.parse import quote
+
+import aiohttp
+
+from git2sc.content import content_hash
+from git2sc.convert import NOT_CONVERTED, ConversionPool
+from git2sc.git2sc import BaseGit2SC
+from git2sc.scheduler import is_future
+from git2sc.throttle import Throttle
+
+
+class Response():
+    '''Status and body of a confluence response, with the attributes of a
+    requests response that Git2SC uses'''
+
+    def __init__(self, status_code, text, headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.text)
+
+
+async def _resolve(value):
+    '''Wait for a value that can be the future result of another task'''
+
+    if isinstance(value, asyncio.Future):
+        return await value
+    if is_future(value):
+        return await asyncio.wrap_future(value)
+    return value
+
+
+class AsyncScheduler():
+    '''Scheduler that runs the tasks as coroutines of the event loop.
+
+    The arguments that are futures, of other tasks or of the conversion
+    pool, are awaited and replaced by their results before calling the task,
+    so a page is created once the page of its directory exists.
+
+    The tasks can be submitted from other threads than the one of the event
+    loop, like the crawl of a directory that runs in an executor so it
+    doesn't block the requests in flight.
+    '''
+
+    def __init__(self):
+        self.tasks = []
+        self.loop = asyncio.get_event_loop()
+        self.thread = threading.get_ident()
+        self.lock = threading.Lock()
+
+    async def _run(self, function, arguments):
+        resolved_arguments = []
+        for argument in arguments:
+            resolved_arguments.append(await _resolve(argument))
+        return await function(*resolved_arguments)
+
+    def submit(self, function, *arguments):
+        '''Schedule function(*arguments) and return its task, or a
+        concurrent future if it's called from another thread'''
+
+        if threading.get_ident() == self.thread:
+            task = asyncio.ensure_future(self._run(function, arguments))
+        else:
+            task = asyncio.run_coroutine_threadsafe(
+                self._run(function, arguments),
+                self.loop,
+            )
+        with self.lock:
+            self.tasks.append(task)
+        return task
+
+    async def join(self):
+        '''Wait for all the submitted tasks. Raises the exception of the first
+        failed task, if any'''
+
+        results = await asyncio.gather(
+            *[_resolve(task) for task in self.tasks],
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+
+class AsyncGit2SC(BaseGit2SC):
+    '''Git2SC client whose requests run on an asyncio event loop.
+
+    It shares with Git2SC the conversions and the scheduling of the syncs,
+    and has its uploads, updates and deletions as coroutines, sending the
+    requests through one aiohttp session with up to concurrency requests in
+    flight, so thousands of pages can be updated without a thread per
+    request. The files are still converted by a pool of threads, as the
+    converters are external processes. The incremental syncs and the plans
+    are only available in Git2SC.
+
+        async with AsyncGit2SC(api_url, auth, space) as g:
+            await g.directory_update(path, excluded_items)
+            print(g.summary())
+
+    The space pages are loaded when the client is opened.
+    '''
+
+    def __init__(
+        self,
+        confluence_api_url,
+        auth,
+        space_id,
+        concurrency=100,
+        timeout=60,
+        page_size=100,
+        listing_concurrency=4,
+        state=None,
+        cache=None,
+        warm_converters=None,
+        markdown_engine='pandoc',
+        rate_limit=None,
+        gitignore=True,
+    ):
+        super().__init__(
+            confluence_api_url,
+            auth,
+            space_id,
+            page_size=page_size,
+            listing_concurrency=listing_concurrency,
+            state=state,
+            cache=cache,
+            warm_converters=warm_converters,
+            markdown_engine=markdown_engine,
+            gitignore=gitignore,
+        )
+        self.concurrency = max(concurrency, 1)
+        self.timeout = timeout
+        self.session = None
+        self.throttle = Throttle(rate_limit, concurrency=self.concurrency)
+        self._slots = None
+
+    async def open(self):
+        '''Open the http session and load the pages of the space'''
+
+        self._slots = asyncio.Condition()
+        self.session = aiohttp.ClientSession(
+            auth=aiohttp.BasicAuth(*self.auth),
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        await self.get_space_articles()
+        return self
+
+    async def close(self):
+        '''Close the http session'''
+
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exception):
+        await self.close()
+
+    async def _request(self, method, url, **kwargs):
+        '''Send a request through the session once there is a free slot in
+        the adaptive concurrency of the throttle, retrying it while
+        confluence throttles the requests'''
+
+        attempt = 0
+        while True:
+            async with self._slots:
+                await self._slots.wait_for(self.throttle.limit.try_acquire)
+            try:
+                await asyncio.sleep(self.throttle.delay())
+                start = self.throttle.clock()
+                async with self.session.request(method, url, **kwargs) as r:
+                    response = Response(r.status, await r.text(), r.headers)
+                latency = self.throttle.clock() - start
+                self.report.request(
+                    method,
+                    self._api_path(url),
+                    latency,
+                    kwargs.get('data'),
+                    response.text,
+                    response.status_code,
+                )
+                delay = self.throttle.record(response, latency, attempt)
+            finally:
+                self.throttle.limit.release()
+                async with self._slots:
+                    self._slots.notify_all()
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get_page_info(self, pageid):
+        '''Get all the information of a confluence page'''
+
+        url = '{base}/content/{pageid}?expand=ancestors,body.storage,version'\
+            .format(base=self.api_url, pageid=pageid)
+
+        r = await self._request('GET', url)
+        self._requests_error(r)
+        return r.json()
+
+    async def get_space_homepage(self):
+        '''Get the homepage of a confluence space'''
+
+        url = '{base}/space/{spaceid}'.format(
+            base=self.api_url,
+            spaceid=self.space,
+        )
+        r = await self._request('GET', url)
+        self._requests_error(r)
+        return r.json()['_expandable']['homepage'].split('/')[4]
+
+    async def _get_space_articles_batch(self, start, limit):
+        '''Get one batch of the pages of a confluence space'''
+
+        url = '{base}/space/{spaceid}/content?expand=version,ancestors'\
+            '&limit={limit}&start={start}'.format(
+                base=self.api_url,
+                spaceid=self.space,
+                limit=limit,
+                start=start,
+            )
+        r = await self._request('GET', url)
+        self._requests_error(r)
+        return r.json()['page']
+
+    async def get_space_articles(self):
+        '''Get the metadata of all the pages of a confluence space.
+
+        As in Git2SC.iter_space_articles the first batch tells the page size,
+        and the rest are requested at once if the server returns the
+        totalSize, or in windows of listing_concurrency batches otherwise.
+        '''
+
+        with self.report.phase('list'):
+            await self._get_space_articles()
+
+    async def _get_space_articles(self):
+        self.pages = {}
+        batch = await self._get_space_articles_batch(0, self.page_size)
+        batches = [batch]
+        if 'next' in batch.get('_links', {}):
+            limit = batch.get('limit') or len(batch['results']) or \
+                self.page_size
+            start = batch.get('start', 0) + len(batch['results'])
+            total = batch.get('totalSize')
+            if total is not None:
+                batches.extend(await asyncio.gather(*[
+                    self._get_space_articles_batch(batch_start, limit)
+                    for batch_start in range(start, total, limit)
+                ]))
+            else:
+                last_batch_found = False
+                while not last_batch_found:
+                    window = await asyncio.gather(*[
+                        self._get_space_articles_batch(
+                            start + index * limit,
+                            limit,
+                        )
+                        for index in range(self.listing_concurrency)
+                    ])
+                    for batch in window:
+                        if 'next' not in batch.get('_links', {}) or \
+                                not batch['results']:
+                            last_batch_found = True
+                    batches.extend(window)
+                    start += self.listing_concurrency * limit
+        for batch in batches:
+            for page in batch['results']:
+                self.pages[page['id']] = page
+
+    async def _get_bodies_batch(self, page_ids):
+        '''Get the storage body of a batch of pages with a single request'''
+
+        cql = 'id in ({})'.format(','.join(page_ids))
+        url = '{base}/content/search?cql={cql}&expand=body.storage'\
+            '&limit={limit}'.format(
+                base=self.api_url,
+                cql=quote(cql),
+                limit=len(page_ids),
+            )
+        r = await self._request('GET', url)
+        self._requests_error(r)
+        return r.json()['results']
+
+    async def load_bodies(self, page_ids):
+        '''Load in bulk the storage body of the pages that don't have it
+        loaded yet'''
+
+        with self.report.phase('bodies'):
+            await self._load_bodies(page_ids)
+
+    async def _load_bodies(self, page_ids):
+        missing = [
+            pageid
+            for pageid in page_ids
+            if pageid in self.pages and 'body' not in self.pages[pageid]
+        ]
+        batches = await asyncio.gather(*[
+            self._get_bodies_batch(missing[index:index + self.page_size])
+            for index in range(0, len(missing), self.page_size)
+        ])
+        for results in batches:
+            for page in results:
+                if page['id'] in self.pages:
+                    self.pages[page['id']]['body'] = page['body']
+
+        pages = await asyncio.gather(*[
+            self.get_page_info(pageid)
+            for pageid in missing
+            if 'body' not in self.pages[pageid]
+        ])
+        for page in pages:
+            self.pages[page['id']]['body'] = page['body']
+
+    async def get_page_body(self, pageid):
+        '''Get the storage body of a page, loading it if needed'''
+
+        if pageid not in self.pages:
+            self.pages[pageid] = await self.get_page_info(pageid)
+        await self.load_bodies([pageid])
+        return self.pages[pageid]['body']['storage']['value']
+
+    async def update_page(self, pageid, html, title=None, parent_id=None):
+        '''Update a confluence page with the content of the html variable,
+        unless its loaded body has the same content. Returns True if the page
+        was updated'''
+
+        if self._is_unchanged(pageid, html, title, parent_id):
+            self._count('skipped')
+            return False
+
+        with self.report.page(self._page_title(pageid, title)):
+            if 'version' not in self.pages.get(pageid, {}):
+                self.pages[pageid] = await self.get_page_info(pageid)
+
+            version, data_json = self._update_data(
+                pageid,
+                html,
+                title,
+                parent_id,
+            )
+            r = await self._request(
+                'PUT',
+                '{base}/content/{pageid}'.format(
+                    base=self.api_url,
+                    pageid=pageid,
+                ),
+                data=data_json,
+                headers={'Content-Type': 'application/json'},
+            )
+        self._requests_error(r)
+
+        self._page_updated(pageid, version)
+        return True
+
+    async def create_page(self, title, html, parent_id=None):
+        '''Create a confluence page with the content of the html variable'''
+
+        new_title = self._reserve_title(title)
+        try:
+            with self.report.page(new_title):
+                r = await self._request(
+                    'POST',
+                    '{base}/content?expand=ancestors,version'.format(
+                        base=self.api_url,
+                    ),
+                    data=self._create_data(new_title, html, parent_id),
+                    headers={'Content-Type': 'application/json'},
+                )
+                self._requests_error(r)
+
+                page = r.json()
+                pageid = page['id']
+                self.pages[pageid] = self._created_page_record(page) or \
+                    await self.get_page_info(pageid)
+        finally:
+            self._release_title(new_title)
+        self._count('created')
+        return pageid
+
+    async def delete_page(self, pageid):
+        '''Delete a confluence page given the pageid'''
+
+        with self.report.page(self._page_title(pageid)):
+            r = await self._request(
+                'DELETE',
+                '{base}/content/{pageid}'.format(
+                    base=self.api_url,
+                    pageid=pageid,
+                ),
+            )
+        if r.status_code != 204:
+            self._requests_error(r)
+
+        self._page_deleted(pageid)
+
+    async def _discover_readme(self, directory_path, html=NOT_CONVERTED):
+        '''Return the body of the page of a directory, converting its README
+        on a thread if html is NOT_CONVERTED'''
+
+        if html is not NOT_CONVERTED:
+            return self._readme_html(directory_path, html)
+        return await asyncio.get_event_loop().run_in_executor(
+            None,
+            self._readme_html,
+            directory_path,
+        )
+
+    async def _process_mainpage(
+        self,
+        directory_path,
+        html=NOT_CONVERTED,
+        relative_path=None,
+    ):
+        '''Update the confluence homepage with the README of a directory'''
+
+        homepage_id = await self.get_space_homepage()
+        await self._update_directory_page(
+            relative_path,
+            homepage_id,
+            await self._discover_readme(directory_path, html),
+        )
+        return homepage_id
+
+    async def _update_directory_page(self, relative_path, article_id, html):
+        '''Update the page of a directory, unless the sync state shows that
+        its rendered html didn't change'''
+
+        if self._state_is_current(
+            relative_path,
+            rendered_hash=content_hash(str(html)),
+        ):
+            self._count('skipped')
+        else:
+            await self.update_page(article_id, html)
+
+    async def _create_directory_readme(
+        self,
+        directory_path,
+        parent_id=None,
+        html=NOT_CONVERTED,
+    ):
+        '''Create the page of a directory with its README'''
+
+        return await self._create_page_once(
+            os.path.basename(directory_path),
+            await self._discover_readme(directory_path, html),
+            parent_id,
+        )
+
+    async def _update_directory_readme(
+        self,
+        directory_path,
+        html=NOT_CONVERTED,
+        relative_path=None,
+    ):
+        '''Update the page of a directory with its README, returning its
+        id'''
+
+        article_id = self._get_article_id(os.path.basename(directory_path))
+        await self._update_directory_page(
+            relative_path,
+            article_id,
+            await self._discover_readme(directory_path, html),
+        )
+        return article_id
+
+    async def _create_page_once(self, title, html, parent_id=None):
+        '''Create a page, or update the page a previous attempt of a resumed
+        upload created'''
+
+        pageid = self._adopted_page(title, parent_id)
+        if pageid is None:
+            return await self.create_page(title, html, parent_id)
+        await self.update_page(pageid, html)
+        return pageid
+
+    async def _create_file_page(
+        self,
+        relative_path,
+        source_hash,
+        filename,
+        html,
+        parent_id,
+    ):
+        '''Create the page of a file and record it in the sync state'''
+
+        if html is None:
+            return None
+        article_id = await self._create_page_once(filename, html, parent_id)
+        self._record_state(relative_path, article_id, source_hash, html)
+        return article_id
+
+    async def _update_file_page(
+        self,
+        relative_path,
+        source_hash,
+        article_id,
+        html,
+        parent_id=None,
+    ):
+        '''Update the page of a file, unless the sync state shows that its
+        rendered html didn't change, moving it below parent_id if the file
+        moved, and record it in the sync state'''
+
+        if html is None:
+            return article_id
+        if self._is_moved(article_id, parent_id):
+            await self.update_page(article_id, html, parent_id=parent_id)
+        elif self._state_is_current(
+            relative_path,
+            rendered_hash=content_hash(str(html)),
+        ):
+            self._count('skipped')
+        else:
+            await self.update_page(article_id, html)
+        self._record_state(relative_path, article_id, source_hash, html)
+        return article_id
+
+    async def _record_directory_state(
+        self,
+        relative_path,
+        article_id,
+        html=None,
+    ):
+        '''Record the page of a directory and the hash of its html in the
+        sync state'''
+
+        self._record_state(relative_path, article_id, html=html)
+        return article_id
+
+    async def _crawl(self, schedule, *arguments):
+        '''Run a crawl that submits the pages to an AsyncScheduler in an
+        executor, as walking the directory and converting the files inline,
+        with one job, would block the requests in flight'''
+
+        return await asyncio.get_event_loop().run_in_executor(
+            None,
+            schedule,
+            *arguments
+        )
+
+    async def directory_full_upload(
+        self,
+        path,
+        excluded_items,
+        parent_id=None,
+        jobs=None,
+        converter_limits=None,
+        journal=None,
+        ref=None,
+    ):
+        '''Crawl a directory and upload its files to confluence, like
+        Git2SC.directory_full_upload, with all the requests in flight at the
+        same time up to the concurrency of the client'''
+
+        if journal is not None:
+            journal.start(path, parent_id)
+        self.journal = journal
+        self._open_ref(path, ref)
+        scheduler = AsyncScheduler()
+        converter = ConversionPool(
+            self._convert_file,
+            jobs or os.cpu_count(),
+            converter_limits,
+        )
+        try:
+            with self.report.phase('publish'):
+                await self._crawl(
+                    self._schedule_full_upload,
+                    path,
+                    excluded_items,
+                    parent_id,
+                    scheduler,
+                    converter,
+                )
+                await scheduler.join()
+        finally:
+            converter.shutdown()
+            self._close_ref()
+            if journal is not None:
+                journal.sync()
+            self.journal = None
+
+    async def directory_update(
+        self,
+        path,
+        excluded_items,
+        parent_id=None,
+        jobs=None,
+        converter_limits=None,
+        max_deletes=None,
+        ref=None,
+    ):
+        '''Crawl a directory and update its files on confluence, like
+        Git2SC.directory_update, with all the requests in flight at the same
+        time up to the concurrency of the client'''
+
+        await self.load_bodies(self._bodies_to_compare(parent_id))
+        self._open_ref(path, ref)
+
+        scheduler = AsyncScheduler()
+        converter = ConversionPool(
+            self._convert_file,
+            jobs or os.cpu_count(),
+            converter_limits,
+        )
+        try:
+            with self.report.phase('publish'):
+                processed_articles_ids, pending_articles_ids = \
+                    await self._crawl(
+                        self._schedule_update,
+                        path,
+                        excluded_items,
+                        parent_id,
+                        scheduler,
+                        converter,
+                    )
+                await scheduler.join()
+        finally:
+            converter.shutdown()
+            self._close_ref()
+        for article_id in pending_articles_ids:
+            processed_articles_ids.add(article_id.result())
+
+        await self.delete_pages(
+            self._pages_to_delete(processed_articles_ids, parent_id),
+            max_deletes=max_deletes,
+        )
+
+    async def delete_pages(self, page_ids, max_deletes=None):
+        '''Delete several pages, leaves first, with all the pages of each
+        batch in flight at the same time'''
+
+        for depth, batch in self._deletion_batches(page_ids, max_deletes):
+            pages = [
+                (page_id, self.pages[page_id].get('title'))
+                for page_id in batch
+            ]
+            start = time.monotonic()
+            with self.report.phase('delete'):
+                await asyncio.gather(*[
+                    self.delete_page(page_id)
+                    for page_id in batch
+                ])
+            self._record_deletion_batch(depth, pages, start)
@@ -0,0 +1,109 @@
+import os
+import hashlib
+import tempfile
+import threading
+
+
+def default_cache_path():
+    '''Return the default directory of the converted html cache'''
+
+    cache_directory = os.environ.get(
+        'XDG_CACHE_HOME',
+        os.path.join(os.path.expanduser('~'), '.cache'),
+    )
+    return os.path.join(cache_directory, 'git2sc', 'html')
+
+
+def cache_key(source, converter, version, arguments):
+    '''Return the cache key of the conversion of the source bytes by a
+    converter version with some arguments'''
+
+    key = hashlib.sha256()
+    for part in (converter, version, ' '.join(arguments)):
+        key.update(part.encode())
+        key.update(b'\0')
+    key.update(source)
+    return key.hexdigest()
+
+
+class HtmlCache():
+    '''Directory with the html of the converted files, stored by the hash of
+    their source, converter, converter version and converter arguments, so a
+    file is only converted again when one of them changes.
+
+    The entries are written atomically and the directory doesn't have any
+    index, so it can be shared between several runs and CI runners. When it
+    grows over max_size bytes the least recently used entries are removed,
+    each hit refreshes the modification time of its entry.
+    '''
+
+    def __init__(self, directory, max_size=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for _, _, size in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.html')
+
+    def _entries(self):
+        '''Yield the (modification time, path, size) of each entry'''
+
+        for prefix in os.scandir(self.directory):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if not entry.name.endswith('.html'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, entry.path, stat.st_size
+
+    def get(self, key):
+        '''Return the cached html of a key or None if it's not cached'''
+
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                html = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # Not cached or removed by another run sharing the directory
+            return None
+        return html
+
+    def put(self, key, html):
+        '''Store the html of a key'''
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(
+            dir=os.path.dirname(path),
+            suffix='.tmp',
+        )
+        with os.fdopen(descriptor, 'w') as f:
+            f.write(html)
+        os.replace(temporary_path, path)
+        with self.lock:
+            self.size += os.path.getsize(path)
+            if self.size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        '''Remove the least recently used entries until the cache uses 90% of
+        its maximum size, leaving room for the next entries'''
+
+        entries = sorted(self._entries())
+        self.size = sum(size for _, _, size in entries)
+        target = self.max_size * 0.9
+        for _, path, size in entries:
+            if self.size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
@@ -1,5 +1,8 @@
+import os
 import argparse
 import argcomplete
+from git2sc.convert import parse_converter_limit
+from git2sc.git2sc import MARKDOWN_ENGINES
 
 
 def load_parser():
@@ -15,6 +18,88 @@ def load_parser():
         type=str,
         help='Confluence space id',
     )
+    parser.add_argument(
+        "--state",
+        type=str,
+        default=None,
+        help='Path to the sync state database, by default '
+        '~/.cache/git2sc/{{ space }}.sqlite',
+    )
+    parser.add_argument(
+        "--no-state",
+        action="store_true",
+        help="Don't use the sync state database",
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        default=None,
+        help='Directory of the converted html cache, it can be shared '
+        'between runners. By default ~/.cache/git2sc/html',
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=512,
+        help="Maximum size of the converted html cache in MB",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't use the converted html cache",
+    )
+    parser.add_argument(
+        "--markdown-engine",
+        choices=MARKDOWN_ENGINES,
+        default='pandoc',
+        help="Engine that converts the markdown files, native renders them "
+        "in process and uses pandoc for the syntax it doesn't support",
+    )
+    parser.add_argument(
+        "--no-warm-converters",
+        action="store_true",
+        help="Start a converter process for each file instead of keeping "
+        "asciidoctor and pandoc workers running",
+    )
+    parser.add_argument(
+        "--no-gitignore",
+        action="store_true",
+        help="Publish the files ignored by the .gitignore files of the "
+        "directory",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=None,
+        help="Maximum sustained number of requests per second sent to "
+        "confluence, by default only the throttled requests slow it down",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        help="Write the time of each phase, converter and endpoint of the "
+        "run as json to this path, or print it if the path is -",
+    )
+    parser.add_argument(
+        "--slowest",
+        type=int,
+        default=10,
+        help="Number of the slowest files and pages shown in the report",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        default=None,
+        help="Write the metrics of the run in OpenMetrics text to this path, "
+        "for the textfile collector of the node exporter",
+    )
+    parser.add_argument(
+        "--pushgateway",
+        type=str,
+        default=None,
+        help="Push the metrics of the run to the Pushgateway of this url",
+    )
 
     subcommand_parser = parser.add_subparsers(
         dest='subcommand',
@@ -86,7 +171,31 @@ def load_parser():
         "--exclude",
         nargs='*',
         default=['.git', '.gitignore', '.gitmodules'],
-        help="List of directories to exclude",
+        help="Patterns of the files and directories to exclude, with the "
+        "syntax of .gitignore",
+    )
+    upload_parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of pages to create or update in parallel",
+    )
+    upload_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of files to convert in parallel, by default the number "
+        "of CPUs",
+    )
+    upload_parser.add_argument(
+        "--converter-limit",
+        type=parse_converter_limit,
+        action="append",
+        metavar="EXTENSION=LIMIT",
+        help="Maximum number of parallel conversions of the files with an "
+        "extension, for example adoc=2. It can be repeated",
     )
     upload_parser.add_argument(
         "-p",
@@ -96,6 +205,27 @@ def load_parser():
         default=None,
         help="Parent id of the article to create",
     )
+    upload_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted upload, skipping the pages that it "
+        "already uploaded",
+    )
+    upload_parser.add_argument(
+        "--journal",
+        type=str,
+        default=None,
+        help='Path to the upload journal, by default '
+        '~/.cache/git2sc/{space}.journal',
+    )
+    upload_parser.add_argument(
+        "--ref",
+        type=str,
+        default=None,
+        help="Git ref to publish, the files are read from the repository of "
+        "the path, that can be a bare mirror, instead of from its working "
+        "tree",
+    )
     sync_parser = subcommand_parser.add_parser('sync')
     sync_parser.add_argument(
         "path",
@@ -107,7 +237,142 @@ def load_parser():
         "--exclude",
         nargs='*',
         default=['.git', '.gitignore', '.gitmodules'],
-        help="List of directories to exclude",
+        help="Patterns of the files and directories to exclude, with the "
+        "syntax of .gitignore",
+    )
+    sync_parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of pages to create or update in parallel",
+    )
+    sync_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of files to convert in parallel, by default the number "
+        "of CPUs",
+    )
+    sync_parser.add_argument(
+        "--converter-limit",
+        type=parse_converter_limit,
+        action="append",
+        metavar="EXTENSION=LIMIT",
+        help="Maximum number of parallel conversions of the files with an "
+        "extension, for example adoc=2. It can be repeated",
+    )
+    sync_parser.add_argument(
+        "-p",
+        "--parent_id",
+        type=str,
+        nargs='?',
+        default=None,
+        help="Id of the page below which the directory is synced, by "
+        "default the homepage of the space",
+    )
+    sync_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only sync the files changed since the last published commit",
+    )
+    sync_parser.add_argument(
+        "--since",
+        type=str,
+        default=None,
+        help="Commit to compare with in an incremental sync, by default the "
+        "last published commit",
+    )
+    sync_parser.add_argument(
+        "--max-deletes",
+        type=int,
+        default=None,
+        help="Abort the sync without deleting any page if it would delete "
+        "more pages than this",
+    )
+    sync_parser.add_argument(
+        "--ref",
+        type=str,
+        default=None,
+        help="Git ref to publish, the files are read from the repository of "
+        "the path, that can be a bare mirror, instead of from its working "
+        "tree",
+    )
+
+    plan_parser = subcommand_parser.add_parser('plan')
+    plan_parser.add_argument(
+        "path",
+        type=str,
+        help='Path to directory',
+    )
+    plan_parser.add_argument(
+        "-p",
+        "--parent_id",
+        type=str,
+        nargs='?',
+        default=None,
+        help="Id of the page below which the directory is synced, by "
+        "default the homepage of the space",
+    )
+    plan_parser.add_argument(
+        "--exclude",
+        nargs='*',
+        default=['.git', '.gitignore', '.gitmodules'],
+        help="Patterns of the files and directories to exclude, with the "
+        "syntax of .gitignore",
+    )
+    plan_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of files to convert in parallel, by default the number "
+        "of CPUs",
+    )
+    plan_parser.add_argument(
+        "--converter-limit",
+        type=parse_converter_limit,
+        action="append",
+        metavar="EXTENSION=LIMIT",
+        help="Maximum number of parallel conversions of the files with an "
+        "extension, for example adoc=2. It can be repeated",
+    )
+    plan_parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=None,
+        help="Path of the json file to save the plan to",
+    )
+    plan_parser.add_argument(
+        "--ref",
+        type=str,
+        default=None,
+        help="Git ref to publish, the files are read from the repository of "
+        "the path, that can be a bare mirror, instead of from its working "
+        "tree",
+    )
+
+    apply_parser = subcommand_parser.add_parser('apply')
+    apply_parser.add_argument(
+        "plan",
+        type=str,
+        help='Path to the json file of the plan',
+    )
+    apply_parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of pages to create or update in parallel",
+    )
+    apply_parser.add_argument(
+        "--max-deletes",
+        type=int,
+        default=None,
+        help="Abort without deleting any page if the plan would delete "
+        "more pages than this",
     )
 
     argcomplete.autocomplete(parser)
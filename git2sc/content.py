@@ -0,0 +1,51 @@
+import re
+import hashlib
+from html import unescape
+
+VOID_TAGS = (
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr',
+)
+
+_DOCTYPE = re.compile(r'<!DOCTYPE[^>]*>|<\?xml[^>]*\?>', re.IGNORECASE)
+_VOID_TAG = re.compile(
+    r'<({})(\s[^>]*?)?\s*/?>'.format('|'.join(VOID_TAGS)),
+    re.IGNORECASE,
+)
+_CLOSING_VOID_TAG = re.compile(
+    r'</({})\s*>'.format('|'.join(VOID_TAGS)),
+    re.IGNORECASE,
+)
+_ENTITY = re.compile(r'&(?!(?:amp|lt|gt|quot|apos);)#?\w+;')
+_SPACE_BETWEEN_TAGS = re.compile(r'>\s+<')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_storage(html):
+    '''Normalize an html or confluence storage format string so that two
+    renderings of the same content compare equal.
+
+    Confluence rewrites the bodies it stores: it drops the doctype, closes
+    the void tags, replaces the entities by their characters and changes the
+    whitespace between tags.
+    '''
+
+    html = _DOCTYPE.sub('', html)
+    html = _CLOSING_VOID_TAG.sub('', html)
+    html = _VOID_TAG.sub(
+        lambda match: '<{}{} />'.format(
+            match.group(1).lower(),
+            (match.group(2) or '').rstrip(),
+        ),
+        html,
+    )
+    html = _ENTITY.sub(lambda match: unescape(match.group(0)), html)
+    html = _SPACE_BETWEEN_TAGS.sub('><', html)
+    html = _SPACES.sub(' ', html)
+    return html.strip()
+
+
+def content_hash(html):
+    '''Return the sha256 hex digest of the normalized html'''
+
+    return hashlib.sha256(normalize_storage(html).encode()).hexdigest()
@@ -0,0 +1,98 @@
+import os
+import threading
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Maximum number of conversions of each extension that can run at the same
+# time, None means limited only by the number of jobs. asciidoctor starts a
+# ruby interpreter for each file, so it's the first one to limit if the
+# runner is short on memory.
+CONVERTER_LIMITS = {
+    '.adoc': None,
+    '.md': None,
+    '.html': None,
+}
+
+# Errors raised by the converters when they can't convert a file:
+# asciidoctor returning a non zero code or not being installed, pandoc
+# (pypandoc raises RuntimeError) or a file that is not valid utf-8.
+CONVERSION_ERRORS = (
+    subprocess.CalledProcessError,
+    OSError,
+    RuntimeError,
+    UnicodeDecodeError,
+)
+
+# Html of a file that wasn't converted yet, None is the result of a failed
+# conversion
+NOT_CONVERTED = object()
+
+
+def parse_converter_limit(value):
+    '''Parse a converter limit of the command line, like adoc=2, into an
+    (extension, limit) tuple'''
+
+    extension, _, limit = value.partition('=')
+    if not extension.startswith('.'):
+        extension = '.' + extension
+    return extension, int(limit)
+
+
+class ConversionPool():
+    '''Convert files to html in parallel.
+
+    The converters are external programs (asciidoctor and pandoc), so a pool
+    of threads is enough to keep several of them running at the same time,
+    each thread waits for its subprocess. The number of conversions running
+    with the same converter can be limited by extension.
+
+    submit returns a future with the html of the file, the futures can be
+    given to the Scheduler as dependencies of the tasks that publish them.
+
+    With one job the files are converted inline when they are submitted.
+    '''
+
+    def __init__(self, convert, jobs=1, limits=None):
+        self.convert = convert
+        self.jobs = max(jobs or 1, 1)
+        self.limits = dict(CONVERTER_LIMITS)
+        if limits is not None:
+            self.limits.update(limits)
+        self.semaphores = {
+            extension: threading.BoundedSemaphore(limit)
+            for extension, limit in self.limits.items()
+            if limit is not None
+        }
+        if self.jobs > 1:
+            self.executor = ThreadPoolExecutor(self.jobs)
+        else:
+            self.executor = None
+
+    def _convert(self, file_path):
+        extension = os.path.splitext(file_path)[-1]
+        semaphore = self.semaphores.get(extension)
+        if semaphore is None:
+            return self.convert(file_path)
+        with semaphore:
+            return self.convert(file_path)
+
+    def submit(self, file_path):
+        '''Schedule the conversion of a file and return a future with its
+        html'''
+
+        if self.executor is not None:
+            return self.executor.submit(self._convert, file_path)
+
+        result = Future()
+        try:
+            result.set_result(self._convert(file_path))
+        except Exception as error:
+            result.set_exception(error)
+        return result
+
+    def shutdown(self):
+        '''Wait for the pending conversions and stop the threads'''
+
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,448 @@
+'''Fakes to measure git2sc without a Confluence instance nor a documentation
+repository.
+
+FakeConfluenceServer serves, from memory, the endpoints of the Confluence
+REST api that git2sc uses: the space, its content, the content search, and
+the read, creation, update and deletion of pages. It can answer slowly,
+throttle some of the requests and cap the size of the listed batches, like
+a real instance does.
+
+generate_repository writes a synthetic documentation tree of the desired
+size, and change_files edits part of it to measure a sync.
+'''
+
+import os
+import re
+import json
+import time
+import random
+import threading
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+# Prefix of the api in the urls of the fake server
+API_PATH = '/rest/api'
+
+WORDS = (
+    'confluence', 'space', 'page', 'deploy', 'cluster', 'runner', 'release',
+    'branch', 'config', 'service', 'request', 'token', 'backup', 'network',
+    'module', 'install', 'upgrade', 'monitor', 'latency', 'document',
+)
+
+
+class FakeConfluence():
+    '''In memory Confluence space that answers the api requests.
+
+    latency is the seconds each request takes, one out of throttle_every
+    requests is answered with a 429 and a Retry-After of retry_after whole
+    seconds, and the listings return at most max_page_size pages per batch.
+    requests counts the requests by endpoint.
+    '''
+
+    def __init__(
+        self,
+        space='TST',
+        latency=0,
+        throttle_every=0,
+        retry_after=0,
+        max_page_size=100,
+    ):
+        self.space = space
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.max_page_size = max_page_size
+        self.pages = OrderedDict()
+        self.titles = {}
+        self.requests = Counter()
+        self.throttled = 0
+        self.lock = threading.Lock()
+        self._next_id = 1
+        self.homepage_id = self._add_page(
+            '{} Home'.format(space),
+            '<p>Home</p>',
+            None,
+        )
+
+    def _add_page(self, title, html, parent_id):
+        pageid = str(self._next_id)
+        self._next_id += 1
+        self.pages[pageid] = {
+            'id': pageid,
+            'title': title,
+            'parent': parent_id,
+            'version': 1,
+            'body': html,
+        }
+        self.titles[title] = pageid
+        return pageid
+
+    def _ancestors(self, pageid):
+        ancestors = []
+        parent_id = self.pages[pageid]['parent']
+        while parent_id is not None:
+            parent = self.pages[parent_id]
+            ancestors.insert(0, {
+                'id': parent_id,
+                'type': 'page',
+                'title': parent['title'],
+            })
+            parent_id = parent['parent']
+        return ancestors
+
+    def _page(self, pageid, body=False):
+        '''Return the api representation of a page'''
+
+        page = self.pages[pageid]
+        result = {
+            'id': pageid,
+            'type': 'page',
+            'title': page['title'],
+            'version': {'number': page['version']},
+            'ancestors': self._ancestors(pageid),
+        }
+        if body:
+            result['body'] = {
+                'storage': {
+                    'value': page['body'],
+                    'representation': 'storage',
+                },
+            }
+        return result
+
+    def _title_exists(self, title, pageid=None):
+        return self.titles.get(title, pageid) != pageid
+
+    def handle(self, method, url, body=None):
+        '''Answer a request to the api, return its status code, json payload
+        and headers'''
+
+        if self.latency:
+            time.sleep(self.latency)
+        parts = urlsplit(url)
+        query = {
+            key: values[0]
+            for key, values in parse_qs(parts.query).items()
+        }
+        path = parts.path[len(API_PATH):].strip('/').split('/')
+        endpoint = '{} {}'.format(
+            method,
+            ' '.join(part for part in path if not part.isdigit() and
+                     part != self.space),
+        )
+        with self.lock:
+            self.requests[endpoint] += 1
+            total = sum(self.requests.values())
+            if self.throttle_every and total % self.throttle_every == 0:
+                self.throttled += 1
+                return 429, _error(429, 'Rate limit exceeded'), {
+                    'Retry-After': str(self.retry_after),
+                }
+            try:
+                return self._route(method, path, query, body)
+            except (KeyError, ValueError) as error:
+                return 400, _error(400, 'Invalid request: {}'.format(
+                    error,
+                )), {}
+
+    def _route(self, method, path, query, body):
+        if path[:2] == ['space', self.space]:
+            if method == 'GET' and len(path) == 2:
+                return 200, {
+                    'key': self.space,
+                    '_expandable': {
+                        'homepage': '{}/content/{}'.format(
+                            API_PATH,
+                            self.homepage_id,
+                        ),
+                    },
+                }, {}
+            if method == 'GET' and path[2:] == ['content']:
+                return self._list(query)
+        elif path == ['content', 'search'] and method == 'GET':
+            return self._search(query)
+        elif path == ['content'] and method == 'POST':
+            return self._create(json.loads(body))
+        elif len(path) == 2 and path[0] == 'content':
+            if path[1] not in self.pages:
+                return 404, _error(404, 'No content found with id: {}'.format(
+                    path[1],
+                )), {}
+            if method == 'GET':
+                return 200, self._page(path[1], body=True), {}
+            if method == 'PUT':
+                return self._update(path[1], json.loads(body))
+            if method == 'DELETE':
+                return self._delete(path[1])
+        return 404, _error(404, 'Not found'), {}
+
+    def _list(self, query):
+        start = int(query.get('start', 0))
+        limit = min(int(query.get('limit', 25)), self.max_page_size)
+        page_ids = list(self.pages.keys())[start:start + limit]
+        batch = {
+            'results': [self._page(pageid) for pageid in page_ids],
+            'start': start,
+            'limit': limit,
+            'size': len(page_ids),
+            '_links': {},
+        }
+        if start + limit < len(self.pages):
+            batch['_links']['next'] = '{}/space/{}/content?start={}'.format(
+                API_PATH,
+                self.space,
+                start + limit,
+            )
+        return 200, {'page': batch}, {}
+
+    def _search(self, query):
+        match = re.match(r'id in \(([\d,]*)\)', query.get('cql', ''))
+        if match is None:
+            return 400, _error(400, 'Unsupported cql'), {}
+        limit = min(int(query.get('limit', 25)), self.max_page_size)
+        page_ids = [
+            pageid
+            for pageid in match.group(1).split(',')
+            if pageid in self.pages
+        ][:limit]
+        return 200, {
+            'results': [self._page(pageid, body=True) for pageid in page_ids],
+            'size': len(page_ids),
+        }, {}
+
+    def _create(self, data):
+        if data['space']['key'] != self.space:
+            return 404, _error(404, 'No space with key: {}'.format(
+                data['space']['key'],
+            )), {}
+        if self._title_exists(data['title']):
+            return 400, _error(
+                400,
+                'A page with this title already exists: {}'.format(
+                    data['title'],
+                ),
+            ), {}
+        parent_id = None
+        if data.get('ancestors'):
+            parent_id = str(data['ancestors'][-1]['id'])
+            if parent_id not in self.pages:
+                return 404, _error(404, 'No parent with id: {}'.format(
+                    parent_id,
+                )), {}
+        pageid = self._add_page(
+            data['title'],
+            data['body']['storage']['value'],
+            parent_id,
+        )
+        return 200, self._page(pageid), {}
+
+    def _update(self, pageid, data):
+        page = self.pages[pageid]
+        if int(data['version']['number']) != page['version'] + 1:
+            return 409, _error(
+                409,
+                'Version must be incremented on update. Current version '
+                'is: {}'.format(page['version']),
+            ), {}
+        if self._title_exists(data['title'], pageid):
+            return 400, _error(
+                400,
+                'A page with this title already exists: {}'.format(
+                    data['title'],
+                ),
+            ), {}
+        if data.get('ancestors'):
+            parent_id = str(data['ancestors'][-1]['id'])
+            if parent_id not in self.pages:
+                return 404, _error(404, 'No parent with id: {}'.format(
+                    parent_id,
+                )), {}
+            page['parent'] = parent_id
+        del self.titles[page['title']]
+        self.titles[data['title']] = pageid
+        page['title'] = data['title']
+        page['version'] += 1
+        page['body'] = data['body']['storage']['value']
+        return 200, self._page(pageid), {}
+
+    def _delete(self, pageid):
+        # The children of a deleted page are moved to its parent
+        page = self.pages.pop(pageid)
+        del self.titles[page['title']]
+        parent_id = page['parent']
+        for page in self.pages.values():
+            if page['parent'] == pageid:
+                page['parent'] = parent_id
+        return 204, None, {}
+
+
+def _error(status_code, message):
+    return {'statusCode': status_code, 'message': message}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps the connections alive like Confluence does
+    protocol_version = 'HTTP/1.1'
+
+    def _answer(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode() if length else None
+        status, payload, headers = self.server.confluence.handle(
+            self.command,
+            self.path,
+            body,
+        )
+        data = b'' if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _answer
+
+    def log_message(self, *arguments):
+        pass
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeConfluenceServer():
+    '''Http server of a FakeConfluence that runs in a thread. The keyword
+    arguments configure the FakeConfluence if one is not given.
+
+        with FakeConfluenceServer(space='TST', latency=0.05) as server:
+            g = Git2SC(server.url, 'user:password', 'TST')
+    '''
+
+    def __init__(self, confluence=None, host='127.0.0.1', port=0, **kwargs):
+        self.confluence = confluence or FakeConfluence(**kwargs)
+        self.server = _ThreadingHTTPServer((host, port), _Handler)
+        self.server.confluence = self.confluence
+        self.thread = None
+
+    @property
+    def url(self):
+        '''Url of the api, the confluence_api_url of Git2SC'''
+
+        host, port = self.server.server_address[:2]
+        return 'http://{}:{}{}'.format(host, port, API_PATH)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exception):
+        self.stop()
+
+
+def _paragraphs(generator, size):
+    '''Return random paragraphs of words of about size characters'''
+
+    paragraphs = []
+    length = 0
+    while length < size:
+        paragraph = ' '.join(
+            generator.choice(WORDS) for _ in range(generator.randint(20, 60))
+        ).capitalize() + '.'
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+    return paragraphs
+
+
+def _document(generator, title, extension, size):
+    '''Return the source of a markdown or asciidoc document'''
+
+    paragraphs = _paragraphs(generator, size)
+    if extension == '.adoc':
+        lines = ['= {}'.format(title), '']
+        for index, paragraph in enumerate(paragraphs):
+            if index % 4 == 0:
+                lines += ['== Section {}'.format(index // 4 + 1), '']
+            lines += [paragraph, '']
+        lines += ['* {}'.format(word) for word in WORDS[:3]]
+        lines += ['', '[source,bash]', '----', 'git2sc TST sync docs', '----']
+    else:
+        lines = ['# {}'.format(title), '']
+        for index, paragraph in enumerate(paragraphs):
+            if index % 4 == 0:
+                lines += ['## Section {}'.format(index // 4 + 1), '']
+            lines += [paragraph, '']
+        lines += ['* {}'.format(word) for word in WORDS[:3]]
+        lines += ['', '```bash', 'git2sc TST sync docs', '```']
+    return '\n'.join(lines) + '\n'
+
+
+def generate_repository(
+    path,
+    depth=2,
+    fan_out=4,
+    files=10,
+    file_size=2048,
+    adoc_ratio=0.0,
+    seed=0,
+):
+    '''Write a synthetic documentation tree in path: each directory has a
+    README.md, files documents of about file_size characters, adoc_ratio of
+    them asciidoc and the rest markdown, and fan_out subdirectories down to
+    depth levels. The names are unique, as the titles of a space are.
+
+    Returns the number of directories and documents written.
+    '''
+
+    generator = random.Random(seed)
+    directories = 0
+    documents = 0
+    pending = [(path, 'docs', 0)]
+    while pending:
+        directory, name, level = pending.pop()
+        os.makedirs(directory, exist_ok=True)
+        directories += 1
+        with open(os.path.join(directory, 'README.md'), 'w') as f:
+            f.write(_document(generator, name, '.md', file_size // 4))
+        for index in range(files):
+            extension = '.adoc' if generator.random() < adoc_ratio else '.md'
+            title = '{}_page_{}'.format(name, index)
+            with open(os.path.join(directory, title + extension), 'w') as f:
+                f.write(_document(generator, title, extension, file_size))
+            documents += 1
+        if level < depth:
+            for index in range(fan_out):
+                child = '{}_{}'.format(name, index)
+                pending.append((os.path.join(directory, child), child,
+                                level + 1))
+    return {'directories': directories, 'documents': documents}
+
+
+def change_files(path, fraction=0.1, seed=0):
+    '''Append a paragraph to a fraction of the documents of a tree written by
+    generate_repository, return the number of changed files'''
+
+    generator = random.Random(seed)
+    documents = []
+    for root, directories, files in os.walk(path):
+        directories.sort()
+        for file in sorted(files):
+            if file != 'README.md':
+                documents.append(os.path.join(root, file))
+    changed = generator.sample(documents, int(len(documents) * fraction))
+    for file_path in changed:
+        with open(file_path, 'a') as f:
+            f.write('\n' + _paragraphs(generator, 200)[0] + '\n')
+    return len(changed)
@@ -0,0 +1,213 @@
+import os
+import hashlib
+import threading
+import subprocess
+
+# Modes of the index entries of regular files, the rest are symlinks and
+# submodules
+FILE_MODES = ('100644', '100755')
+
+# Mode of the subtrees in a tree object
+TREE_MODE = '40000'
+
+
+def git(path, *arguments, stderr=None):
+    '''Run a git command on the repository that contains path and return its
+    output'''
+
+    return subprocess.check_output(
+        ['git', '-C', path] + list(arguments),
+        shell=False,
+        stderr=stderr,
+    ).decode()
+
+
+def head(path):
+    '''Return the commit id of the HEAD of the repository'''
+
+    return git(path, 'rev-parse', 'HEAD').strip()
+
+
+def blob_hash(data):
+    '''Return the id git gives to a blob with the data bytes'''
+
+    header = 'blob {}\0'.format(len(data)).encode()
+    return hashlib.sha1(header + data).hexdigest()
+
+
+def index_blobs(path):
+    '''Return a dictionary with the blob ids of the files under path whose
+    working tree is the same as the git index, by their path relative to
+    path.
+
+    The ids are read with two git calls, ls-files --stage and ls-files
+    --modified, without opening the files. The modified, deleted, untracked
+    and conflicted files are left out. Outside a repository it raises
+    CalledProcessError without printing the error of git.
+    '''
+
+    blobs = {}
+    stage = git(
+        path,
+        'ls-files',
+        '--stage',
+        '-z',
+        stderr=subprocess.DEVNULL,
+    )
+    for entry in stage.split('\0'):
+        if entry == '':
+            continue
+        info, file_path = entry.split('\t', 1)
+        mode, blob, stage = info.split(' ')
+        if mode in FILE_MODES and stage == '0':
+            blobs[file_path] = blob
+    for file_path in git(path, 'ls-files', '--modified', '-z').split('\0'):
+        blobs.pop(file_path, None)
+    return blobs
+
+
+def prefix(path):
+    '''Return the path of a directory relative to the top of its repository,
+    with a trailing /, or an empty string for the top of the repository and
+    for a bare repository'''
+
+    return git(path, 'rev-parse', '--show-prefix').strip()
+
+
+def tree_entries(data, id_size=20):
+    '''Return the (mode, name, object id) tuples of the entries of a tree
+    object. Each entry is "<mode> <name>\\0" followed by the raw object id,
+    of id_size bytes'''
+
+    entries = []
+    index = 0
+    while index < len(data):
+        separator = data.index(b'\0', index)
+        mode, name = data[index:separator].split(b' ', 1)
+        index = separator + 1 + id_size
+        entries.append((
+            mode.decode(),
+            name.decode(errors='surrogateescape'),
+            data[separator + 1:index].hex(),
+        ))
+    return entries
+
+
+class MissingObject(Exception):
+    '''The object asked to git cat-file doesn't exist in the repository'''
+
+
+class CatFile():
+    '''Long lived git cat-file --batch process that reads the objects of a
+    repository through a pipe, without a process per object nor a working
+    tree. It can be shared by several threads, the reads are serialized'''
+
+    def __init__(self, path):
+        self.process = subprocess.Popen(
+            ['git', '-C', path, 'cat-file', '--batch'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self.lock = threading.Lock()
+
+    def read(self, name):
+        '''Return the id, type and contents of an object, name can be an
+        object id or any revision expression, like release:docs'''
+
+        with self.lock:
+            self.process.stdin.write(name.encode() + b'\n')
+            self.process.stdin.flush()
+            header = self.process.stdout.readline().decode().split()
+            if len(header) != 3:
+                raise MissingObject(
+                    '{} is not an object of the repository'.format(name),
+                )
+            object_id, object_type, size = header
+            data = self.process.stdout.read(int(size))
+            # The contents are followed by a newline
+            self.process.stdout.read(1)
+        return object_id, object_type, data
+
+    def tree(self, name):
+        '''Return the id and the entries of a tree object'''
+
+        object_id, object_type, data = self.read(name)
+        if object_type != 'tree':
+            raise MissingObject('{} is not a tree'.format(name))
+        return object_id, tree_entries(data, len(object_id) // 2)
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+        self.process.stdout.close()
+
+
+def changed_files(path, since, until='HEAD'):
+    '''Return a dictionary with the files under path that changed between the
+    since and until commits. The keys are the paths relative to path and the
+    values the git status letter: A (added), M (modified) or D (deleted).
+
+    Renames are reported as a deletion and an addition. The paths are read
+    separated by NUL, so they are not quoted by core.quotePath.
+    '''
+
+    output = git(
+        path,
+        'diff',
+        '--name-status',
+        '--no-renames',
+        '--relative',
+        '-z',
+        since,
+        until,
+    )
+    fields = output.split('\0')
+    changes = {}
+    # Each change is a status and a path field
+    for status, file_path in zip(fields[0::2], fields[1::2]):
+        status = status[0]
+        if status not in ('A', 'M', 'D'):
+            status = 'M'
+        changes[file_path] = status
+    return changes
+
+
+def directories(path, commit='HEAD'):
+    '''Return the set of the directories under path in a commit, as paths
+    relative to path'''
+
+    output = git(path, 'ls-tree', '-r', '-d', '-z', '--name-only', commit)
+    # Inside a subdirectory ls-tree lists it as ./
+    return {
+        directory
+        for directory in output.split('\0')
+        if directory not in ('', './')
+    }
+
+
+def _last_commit_file(path, space):
+    git_dir = git(path, 'rev-parse', '--absolute-git-dir').strip()
+    return os.path.join(git_dir, 'git2sc', space)
+
+
+def read_last_commit(path, space):
+    '''Return the last commit published to the space or None if the space was
+    never published from this repository'''
+
+    try:
+        with open(_last_commit_file(path, space), 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_last_commit(path, space, commit):
+    '''Record the last commit published to the space'''
+
+    last_commit_file = _last_commit_file(path, space)
+    os.makedirs(os.path.dirname(last_commit_file), exist_ok=True)
+    with open(last_commit_file, 'w') as f:
+        f.write(commit + '\n')
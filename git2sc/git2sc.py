@@ -1,20 +1,163 @@
 import os
 import json
 import shlex
-import requests
+import hashlib
 import pypandoc
+import threading
 import subprocess
-
-
-class Git2SC():
-    '''Class to sync a git documentation repository to Confluence.'''
-
-    def __init__(self, confluence_api_url, auth, space_id):
+import time
+from collections import Counter
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from git2sc import git, markdown
+from git2sc.cache import cache_key
+from git2sc.content import content_hash
+from git2sc.convert import (
+    CONVERSION_ERRORS,
+    NOT_CONVERTED,
+    ConversionPool,
+)
+from git2sc.index import PageIndex, parent_id as page_parent_id
+from git2sc.plan import Planner, PlanningScheduler, SyncPlan
+from git2sc.report import RunReport
+from git2sc.scan import GitTreeScanner, IgnoreRules, TreeScanner
+from git2sc.scheduler import Scheduler, is_future
+from git2sc.session import build_session
+from git2sc.throttle import Throttle
+from git2sc.workers import WorkerUnavailable
+
+SUPPORTED_EXTENSIONS = ('.adoc', '.html', '.md')
+
+# Arguments of the converters, they are part of the key of the cached html
+ASCIIDOCTOR_ARGUMENTS = ['-b', 'xhtml']
+PANDOC_FORMAT = 'html'
+
+# Engines that can convert the markdown files: pandoc or the renderer of
+# git2sc.markdown, that falls back to pandoc for the syntax it doesn't support
+MARKDOWN_ENGINES = ('pandoc', 'native')
+
+# READMEs that are published as the page of their directory, in order of
+# preference
+README_FILES = ('README.adoc', 'README.md')
+
+# Body of the page of a directory without README, or whose README couldn't
+# be converted
+NO_README = "No README here, keep on looking :("
+
+# Fields of a page that the page index needs, the create requests ask
+# confluence to expand them in the response
+INDEXED_FIELDS = ('id', 'title', 'version', 'ancestors')
+
+
+class BaseGit2SC():
+    '''Base of the clients that sync a git documentation repository to
+    Confluence.
+
+    It has the conversion of the files, the page index, the sync state and
+    the scheduling of the syncs, that don't send requests. Git2SC and
+    git2sc.aio.AsyncGit2SC add the operations that talk to confluence, as
+    methods and as coroutines.
+    '''
+
+    def __init__(
+        self,
+        confluence_api_url,
+        auth,
+        space_id,
+        page_size=100,
+        listing_concurrency=4,
+        state=None,
+        cache=None,
+        warm_converters=None,
+        markdown_engine='pandoc',
+        gitignore=True,
+    ):
         self.api_url = confluence_api_url
         self.auth = tuple(auth.split(':'))
         self.space = space_id
+        self.page_size = page_size
+        self.listing_concurrency = max(listing_concurrency, 1)
+        self.state = state
+        self.cache = cache
+        self.warm_converters = warm_converters
+        self.markdown_engine = markdown_engine
+        self.gitignore = gitignore
+        self._converter_versions = {}
         self.pages = {}
-        self.get_space_articles()
+        self.stats = Counter()
+        self.conversion_errors = {}
+        # Number of times each file was converted in this run
+        self.conversions = Counter()
+        # Git blob ids of the files of the published directory by their path
+        self.blobs = {}
+        # Reader of the repository and tree of the published git ref, None
+        # when the files are read from the working tree
+        self.cat_file = None
+        self.tree = None
+        self._stats_lock = threading.Lock()
+        self._title_lock = threading.Lock()
+        self._converters_lock = threading.Lock()
+        self._reserved_titles = set()
+        self.journal = None
+        self.deletions = []
+        # Timings and requests of the run, it includes the load of the space
+        self.report = RunReport()
+
+    @property
+    def pages(self):
+        '''PageIndex with the known pages of the space'''
+        return self._pages
+
+    @pages.setter
+    def pages(self, pages):
+        self._pages = PageIndex(pages)
+
+    def _api_path(self, url):
+        '''Return the path of an url of the confluence api'''
+
+        if url.startswith(self.api_url):
+            return url[len(self.api_url):]
+        return url
+
+    def _count(self, stat):
+        '''Increase one of the run stats, it can be called from several
+        threads'''
+
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def summary(self):
+        '''Return a line with the number of pages created, updated, skipped
+        and deleted, the number of files that failed to convert if any and
+        the number of conversions'''
+
+        summary = '{created} created, {updated} updated, {skipped} skipped '\
+            'because they had no changes, {deleted} deleted'.format(
+                created=self.stats['created'],
+                updated=self.stats['updated'],
+                skipped=self.stats['skipped'],
+                deleted=self.stats['deleted'],
+            )
+        if self.stats['failed'] > 0:
+            summary += ', {} failed to convert'.format(self.stats['failed'])
+        if self.stats['scanned'] > 0:
+            summary += '. Scanned {} entries, pruned {}'.format(
+                self.stats['scanned'],
+                self.stats['pruned'],
+            )
+        if self.conversions:
+            summary += '. {} conversions of {} files'.format(
+                sum(self.conversions.values()),
+                len(self.conversions),
+            )
+        if self.stats['cache_hits'] + self.stats['cache_misses'] > 0:
+            summary += '. Html cache: {} hits, {} misses'.format(
+                self.stats['cache_hits'],
+                self.stats['cache_misses'],
+            )
+        if self.throttle.throttled > 0:
+            summary += '. {}'.format(self.throttle.summary())
+        return summary
 
     def _requests_error(self, requests_object):
         '''Print the confluence error'''
@@ -29,78 +172,65 @@ class Git2SC():
                 response['message']
             ))
 
-    def get_page_info(self, pageid):
-        '''Get all the information of a confluence page'''
-
-        url = '{base}/content/{pageid}?expand=ancestors,body.storage,version'\
-            .format(base=self.api_url, pageid=pageid)
-
-        r = requests.get(url, auth=self.auth)
-        self._requests_error(r)
-        return r.json()
-
-    def get_space_homepage(self):
-        '''Get the homepage of a confluence space'''
-
-        url = '{base}/space/{spaceid}'.format(
-            base=self.api_url,
-            spaceid=self.space,
-        )
-        r = requests.get(url, auth=self.auth)
-        self._requests_error(r)
-        return r.json()['_expandable']['homepage'].split('/')[4]
-
-    def get_space_articles(self):
-        '''Get all the pages of a confluence space'''
-
-        url = '{base}/space/{spaceid}/'\
-            'content?expand=body.storage&limit=5000&start=0'.format(
-                base=self.api_url,
-                spaceid=self.space,
-            )
-        r = requests.get(url, auth=self.auth)
-        self._requests_error(r)
-        self.pages = {}
-        for page in r.json()['page']['results']:
-            self.pages[page['id']] = page
-
     def _get_article_id(self, title):
         '''Get the id of the article with the specified title'''
 
-        try:
-            article_id = [
-                pageid
-                for pageid, content in self.pages.items()
-                if content['title'] == title
-            ][0]
-        except IndexError:
-            article_id = None
-        return article_id
+        return self.pages.get_id(title)
 
     def _title_exist(self, title):
         '''You can't create more than one article with a specified title, test
         if title exists in the existing pages'''
-        titles = [content['title'] for page, content in self.pages.items()]
-        return title in titles
+        return self.pages.title_exists(title)
 
-    def update_page(self, pageid, html, title=None):
-        '''Update a confluence page with the content of the html variable'''
+    def _is_moved(self, pageid, parent_id=None):
+        '''Test if an indexed page has to be moved below parent_id'''
 
-        try:
-            self.pages[pageid]['version']
-        except KeyError:
-            self.pages[pageid] = self.get_page_info(pageid)
+        return parent_id is not None and pageid in self.pages and \
+            self.pages.parent(pageid) != parent_id
 
-        version = int(self.pages[pageid]['version']['number']) + 1
+    def _is_unchanged(self, pageid, html, title=None, parent_id=None):
+        '''Test if the html has the same content as the stored body of the
+        page. Only the pages whose body is already loaded are compared, so
+        this never makes a request'''
 
-        ancestors = self.pages[pageid]['ancestors'][-1:]
-        if ancestors != []:
-            del ancestors[0]['_links']
-            del ancestors[0]['_expandable']
-            del ancestors[0]['extensions']
+        page = self.pages.get(pageid)
+        if page is None or 'body' not in page:
+            return False
+        if title is not None and title != page.get('title'):
+            return False
+        if self._is_moved(pageid, parent_id):
+            return False
+        return content_hash(page['body']['storage']['value']) == \
+            content_hash(str(html))
+
+    def _page_title(self, pageid, title=None):
+        '''Return the title of a page for the run report, or its id if the
+        page is not indexed'''
+
+        if title is not None:
+            return title
+        return self.pages.get(pageid, {}).get('title', pageid)
+
+    def _update_data(self, pageid, html, title=None, parent_id=None):
+        '''Return the next version of an indexed page and the json of the
+        request that updates it, renaming or moving the page in the index if
+        there is a new title or parent'''
+
+        version = int(self.pages[pageid]['version']['number']) + 1
+        if self._is_moved(pageid, parent_id):
+            self.pages.move(pageid, parent_id)
+
+        ancestors = [
+            {
+                key: value
+                for key, value in ancestor.items()
+                if key not in ('_links', '_expandable', 'extensions')
+            }
+            for ancestor in self.pages[pageid]['ancestors'][-1:]
+        ]
 
         if title is not None:
-            self.pages[pageid]['title'] = title
+            self.pages.rename(pageid, title)
 
         data = {
             'id': str(pageid),
@@ -117,27 +247,36 @@ class Git2SC():
             }
         }
 
-        data_json = json.dumps(data)
+        return version, json.dumps(data)
 
-        url = '{base}/content/{pageid}'.format(base=self.api_url, pageid=pageid)
+    def _page_updated(self, pageid, version):
+        '''Record in the index that a page was updated'''
 
-        r = requests.put(
-            url,
-            data=data_json,
-            auth=self.auth,
-            headers={'Content-Type': 'application/json'}
-        )
+        self.pages[pageid]['version'] = {'number': version}
+        self.pages[pageid].pop('body', None)
+        self._count('updated')
 
-        self._requests_error(r)
+    def _reserve_title(self, title):
+        '''Choose a title that no other page has, adding a counter to the
+        title if needed. The title is reserved until the page is created so
+        two concurrent creations can't choose the same one'''
 
-    def create_page(self, title, html, parent_id=None):
-        '''Create a confluence page with the content of the html variable'''
+        with self._title_lock:
+            new_title = title
+            for counter in range(1, 10):
+                if not self._title_exist(new_title) and \
+                        new_title not in self._reserved_titles:
+                    break
+                new_title = '{}_{}'.format(title, counter)
+            self._reserved_titles.add(new_title)
+        return new_title
 
-        new_title = title
-        for counter in range(1, 10):
-            if not self._title_exist(new_title):
-                break
-            new_title = '{}_{}'.format(title, counter)
+    def _release_title(self, title):
+        with self._title_lock:
+            self._reserved_titles.discard(title)
+
+    def _create_data(self, new_title, html, parent_id=None):
+        '''Return the json of the request that creates a page'''
 
         data = {
             'type': 'page',
@@ -154,35 +293,24 @@ class Git2SC():
         if parent_id is not None:
             data['ancestors'] = [{'id': parent_id}]
 
-        data_json = json.dumps(data)
+        return json.dumps(data)
 
-        url = '{base}/content'.format(base=self.api_url)
+    def _created_page_record(self, page):
+        '''Return the index record of a page from the response that created
+        it, or None if the response lacks some of the indexed fields and the
+        page has to be fetched'''
 
-        r = requests.post(
-            url,
-            data=data_json,
-            auth=self.auth,
-            headers={'Content-Type': 'application/json'}
-        )
+        if any(field not in page for field in INDEXED_FIELDS):
+            return None
+        return {field: page[field] for field in INDEXED_FIELDS}
 
-        self._requests_error(r)
+    def _page_deleted(self, pageid):
+        '''Remove a deleted page from the index and the sync state'''
 
-        pageid = json.loads(r.text)['id']
-        self.pages[pageid] = self.get_page_info(pageid)
-        return pageid
-
-    def delete_page(self, pageid):
-        '''Delete a confluence page given the pageid'''
-
-        url = '{base}/content/{pageid}'.format(base=self.api_url, pageid=pageid)
-
-        r = requests.delete(
-            url,
-            auth=self.auth,
-        )
-
-        if r.status_code is not 204:
-            self._requests_error(r)
+        self.pages.pop(pageid, None)
+        self._count('deleted')
+        if self.state is not None:
+            self.state.forget_page(pageid)
 
     def _safe_load_file(self, file_path):
         '''Takes a file path and loads it in a safe way evading posible
@@ -190,6 +318,14 @@ class Git2SC():
 
         return os.path.expanduser(shlex.quote(file_path))
 
+    def _read_source(self, file_path):
+        '''Return the contents of a file published from a git ref, read from
+        the repository, or None if the file is read from the working tree'''
+
+        if self.cat_file is None:
+            return None
+        return self.cat_file.read(self.blobs[file_path])[2]
+
     def _process_adoc(self, adoc_file_path):
         '''Takes a path to an adoc file, transform it and return it as
         html'''
@@ -199,167 +335,687 @@ class Git2SC():
         * autoclose </meta> </link> </img> </br> </col>
         '''
 
-        clean_path = self._safe_load_file(adoc_file_path)
+        source = self._read_source(adoc_file_path)
+        if source is None:
+            clean_path = self._safe_load_file(adoc_file_path)
+        else:
+            clean_path = adoc_file_path
+
+        html = None
+        if self.warm_converters is not None:
+            try:
+                html = self.warm_converters.convert_adoc(clean_path, source)
+            except WorkerUnavailable:
+                pass
+        if html is None and source is None:
+            html = subprocess.check_output(
+                ['asciidoctor'] + ASCIIDOCTOR_ARGUMENTS +
+                [clean_path, '-o', '-'],
+                shell=False,
+            ).decode()
+        elif html is None:
+            html = subprocess.check_output(
+                ['asciidoctor'] + ASCIIDOCTOR_ARGUMENTS + ['-', '-o', '-'],
+                input=source,
+                shell=False,
+            ).decode()
 
         # Confluence doesn't like the <!DOCTYPE html> line, therefore
         # the split('/n')
-        return subprocess.check_output(
-            ['asciidoctor', '-b', 'xhtml', clean_path, '-o', '-'],
-            shell=False,
-        ).decode().replace('<!DOCTYPE html>\n', '')
+        return html.replace('<!DOCTYPE html>\n', '')
 
     def _process_md(self, md_file_path):
         '''Takes a path to an md file, transform it and return it as
         html'''
 
-        clean_path = self._safe_load_file(md_file_path)
-
-        return pypandoc.convert_file(clean_path, 'html')
+        source = self._read_source(md_file_path)
+        if source is None:
+            clean_path = self._safe_load_file(md_file_path)
+        else:
+            clean_path = md_file_path
+            source = source.decode()
+
+        if self.markdown_engine == 'native':
+            text = source
+            if text is None:
+                with open(clean_path, 'r') as f:
+                    text = f.read()
+            try:
+                return markdown.render(text)
+            except markdown.UnsupportedMarkdown:
+                self._count('markdown_fallbacks')
+
+        if self.warm_converters is not None:
+            try:
+                return self.warm_converters.convert_md(
+                    clean_path,
+                    PANDOC_FORMAT,
+                    source,
+                )
+            except WorkerUnavailable:
+                pass
+        if source is not None:
+            return pypandoc.convert_text(source, PANDOC_FORMAT, format='md')
+        return pypandoc.convert_file(clean_path, PANDOC_FORMAT)
 
     def _process_html(self, html_file_path):
         '''Takes a path to an html file and returns it'''
+        source = self._read_source(html_file_path)
+        if source is not None:
+            return source.decode()
         clean_path = self._safe_load_file(html_file_path)
         with open(clean_path, 'r') as f:
             return f.read()
 
-    def _process_mainpage(self, directory_path):
-        '''Takes a path to a file and updates the confluence homepage'''
-        homepage_id = self.get_space_homepage()
-        html = self._discover_directory_readme(directory_path)
-        self.update_page(homepage_id, html)
-        return homepage_id
+    def _readme_path(self, directory_path, files=None):
+        '''Return the path of the README.adoc or README.md of a directory, or
+        None if it has none. If the files of the directory are known the
+        README is looked up in them'''
+
+        for readme in README_FILES:
+            readme_file = os.path.join(directory_path, readme)
+            if files is None and self.tree is not None:
+                if readme_file in self.blobs:
+                    return readme_file
+            elif files is None:
+                if os.path.isfile(readme_file):
+                    return readme_file
+            elif readme in files:
+                return readme_file
+        return None
 
     def _discover_directory_readme(self, directory_path, parent_id=None):
         '''Takes a directory path, searches for README.adoc or README.md and
-        returns it's html'''
-
-        adoc_file = os.path.join(directory_path, 'README.adoc')
-        md_file = os.path.join(directory_path, 'README.md')
-        if os.path.isfile(adoc_file):
-            readme_file = adoc_file
-        elif os.path.isfile(md_file):
-            readme_file = md_file
-        else:
-            return "No README here, keep on looking :("
+        returns it's html. If the README can't be converted the error is
+        recorded like the ones of the files and NO_README is returned'''
 
-        return self.import_file(readme_file)
+        readme_file = self._readme_path(directory_path)
+        if readme_file is None:
+            return NO_README
 
-    def _create_directory_readme(self, directory_path, parent_id=None):
-        '''Takes a directory path, searches for README.adoc or README.md and
-        creates a confluence page with that information'''
-        return self.create_page(
-            os.path.basename(directory_path),
-            self._discover_directory_readme(directory_path),
-            parent_id,
-        )
+        html = self._convert_file(readme_file)
+        if html is None:
+            return NO_README
+        return html
 
-    def _update_directory_readme(self, directory_path):
-        '''Takes a directory path, deduces the article_id and updates it with
-        the contents of the README.adoc or README.md'''
-        self.update_page(
-            self._get_article_id(os.path.basename(directory_path)),
-            self._discover_directory_readme(directory_path),
-        )
+    def _readme_html(self, directory_path, html=NOT_CONVERTED):
+        '''Return the body of the page of a directory: html if its README
+        was already converted, NO_README if that conversion failed, or the
+        README converted now if html is NOT_CONVERTED'''
+
+        if html is NOT_CONVERTED:
+            return self._discover_directory_readme(directory_path)
+        if html is None:
+            return NO_README
+        return html
+
+    def _convert_readme(self, directory_path, files, converter):
+        '''Submit to the converter the README of the files of a directory,
+        returning the future of its html, or the body of a directory without
+        README'''
+
+        readme_file = self._readme_path(directory_path, files)
+        if readme_file is None:
+            return NO_README
+        return converter.submit(readme_file)
+
+    def _import(self, file_path):
+        '''Convert a file with import_file counting the conversions of each
+        file of the run'''
+
+        with self._stats_lock:
+            self.conversions[file_path] += 1
+        return self.import_file(file_path)
 
     def import_file(self, file_path):
         '''Takes a path to a file and decides which _process.* method to use
-        based on the extension'''
+        based on the extension.
+
+        If there is an html cache the converted files are read from it when
+        their source and converter didn't change. The time of each conversion
+        is recorded in the run report.'''
         extension = os.path.splitext(file_path)[-1]
         if extension == '.adoc':
-            html = self._process_adoc(file_path)
+            process = self._timed('asciidoctor', self._process_adoc)
         elif extension == '.html':
-            html = self._process_html(file_path)
+            return self._timed('html', self._process_html)(file_path)
         elif extension == '.md':
-            html = self._process_md(file_path)
+            if self.markdown_engine == 'native':
+                process = self._timed('git2sc-markdown', self._process_md)
+            else:
+                process = self._timed('pandoc', self._process_md)
         else:
             raise UnknownExtension('Extension {} of file {} not known'.format(
                 extension,
                 file_path,
             ))
+        if self.cache is None:
+            return process(file_path)
+        return self._cached_conversion(file_path, extension, process)
+
+    def _timed(self, converter, process):
+        '''Return a function that converts a file with process recording the
+        time it takes as a conversion of converter in the run report'''
+
+        def timed_process(file_path):
+            start = self.report.clock()
+            html = process(file_path)
+            self.report.conversion(
+                converter,
+                file_path,
+                self.report.clock() - start,
+            )
+            return html
+        return timed_process
+
+    def _converter(self, extension):
+        '''Return the name, version and arguments of the converter of an
+        extension'''
+
+        with self._converters_lock:
+            if extension not in self._converter_versions:
+                if extension == '.adoc':
+                    version = subprocess.check_output(
+                        ['asciidoctor', '--version'],
+                        shell=False,
+                    ).decode().splitlines()[0]
+                else:
+                    try:
+                        version = pypandoc.get_pandoc_version()
+                    except OSError:
+                        # The native markdown engine works without pandoc
+                        if self.markdown_engine != 'native':
+                            raise
+                        version = None
+                self._converter_versions[extension] = version
+        version = self._converter_versions[extension]
+        if extension == '.adoc':
+            return 'asciidoctor', version, ASCIIDOCTOR_ARGUMENTS
+        if self.markdown_engine == 'native':
+            # The files with unsupported syntax are converted by pandoc
+            return 'git2sc-markdown', '{} pandoc {}'.format(
+                markdown.VERSION,
+                version,
+            ), ['storage']
+        return 'pandoc', version, [PANDOC_FORMAT]
+
+    def _cached_conversion(self, file_path, extension, process):
+        '''Return the html of a file from the cache, converting and storing it
+        if it's not there'''
+
+        key = cache_key(
+            self._blob_id(file_path).encode(),
+            *self._converter(extension)
+        )
+        html = self.cache.get(key)
+        if html is not None:
+            self._count('cache_hits')
+            return html
+        self._count('cache_misses')
+        html = process(file_path)
+        self.cache.put(key, html)
         return html
 
-    def directory_full_upload(
+    def _convert_file(self, file_path):
+        '''Convert a file with import_file, returning None if its extension
+        is not supported or if the converter fails. The failures are stored
+        in conversion_errors so the rest of the files are still published'''
+
+        try:
+            return self._import(file_path)
+        except UnknownExtension:
+            return None
+        except CONVERSION_ERRORS as error:
+            with self._stats_lock:
+                self.conversion_errors[file_path] = error
+                self.stats['failed'] += 1
+            return None
+
+    def _page_version(self, pageid):
+        '''Return the version number of an indexed page or None'''
+
+        try:
+            return int(self.pages[pageid]['version']['number'])
+        except (KeyError, TypeError):
+            return None
+
+    def _relative_path(self, path, file_path):
+        '''Return the path of a synced file relative to the synced directory,
+        the key of the file in the sync state and the upload journal'''
+
+        if self.state is None and self.journal is None:
+            return None
+        return os.path.relpath(file_path, path).replace(os.sep, '/')
+
+    def _source_hash(self, file_path):
+        '''Return the hash of a file if there is a sync state or an upload
+        journal to compare it with'''
+
+        if self.state is None and self.journal is None:
+            return None
+        return self._file_hash(file_path)
+
+    def _file_hash(self, file_path):
+        '''Return the hash of the git blob id of a file and of the name,
+        version and arguments of its converter. A change of converter changes
+        the hash, so the files are converted and published again'''
+
+        try:
+            converter = self._converter(os.path.splitext(file_path)[-1])
+        except CONVERSION_ERRORS:
+            # The conversion fails too, and records the error
+            converter = None
+        return hashlib.sha256('{} {!r}'.format(
+            self._blob_id(file_path),
+            converter,
+        ).encode()).hexdigest()
+
+    def _blob_id(self, file_path):
+        '''Return the git blob id of a file, from the git index if the file
+        is in it and unmodified, or hashing its contents otherwise'''
+
+        blob = self.blobs.get(file_path)
+        if blob is not None:
+            return blob
+        with open(file_path, 'rb') as f:
+            return git.blob_hash(f.read())
+
+    def _load_blobs(self, path):
+        '''Read from the git index the blob ids of the files of a directory,
+        the keys of the sync state and the html cache, so the unchanged files
+        are detected without opening them. Outside a git repository the
+        files are hashed when needed'''
+
+        self.blobs = {}
+        if self.state is None and self.journal is None and self.cache is None:
+            return
+        try:
+            blobs = git.index_blobs(path)
+        except (subprocess.CalledProcessError, OSError):
+            return
+        self.blobs = {
+            os.path.join(path, *relative_path.split('/')): blob
+            for relative_path, blob in blobs.items()
+        }
+
+    def _state_page_id(self, relative_path):
+        '''Return the page id recorded in the sync state for a path if the
+        page still exists'''
+
+        if relative_path is None or self.state is None:
+            return None
+        record = self.state.get(relative_path)
+        if record is None or record['page_id'] not in self.pages:
+            return None
+        return record['page_id']
+
+    def _deleted_page(self, relative_path, title):
+        '''Return the page id of a deleted file or directory. With a sync
+        state only its record is trusted, as the page with the same title may
+        belong to another path'''
+
+        if self.state is not None:
+            return self._state_page_id(relative_path)
+        return self._get_article_id(title)
+
+    def _last_commit(self, path):
+        '''Return the last commit published to the space, from the sync
+        state if there is one or from the git directory of path'''
+
+        if self.state is not None:
+            return self.state.last_commit()
+        return git.read_last_commit(path, self.space)
+
+    def _record_last_commit(self, path, commit):
+        '''Record the last commit published to the space'''
+
+        if self.state is not None:
+            self.state.record_last_commit(commit)
+        else:
+            git.write_last_commit(path, self.space, commit)
+
+    def _state_is_current(
+        self,
+        relative_path,
+        source_hash=None,
+        rendered_hash=None,
+    ):
+        '''Test if the page of a path is the same as in the last sync: the
+        source file or the rendered html have the same hash as recorded, and
+        nobody edited the page since, as its version is still the recorded
+        one'''
+
+        if relative_path is None or self.state is None:
+            return False
+        record = self.state.get(relative_path)
+        if record is None:
+            return False
+        if record['version'] != self._page_version(record['page_id']):
+            return False
+        if source_hash is not None and \
+                record['source_hash'] == source_hash:
+            return True
+        return rendered_hash is not None and \
+            record['rendered_hash'] == rendered_hash
+
+    def _record_state(
+        self,
+        relative_path,
+        pageid,
+        source_hash=None,
+        html=None,
+    ):
+        '''Store in the sync state and the upload journal the page of a
+        synced path'''
+
+        if relative_path is None or pageid not in self.pages:
+            return
+        if self.journal is not None:
+            self.journal.done(relative_path, pageid, source_hash)
+        if self.state is None:
+            return
+        self.state.record(
+            relative_path,
+            pageid,
+            parent_id=page_parent_id(self.pages[pageid]),
+            version=self._page_version(pageid),
+            source_hash=source_hash,
+            rendered_hash=None if html is None else content_hash(str(html)),
+        )
+
+    def _adopted_page(self, title, parent_id=None):
+        '''When resuming an upload, return the id of the page that a previous
+        attempt created below the parent with the title, or the title with a
+        counter, but didn't record as done in the journal'''
+
+        if self.journal is None or not self.journal.resuming:
+            return None
+        journaled_ids = self.journal.page_ids()
+        for counter in range(10):
+            if counter == 0:
+                candidate = title
+            else:
+                candidate = '{}_{}'.format(title, counter)
+            pageid = self._get_article_id(candidate)
+            if pageid is not None and pageid not in journaled_ids and \
+                    page_parent_id(self.pages[pageid]) == parent_id:
+                return pageid
+        return None
+
+    def _journal_page_id(self, relative_path):
+        '''Return the page id of a path that a resumed upload already
+        uploaded, if the page still exists'''
+
+        if self.journal is None or relative_path is None:
+            return None
+        pageid = self.journal.page_id(relative_path)
+        if pageid not in self.pages:
+            return None
+        return pageid
+
+    def _schedule_full_upload(
         self,
         path,
         excluded_items,
-        parent_id=None
+        parent_id,
+        scheduler,
+        converter,
     ):
-        '''Takes a path to a directory and crawls all the subdirectories and
-        files and uploads them to confluence.
+        '''Crawl a directory submitting to the scheduler the creation of its
+        pages, and to the converter the conversion of its files.
 
-        The uploaded files are the ones supported by the import_file method.
-
-        Optionally you can set up a parent_id to create the confluence structure
-        hanging below a confluence article id
+        The paths that a resumed journal has as done are not uploaded again,
+        unless their file changed since.
         '''
 
         is_root_directory = True
         parent_ids = {}
         parent_ids[path] = parent_id
-        for root, directories, files in os.walk(path):
+        for root, directories, files in self._walk(path, excluded_items):
+            relative_root = self._relative_path(path, root)
+            journaled_id = self._journal_page_id(relative_root)
             if is_root_directory and parent_id is None:
-                self._process_mainpage(root)
-            elif is_root_directory and parent_id is not None:
-                parent_id = self._create_directory_readme(
-                    root,
-                    parent_id,
-                )
-                parent_ids[root] = parent_id
+                if journaled_id is None:
+                    readme = self._convert_readme(root, files, converter)
+                    homepage_id = scheduler.submit(
+                        self._process_mainpage,
+                        root,
+                        readme,
+                        relative_root,
+                    )
+                    scheduler.submit(
+                        self._record_directory_state,
+                        relative_root,
+                        homepage_id,
+                        readme,
+                    )
+            elif journaled_id is not None:
+                parent_ids[root] = journaled_id
             else:
-                directory_parent_id = parent_ids[os.path.dirname(root)]
-                parent_id = self._create_directory_readme(
+                if is_root_directory:
+                    directory_parent_id = parent_id
+                else:
+                    directory_parent_id = parent_ids[os.path.dirname(root)]
+                self._plan(relative_root, os.path.basename(root))
+                readme = self._convert_readme(root, files, converter)
+                parent_ids[root] = scheduler.submit(
+                    self._create_directory_readme,
                     root,
                     directory_parent_id,
+                    readme,
+                )
+                scheduler.submit(
+                    self._record_directory_state,
+                    relative_root,
+                    parent_ids[root],
+                    readme,
                 )
-                parent_ids[root] = parent_id
             is_root_directory = False
 
             for file in files:
-                filename = os.path.splitext(os.path.basename(file))[0]
+                filename, extension = os.path.splitext(os.path.basename(file))
+                if filename == 'README' or \
+                        extension not in SUPPORTED_EXTENSIONS:
+                    continue
 
-                try:
-                    html = self.import_file(
-                        os.path.join(root, file)
-                    )
-                except UnknownExtension:
+                file_path = os.path.join(root, file)
+                relative_path = self._relative_path(path, file_path)
+                source_hash = self._source_hash(file_path)
+                journaled_id = self._journal_page_id(relative_path)
+                if journaled_id is not None:
+                    if self.journal.completed[relative_path]['hash'] == \
+                            source_hash:
+                        self._count('skipped')
+                    else:
+                        scheduler.submit(
+                            self._update_file_page,
+                            relative_path,
+                            source_hash,
+                            journaled_id,
+                            converter.submit(file_path),
+                        )
                     continue
 
-                if not filename == 'README' and file not in excluded_items:
-                    self.create_page(
-                        filename,
-                        html,
-                        parent_id,
-                    )
+                self._plan(relative_path, filename, source_hash)
+                scheduler.submit(
+                    self._create_file_page,
+                    relative_path,
+                    source_hash,
+                    filename,
+                    converter.submit(file_path),
+                    parent_ids[root],
+                )
+
+    def _walk(self, path, excluded_items):
+        '''Walk the directory to publish like os.walk, pruning the entries
+        that match the excluded_items globs or, if gitignore is set, the
+        .gitignore files of the tree. The visited and pruned entries are
+        added to the stats.
+
+        When a git ref is published the tree of the ref is walked instead of
+        the working tree, and the blob ids are taken from it. The time spent
+        walking is recorded as the scan phase of the run report.'''
+
+        if self.tree is not None:
+            scanner = GitTreeScanner(
+                self.cat_file,
+                self.tree,
+                path,
+                excluded_items,
+                self.gitignore,
+            )
+            self.blobs = scanner.blobs
+        else:
+            with self.report.phase('scan'):
+                self._load_blobs(path)
+            scanner = TreeScanner(path, excluded_items, self.gitignore)
+        try:
+            for root, directories, files in self.report.iterate(
+                'scan',
+                scanner.walk(),
+            ):
+                yield root, directories, files
+        finally:
+            with self._stats_lock:
+                self.stats['scanned'] += scanner.visited
+                self.stats['pruned'] += scanner.pruned
+
+    def _open_ref(self, path, ref):
+        '''Publish the files of a git ref of the repository of path instead
+        of its working tree, reading them through a git cat-file process'''
+
+        if ref is None:
+            return
+        cat_file = git.CatFile(path)
+        tree = '{}:{}'.format(ref, git.prefix(path))
+        try:
+            cat_file.tree(tree)
+        except git.MissingObject:
+            cat_file.close()
+            raise
+        self.cat_file = cat_file
+        self.tree = tree
 
-            for directory in directories:
-                if directory in excluded_items:
-                    directories.remove(directory)
+    def _close_ref(self):
+        '''Stop reading the files of the published git ref'''
 
-    def directory_update(
+        if self.cat_file is not None:
+            self.cat_file.close()
+        self.cat_file = None
+        self.tree = None
+
+    def _plan(self, relative_path, title, source_hash=None):
+        '''Record in the upload journal a page that is going to be created'''
+
+        if self.journal is not None:
+            self.journal.plan(relative_path, title, source_hash)
+
+    def _bodies_to_compare(self, parent_id=None):
+        '''Return the ids of the pages whose body has to be loaded to compare
+        it with the converted files in a directory_update'''
+
+        if parent_id is None:
+            scope = list(self.pages.keys())
+        else:
+            scope = self.pages.descendants(parent_id)
+        if self.state is not None:
+            # The pages whose version is the one we left in the last sync
+            # can be compared with the sync state instead of their body
+            synced_versions = self.state.versions()
+            scope = [
+                pageid
+                for pageid in scope
+                if synced_versions.get(pageid) is None or
+                synced_versions[pageid] != self._page_version(pageid)
+            ]
+        return scope
+
+    def _pages_to_delete(self, processed_articles_ids, parent_id=None):
+        '''Return the ids of the pages owned by a sync, the ones below
+        parent_id or below the homepage if it's not set, that the sync didn't
+        process'''
+
+        if parent_id is None:
+            # The homepage is the only top level page that a sync of the
+            # space processes, the pages outside of it aren't synced
+            scope = [
+                descendant
+                for page_id in processed_articles_ids
+                if page_id in self.pages and
+                page_parent_id(self.pages[page_id]) is None
+                for descendant in self.pages.descendants(page_id)
+            ]
+        else:
+            scope = self.pages.descendants(parent_id)
+        return [
+            page_id
+            for page_id in scope
+            if page_id not in processed_articles_ids
+        ]
+
+    def _deletion_batches(self, page_ids, max_deletes=None):
+        '''Split the pages to delete in batches by depth, the deepest first,
+        so no page is deleted before its children. Raises TooManyDeletions
+        if there are more than max_deletes pages'''
+
+        if max_deletes is not None and len(page_ids) > max_deletes:
+            raise TooManyDeletions(
+                'The sync would delete {} pages, more than the maximum of '
+                '{}'.format(len(page_ids), max_deletes)
+            )
+        batches = {}
+        for page_id in page_ids:
+            depth = len(self.pages[page_id].get('ancestors') or [])
+            batches.setdefault(depth, []).append(page_id)
+        return [
+            (depth, batches[depth])
+            for depth in sorted(batches, reverse=True)
+        ]
+
+    def _record_deletion_batch(self, depth, pages, start):
+        '''Record the pages deleted in a batch and how long it took'''
+
+        self.deletions.append({
+            'depth': depth,
+            'pages': pages,
+            'seconds': time.monotonic() - start,
+        })
+
+    def _schedule_update(
         self,
         path,
         excluded_items,
-        parent_id=None
+        parent_id,
+        scheduler,
+        converter,
     ):
-        '''Takes a path to a directory and crawls all the subdirectories and
-        files and updates them on confluence.
-
-        The uploaded files are the ones supported by the import_file method.
+        '''Crawl a directory submitting to the scheduler the creation or
+        update of its pages, and to the converter the conversion of the files
+        that changed.
 
-        Optionally you can set up a parent_id to create the confluence structure
-        hanging below a confluence article id.
-
-        Right now it will update or create each article even though it doesn't
-        have any changes.
+        Returns the set of ids of the pages that are kept and the list of
+        futures of the ids of the pages that are being created or found.
         '''
 
         is_root_directory = True
         parent_ids = {}
-        processed_articles_ids = []
+        processed_articles_ids = set()
+        # Pages created or found by the workers, their ids are known once the
+        # scheduler finishes
+        pending_articles_ids = []
+        created_titles = set()
         parent_ids[path] = parent_id
-        for root, directories, files in os.walk(path):
+        for root, directories, files in self._walk(path, excluded_items):
+            relative_root = self._relative_path(path, root)
+            readme = self._convert_readme(root, files, converter)
             if is_root_directory and parent_id is None:
-                article_id = self._process_mainpage(root)
+                article_id = scheduler.submit(
+                    self._process_mainpage,
+                    root,
+                    readme,
+                    relative_root,
+                )
+                written = article_id
             else:
                 article_id = self._get_article_id(os.path.basename(root))
                 if is_root_directory:
@@ -367,55 +1023,1020 @@ class Git2SC():
                 else:
                     directory_parent_id = parent_ids[os.path.dirname(root)]
                 if article_id is not None:
-                    self._update_directory_readme(root)
+                    # The files of the directory don't need to wait for the
+                    # update of its page, its state does
+                    written = scheduler.submit(
+                        self._update_directory_readme,
+                        root,
+                        readme,
+                        relative_root,
+                    )
                 else:
-                    article_id = self._create_directory_readme(
+                    article_id = scheduler.submit(
+                        self._create_directory_readme,
                         root,
                         directory_parent_id,
+                        readme,
                     )
+                    written = article_id
+                    created_titles.add(os.path.basename(root))
                 parent_ids[root] = article_id
-            processed_articles_ids.append(article_id)
+            if is_future(article_id):
+                pending_articles_ids.append(article_id)
+            else:
+                processed_articles_ids.add(article_id)
+            scheduler.submit(
+                self._record_directory_state,
+                relative_root,
+                written,
+                readme,
+            )
 
             for file in files:
-                filename = os.path.splitext(os.path.basename(file))[0]
-
-                try:
-                    html = self.import_file(
-                        os.path.join(root, file)
-                    )
-                except UnknownExtension:
+                filename, extension = os.path.splitext(os.path.basename(file))
+                if filename == 'README' or \
+                        extension not in SUPPORTED_EXTENSIONS:
                     continue
 
-                if not filename == 'README' and file not in excluded_items:
-                    article_id = self._get_article_id(filename)
+                file_path = os.path.join(root, file)
+                relative_path = self._relative_path(path, file_path)
+                source_hash = self._source_hash(file_path)
+                article_id = self._state_page_id(relative_path) or \
+                    self._get_article_id(filename)
 
-                    if article_id in processed_articles_ids:
-                        continue
-                    directory_parent_id = parent_ids[root]
+                if article_id in processed_articles_ids or \
+                        (article_id is None and filename in created_titles):
+                    continue
 
-                    if article_id is not None:
-                        self.update_page(
-                            article_id,
-                            html,
-                        )
-                    else:
-                        article_id = self.create_page(
-                            filename,
-                            html,
-                            directory_parent_id,
-                        )
-                    processed_articles_ids.append(article_id)
+                if article_id is not None and \
+                        not self._is_moved(article_id, parent_ids[root]) and \
+                        self._state_is_current(relative_path, source_hash):
+                    # Neither the file nor the page changed since the last
+                    # sync, there is no need to convert it
+                    self._count('skipped')
+                    processed_articles_ids.add(article_id)
+                    continue
 
-            for directory in directories:
-                if directory in excluded_items:
-                    directories.remove(directory)
+                html = converter.submit(file_path)
+                if article_id is not None:
+                    scheduler.submit(
+                        self._update_file_page,
+                        relative_path,
+                        source_hash,
+                        article_id,
+                        html,
+                        parent_ids[root],
+                    )
+                    processed_articles_ids.add(article_id)
+                else:
+                    pending_articles_ids.append(scheduler.submit(
+                        self._create_file_page,
+                        relative_path,
+                        source_hash,
+                        filename,
+                        html,
+                        parent_ids[root],
+                    ))
+                    created_titles.add(filename)
 
             is_root_directory = False
 
-        for page_id in self.pages.keys():
-            if page_id not in processed_articles_ids:
-                self.delete_page(page_id)
+        return processed_articles_ids, pending_articles_ids
+
+
+class Git2SC(BaseGit2SC):
+    '''Class to sync a git documentation repository to Confluence.'''
+
+    def __init__(
+        self,
+        confluence_api_url,
+        auth,
+        space_id,
+        pool_size=10,
+        timeout=(3.05, 60),
+        max_retries=3,
+        keep_alive=True,
+        page_size=100,
+        listing_concurrency=4,
+        state=None,
+        cache=None,
+        warm_converters=None,
+        markdown_engine='pandoc',
+        rate_limit=None,
+        gitignore=True,
+    ):
+        super().__init__(
+            confluence_api_url,
+            auth,
+            space_id,
+            page_size=page_size,
+            listing_concurrency=listing_concurrency,
+            state=state,
+            cache=cache,
+            warm_converters=warm_converters,
+            markdown_engine=markdown_engine,
+            gitignore=gitignore,
+        )
+        self.session, self.adapter = build_session(
+            self.auth,
+            pool_size=pool_size,
+            timeout=timeout,
+            max_retries=max_retries,
+            keep_alive=keep_alive,
+        )
+        self.throttle = Throttle(rate_limit, concurrency=pool_size)
+        self.get_space_articles()
+
+    def _request(self, method, url, **kwargs):
+        '''Send a request through the pooled session, waiting and retrying
+        while confluence throttles the requests'''
+
+        return self.throttle.request(self._send, method, url, **kwargs)
+
+    def _send(self, method, url, **kwargs):
+        '''Send a request through the pooled session recording its latency
+        and size in the run report'''
+
+        start = self.report.clock()
+        r = self.session.request(method, url, **kwargs)
+        self.report.request(
+            method,
+            self._api_path(url),
+            self.report.clock() - start,
+            kwargs.get('data'),
+            r.content,
+            r.status_code,
+        )
+        return r
+
+    def connection_stats(self):
+        '''Return the number of requests sent and how many of them reused a
+        kept-alive connection'''
+
+        return self.adapter.connection_stats()
+
+    def get_page_info(self, pageid):
+        '''Get all the information of a confluence page'''
+
+        url = '{base}/content/{pageid}?expand=ancestors,body.storage,version'\
+            .format(base=self.api_url, pageid=pageid)
+
+        r = self._request('GET', url)
+        self._requests_error(r)
+        return r.json()
+
+    def get_space_homepage(self):
+        '''Get the homepage of a confluence space'''
+
+        url = '{base}/space/{spaceid}'.format(
+            base=self.api_url,
+            spaceid=self.space,
+        )
+        r = self._request('GET', url)
+        self._requests_error(r)
+        return r.json()['_expandable']['homepage'].split('/')[4]
+
+    def _get_space_articles_batch(self, start, limit):
+        '''Get one batch of the pages of a confluence space'''
+
+        url = '{base}/space/{spaceid}/content?expand=version,ancestors'\
+            '&limit={limit}&start={start}'.format(
+                base=self.api_url,
+                spaceid=self.space,
+                limit=limit,
+                start=start,
+            )
+        r = self._request('GET', url)
+        self._requests_error(r)
+        return r.json()['page']
+
+    def iter_space_articles(self):
+        '''Yield all the pages of a confluence space as the batches arrive.
+
+        The first batch tells us the page size the server accepts (Confluence
+        caps the requested limit), the rest of the batches are requested
+        concurrently, up to listing_concurrency at the same time. If the
+        server returns the totalSize all the batches are requested at once,
+        otherwise they are requested in windows until a batch doesn't have a
+        next link.
+        '''
+
+        batch = self._get_space_articles_batch(0, self.page_size)
+        for page in batch['results']:
+            yield page
+        if 'next' not in batch.get('_links', {}):
+            return
+
+        limit = batch.get('limit') or len(batch['results']) or self.page_size
+        start = batch.get('start', 0) + len(batch['results'])
+        total = batch.get('totalSize')
+
+        with ThreadPoolExecutor(self.listing_concurrency) as executor:
+            if total is not None:
+                futures = [
+                    executor.submit(
+                        self._get_space_articles_batch,
+                        batch_start,
+                        limit,
+                    )
+                    for batch_start in range(start, total, limit)
+                ]
+                for future in as_completed(futures):
+                    for page in future.result()['results']:
+                        yield page
+                return
+
+            last_batch_found = False
+            while not last_batch_found:
+                futures = [
+                    executor.submit(
+                        self._get_space_articles_batch,
+                        start + window * limit,
+                        limit,
+                    )
+                    for window in range(self.listing_concurrency)
+                ]
+                for future in as_completed(futures):
+                    batch = future.result()
+                    if 'next' not in batch.get('_links', {}) or \
+                            not batch['results']:
+                        last_batch_found = True
+                    for page in batch['results']:
+                        yield page
+                start += self.listing_concurrency * limit
+
+    def get_space_articles(self):
+        '''Get the metadata (id, title, version and ancestors) of all the pages
+        of a confluence space, the bodies are loaded on demand with
+        load_bodies'''
+
+        self.pages = {}
+        with self.report.phase('list'):
+            for page in self.iter_space_articles():
+                self.pages[page['id']] = page
+
+    def _get_bodies_batch(self, page_ids):
+        '''Get the storage body of a batch of pages with a single request'''
+
+        cql = 'id in ({})'.format(','.join(page_ids))
+        url = '{base}/content/search?cql={cql}&expand=body.storage'\
+            '&limit={limit}'.format(
+                base=self.api_url,
+                cql=quote(cql),
+                limit=len(page_ids),
+            )
+        r = self._request('GET', url)
+        self._requests_error(r)
+        return r.json()['results']
+
+    def load_bodies(self, page_ids):
+        '''Load in bulk the storage body of the pages that don't have it
+        loaded yet. The batches are requested concurrently'''
+
+        with self.report.phase('bodies'):
+            self._load_bodies(page_ids)
+
+    def _load_bodies(self, page_ids):
+        missing = [
+            pageid
+            for pageid in page_ids
+            if pageid in self.pages and 'body' not in self.pages[pageid]
+        ]
+        batches = [
+            missing[index:index + self.page_size]
+            for index in range(0, len(missing), self.page_size)
+        ]
+
+        with ThreadPoolExecutor(self.listing_concurrency) as executor:
+            for results in executor.map(self._get_bodies_batch, batches):
+                for page in results:
+                    if page['id'] in self.pages:
+                        self.pages[page['id']]['body'] = page['body']
+
+        # The search endpoint may cap the number of expanded bodies it
+        # returns, fetch the remaining ones one by one.
+        for pageid in missing:
+            if 'body' not in self.pages[pageid]:
+                self.pages[pageid]['body'] = \
+                    self.get_page_info(pageid)['body']
+
+    def get_page_body(self, pageid):
+        '''Get the storage body of a page, loading it if needed'''
+
+        if pageid not in self.pages:
+            self.pages[pageid] = self.get_page_info(pageid)
+        self.load_bodies([pageid])
+        return self.pages[pageid]['body']['storage']['value']
+
+    def update_page(self, pageid, html, title=None, parent_id=None):
+        '''Update a confluence page with the content of the html variable,
+        renaming it if there is a title and moving it below parent_id if
+        it's set.
+
+        If the body of the page was loaded with load_bodies and it has the
+        same content as the html, the update is skipped to avoid creating a
+        new version of the page. Returns True if the page was updated.
+        '''
+
+        if self._is_unchanged(pageid, html, title, parent_id):
+            self._count('skipped')
+            return False
+
+        with self.report.page(self._page_title(pageid, title)):
+            try:
+                self.pages[pageid]['version']
+            except KeyError:
+                self.pages[pageid] = self.get_page_info(pageid)
+
+            version, data_json = self._update_data(
+                pageid,
+                html,
+                title,
+                parent_id,
+            )
+
+            url = '{base}/content/{pageid}'.format(
+                base=self.api_url,
+                pageid=pageid,
+            )
+
+            r = self._request(
+                'PUT',
+                url,
+                data=data_json,
+                headers={'Content-Type': 'application/json'}
+            )
+
+        self._requests_error(r)
+
+        self._page_updated(pageid, version)
+        return True
+
+    def create_page(self, title, html, parent_id=None):
+        '''Create a confluence page with the content of the html variable'''
+
+        new_title = self._reserve_title(title)
+        try:
+            with self.report.page(new_title):
+                return self._post_page(new_title, html, parent_id)
+        finally:
+            self._release_title(new_title)
+
+    def _post_page(self, new_title, html, parent_id=None):
+        '''Post the creation of a page and index it'''
+
+        url = '{base}/content?expand=ancestors,version'.format(
+            base=self.api_url,
+        )
+
+        r = self._request(
+            'POST',
+            url,
+            data=self._create_data(new_title, html, parent_id),
+            headers={'Content-Type': 'application/json'}
+        )
+
+        self._requests_error(r)
+
+        page = json.loads(r.text)
+        pageid = page['id']
+        self.pages[pageid] = self._created_page_record(page) or \
+            self.get_page_info(pageid)
+        self._count('created')
+        return pageid
+
+    def delete_page(self, pageid):
+        '''Delete a confluence page given the pageid'''
+
+        url = '{base}/content/{pageid}'.format(base=self.api_url, pageid=pageid)
+
+        with self.report.page(self._page_title(pageid)):
+            r = self._request('DELETE', url)
+
+        if r.status_code != 204:
+            self._requests_error(r)
+
+        self._page_deleted(pageid)
+
+    def _process_mainpage(
+        self,
+        directory_path,
+        html=NOT_CONVERTED,
+        relative_path=None,
+    ):
+        '''Takes a path to a file and updates the confluence homepage. html
+        is the converted README of the directory, if it's NOT_CONVERTED the
+        README is converted now. relative_path is the key of the directory
+        in the sync state'''
+        homepage_id = self.get_space_homepage()
+        self._update_directory_page(
+            relative_path,
+            homepage_id,
+            self._readme_html(directory_path, html),
+        )
+        return homepage_id
+
+    def _update_directory_page(self, relative_path, article_id, html):
+        '''Update the page of a directory, unless the sync state shows that
+        its rendered html didn't change'''
+
+        if self._state_is_current(
+            relative_path,
+            rendered_hash=content_hash(str(html)),
+        ):
+            self._count('skipped')
+        else:
+            self.update_page(article_id, html)
+
+    def _create_directory_readme(
+        self,
+        directory_path,
+        parent_id=None,
+        html=NOT_CONVERTED,
+    ):
+        '''Takes a directory path, searches for README.adoc or README.md and
+        creates a confluence page with that information. html is the
+        converted README, if it's NOT_CONVERTED the README is converted
+        now'''
+        return self._create_page_once(
+            os.path.basename(directory_path),
+            self._readme_html(directory_path, html),
+            parent_id,
+        )
+
+    def _update_directory_readme(
+        self,
+        directory_path,
+        html=NOT_CONVERTED,
+        relative_path=None,
+    ):
+        '''Takes a directory path, deduces the article_id and updates it with
+        the contents of the README.adoc or README.md. html is the converted
+        README, if it's NOT_CONVERTED the README is converted now.
+        relative_path is the key of the directory in the sync state. Returns
+        the id of the page'''
+        article_id = self._get_article_id(os.path.basename(directory_path))
+        self._update_directory_page(
+            relative_path,
+            article_id,
+            self._readme_html(directory_path, html),
+        )
+        return article_id
+
+    def _create_page_once(self, title, html, parent_id=None):
+        '''Create a page, or update the page a previous attempt of a resumed
+        upload created, so resuming doesn't duplicate pages'''
+
+        pageid = self._adopted_page(title, parent_id)
+        if pageid is None:
+            return self.create_page(title, html, parent_id)
+        self.update_page(pageid, html)
+        return pageid
+
+    def _create_file_page(
+        self,
+        relative_path,
+        source_hash,
+        filename,
+        html,
+        parent_id,
+    ):
+        '''Create the page of a file and record it in the sync state'''
+
+        if html is None:
+            return None
+        article_id = self._create_page_once(filename, html, parent_id)
+        self._record_state(relative_path, article_id, source_hash, html)
+        return article_id
+
+    def _update_file_page(
+        self,
+        relative_path,
+        source_hash,
+        article_id,
+        html,
+        parent_id=None,
+    ):
+        '''Update the page of a file, unless the sync state shows that its
+        rendered html didn't change, and record it in the sync state. If
+        parent_id is set and the file moved to another directory the page is
+        moved below it'''
+
+        if html is None:
+            return article_id
+        if self._is_moved(article_id, parent_id):
+            self.update_page(article_id, html, parent_id=parent_id)
+        elif self._state_is_current(
+            relative_path,
+            rendered_hash=content_hash(str(html)),
+        ):
+            self._count('skipped')
+        else:
+            self.update_page(article_id, html)
+        self._record_state(relative_path, article_id, source_hash, html)
+        return article_id
+
+    def _record_directory_state(self, relative_path, article_id, html=None):
+        '''Record the page of a directory and the hash of its html in the
+        sync state. html is None if the README couldn't be converted, so the
+        page is written again in the next sync'''
+
+        self._record_state(relative_path, article_id, html=html)
+        return article_id
+
+    def directory_full_upload(
+        self,
+        path,
+        excluded_items,
+        parent_id=None,
+        workers=1,
+        jobs=1,
+        converter_limits=None,
+        journal=None,
+        ref=None,
+    ):
+        '''Takes a path to a directory and crawls all the subdirectories and
+        files and uploads them to confluence.
+
+        The uploaded files are the ones supported by the import_file method.
+
+        Optionally you can set up a parent_id to create the confluence structure
+        hanging below a confluence article id
+
+        The pages are created by a pool of workers, each page is created once
+        the page of its directory exists. The files are converted by jobs
+        parallel converters, converter_limits limits the number of them
+        running with each extension.
+
+        With a Journal the upload records the pages it plans and creates, and
+        if the journal is resumed the pages already uploaded are skipped.
+
+        If ref is set the files are read from that git ref of the repository
+        of path, which can be bare, instead of from the working tree.
+        '''
+
+        if journal is not None:
+            journal.start(path, parent_id)
+        self.journal = journal
+        self._open_ref(path, ref)
+        scheduler = Scheduler(workers)
+        converter = ConversionPool(self._convert_file, jobs, converter_limits)
+        try:
+            with self.report.phase('publish'):
+                self._schedule_full_upload(
+                    path,
+                    excluded_items,
+                    parent_id,
+                    scheduler,
+                    converter,
+                )
+                scheduler.join()
+        finally:
+            converter.shutdown()
+            self._close_ref()
+            if journal is not None:
+                journal.sync()
+            self.journal = None
+
+    def directory_update(
+        self,
+        path,
+        excluded_items,
+        parent_id=None,
+        workers=1,
+        jobs=1,
+        converter_limits=None,
+        max_deletes=None,
+        ref=None,
+    ):
+        '''Takes a path to a directory and crawls all the subdirectories and
+        files and updates them on confluence.
+
+        The uploaded files are the ones supported by the import_file method.
+
+        Optionally you can set up a parent_id to create the confluence structure
+        hanging below a confluence article id.
+
+        The bodies of the existing pages are loaded in bulk before crawling so
+        the articles whose content hasn't changed are not updated.
+
+        The pages are created and updated by a pool of workers, each page is
+        created once the page of its directory exists. The files are
+        converted by jobs parallel converters, converter_limits limits the
+        number of them running with each extension.
+
+        At the end the pages below parent_id, or in the whole space if it's
+        not set, that don't belong to any file nor directory are deleted by
+        the workers, leaves first. If there are more than max_deletes of them
+        nothing is deleted and TooManyDeletions is raised.
+
+        If ref is set the files are read from that git ref of the repository
+        of path, which can be bare, instead of from the working tree.
+        '''
+
+        self.load_bodies(self._bodies_to_compare(parent_id))
+
+        self._open_ref(path, ref)
+        scheduler = Scheduler(workers)
+        converter = ConversionPool(self._convert_file, jobs, converter_limits)
+        try:
+            with self.report.phase('publish'):
+                processed_articles_ids, pending_articles_ids = \
+                    self._schedule_update(
+                        path,
+                        excluded_items,
+                        parent_id,
+                        scheduler,
+                        converter,
+                    )
+                scheduler.join()
+        finally:
+            converter.shutdown()
+            self._close_ref()
+        for article_id in pending_articles_ids:
+            processed_articles_ids.add(article_id.result())
+
+        self.delete_pages(
+            self._pages_to_delete(processed_articles_ids, parent_id),
+            workers=workers,
+            max_deletes=max_deletes,
+        )
+
+    def delete_pages(self, page_ids, workers=1, max_deletes=None):
+        '''Delete several pages, leaves first and with a pool of workers. The
+        deleted pages and the time of each batch are recorded in
+        self.deletions'''
+
+        for depth, batch in self._deletion_batches(page_ids, max_deletes):
+            pages = [
+                (page_id, self.pages[page_id].get('title'))
+                for page_id in batch
+            ]
+            start = time.monotonic()
+            scheduler = Scheduler(workers)
+            with self.report.phase('delete'):
+                for page_id in batch:
+                    scheduler.submit(self.delete_page, page_id)
+                scheduler.join()
+            self._record_deletion_batch(depth, pages, start)
+
+    def plan_update(
+        self,
+        path,
+        excluded_items,
+        parent_id=None,
+        jobs=1,
+        converter_limits=None,
+        ref=None,
+    ):
+        '''Plan a directory_update without changing the space and return the
+        SyncPlan of the pages it would create, update, move, delete and skip.
+
+        The plan is made with the same crawl as directory_update, converting
+        only the files that changed, and without requests besides the ones
+        that load the space and the bodies of the pages to compare. If ref is
+        set the files are read from that git ref, like in directory_update.
+        '''
+
+        self.load_bodies(self._bodies_to_compare(parent_id))
+
+        plan = SyncPlan(self.space, path, parent_id)
+        planner = Planner(self, plan)
+        scheduler = PlanningScheduler(planner)
+        self._open_ref(path, ref)
+        converter = ConversionPool(self._convert_file, jobs, converter_limits)
+        try:
+            with self.report.phase('plan'):
+                processed_articles_ids, pending_articles_ids = \
+                    self._schedule_update(
+                        path,
+                        excluded_items,
+                        parent_id,
+                        scheduler,
+                        converter,
+                    )
+                scheduler.join()
+        finally:
+            converter.shutdown()
+            self._close_ref()
+        for article_id in pending_articles_ids:
+            processed_articles_ids.add(article_id.result())
+
+        for article_id in sorted(processed_articles_ids - {None}):
+            # Pages skipped by the crawl without converting their file
+            if article_id not in planner.operations and \
+                    article_id in self.pages:
+                plan.add(
+                    'skip',
+                    kind='file',
+                    page_id=article_id,
+                    title=self.pages[article_id].get('title'),
+                )
+        page_ids = self._pages_to_delete(processed_articles_ids, parent_id)
+        for depth, batch in self._deletion_batches(page_ids):
+            for page_id in batch:
+                plan.add(
+                    'delete',
+                    page_id=page_id,
+                    title=self.pages[page_id].get('title'),
+                    version=self._page_version(page_id),
+                    depth=depth,
+                )
+        return plan
+
+    def apply_plan(self, plan, workers=1, max_deletes=None):
+        '''Apply a SyncPlan made by plan_update with a pool of workers.
+
+        The pages are written with the html stored in the plan, each created
+        page once the page of its directory exists, and then the pages to
+        delete are deleted leaves first. If a page of the plan changed since
+        it was made StalePlan is raised before changing anything, and if
+        there are more than max_deletes pages to delete TooManyDeletions is
+        raised before deleting any of them.
+        '''
+
+        plan.check(self.pages)
+        deletions = [
+            operation['page_id']
+            for operation in plan.operations
+            if operation['op'] == 'delete'
+        ]
+        self._deletion_batches(deletions, max_deletes)
+
+        scheduler = Scheduler(workers)
+        # Futures of the ids of the created pages by the ref of their create
+        # operation
+        created = {}
+        with self.report.phase('publish'):
+            for operation in plan.operations:
+                parent_id = created.get(operation.get('parent'),
+                                        operation.get('parent'))
+                if operation['op'] == 'create':
+                    created[operation['ref']] = scheduler.submit(
+                        self._apply_create,
+                        operation,
+                        parent_id,
+                    )
+                elif operation['op'] in ('update', 'move'):
+                    scheduler.submit(self._apply_update, operation, parent_id)
+                elif operation['op'] == 'skip':
+                    self._count('skipped')
+            scheduler.join()
+
+        self.delete_pages(deletions, workers=workers)
+
+    def _apply_create(self, operation, parent_id):
+        '''Create the page of a create operation of a SyncPlan'''
+
+        article_id = self.create_page(
+            operation['title'],
+            operation['html'],
+            parent_id,
+        )
+        self._record_operation_state(operation, article_id)
+        return article_id
+
+    def _apply_update(self, operation, parent_id=None):
+        '''Update, and move if it's a move, the page of an operation of a
+        SyncPlan'''
+
+        self.update_page(
+            operation['page_id'],
+            operation['html'],
+            parent_id=parent_id if operation['op'] == 'move' else None,
+        )
+        self._record_operation_state(operation, operation['page_id'])
+        return operation['page_id']
+
+    def _record_operation_state(self, operation, article_id):
+        '''Record in the sync state the page written by an operation of a
+        SyncPlan'''
+
+        self._record_state(
+            operation.get('path'),
+            article_id,
+            operation.get('source_hash'),
+            operation['html'],
+        )
+
+    def _ensure_directory_page(
+        self,
+        path,
+        directory,
+        parent_id,
+        directory_ids,
+        created_directories,
+    ):
+        '''Return the article id of a directory of the synced tree, creating
+        the pages of the directory and its parents if they don't exist'''
+
+        if directory in directory_ids:
+            return directory_ids[directory]
+
+        if directory == path and parent_id is None:
+            article_id = self.get_space_homepage()
+        else:
+            article_id = self._get_article_id(os.path.basename(directory))
+            if article_id is None:
+                if directory == path:
+                    directory_parent_id = parent_id
+                else:
+                    directory_parent_id = self._ensure_directory_page(
+                        path,
+                        os.path.dirname(directory),
+                        parent_id,
+                        directory_ids,
+                        created_directories,
+                    )
+                article_id = self._create_directory_readme(
+                    directory,
+                    directory_parent_id,
+                )
+                created_directories.add(directory)
+        directory_ids[directory] = article_id
+        return article_id
+
+    def directory_incremental_update(
+        self,
+        path,
+        excluded_items,
+        parent_id=None,
+        since=None,
+        workers=1,
+        jobs=1,
+        converter_limits=None,
+        max_deletes=None,
+    ):
+        '''Takes a path to a directory of a git repository and updates on
+        confluence only the files that changed since the last published
+        commit.
+
+        The changes are taken from git diff between the since commit (by
+        default the last commit published to the space) and HEAD. Added and
+        modified files are converted and created or updated, deleted files
+        are deleted and the pages of their parent directories are created if
+        they don't exist or updated if their README changed. A deleted and an
+        added file with the same title are a moved file, and its page is
+        moved below its new directory. The pages of the directories of the
+        deleted files that are not in HEAD are deleted.
+
+        If the space was never published from this repository it does a
+        directory_update. In both cases HEAD is recorded as the last
+        published commit.
+
+        The changed files are converted by jobs parallel converters before
+        publishing them with workers parallel requests. The pages of the
+        deleted files are deleted first, and if there are more than
+        max_deletes of them TooManyDeletions is raised before changing
+        anything.
+        '''
+
+        path = os.path.normpath(path)
+        commit = git.head(path)
+        if since is None:
+            since = self._last_commit(path)
+        if since is None:
+            self.directory_update(
+                path,
+                excluded_items,
+                parent_id,
+                workers=workers,
+                jobs=jobs,
+                converter_limits=converter_limits,
+                max_deletes=max_deletes,
+            )
+            self._record_last_commit(path, commit)
+            return
+
+        directory_ids = {}
+        created_directories = set()
+        refreshed_directories = set()
+        deleted_directories = set()
+        moved = {}
+        deletions = []
+        changes = []
+        conversions = {}
+        excludes = IgnoreRules(excluded_items)
+        start = self.report.clock()
+        self._load_blobs(path)
+        converter = ConversionPool(self._convert_file, jobs, converter_limits)
+        for file_path, status in sorted(
+            git.changed_files(path, since, commit).items()
+        ):
+            parts = file_path.split('/')
+            if excludes.excludes(file_path):
+                continue
+            if status == 'D':
+                for depth in range(1, len(parts)):
+                    deleted_directories.add('/'.join(parts[:depth]))
+            filename, extension = os.path.splitext(parts[-1])
+            if extension not in SUPPORTED_EXTENSIONS:
+                continue
+            changes.append((file_path, status, parts, filename))
+            if filename != 'README' and status != 'D':
+                conversions[file_path] = converter.submit(
+                    os.path.join(path, file_path),
+                )
+        converter.shutdown()
+        self.report.add_phase('convert', self.report.clock() - start)
+
+        # The directories of the deleted files that are not in the commit
+        removed_directories = set()
+        if deleted_directories:
+            removed_directories = deleted_directories - \
+                git.directories(path, commit)
+
+        # A deleted and an added file with the same title are a file moved
+        # to another directory, its page is moved instead of deleted
+        added = {
+            filename
+            for file_path, status, parts, filename in changes
+            if status == 'A' and filename != 'README'
+        }
+        for file_path, status, parts, filename in changes:
+            relative_path = self._relative_path(
+                path,
+                os.path.join(path, file_path),
+            )
+            if filename == 'README':
+                if '/'.join(parts[:-1]) not in removed_directories:
+                    refreshed_directories.add(os.path.join(path, *parts[:-1]))
+            elif status == 'D' and filename in added:
+                moved[filename] = relative_path
+            elif status == 'D':
+                article_id = self._deleted_page(relative_path, filename)
+                if article_id is not None:
+                    deletions.append(article_id)
+        for directory in sorted(removed_directories):
+            article_id = self._deleted_page(
+                self._relative_path(path, os.path.join(path, directory)),
+                os.path.basename(directory),
+            )
+            if article_id is not None:
+                deletions.append(article_id)
+        self.delete_pages(deletions, workers=workers, max_deletes=max_deletes)
+
+        start = self.report.clock()
+        scheduler = Scheduler(workers)
+        for file_path, status, parts, filename in changes:
+            if filename == 'README' or status == 'D':
+                continue
+            html = conversions[file_path].result()
+            if html is None:
+                continue
+            absolute_path = os.path.join(path, file_path)
+            relative_path = self._relative_path(path, absolute_path)
+            article_id = self._state_page_id(relative_path) or \
+                self._state_page_id(moved.get(filename)) or \
+                self._get_article_id(filename)
+            directory_parent_id = self._ensure_directory_page(
+                path,
+                os.path.join(path, *parts[:-1]),
+                parent_id,
+                directory_ids,
+                created_directories,
+            )
+            if article_id is not None:
+                scheduler.submit(
+                    self._update_file_page,
+                    relative_path,
+                    self._source_hash(absolute_path),
+                    article_id,
+                    html,
+                    directory_parent_id,
+                )
+            else:
+                scheduler.submit(
+                    self._create_file_page,
+                    relative_path,
+                    self._source_hash(absolute_path),
+                    filename,
+                    html,
+                    directory_parent_id,
+                )
+
+        for directory in sorted(refreshed_directories):
+            if directory == path and parent_id is None:
+                scheduler.submit(self._process_mainpage, path)
+                continue
+            self._ensure_directory_page(
+                path,
+                directory,
+                parent_id,
+                directory_ids,
+                created_directories,
+            )
+            if directory not in created_directories:
+                scheduler.submit(self._update_directory_readme, directory)
+        scheduler.join()
+        self.report.add_phase('publish', self.report.clock() - start)
+
+        self._record_last_commit(path, commit)
 
 
 class UnknownExtension(Exception):
     pass
+
+
+class TooManyDeletions(Exception):
+    '''The sync would delete more pages than the allowed maximum'''
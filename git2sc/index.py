@@ -0,0 +1,127 @@
+import threading
+from collections.abc import MutableMapping
+
+
+def parent_id(page):
+    '''Return the id of the direct ancestor of a confluence page or None if
+    it hangs from the root of the space'''
+
+    ancestors = page.get('ancestors') or []
+    if ancestors == []:
+        return None
+    return ancestors[-1].get('id')
+
+
+class PageIndex(MutableMapping):
+    '''Dictionary of confluence pages indexed by page id that keeps a title to
+    id and a parent to children index updated, so the lookups done while
+    syncing a directory don't need to scan all the pages of the space.
+
+    The changes are serialized with a lock so the pages can be created and
+    updated from several threads.
+    '''
+
+    def __init__(self, pages=None):
+        self._lock = threading.RLock()
+        self._pages = {}
+        self._titles = {}
+        self._parents = {}
+        self._children = {}
+        if pages is not None:
+            self.update(pages)
+
+    def __getitem__(self, pageid):
+        return self._pages[pageid]
+
+    def __setitem__(self, pageid, page):
+        with self._lock:
+            if pageid in self._pages:
+                self._unindex(pageid)
+            self._pages[pageid] = page
+            self._index(pageid)
+
+    def __delitem__(self, pageid):
+        with self._lock:
+            self._unindex(pageid)
+            del self._pages[pageid]
+
+    def __iter__(self):
+        return iter(self._pages)
+
+    def __len__(self):
+        return len(self._pages)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self._pages)
+
+    def _index(self, pageid):
+        page = self._pages[pageid]
+        title = page.get('title')
+        if title is not None:
+            self._titles[title] = pageid
+        parent = parent_id(page)
+        self._parents[pageid] = parent
+        self._children.setdefault(parent, set()).add(pageid)
+
+    def _unindex(self, pageid):
+        title = self._pages[pageid].get('title')
+        if title is not None and self._titles.get(title) == pageid:
+            del self._titles[title]
+        parent = self._parents.pop(pageid)
+        siblings = self._children[parent]
+        siblings.discard(pageid)
+        if len(siblings) == 0:
+            del self._children[parent]
+
+    def get_id(self, title):
+        '''Get the id of the page with the specified title or None if it
+        doesn't exist'''
+
+        return self._titles.get(title)
+
+    def title_exists(self, title):
+        '''Test if there is a page with the specified title'''
+
+        return title in self._titles
+
+    def rename(self, pageid, title):
+        '''Change the title of an indexed page'''
+
+        with self._lock:
+            self._unindex(pageid)
+            self._pages[pageid]['title'] = title
+            self._index(pageid)
+
+    def move(self, pageid, parent):
+        '''Change the parent of an indexed page'''
+
+        with self._lock:
+            self._unindex(pageid)
+            ancestors = []
+            if parent in self._pages:
+                ancestors = list(self._pages[parent].get('ancestors') or [])
+            self._pages[pageid]['ancestors'] = ancestors + [{'id': parent}]
+            self._index(pageid)
+
+    def parent(self, pageid):
+        '''Get the id of the parent of an indexed page'''
+
+        return self._parents[pageid]
+
+    def children(self, pageid):
+        '''Get the ids of the direct children of a page'''
+
+        with self._lock:
+            return set(self._children.get(pageid, ()))
+
+    def descendants(self, pageid):
+        '''Get the ids of all the pages hanging below a page'''
+
+        descendants = []
+        pending = [pageid]
+        with self._lock:
+            while pending:
+                children = self._children.get(pending.pop(), ())
+                descendants.extend(children)
+                pending.extend(children)
+        return descendants
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import threading
+
+
+def default_journal_path(space):
+    '''Return the default path of the upload journal of a space'''
+
+    cache_directory = os.environ.get(
+        'XDG_CACHE_HOME',
+        os.path.join(os.path.expanduser('~'), '.cache'),
+    )
+    return os.path.join(
+        cache_directory,
+        'git2sc',
+        '{}.journal'.format(space),
+    )
+
+
+class JournalMismatch(Exception):
+    '''The journal to resume belongs to the upload of another directory'''
+
+
+class Journal():
+    '''Write ahead journal of the pages of a directory_full_upload.
+
+    Before a page is created its path, title and source hash are written as
+    planned, and once it exists its path, page id and source hash are
+    written as done. If the upload stops, a resumed upload skips the done
+    paths and adopts the pages of the planned ones that were created but
+    didn't reach the journal, instead of creating them again with a
+    suffixed title.
+
+    The records are appended to a json lines file and fsynced in batches,
+    every sync_every records or sync_interval seconds, so the journal
+    doesn't slow down the upload. A crash can lose the last batch, which
+    is fine as the pages of the lost records are adopted when resuming.
+
+    Without resume an existing journal is discarded.
+    '''
+
+    def __init__(self, path, resume=False, sync_every=100, sync_interval=1):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.lock = threading.Lock()
+        self.source = None
+        self.planned = {}
+        self.completed = {}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if resume and os.path.exists(path):
+            self._load()
+            mode = 'a'
+        else:
+            mode = 'w'
+        self.file = open(path, mode)
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    @property
+    def resuming(self):
+        '''True if there are operations of a previous upload'''
+
+        return bool(self.planned or self.completed)
+
+    def _load(self):
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Line cut by the crash
+                    continue
+                if record['op'] == 'start':
+                    self.source = record
+                elif record['op'] == 'plan':
+                    self.planned[record['path']] = record
+                elif record['op'] == 'done':
+                    self.completed[record['path']] = record
+
+    def _write(self, record):
+        with self.lock:
+            self.file.write(json.dumps(record) + '\n')
+            self.pending += 1
+            if self.pending >= self.sync_every or \
+                    time.monotonic() - self.last_sync >= self.sync_interval:
+                self._sync()
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def start(self, directory, parent_id=None):
+        '''Record the upload the journal belongs to. Raises JournalMismatch
+        if the journal being resumed belongs to another upload'''
+
+        directory = os.path.abspath(directory)
+        if self.source is not None:
+            if self.source['directory'] != directory or \
+                    self.source['parent_id'] != parent_id:
+                raise JournalMismatch(
+                    'The journal {} belongs to the upload of {}'.format(
+                        self.path,
+                        self.source['directory'],
+                    )
+                )
+            return
+        self.source = {
+            'op': 'start',
+            'directory': directory,
+            'parent_id': parent_id,
+        }
+        self._write(self.source)
+
+    def plan(self, path, title, source_hash=None):
+        '''Record that the page of a path is going to be created'''
+
+        record = {
+            'op': 'plan',
+            'path': path,
+            'title': title,
+            'hash': source_hash,
+        }
+        self.planned[path] = record
+        self._write(record)
+
+    def done(self, path, page_id, source_hash=None):
+        '''Record that the page of a path exists'''
+
+        record = {
+            'op': 'done',
+            'path': path,
+            'page_id': page_id,
+            'hash': source_hash,
+        }
+        self.completed[path] = record
+        self._write(record)
+
+    def page_id(self, path):
+        '''Return the page id of a completed path or None'''
+
+        record = self.completed.get(path)
+        if record is None:
+            return None
+        return record['page_id']
+
+    def page_ids(self):
+        '''Return the ids of the pages of the completed paths'''
+
+        return {record['page_id'] for record in self.completed.values()}
+
+    def sync(self):
+        '''Write the pending records to disk'''
+
+        with self.lock:
+            if not self.file.closed:
+                self._sync()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self._sync()
+                self.file.close()
+
+    def remove(self):
+        '''Close and remove the journal of a finished upload'''
+
+        self.close()
+        os.remove(self.path)
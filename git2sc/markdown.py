@@ -0,0 +1,788 @@
+'''Markdown to confluence storage format renderer.
+
+It supports the common markdown syntax: ATX and setext headings,
+paragraphs, emphasis, strong emphasis, strikethrough, code spans, fenced and
+indented code blocks, block quotes, nested ordered and unordered lists,
+thematic breaks, inline and reference links and images, autolinks, hard line
+breaks and pipe tables.
+
+The code blocks are rendered as confluence code macros and the void tags
+are self closed, as the storage format is xhtml. Raw html and footnotes are
+not supported, render raises UnsupportedMarkdown so the file can be
+converted with pandoc instead.
+'''
+
+import re
+from html import unescape
+
+# Part of the key of the cached html, it has to change with the output of the
+# renderer
+VERSION = '1'
+
+# Languages of the confluence code macro and the markdown names of them
+CODE_LANGUAGES = {
+    'actionscript3': 'actionscript3',
+    'applescript': 'applescript',
+    'bash': 'bash',
+    'sh': 'bash',
+    'shell': 'bash',
+    'zsh': 'bash',
+    'console': 'bash',
+    'c#': 'c#',
+    'csharp': 'c#',
+    'c': 'cpp',
+    'cpp': 'cpp',
+    'c++': 'cpp',
+    'css': 'css',
+    'coldfusion': 'coldfusion',
+    'delphi': 'delphi',
+    'pascal': 'delphi',
+    'diff': 'diff',
+    'patch': 'diff',
+    'erlang': 'erl',
+    'erl': 'erl',
+    'groovy': 'groovy',
+    'html': 'xml',
+    'xml': 'xml',
+    'java': 'java',
+    'javafx': 'jfx',
+    'javascript': 'js',
+    'js': 'js',
+    'json': 'js',
+    'php': 'php',
+    'perl': 'perl',
+    'text': 'text',
+    'txt': 'text',
+    'powershell': 'powershell',
+    'ps1': 'powershell',
+    'python': 'py',
+    'py': 'py',
+    'ruby': 'ruby',
+    'rb': 'ruby',
+    'sql': 'sql',
+    'sass': 'sass',
+    'scss': 'sass',
+    'scala': 'scala',
+    'vb': 'vb',
+    'yaml': 'yml',
+    'yml': 'yml',
+}
+
+_BLANK = re.compile(r'^[ \t]*$')
+_ATX_HEADING = re.compile(
+    r'^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$'
+)
+_SETEXT_UNDERLINE = re.compile(r'^ {0,3}(=+|-+)[ \t]*$')
+_THEMATIC_BREAK = re.compile(r'^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+_FENCE = re.compile(r'^( {0,3})(`{3,}|~{3,})[ \t]*(.*?)[ \t]*$')
+_BLOCK_QUOTE = re.compile(r'^ {0,3}> ?(.*)$')
+_BULLET_ITEM = re.compile(r'^( {0,3})([-+*])([ \t]+|$)(.*)$')
+_ORDERED_ITEM = re.compile(r'^( {0,3})(\d{1,9})([.)])([ \t]+|$)(.*)$')
+_HTML_BLOCK = re.compile(r'^ {0,3}<(?:[A-Za-z][A-Za-z0-9-]*[\s/>]|'
+                         r'[A-Za-z][A-Za-z0-9-]*$|/[A-Za-z]|!--|\?|!\[CDATA)')
+_DEFINITION = re.compile(
+    r'^ {0,3}\[([^\]^][^\]]*)\]:[ \t]*<?([^\s>]+)>?'
+    r'(?:[ \t]+(?:"([^"]*)"|\'([^\']*)\'|\(([^)]*)\)))?[ \t]*$'
+)
+_FOOTNOTE = re.compile(r'^ {0,3}\[\^[^\]]+\]:')
+_TABLE_DELIMITER = re.compile(
+    r'^ {0,3}\|?[ \t]*:?-+:?[ \t]*(?:\|[ \t]*:?-+:?[ \t]*)*\|?[ \t]*$'
+)
+_TABLE_CELL_SEPARATOR = re.compile(r'(?<!\\)\|')
+
+_INLINE_SPECIAL = re.compile(r'[\\`!\[<\n]')
+_ESCAPABLE = '!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~'
+_AUTOLINK = re.compile(r'<([A-Za-z][A-Za-z0-9+.-]{1,31}:[^\s<>]*)>')
+_EMAIL_AUTOLINK = re.compile(r'<([^\s@<>\\]+@[^\s@<>\\]+\.[^\s@<>\\]+)>')
+_INLINE_HTML = re.compile(r'<(?:[A-Za-z][A-Za-z0-9-]*|/[A-Za-z]|!--|\?)')
+_FOOTNOTE_REFERENCE = re.compile(r'\[\^[^\]\s]+\]')
+_STRONG_EMPHASIS = re.compile(
+    r'\*\*\*(?=\S)(.+?)(?<=\S)\*\*\*|(?<!\w)___(?=\S)(.+?)(?<=\S)___(?!\w)',
+    re.DOTALL,
+)
+_STRONG = re.compile(
+    r'\*\*(?=\S)(.+?)(?<=\S)\*\*|(?<!\w)__(?=\S)(.+?)(?<=\S)__(?!\w)',
+    re.DOTALL,
+)
+_EMPHASIS = re.compile(
+    r'\*(?=\S)(.+?)(?<=\S)\*|(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)',
+    re.DOTALL,
+)
+_STRIKETHROUGH = re.compile(r'~~(?=\S)(.+?)(?<=\S)~~', re.DOTALL)
+_PLACEHOLDER = re.compile('\x00(\\d+)\x00')
+_TAGS = re.compile(r'<[^>]*>')
+
+
+class UnsupportedMarkdown(Exception):
+    '''The markdown uses syntax the renderer doesn't support'''
+
+
+def escape(text, quote=False):
+    '''Escape a text for xhtml, unlike html.escape it doesn't escape the
+    single quotes, as &#x27; is not valid in the storage format'''
+
+    text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    if quote:
+        text = text.replace('"', '&quot;')
+    return text
+
+
+def _expand_indentation(line):
+    '''Replace the tabs of the indentation of a line by spaces'''
+
+    if '\t' not in line:
+        return line
+    stripped = line.lstrip(' \t')
+    if '\t' not in line[:len(line) - len(stripped)]:
+        return line
+    return line[:len(line) - len(stripped)].expandtabs(4) + stripped
+
+
+def _indentation(line):
+    return len(line) - len(line.lstrip(' '))
+
+
+def _normalize_label(label):
+    return ' '.join(label.split()).lower()
+
+
+def _list_item(line):
+    '''Return the (kind, indentation, start, content) of a list item line or
+    None. The kind identifies the lists an item can belong to'''
+
+    match = _BULLET_ITEM.match(line)
+    if match is not None:
+        indent, marker, spacing, content = match.groups()
+        start = None
+    else:
+        match = _ORDERED_ITEM.match(line)
+        if match is None:
+            return None
+        indent, start, marker, spacing, content = match.groups()
+        start = int(start)
+    marker_width = len(indent) + len(match.group(2)) + \
+        (len(marker) if start is not None else 0)
+    if content == '':
+        content_indent = marker_width + 1
+    elif len(spacing) > 4:
+        # The content is an indented code block
+        content_indent = marker_width + 1
+        content = spacing[1:] + content
+    else:
+        content_indent = marker_width + len(spacing)
+    return marker, content_indent, start, content
+
+
+def _can_interrupt_paragraph(line):
+    if _ATX_HEADING.match(line) or _FENCE.match(line) or \
+            _THEMATIC_BREAK.match(line) or _BLOCK_QUOTE.match(line) or \
+            _HTML_BLOCK.match(line):
+        return True
+    item = _list_item(line)
+    if item is not None and item[3] != '' and item[2] in (None, 1):
+        return True
+    return False
+
+
+def _split_table_row(line):
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    return [
+        cell.strip().replace('\\|', '|')
+        for cell in _TABLE_CELL_SEPARATOR.split(line)
+    ]
+
+
+class _BlockParser():
+    '''Split the lines of a document in a tree of blocks'''
+
+    def __init__(self, definitions):
+        self.definitions = definitions
+
+    def parse(self, lines):
+        blocks = []
+        index = 0
+        while index < len(lines):
+            line = lines[index]
+            if _BLANK.match(line):
+                index += 1
+                continue
+
+            match = _ATX_HEADING.match(line)
+            if match is not None:
+                blocks.append(
+                    ('heading', len(match.group(1)), match.group(2) or ''),
+                )
+                index += 1
+                continue
+
+            match = _FENCE.match(line)
+            if match is not None and not (
+                match.group(2)[0] == '`' and '`' in match.group(3)
+            ):
+                index = self._parse_fenced_code(lines, index, match, blocks)
+                continue
+
+            if _THEMATIC_BREAK.match(line):
+                blocks.append(('thematic_break',))
+                index += 1
+                continue
+
+            if _indentation(line) >= 4:
+                index = self._parse_indented_code(lines, index, blocks)
+                continue
+
+            if _BLOCK_QUOTE.match(line):
+                index = self._parse_block_quote(lines, index, blocks)
+                continue
+
+            if _list_item(line) is not None:
+                index = self._parse_list(lines, index, blocks)
+                continue
+
+            if _HTML_BLOCK.match(line):
+                raise UnsupportedMarkdown('Raw html block: {}'.format(line))
+
+            if _FOOTNOTE.match(line):
+                raise UnsupportedMarkdown('Footnote: {}'.format(line))
+
+            match = _DEFINITION.match(line)
+            if match is not None:
+                label = _normalize_label(match.group(1))
+                title = match.group(3) or match.group(4) or match.group(5)
+                self.definitions.setdefault(label, (match.group(2), title))
+                index += 1
+                continue
+
+            if '|' in line and index + 1 < len(lines) and \
+                    _TABLE_DELIMITER.match(lines[index + 1]):
+                header = _split_table_row(line)
+                alignments = [
+                    self._alignment(cell)
+                    for cell in _split_table_row(lines[index + 1])
+                ]
+                if len(header) == len(alignments):
+                    index = self._parse_table(
+                        lines,
+                        index,
+                        header,
+                        alignments,
+                        blocks,
+                    )
+                    continue
+
+            index = self._parse_paragraph(lines, index, blocks)
+        return blocks
+
+    def _parse_fenced_code(self, lines, index, match, blocks):
+        indent = len(match.group(1))
+        fence = match.group(2)
+        information = unescape(match.group(3)).split()
+        code = []
+        index += 1
+        while index < len(lines):
+            line = lines[index]
+            stripped = line.strip()
+            if stripped.startswith(fence[0] * len(fence)) and \
+                    stripped.strip(fence[0]) == '' and \
+                    _indentation(line) < 4:
+                index += 1
+                break
+            code.append(line[min(indent, _indentation(line)):])
+            index += 1
+        language = information[0] if information else None
+        blocks.append(('code', language, '\n'.join(code)))
+        return index
+
+    def _parse_indented_code(self, lines, index, blocks):
+        code = []
+        while index < len(lines):
+            line = lines[index]
+            if _BLANK.match(line):
+                code.append(line[4:])
+            elif _indentation(line) >= 4:
+                code.append(line[4:])
+            else:
+                break
+            index += 1
+        while code and _BLANK.match(code[-1]):
+            code.pop()
+        blocks.append(('code', None, '\n'.join(code)))
+        return index
+
+    def _parse_block_quote(self, lines, index, blocks):
+        quoted = []
+        while index < len(lines):
+            line = lines[index]
+            match = _BLOCK_QUOTE.match(line)
+            if match is not None:
+                quoted.append(match.group(1))
+            elif quoted and not _BLANK.match(quoted[-1]) and \
+                    not _BLANK.match(line) and \
+                    not _can_interrupt_paragraph(line):
+                # Lazy continuation of a quoted paragraph
+                quoted.append(line)
+            else:
+                break
+            index += 1
+        blocks.append(('block_quote', self.parse(quoted)))
+        return index
+
+    def _parse_list(self, lines, index, blocks):
+        kind, _, start, _ = _list_item(lines[index])
+        items = []
+        loose = False
+        while index < len(lines):
+            item = _list_item(lines[index])
+            if item is None or item[0] != kind or \
+                    _THEMATIC_BREAK.match(lines[index]):
+                break
+            _, content_indent, _, content = item
+            item_lines = [content]
+            index += 1
+            while index < len(lines):
+                line = lines[index]
+                if _BLANK.match(line):
+                    item_lines.append('')
+                elif _indentation(line) >= content_indent:
+                    item_lines.append(line[content_indent:])
+                elif not _BLANK.match(item_lines[-1]) and \
+                        _list_item(line) is None and \
+                        not _can_interrupt_paragraph(line):
+                    # Lazy continuation of the paragraph of the item
+                    item_lines.append(line.lstrip())
+                else:
+                    break
+                index += 1
+            trailing_blank_lines = 0
+            while item_lines and _BLANK.match(item_lines[-1]):
+                item_lines.pop()
+                trailing_blank_lines += 1
+            children = self.parse(item_lines)
+            if trailing_blank_lines > 0 and index < len(lines) and \
+                    _list_item(lines[index]) is not None and \
+                    _list_item(lines[index])[0] == kind:
+                loose = True
+            if len(children) > 1 and any(
+                _BLANK.match(line) for line in item_lines
+            ) and not all(child[0] == 'code' for child in children):
+                loose = True
+            items.append(children)
+            if trailing_blank_lines > 0 and (
+                index >= len(lines) or
+                _list_item(lines[index]) is None or
+                _list_item(lines[index])[0] != kind
+            ):
+                break
+        blocks.append(('list', start, loose, items))
+        return index
+
+    def _alignment(self, cell):
+        if cell.startswith(':') and cell.endswith(':'):
+            return 'center'
+        if cell.endswith(':'):
+            return 'right'
+        if cell.startswith(':'):
+            return 'left'
+        return None
+
+    def _parse_table(self, lines, index, header, alignments, blocks):
+        rows = []
+        index += 2
+        while index < len(lines):
+            line = lines[index]
+            if _BLANK.match(line) or '|' not in line or \
+                    _can_interrupt_paragraph(line):
+                break
+            cells = _split_table_row(line)
+            cells = (cells + [''] * len(header))[:len(header)]
+            rows.append(cells)
+            index += 1
+        blocks.append(('table', alignments, header, rows))
+        return index
+
+    def _parse_paragraph(self, lines, index, blocks):
+        paragraph = [lines[index].lstrip()]
+        index += 1
+        while index < len(lines):
+            line = lines[index]
+            if _BLANK.match(line):
+                break
+            match = _SETEXT_UNDERLINE.match(line)
+            if match is not None:
+                level = 1 if match.group(1)[0] == '=' else 2
+                blocks.append(
+                    ('heading', level, '\n'.join(paragraph).rstrip()),
+                )
+                return index + 1
+            if _can_interrupt_paragraph(line):
+                break
+            paragraph.append(line.lstrip())
+            index += 1
+        blocks.append(('paragraph', '\n'.join(paragraph).rstrip()))
+        return index
+
+
+class _InlineRenderer():
+    '''Render the inline markdown of a block'''
+
+    def __init__(self, definitions):
+        self.definitions = definitions
+
+    def render(self, text):
+        if _FOOTNOTE_REFERENCE.search(text):
+            raise UnsupportedMarkdown('Footnote reference: {}'.format(text))
+
+        rendered = []
+        stash = []
+
+        def placeholder(html):
+            stash.append(html)
+            return '\x00{}\x00'.format(len(stash) - 1)
+
+        def add_text(chunk):
+            if '&' in chunk:
+                chunk = unescape(chunk)
+            rendered.append(escape(chunk))
+
+        position = 0
+        length = len(text)
+        while position < length:
+            match = _INLINE_SPECIAL.search(text, position)
+            if match is None:
+                add_text(text[position:])
+                break
+            special = match.start()
+            add_text(text[position:special])
+            character = text[special]
+            position = special + 1
+
+            if character == '\\':
+                if position < length and text[position] in _ESCAPABLE:
+                    rendered.append(placeholder(escape(text[position])))
+                    position += 1
+                elif position < length and text[position] == '\n':
+                    rendered.append(placeholder('<br />'))
+                    position += 1
+                else:
+                    rendered.append('\\')
+
+            elif character == '`':
+                end = special
+                while end < length and text[end] == '`':
+                    end += 1
+                run = text[special:end]
+                closing = re.compile(
+                    r'(?<!`){}(?!`)'.format(re.escape(run)),
+                ).search(text, end)
+                if closing is None:
+                    rendered.append(escape(run))
+                    position = end
+                    continue
+                code = text[end:closing.start()].replace('\n', ' ')
+                if code.startswith(' ') and code.endswith(' ') and \
+                        code.strip(' ') != '':
+                    code = code[1:-1]
+                rendered.append(
+                    placeholder('<code>{}</code>'.format(escape(code))),
+                )
+                position = closing.end()
+
+            elif character == '!':
+                if position < length and text[position] == '[':
+                    link = self._link(text, position)
+                    if link is not None:
+                        label, url, title, position = link
+                        rendered.append(placeholder(self._image(
+                            label,
+                            url,
+                            title,
+                        )))
+                        continue
+                rendered.append('!')
+
+            elif character == '[':
+                link = self._link(text, special)
+                if link is None:
+                    rendered.append('[')
+                    continue
+                label, url, title, position = link
+                attributes = ' href="{}"'.format(escape(url, True))
+                if title is not None:
+                    attributes += ' title="{}"'.format(escape(title, True))
+                rendered.append(placeholder('<a{}>{}</a>'.format(
+                    attributes,
+                    self.render(label),
+                )))
+
+            elif character == '<':
+                match = _AUTOLINK.match(text, special) or \
+                    _EMAIL_AUTOLINK.match(text, special)
+                if match is not None:
+                    url = match.group(1)
+                    href = url if match.re is _AUTOLINK else 'mailto:' + url
+                    rendered.append(placeholder('<a href="{}">{}</a>'.format(
+                        escape(href, True),
+                        escape(url),
+                    )))
+                    position = match.end()
+                elif _INLINE_HTML.match(text, special):
+                    raise UnsupportedMarkdown('Raw html: {}'.format(text))
+                else:
+                    rendered.append('&lt;')
+
+            elif character == '\n':
+                previous = rendered[-1] if rendered else ''
+                if previous.endswith('  '):
+                    rendered[-1] = previous.rstrip(' ')
+                    rendered.append(placeholder('<br />'))
+                else:
+                    if rendered:
+                        rendered[-1] = previous.rstrip(' ')
+                    rendered.append('\n')
+
+        html = ''.join(rendered)
+        if '*' in html or '_' in html:
+            html = self._emphasis(html)
+        if '~~' in html:
+            html = _STRIKETHROUGH.sub(r'<del>\1</del>', html)
+        if not stash:
+            return html
+        return _PLACEHOLDER.sub(
+            lambda match: stash[int(match.group(1))],
+            html,
+        )
+
+    def _emphasis(self, html):
+        html = _STRONG_EMPHASIS.sub(
+            lambda match: '<strong><em>{}</em></strong>'.format(
+                match.group(1) or match.group(2),
+            ),
+            html,
+        )
+        html = _STRONG.sub(
+            lambda match: '<strong>{}</strong>'.format(
+                match.group(1) or match.group(2),
+            ),
+            html,
+        )
+        return _EMPHASIS.sub(
+            lambda match: '<em>{}</em>'.format(
+                match.group(1) or match.group(2),
+            ),
+            html,
+        )
+
+    def _closing_bracket(self, text, position):
+        '''Return the position of the bracket that closes the one at
+        position or None'''
+
+        depth = 0
+        index = position
+        while index < len(text):
+            character = text[index]
+            if character == '\\':
+                index += 2
+                continue
+            if character == '[':
+                depth += 1
+            elif character == ']':
+                depth -= 1
+                if depth == 0:
+                    return index
+            index += 1
+        return None
+
+    def _destination(self, text, position):
+        '''Parse the (url "title") of an inline link starting at the
+        parenthesis and return (url, title, end) or None'''
+
+        length = len(text)
+        index = position + 1
+        while index < length and text[index] in ' \t\n':
+            index += 1
+        if index < length and text[index] == '<':
+            end = text.find('>', index)
+            if end == -1:
+                return None
+            url = text[index + 1:end]
+            index = end + 1
+        else:
+            start = index
+            depth = 0
+            while index < length:
+                character = text[index]
+                if character == '\\' and index + 1 < length:
+                    index += 2
+                    continue
+                if character in ' \t\n':
+                    break
+                if character == '(':
+                    depth += 1
+                elif character == ')':
+                    if depth == 0:
+                        break
+                    depth -= 1
+                index += 1
+            url = text[start:index]
+        while index < length and text[index] in ' \t\n':
+            index += 1
+        title = None
+        if index < length and text[index] in '"\'(':
+            closing = ')' if text[index] == '(' else text[index]
+            end = text.find(closing, index + 1)
+            if end == -1:
+                return None
+            title = text[index + 1:end]
+            index = end + 1
+            while index < length and text[index] in ' \t\n':
+                index += 1
+        if index >= length or text[index] != ')':
+            return None
+        return url, title, index + 1
+
+    def _link(self, text, position):
+        '''Parse the link whose text starts at the bracket in position and
+        return (text, url, title, end) or None'''
+
+        closing = self._closing_bracket(text, position)
+        if closing is None:
+            return None
+        label = text[position + 1:closing]
+        end = closing + 1
+        if end < len(text) and text[end] == '(':
+            destination = self._destination(text, end)
+            if destination is not None:
+                url, title, end = destination
+                return (
+                    label,
+                    self._unescape(url),
+                    None if title is None else self._unescape(title),
+                    end,
+                )
+        reference = label
+        if end < len(text) and text[end] == '[':
+            reference_end = text.find(']', end)
+            if reference_end != -1:
+                if reference_end > end + 1:
+                    reference = text[end + 1:reference_end]
+                end = reference_end + 1
+        definition = self.definitions.get(_normalize_label(reference))
+        if definition is None:
+            return None
+        url, title = definition
+        return label, self._unescape(url), title, end
+
+    def _unescape(self, text):
+        return unescape(re.sub(
+            r'\\([{}])'.format(re.escape(_ESCAPABLE)),
+            r'\1',
+            text,
+        ))
+
+    def _image(self, label, url, title):
+        alternative = _TAGS.sub('', self.render(label))
+        attributes = ''
+        if alternative != '':
+            attributes += ' ac:alt="{}"'.format(
+                escape(unescape(alternative), True),
+            )
+        if title is not None:
+            attributes += ' ac:title="{}"'.format(escape(title, True))
+        return '<ac:image{}><ri:url ri:value="{}" /></ac:image>'.format(
+            attributes,
+            escape(url, True),
+        )
+
+
+def _code_macro(language, code):
+    parameter = ''
+    language = CODE_LANGUAGES.get((language or '').lower())
+    if language is not None:
+        parameter = '<ac:parameter ac:name="language">{}'\
+            '</ac:parameter>'.format(language)
+    return '<ac:structured-macro ac:name="code">{}<ac:plain-text-body>'\
+        '<![CDATA[{}]]></ac:plain-text-body></ac:structured-macro>'.format(
+            parameter,
+            code.replace(']]>', ']]]]><![CDATA[>'),
+        )
+
+
+def _render_blocks(blocks, inline, tight=False):
+    rendered = []
+    for block in blocks:
+        kind = block[0]
+        if kind == 'heading':
+            rendered.append('<h{0}>{1}</h{0}>'.format(
+                block[1],
+                inline.render(block[2]),
+            ))
+        elif kind == 'paragraph':
+            if tight:
+                rendered.append(inline.render(block[1]))
+            else:
+                rendered.append('<p>{}</p>'.format(inline.render(block[1])))
+        elif kind == 'code':
+            rendered.append(_code_macro(block[1], block[2]))
+        elif kind == 'thematic_break':
+            rendered.append('<hr />')
+        elif kind == 'block_quote':
+            rendered.append('<blockquote>{}</blockquote>'.format(
+                _render_blocks(block[1], inline),
+            ))
+        elif kind == 'list':
+            start, loose, items = block[1:]
+            if start is None:
+                tag = 'ul'
+                attributes = ''
+            else:
+                tag = 'ol'
+                attributes = '' if start == 1 else ' start="{}"'.format(start)
+            rendered.append('<{0}{1}>{2}</{0}>'.format(
+                tag,
+                attributes,
+                ''.join(
+                    '<li>{}</li>'.format(
+                        _render_blocks(item, inline, tight=not loose),
+                    )
+                    for item in items
+                ),
+            ))
+        elif kind == 'table':
+            alignments, header, rows = block[1:]
+
+            def cells(tag, row):
+                return ''.join(
+                    '<{0}{1}>{2}</{0}>'.format(
+                        tag,
+                        '' if alignment is None else
+                        ' style="text-align: {};"'.format(alignment),
+                        inline.render(cell),
+                    )
+                    for alignment, cell in zip(alignments, row)
+                )
+
+            rendered.append('<table><tbody>{}</tbody></table>'.format(
+                ''.join(
+                    '<tr>{}</tr>'.format(cells(tag, row))
+                    for tag, row in [('th', header)] +
+                    [('td', row) for row in rows]
+                ),
+            ))
+    return '\n'.join(rendered)
+
+
+def render(text):
+    '''Render a markdown document as confluence storage format. Raises
+    UnsupportedMarkdown if it uses syntax the renderer doesn't support'''
+
+    lines = [
+        _expand_indentation(line)
+        for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    ]
+    definitions = {}
+    blocks = _BlockParser(definitions).parse(lines)
+    return _render_blocks(blocks, _InlineRenderer(definitions))
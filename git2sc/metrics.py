@@ -0,0 +1,205 @@
+import os
+import time
+import requests
+from urllib.parse import quote
+
+# Upper bounds in seconds of the buckets of the request latency histogram
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Content type of the pushed metrics. The text has no counters, so it's valid
+# both as OpenMetrics and as the text format of Prometheus that the
+# Pushgateway parses
+PUSH_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class PushError(Exception):
+    '''The metrics couldn't be pushed to the Pushgateway'''
+
+
+def _escape(value):
+    '''Escape a label value'''
+
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')\
+        .replace('\n', '\\n')
+
+
+def _number(value):
+    '''Format a sample value'''
+
+    if isinstance(value, float) and value == float('inf'):
+        return '+Inf'
+    return repr(value)
+
+
+class MetricsText():
+    '''Builder of the OpenMetrics text of the metrics of a run, with a space
+    label in all the samples'''
+
+    def __init__(self, space):
+        self.space = space
+        self.lines = []
+
+    def family(self, name, kind, description):
+        '''Start a metric family of a type'''
+
+        self.lines.append('# HELP {} {}'.format(name, description))
+        self.lines.append('# TYPE {} {}'.format(name, kind))
+
+    def sample(self, name, value, **labels):
+        '''Add a sample of the current metric family'''
+
+        labels = [('space', self.space)] + sorted(labels.items())
+        self.lines.append('{}{{{}}} {}'.format(
+            name,
+            ','.join(
+                '{}="{}"'.format(label, _escape(label_value))
+                for label, label_value in labels
+            ),
+            _number(value),
+        ))
+
+    def histogram(self, name, values, buckets=LATENCY_BUCKETS, **labels):
+        '''Add the cumulative buckets, sum and count of some values'''
+
+        for bucket in tuple(buckets) + (float('inf'),):
+            self.sample(
+                name + '_bucket',
+                len([value for value in values if value <= bucket]),
+                le=_number(float(bucket)),
+                **labels
+            )
+        self.sample(name + '_sum', float(sum(values)), **labels)
+        self.sample(name + '_count', len(values), **labels)
+
+    def text(self):
+        '''Return the text of the metrics'''
+
+        return '\n'.join(self.lines + ['# EOF']) + '\n'
+
+
+def openmetrics(g, now=None):
+    '''Return the metrics of the run of a Git2SC object as OpenMetrics text.
+
+    They are gauges with the values of the run, so each run replaces the
+    values of the previous one of the same space.'''
+
+    if now is None:
+        now = time.time()
+    report = g.report.to_dict()
+    metrics = MetricsText(g.space)
+
+    metrics.family(
+        'git2sc_pages',
+        'gauge',
+        'Pages of the space processed by the run by operation',
+    )
+    for operation in ('created', 'updated', 'skipped', 'deleted'):
+        metrics.sample(
+            'git2sc_pages',
+            g.stats[operation],
+            operation=operation,
+        )
+
+    metrics.family(
+        'git2sc_conversion_failures',
+        'gauge',
+        'Files that failed to convert',
+    )
+    metrics.sample('git2sc_conversion_failures', g.stats['failed'])
+
+    metrics.family(
+        'git2sc_conversion_seconds',
+        'gauge',
+        'Seconds spent converting files by converter',
+    )
+    for converter, timings in report['converters'].items():
+        metrics.sample(
+            'git2sc_conversion_seconds',
+            float(timings['seconds']),
+            converter=converter,
+        )
+    metrics.family(
+        'git2sc_conversions',
+        'gauge',
+        'Files converted by converter',
+    )
+    for converter, timings in report['converters'].items():
+        metrics.sample(
+            'git2sc_conversions',
+            timings['files'],
+            converter=converter,
+        )
+
+    metrics.family(
+        'git2sc_http_request_duration_seconds',
+        'histogram',
+        'Latency of the requests to confluence by endpoint',
+    )
+    for name, latencies in sorted(g.report.latencies().items()):
+        metrics.histogram(
+            'git2sc_http_request_duration_seconds',
+            latencies,
+            endpoint=name,
+        )
+    metrics.family(
+        'git2sc_http_responses',
+        'gauge',
+        'Responses of confluence by status code',
+    )
+    for status, count in sorted(g.report.statuses.items()):
+        metrics.sample('git2sc_http_responses', count, code=status)
+    metrics.family(
+        'git2sc_throttled_requests',
+        'gauge',
+        'Requests throttled by confluence (429 or 503) and retried',
+    )
+    metrics.sample('git2sc_throttled_requests', g.throttle.throttled)
+
+    metrics.family(
+        'git2sc_run_duration_seconds',
+        'gauge',
+        'Wall time of the run',
+    )
+    metrics.sample('git2sc_run_duration_seconds', float(report['seconds']))
+    metrics.family(
+        'git2sc_last_run_timestamp_seconds',
+        'gauge',
+        'Unix time when the run finished',
+    )
+    metrics.sample('git2sc_last_run_timestamp_seconds', float(now))
+    return metrics.text()
+
+
+def write_textfile(path, text):
+    '''Write metrics for the textfile collector of the node exporter. The
+    file is replaced atomically, so the collector never reads it half
+    written'''
+
+    temporary_path = '{}.{}'.format(path, os.getpid())
+    with open(temporary_path, 'w') as f:
+        f.write(text)
+    os.replace(temporary_path, path)
+
+
+def push(url, space, text, job='git2sc', timeout=10):
+    '''Push metrics to a Pushgateway, replacing the ones of the previous run
+    of the space. Raises PushError if they can't be pushed'''
+
+    url = '{}/metrics/job/{}/space/{}'.format(
+        url.rstrip('/'),
+        quote(job, safe=''),
+        quote(space, safe=''),
+    )
+    try:
+        r = requests.put(
+            url,
+            data=text.encode(),
+            headers={'Content-Type': PUSH_CONTENT_TYPE},
+            timeout=timeout,
+        )
+        r.raise_for_status()
+    except requests.exceptions.RequestException as error:
+        raise PushError('Error pushing the metrics to {}: {}'.format(
+            url,
+            error,
+        ))
@@ -0,0 +1,322 @@
+import os
+import json
+from collections import Counter
+from concurrent.futures import Future
+from git2sc.content import content_hash
+from git2sc.convert import NOT_CONVERTED
+from git2sc.scheduler import is_future
+
+PLAN_FORMAT = 1
+
+OPERATIONS = ('create', 'update', 'move', 'delete', 'skip')
+
+# Requests that each operation sends when the plan is applied
+OPERATION_REQUESTS = {
+    'create': 1,
+    'update': 1,
+    'move': 1,
+    'delete': 1,
+    'skip': 0,
+}
+
+
+class StalePlan(Exception):
+    '''The pages of the plan changed since it was made'''
+
+
+class SyncPlan():
+    '''Operations that a sync of a directory does on a space: create,
+    update, move, delete and skip pages.
+
+    The operations that write a page carry its converted html, so applying
+    the plan doesn't read nor convert the files again. The pages that are
+    going to be created are referenced by the other operations with the
+    ref of their create operation, @ followed by its position.
+    '''
+
+    def __init__(self, space, directory, parent_id=None, operations=None):
+        self.space = space
+        self.directory = directory
+        self.parent_id = parent_id
+        self.operations = operations or []
+
+    def add(self, op, **fields):
+        '''Add an operation and return its ref'''
+
+        ref = '@{}'.format(len(self.operations))
+        operation = {'op': op, 'ref': ref}
+        operation.update(fields)
+        self.operations.append(operation)
+        return ref
+
+    def estimates(self):
+        '''Return the number of operations of each kind and the requests and
+        bytes of html that applying the plan sends'''
+
+        operations = Counter({op: 0 for op in OPERATIONS})
+        requests = 0
+        size = 0
+        for operation in self.operations:
+            operations[operation['op']] += 1
+            requests += OPERATION_REQUESTS[operation['op']]
+            if 'html' in operation:
+                size += len(operation['html'].encode())
+        return {
+            'operations': dict(operations),
+            'requests': requests,
+            'bytes': size,
+        }
+
+    def summary(self):
+        '''Return a line with the operations and the estimated requests and
+        bytes of the plan'''
+
+        estimates = self.estimates()
+        return '{operations}. Estimated {requests} requests and {size:.1f} '\
+            'KB of html'.format(
+                operations=', '.join(
+                    '{} {}'.format(estimates['operations'][op], op)
+                    for op in OPERATIONS
+                ),
+                requests=estimates['requests'],
+                size=estimates['bytes'] / 1024,
+            )
+
+    def check(self, pages):
+        '''Raise StalePlan if a page that the plan changes was edited or
+        removed since the plan was made, or if the page below which the
+        directory is synced was removed'''
+
+        if self.parent_id is not None and self.parent_id not in pages:
+            raise StalePlan(
+                'The parent page {} was removed'.format(self.parent_id)
+            )
+        for operation in self.operations:
+            if 'version' not in operation:
+                continue
+            page = pages.get(operation['page_id'])
+            if page is None:
+                raise StalePlan(
+                    'The page {} was removed'.format(operation['page_id'])
+                )
+            try:
+                version = int(page['version']['number'])
+            except (KeyError, TypeError):
+                version = None
+            if version != operation['version']:
+                raise StalePlan(
+                    'The page {} changed to version {}'.format(
+                        operation['page_id'],
+                        version,
+                    )
+                )
+
+    def to_dict(self):
+        return {
+            'format': PLAN_FORMAT,
+            'space': self.space,
+            'directory': self.directory,
+            'parent_id': self.parent_id,
+            'estimates': self.estimates(),
+            'operations': self.operations,
+        }
+
+    def save(self, path):
+        '''Write the plan to a json file'''
+
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        '''Read a plan from a json file'''
+
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get('format') != PLAN_FORMAT:
+            raise ValueError('Unknown plan format {}'.format(
+                data.get('format'),
+            ))
+        return cls(
+            data['space'],
+            data['directory'],
+            data['parent_id'],
+            data['operations'],
+        )
+
+
+class PlanningScheduler():
+    '''Scheduler that, instead of running the tasks of a sync, gives them to
+    the methods of a Planner with the same name.
+
+    The tasks are planned in join, in the order they were submitted, once
+    the conversions they depend on have finished, so the files are still
+    converted in parallel.
+    '''
+
+    def __init__(self, planner):
+        self.planner = planner
+        self.tasks = []
+
+    def submit(self, function, *arguments):
+        future = Future()
+        self.tasks.append((function.__name__, arguments, future))
+        return future
+
+    def join(self):
+        for name, arguments, future in self.tasks:
+            arguments = [
+                argument.result() if is_future(argument) else argument
+                for argument in arguments
+            ]
+            future.set_result(getattr(self.planner, name)(*arguments))
+
+
+class Planner():
+    '''Stands in for the tasks that Git2SC._schedule_update submits, adding
+    to a SyncPlan the operation each of them would do. Where a task would
+    return the id of a created page it returns the ref of its create
+    operation'''
+
+    def __init__(self, git2sc, plan):
+        self.git2sc = git2sc
+        self.plan = plan
+        # Operation of each page, to attach the path of the directories
+        self.operations = {}
+
+    def _version(self, pageid):
+        return self.git2sc._page_version(pageid)
+
+    def _write(self, pageid, html, path=None, source_hash=None,
+               parent_id=None, kind='file'):
+        '''Plan the update, move or skip of an existing page'''
+
+        if self.git2sc._is_moved(pageid, parent_id):
+            op = 'move'
+        elif self.git2sc._is_unchanged(pageid, html) or \
+                self.git2sc._state_is_current(
+                    path,
+                    rendered_hash=content_hash(str(html)),
+                ):
+            self.plan.add(
+                'skip',
+                kind=kind,
+                page_id=pageid,
+                path=path,
+            )
+            self.operations[pageid] = self.plan.operations[-1]
+            return pageid
+        else:
+            op = 'update'
+        fields = {
+            'kind': kind,
+            'page_id': pageid,
+            'title': self.git2sc.pages[pageid].get('title'),
+            'version': self._version(pageid),
+            'path': path,
+            'source_hash': source_hash,
+            'html': str(html),
+        }
+        if op == 'move':
+            fields['parent'] = parent_id
+        self.plan.add(op, **fields)
+        self.operations[pageid] = self.plan.operations[-1]
+        return pageid
+
+    def _create(self, title, html, parent_id, path=None, source_hash=None,
+                kind='file'):
+        ref = self.plan.add(
+            'create',
+            kind=kind,
+            title=title,
+            parent=parent_id,
+            path=path,
+            source_hash=source_hash,
+            html=str(html),
+        )
+        self.operations[ref] = self.plan.operations[-1]
+        return ref
+
+    def _readme(self, directory_path, html=NOT_CONVERTED):
+        return self.git2sc._readme_html(directory_path, html)
+
+    def _process_mainpage(
+        self,
+        directory_path,
+        html=NOT_CONVERTED,
+        relative_path=None,
+    ):
+        return self._write(
+            self.git2sc.get_space_homepage(),
+            self._readme(directory_path, html),
+            path=relative_path,
+            kind='directory',
+        )
+
+    def _create_directory_readme(
+        self,
+        directory_path,
+        parent_id=None,
+        html=NOT_CONVERTED,
+    ):
+        return self._create(
+            os.path.basename(directory_path),
+            self._readme(directory_path, html),
+            parent_id,
+            kind='directory',
+        )
+
+    def _update_directory_readme(
+        self,
+        directory_path,
+        html=NOT_CONVERTED,
+        relative_path=None,
+    ):
+        return self._write(
+            self.git2sc._get_article_id(os.path.basename(directory_path)),
+            self._readme(directory_path, html),
+            path=relative_path,
+            kind='directory',
+        )
+
+    def _record_directory_state(self, relative_path, article_id, html=None):
+        operation = self.operations.get(article_id)
+        if operation is not None:
+            operation['path'] = relative_path
+        return article_id
+
+    def _create_file_page(
+        self,
+        relative_path,
+        source_hash,
+        filename,
+        html,
+        parent_id,
+    ):
+        if html is None:
+            return None
+        return self._create(
+            filename,
+            html,
+            parent_id,
+            relative_path,
+            source_hash,
+        )
+
+    def _update_file_page(
+        self,
+        relative_path,
+        source_hash,
+        article_id,
+        html,
+        parent_id=None,
+    ):
+        if html is None:
+            return article_id
+        return self._write(
+            article_id,
+            html,
+            relative_path,
+            source_hash,
+            parent_id,
+        )
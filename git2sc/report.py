@@ -0,0 +1,277 @@
+import json
+import math
+import time
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+# Percentiles of the latencies reported for each converter and endpoint
+PERCENTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+
+
+def percentile(values, fraction):
+    '''Return the nearest-rank percentile of a list of values, or None if
+    it's empty'''
+
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(int(math.ceil(fraction * len(ordered))) - 1, 0)
+    return ordered[index]
+
+
+def endpoint(method, path):
+    '''Return the name of the endpoint of a request to a path of the api,
+    replacing the page ids and the space key by placeholders so the requests
+    to different pages are grouped'''
+
+    parts = []
+    for part in path.split('?')[0].strip('/').split('/'):
+        if parts and parts[-1] == 'space':
+            part = '{space}'
+        elif part.isdigit():
+            part = '{id}'
+        parts.append(part)
+    return '{} /{}'.format(method, '/'.join(parts))
+
+
+def _size(body):
+    '''Return the bytes of a request or response body'''
+
+    if isinstance(body, str):
+        return len(body.encode())
+    if isinstance(body, bytes):
+        return len(body)
+    return 0
+
+
+def _latencies(seconds):
+    '''Return the total, the percentiles and the maximum of some timings'''
+
+    latencies = OrderedDict([('seconds', sum(seconds))])
+    for name, fraction in PERCENTILES:
+        latencies[name] = percentile(seconds, fraction)
+    latencies['max'] = max(seconds) if seconds else None
+    return latencies
+
+
+def _slowest(timings, slowest):
+    '''Return the slowest items of a dictionary of timings'''
+
+    return sorted(timings.items(), key=lambda item: -item[1])[:slowest]
+
+
+class RunReport():
+    '''Timings and request accounting of a run of git2sc: the wall time of
+    each phase, the time of each converter and file, the requests, latency
+    and bytes of each endpoint and the time to write each page. It's shared
+    by all the threads of the run.
+
+    The phases can overlap, the scan of the directory happens while the
+    pages are published.
+    '''
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.start = clock()
+        self.phases = OrderedDict()
+        # Conversion seconds by converter and by file
+        self.conversions = {}
+        self.files = {}
+        # Latencies and bytes sent and received by endpoint
+        self.requests = {}
+        # Number of responses by status code
+        self.statuses = Counter()
+        # Seconds to create, update or delete each page by title
+        self.pages = {}
+        self.lock = threading.Lock()
+
+    def add_phase(self, name, seconds):
+        '''Add seconds to the wall time of a phase'''
+
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        '''Time the block as part of a phase'''
+
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.add_phase(name, self.clock() - start)
+
+    def iterate(self, name, iterable):
+        '''Yield the items of an iterable adding the time it takes to produce
+        them to a phase, without the time the consumer takes'''
+
+        iterator = iter(iterable)
+        while True:
+            start = self.clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add_phase(name, self.clock() - start)
+            yield item
+
+    def conversion(self, converter, file_path, seconds):
+        '''Record the conversion of a file'''
+
+        with self.lock:
+            self.conversions.setdefault(converter, []).append(seconds)
+            self.files[file_path] = self.files.get(file_path, 0) + seconds
+
+    def request(
+        self,
+        method,
+        path,
+        seconds,
+        sent=None,
+        received=None,
+        status=None,
+    ):
+        '''Record a request to a path of the api with the bodies sent and
+        received and the status code of the response'''
+
+        name = endpoint(method, path)
+        with self.lock:
+            if status is not None:
+                self.statuses[status] += 1
+            record = self.requests.setdefault(name, {
+                'latencies': [],
+                'sent': 0,
+                'received': 0,
+            })
+            record['latencies'].append(seconds)
+            record['sent'] += _size(sent)
+            record['received'] += _size(received)
+
+    def latencies(self):
+        '''Return the latencies of the requests by endpoint'''
+
+        with self.lock:
+            return {
+                name: list(record['latencies'])
+                for name, record in self.requests.items()
+            }
+
+    @contextmanager
+    def page(self, title):
+        '''Time the block as the creation, update or deletion of a page'''
+
+        start = self.clock()
+        try:
+            yield
+        finally:
+            seconds = self.clock() - start
+            with self.lock:
+                self.pages[title] = self.pages.get(title, 0) + seconds
+
+    def to_dict(self, slowest=10):
+        '''Return the report as a dictionary that can be dumped to json, with
+        the slowest files and pages'''
+
+        with self.lock:
+            converters = OrderedDict()
+            for name in sorted(self.conversions):
+                converters[name] = _latencies(self.conversions[name])
+                converters[name]['files'] = len(self.conversions[name])
+            endpoints = OrderedDict()
+            for name in sorted(self.requests):
+                record = self.requests[name]
+                endpoints[name] = _latencies(record['latencies'])
+                endpoints[name]['requests'] = len(record['latencies'])
+                endpoints[name]['sent'] = record['sent']
+                endpoints[name]['received'] = record['received']
+            return OrderedDict([
+                ('seconds', self.clock() - self.start),
+                ('phases', OrderedDict(self.phases)),
+                ('converters', converters),
+                ('endpoints', endpoints),
+                ('requests', sum(
+                    record['requests'] for record in endpoints.values()
+                )),
+                ('sent', sum(
+                    record['sent'] for record in endpoints.values()
+                )),
+                ('received', sum(
+                    record['received'] for record in endpoints.values()
+                )),
+                ('slowest_files', [
+                    {'path': path, 'seconds': seconds}
+                    for path, seconds in _slowest(self.files, slowest)
+                ]),
+                ('slowest_pages', [
+                    {'title': title, 'seconds': seconds}
+                    for title, seconds in _slowest(self.pages, slowest)
+                ]),
+            ])
+
+    def format(self, slowest=10):
+        '''Return the report as text'''
+
+        report = self.to_dict(slowest)
+        lines = ['Run took {:.2f}s'.format(report['seconds'])]
+        if report['phases']:
+            lines.append('Phases:')
+            for name, seconds in report['phases'].items():
+                lines.append('  {:<12} {:>9.2f}s'.format(name, seconds))
+        if report['converters']:
+            lines.append('Converters:')
+            for name, converter in report['converters'].items():
+                lines.append(
+                    '  {:<16} {:>6} files {:>9.2f}s  p50 {:.3f}s  '
+                    'p90 {:.3f}s  p99 {:.3f}s  max {:.3f}s'.format(
+                        name,
+                        converter['files'],
+                        converter['seconds'],
+                        converter['p50'],
+                        converter['p90'],
+                        converter['p99'],
+                        converter['max'],
+                    )
+                )
+        lines.append('Requests: {} sent {} bytes and received {} '
+                     'bytes'.format(
+                         report['requests'],
+                         report['sent'],
+                         report['received'],
+                     ))
+        for name, requests in report['endpoints'].items():
+            lines.append(
+                '  {:<32} {:>6}  p50 {:.3f}s  p90 {:.3f}s  p99 {:.3f}s  '
+                'max {:.3f}s  sent {} B  received {} B'.format(
+                    name,
+                    requests['requests'],
+                    requests['p50'],
+                    requests['p90'],
+                    requests['p99'],
+                    requests['max'],
+                    requests['sent'],
+                    requests['received'],
+                )
+            )
+        if report['slowest_files']:
+            lines.append('Slowest files:')
+            for item in report['slowest_files']:
+                lines.append('  {:>9.3f}s {}'.format(
+                    item['seconds'],
+                    item['path'],
+                ))
+        if report['slowest_pages']:
+            lines.append('Slowest pages:')
+            for item in report['slowest_pages']:
+                lines.append('  {:>9.3f}s {}'.format(
+                    item['seconds'],
+                    item['title'],
+                ))
+        return '\n'.join(lines)
+
+    def save(self, path, slowest=10):
+        '''Write the report to a json file'''
+
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(slowest), f, indent=2)
@@ -0,0 +1,259 @@
+import os
+import re
+from git2sc import git
+
+
+def translate(pattern):
+    '''Translate a gitignore glob into a regular expression. * and ? don't
+    match /, and ** matches any number of directories'''
+
+    index = 0
+    parts = []
+    while index < len(pattern):
+        character = pattern[index]
+        if character == '*':
+            if pattern[index:index + 3] == '**/':
+                parts.append('(?:.*/)?')
+                index += 3
+                continue
+            if pattern[index:index + 2] == '**':
+                parts.append('.*')
+                index += 2
+                continue
+            parts.append('[^/]*')
+        elif character == '?':
+            parts.append('[^/]')
+        elif character == '[':
+            end = pattern.find(']', index + 2)
+            if end == -1:
+                parts.append(re.escape(character))
+            else:
+                characters = pattern[index + 1:end].replace('\\', '\\\\')
+                if characters.startswith('!'):
+                    characters = '^' + characters[1:]
+                parts.append('[{}]'.format(characters))
+                index = end
+        elif character == '\\' and index + 1 < len(pattern):
+            index += 1
+            parts.append(re.escape(pattern[index]))
+        else:
+            parts.append(re.escape(character))
+        index += 1
+    return ''.join(parts)
+
+
+class IgnoreRules():
+    '''Compiled gitignore rules of a directory.
+
+    The patterns without a / match the name of the entries at any depth
+    below the directory, the rest match their path relative to it. A
+    trailing / matches only directories and a leading ! includes again the
+    entries excluded by the previous rules.
+    '''
+
+    def __init__(self, patterns, base=''):
+        self.base = base
+        self.rules = []
+        for pattern in patterns:
+            pattern = pattern.rstrip('\n')
+            if not pattern.strip() or pattern.startswith('#'):
+                continue
+            pattern = pattern.rstrip(' ')
+            negate = pattern.startswith('!')
+            if negate:
+                pattern = pattern[1:]
+            directory_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            anchored = '/' in pattern
+            pattern = pattern.lstrip('/')
+            if not pattern:
+                continue
+            self.rules.append((
+                re.compile('{}$'.format(translate(pattern))),
+                anchored,
+                directory_only,
+                negate,
+            ))
+
+    @classmethod
+    def from_file(cls, path, base=''):
+        '''Load the rules of a .gitignore file'''
+
+        with open(path, 'r', errors='replace') as f:
+            return cls(f.readlines(), base)
+
+    def match(self, relative_path, is_directory):
+        '''Return True if the rules exclude the path, False if they include
+        it again and None if no rule matches it'''
+
+        if self.base:
+            relative_path = relative_path[len(self.base) + 1:]
+        name = relative_path.rsplit('/', 1)[-1]
+        result = None
+        for regex, anchored, directory_only, negate in self.rules:
+            if directory_only and not is_directory:
+                continue
+            if regex.match(relative_path if anchored else name):
+                result = not negate
+        return result
+
+    def excludes(self, relative_path):
+        '''Return True if the rules exclude a file or any of its parent
+        directories'''
+
+        parts = relative_path.split('/')
+        for depth in range(1, len(parts) + 1):
+            if self.match('/'.join(parts[:depth]), depth < len(parts)):
+                return True
+        return False
+
+
+class TreeScanner():
+    '''Walk a directory tree top-down like os.walk, with os.scandir, leaving
+    out the entries excluded by the exclude patterns or by the .gitignore
+    files of the tree.
+
+    The excluded directories are pruned before descending into them, so
+    big ignored trees like node_modules are never read. visited counts the
+    entries read and pruned the excluded ones.
+    '''
+
+    def __init__(self, path, excluded_items=(), gitignore=True):
+        self.path = path
+        self.excludes = IgnoreRules(excluded_items)
+        self.gitignore = gitignore
+        self.visited = 0
+        self.pruned = 0
+
+    def _is_excluded(self, rules, relative_path, is_directory):
+        excluded = False
+        for rule in rules:
+            result = rule.match(relative_path, is_directory)
+            if result is not None:
+                excluded = result
+        return excluded
+
+    def _entries(self, root, handle):
+        '''Return the (name, is_directory, handle) tuples of the entries of
+        a directory. The handle of a subdirectory is what _entries needs to
+        list it, None if it can't be walked, and the handle of a file is what
+        _rules needs to read it'''
+
+        try:
+            entries = list(os.scandir(handle))
+        except OSError:
+            return []
+        return [
+            (
+                entry.name,
+                entry.is_dir(),
+                None if entry.is_dir() and entry.is_symlink() else entry.path,
+            )
+            for entry in entries
+        ]
+
+    def _rules(self, handle, relative_root):
+        '''Return the IgnoreRules of a .gitignore file'''
+
+        return IgnoreRules.from_file(handle, relative_root)
+
+    def walk(self):
+        '''Yield a (root, directories, files) tuple for each directory of the
+        tree, removing directories from the list prevents descending into
+        them'''
+
+        pending = [(self.path, '', [self.excludes], self._root())]
+        while pending:
+            root, relative_root, rules, handle = pending.pop()
+            entries = self._entries(root, handle)
+            if self.gitignore:
+                for name, is_directory, entry_handle in entries:
+                    if name == '.gitignore' and not is_directory:
+                        rules = rules + [
+                            self._rules(entry_handle, relative_root),
+                        ]
+                        break
+
+            directories = []
+            files = []
+            walkable = {}
+            for name, is_directory, entry_handle in entries:
+                self.visited += 1
+                if relative_root:
+                    relative_path = '{}/{}'.format(relative_root, name)
+                else:
+                    relative_path = name
+                if self._is_excluded(rules, relative_path, is_directory):
+                    self.pruned += 1
+                elif is_directory:
+                    directories.append(name)
+                    if entry_handle is not None:
+                        walkable[name] = entry_handle
+                else:
+                    files.append(name)
+
+            yield root, directories, files
+
+            for directory in reversed(directories):
+                if directory not in walkable:
+                    continue
+                if relative_root:
+                    relative_path = '{}/{}'.format(relative_root, directory)
+                else:
+                    relative_path = directory
+                pending.append((
+                    os.path.join(root, directory),
+                    relative_path,
+                    rules,
+                    walkable[directory],
+                ))
+
+    def _root(self):
+        '''Return the handle of the walked directory'''
+
+        return self.path
+
+
+class GitTreeScanner(TreeScanner):
+    '''Walk the tree of a git revision like TreeScanner walks a directory,
+    reading the tree objects and the .gitignore blobs through a
+    git.CatFile, so no working tree is needed.
+
+    tree is the revision expression of the walked tree, like release:docs,
+    and path the root of the yielded paths. Only the subtrees and the
+    regular files are walked, the symlinks and submodules are left out.
+    blobs maps the path of each file of the walked trees to its blob id.
+    '''
+
+    def __init__(
+        self,
+        cat_file,
+        tree,
+        path,
+        excluded_items=(),
+        gitignore=True,
+    ):
+        super().__init__(path, excluded_items, gitignore)
+        self.cat_file = cat_file
+        self.tree = tree
+        self.blobs = {}
+
+    def _root(self):
+        return self.tree
+
+    def _entries(self, root, handle):
+        entries = []
+        for mode, name, object_id in self.cat_file.tree(handle)[1]:
+            if mode == git.TREE_MODE:
+                entries.append((name, True, object_id))
+            elif mode in git.FILE_MODES:
+                self.blobs[os.path.join(root, name)] = object_id
+                entries.append((name, False, object_id))
+        return entries
+
+    def _rules(self, handle, relative_root):
+        data = self.cat_file.read(handle)[2]
+        return IgnoreRules(
+            data.decode(errors='replace').splitlines(),
+            relative_root,
+        )
@@ -0,0 +1,121 @@
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+
+def is_future(value):
+    '''Test if a value is the future result of a task, of the Scheduler or
+    of an asyncio event loop'''
+
+    return isinstance(value, (Future, asyncio.Future))
+
+
+class Scheduler():
+    '''Run tasks on a bounded pool of workers respecting the dependencies
+    between them.
+
+    The arguments of a task can be the futures returned by other tasks, the
+    task starts when all of them are done and receives their results instead.
+    For example the creation of a page can depend on the creation of the page
+    of its directory, receiving the id of the parent as an argument.
+
+    With one worker the tasks run inline when they are submitted, in the same
+    order as a plain loop would. The tasks that wait for a future of another
+    thread, like the html of the ConversionPool, are queued when it's done
+    and run by the thread that created the scheduler on the next submit or
+    on join, so they never run on the threads of the converters.
+    '''
+
+    def __init__(self, workers=1):
+        self.workers = max(workers, 1)
+        self.futures = []
+        if self.workers > 1:
+            self.executor = ThreadPoolExecutor(self.workers)
+        else:
+            self.executor = None
+        # Tasks of the single worker that are ready to run
+        self.ready = queue.Queue()
+        self.thread = threading.get_ident()
+
+    def _run_ready(self):
+        '''Run the queued tasks of the single worker that are ready'''
+
+        while True:
+            try:
+                run = self.ready.get_nowait()
+            except queue.Empty:
+                return
+            run()
+
+    def submit(self, function, *arguments):
+        '''Schedule function(*arguments) and return a future with its result.
+
+        If a dependency fails the task is not run and its future gets the
+        exception of the dependency.
+        '''
+
+        self._run_ready()
+        result = Future()
+        self.futures.append(result)
+        dependencies = [
+            argument for argument in arguments if isinstance(argument, Future)
+        ]
+        lock = threading.Lock()
+        pending = [len(dependencies)]
+
+        def run():
+            if not result.set_running_or_notify_cancel():
+                return
+            try:
+                resolved_arguments = [
+                    argument.result() if isinstance(argument, Future)
+                    else argument
+                    for argument in arguments
+                ]
+                result.set_result(function(*resolved_arguments))
+            except Exception as error:
+                result.set_exception(error)
+            except BaseException as error:
+                # A Ctrl-C or an exit stops the run instead of failing only
+                # this task
+                result.set_exception(error)
+                raise
+
+        def start():
+            if self.executor is not None:
+                self.executor.submit(run)
+            elif threading.get_ident() == self.thread:
+                run()
+            else:
+                self.ready.put(run)
+
+        def dependency_done(future):
+            with lock:
+                pending[0] -= 1
+                ready = pending[0] == 0
+            if ready:
+                start()
+
+        if len(dependencies) == 0:
+            start()
+        else:
+            for dependency in dependencies:
+                dependency.add_done_callback(dependency_done)
+        return result
+
+    def join(self):
+        '''Wait for all the submitted tasks and shut down the workers. Raises
+        the exception of the first failed task, if any'''
+
+        if self.executor is None:
+            for future in self.futures:
+                while not future.done():
+                    self.ready.get()()
+        wait(self.futures)
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        for future in self.futures:
+            if future.exception() is not None:
+                raise future.exception()
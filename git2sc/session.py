@@ -0,0 +1,82 @@
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    '''HTTPAdapter with a default timeout and a retry policy that keeps a pool
+    of keep-alive connections to the Confluence host.
+
+    The throttled requests (429 and 503) are not retried here, not even when
+    they have a Retry-After header, the Throttle of Git2SC retries them
+    adjusting the rate of all the requests.
+    '''
+
+    def __init__(
+        self,
+        pool_size=10,
+        timeout=(3.05, 60),
+        max_retries=3,
+        backoff_factor=0.5,
+    ):
+        self.timeout = timeout
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 504),
+            raise_on_status=False,
+            respect_retry_after_header=False,
+        )
+        super().__init__(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+    def connection_stats(self):
+        '''Return how many requests were sent through the pool and how many
+        of them needed a new connection instead of reusing a kept-alive one'''
+
+        requests_count = 0
+        new_connections = 0
+        pools = self.poolmanager.pools
+        for key in list(pools.keys()):
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue
+            requests_count += pool.num_requests
+            new_connections += pool.num_connections
+        return {
+            'requests': requests_count,
+            'new_connections': new_connections,
+            'reused_connections': max(requests_count - new_connections, 0),
+        }
+
+
+def build_session(
+    auth,
+    pool_size=10,
+    timeout=(3.05, 60),
+    max_retries=3,
+    keep_alive=True,
+):
+    '''Create a requests session that shares one PooledHTTPAdapter for all the
+    http and https calls'''
+
+    session = requests.Session()
+    session.auth = auth
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    adapter = PooledHTTPAdapter(pool_size, timeout, max_retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session, adapter
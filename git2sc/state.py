@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+
+
+def default_state_path(space):
+    '''Return the default path of the sync state database of a space'''
+
+    cache_directory = os.environ.get(
+        'XDG_CACHE_HOME',
+        os.path.join(os.path.expanduser('~'), '.cache'),
+    )
+    return os.path.join(cache_directory, 'git2sc', '{}.sqlite'.format(space))
+
+
+class SyncState():
+    '''SQLite database that records, for each synced file of a space, the id
+    of its confluence page, its parent, the version of the page after the
+    last sync and the hashes of the source file and the rendered html, and
+    the last commit published to the space by an incremental sync.
+
+    With it the next syncs don't need to guess the page of each file from its
+    title, and can skip the files that didn't change since the last sync
+    without converting them nor downloading the body of their page.
+    '''
+
+    def __init__(self, database_path, space):
+        self.database_path = database_path
+        self.space = space
+        if database_path != ':memory:':
+            directory = os.path.dirname(os.path.abspath(database_path))
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            database_path,
+            check_same_thread=False,
+        )
+        self.connection.row_factory = sqlite3.Row
+        if database_path != ':memory:':
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS pages ('
+                'space TEXT NOT NULL, '
+                'path TEXT NOT NULL, '
+                'page_id TEXT NOT NULL, '
+                'parent_id TEXT, '
+                'version INTEGER, '
+                'source_hash TEXT, '
+                'rendered_hash TEXT, '
+                'PRIMARY KEY (space, path))'
+            )
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS pages_page_id '
+                'ON pages (space, page_id)'
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS commits ('
+                'space TEXT PRIMARY KEY, '
+                'commit_id TEXT NOT NULL)'
+            )
+
+    def get(self, path):
+        '''Return the record of a synced path or None if it's not known'''
+
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT * FROM pages WHERE space = ? AND path = ?',
+                (self.space, path),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(row)
+
+    def records(self):
+        '''Return a dictionary with the records of all the synced paths'''
+
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT * FROM pages WHERE space = ?',
+                (self.space,),
+            ).fetchall()
+        return {row['path']: dict(row) for row in rows}
+
+    def versions(self):
+        '''Return a dictionary with the version of each synced page id'''
+
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT page_id, version FROM pages WHERE space = ?',
+                (self.space,),
+            ).fetchall()
+        return {row['page_id']: row['version'] for row in rows}
+
+    def record(
+        self,
+        path,
+        page_id,
+        parent_id=None,
+        version=None,
+        source_hash=None,
+        rendered_hash=None,
+    ):
+        '''Store the result of syncing a path'''
+
+        with self.lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM pages WHERE space = ? AND page_id = ? '
+                'AND path != ?',
+                (self.space, page_id, path),
+            )
+            self.connection.execute(
+                'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    self.space,
+                    path,
+                    page_id,
+                    parent_id,
+                    version,
+                    source_hash,
+                    rendered_hash,
+                ),
+            )
+
+    def forget_page(self, page_id):
+        '''Remove the records of a deleted page'''
+
+        with self.lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM pages WHERE space = ? AND page_id = ?',
+                (self.space, page_id),
+            )
+
+    def last_commit(self):
+        '''Return the last commit published to the space or None if it was
+        never published incrementally'''
+
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT commit_id FROM commits WHERE space = ?',
+                (self.space,),
+            ).fetchone()
+        if row is None:
+            return None
+        return row['commit_id']
+
+    def record_last_commit(self, commit):
+        '''Store the last commit published to the space'''
+
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO commits VALUES (?, ?)',
+                (self.space, commit),
+            )
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,287 @@
+import time
+import logging
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+log = logging.getLogger(__name__)
+
+# Status codes that Confluence answers when the client sends requests faster
+# than the rate limit of the tenant
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(value, now=None):
+    '''Return the seconds to wait given by a Retry-After header, that can be
+    a number of seconds or an http date, or None if it can't be parsed'''
+
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if now is None:
+        now = time.time()
+    return max(date.timestamp() - now, 0)
+
+
+class TokenBucket():
+    '''Token bucket that allows a sustained rate of requests per second with
+    bursts of up to burst requests. It's shared by all the threads'''
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        '''Take a token and return the seconds to wait before using it'''
+
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(
+                self.burst,
+                self.tokens + (now - self.updated) * self.rate,
+            )
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+
+class AdaptiveLimit():
+    '''Number of requests that can be in flight, adjusted with additive
+    increase and multiplicative decrease (AIMD).
+
+    Each successful request increases the limit by 1 / limit, so it grows by
+    one for each window of limit requests, up to maximum. A throttled
+    request, or a recent latency over latency_factor times the usual latency
+    of the requests, decreases it by the decrease factor. The decreases
+    happen at most once per cooldown seconds, as all the requests in flight
+    when the server starts throttling are going to report it.
+
+    The recent and usual latencies are moving averages of the latency of the
+    requests that react fast and slow, so the different latency of each kind
+    of request doesn't look like a slow server.
+    '''
+
+    def __init__(
+        self,
+        maximum,
+        minimum=1,
+        decrease=0.5,
+        latency_factor=3,
+        cooldown=1,
+        clock=time.monotonic,
+    ):
+        self.maximum = max(maximum, 1)
+        self.minimum = min(max(minimum, 1), self.maximum)
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.clock = clock
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self.usual_latency = None
+        self.recent_latency = None
+        self.last_decrease = None
+        self.condition = threading.Condition()
+
+    def try_acquire(self):
+        '''Take a slot if there is one free, return True if it was taken'''
+
+        with self.condition:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire(self):
+        '''Wait for a free slot and take it'''
+
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def _decrease(self):
+        now = self.clock()
+        if self.last_decrease is not None and \
+                now - self.last_decrease < self.cooldown:
+            return False
+        self.last_decrease = now
+        self.limit = max(self.limit * self.decrease, self.minimum)
+        return True
+
+    def on_success(self, latency):
+        '''Adjust the limit with the latency of a successful request'''
+
+        with self.condition:
+            if self.usual_latency is None:
+                self.usual_latency = self.recent_latency = latency
+            self.usual_latency = 0.98 * self.usual_latency + 0.02 * latency
+            self.recent_latency = 0.8 * self.recent_latency + 0.2 * latency
+            if self.latency_factor is not None and self.recent_latency > \
+                    self.latency_factor * self.usual_latency:
+                self._decrease()
+                return
+            self.limit = min(self.limit + 1 / self.limit, self.maximum)
+            self.condition.notify_all()
+
+    def on_throttle(self):
+        '''Decrease the limit after a throttled request'''
+
+        with self.condition:
+            self._decrease()
+
+
+class Throttle():
+    '''Send the requests to Confluence without going over its rate limit.
+
+    The requests wait for a slot of the AdaptiveLimit and, if rate is set,
+    for a token of a TokenBucket of rate requests per second. The throttled
+    requests (429 or 503) pause all the requests for the time of their
+    Retry-After header, or an exponential backoff if they don't have one,
+    and are retried up to max_retries times.
+
+    The throttle events are logged with the concurrency and the effective
+    request rate.
+    '''
+
+    def __init__(
+        self,
+        rate=None,
+        concurrency=10,
+        max_retries=5,
+        backoff_factor=1,
+        max_wait=300,
+        latency_factor=3,
+        clock=time.monotonic,
+    ):
+        self.bucket = None
+        if rate is not None:
+            self.bucket = TokenBucket(rate, clock=clock)
+        self.limit = AdaptiveLimit(
+            concurrency,
+            latency_factor=latency_factor,
+            clock=clock,
+        )
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_wait = max_wait
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.paused_until = 0
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0
+        self.started = None
+        self.recent = deque()
+
+    def delay(self):
+        '''Return the seconds to wait before sending a request'''
+
+        delay = max(self.paused_until - self.clock(), 0)
+        if self.bucket is not None:
+            delay = max(delay, self.bucket.reserve())
+        return delay
+
+    def record(self, response, latency, attempt):
+        '''Record the response of a request, return the seconds to wait
+        before retrying it or None if it doesn't have to be retried'''
+
+        now = self.clock()
+        with self.lock:
+            if self.started is None:
+                self.started = now - latency
+            self.requests += 1
+            self.recent.append(now)
+            while self.recent and now - self.recent[0] > 10:
+                self.recent.popleft()
+
+        if response.status_code not in THROTTLE_STATUS_CODES:
+            self.limit.on_success(latency)
+            return None
+
+        self.limit.on_throttle()
+        with self.lock:
+            self.throttled += 1
+        if attempt >= self.max_retries:
+            return None
+        delay = parse_retry_after(response.headers.get('Retry-After'))
+        if delay is None:
+            delay = self.backoff_factor * 2 ** attempt
+        delay = min(delay, self.max_wait)
+        with self.lock:
+            self.waited += delay
+            self.paused_until = max(self.paused_until, now + delay)
+        log.warning(
+            'Confluence throttled the requests (%s), retrying in %.1fs with '
+            'a concurrency of %d, effective rate %.1f requests/s',
+            response.status_code,
+            delay,
+            int(self.limit.limit),
+            self.recent_rate(),
+        )
+        return delay
+
+    def recent_rate(self):
+        '''Return the requests per second of the last 10 seconds'''
+
+        with self.lock:
+            if len(self.recent) < 2:
+                return float(len(self.recent))
+            return len(self.recent) / max(self.clock() - self.recent[0], 1)
+
+    def rate(self):
+        '''Return the requests per second since the first request'''
+
+        with self.lock:
+            if self.started is None:
+                return 0.0
+            return self.requests / max(self.clock() - self.started, 1e-3)
+
+    def request(self, send, method, url, **kwargs):
+        '''Send a request with send(method, url, **kwargs), retrying it while
+        it's throttled. Returns the last response'''
+
+        attempt = 0
+        while True:
+            self.limit.acquire()
+            try:
+                time.sleep(self.delay())
+                start = self.clock()
+                response = send(method, url, **kwargs)
+                delay = self.record(response, self.clock() - start, attempt)
+            finally:
+                self.limit.release()
+            if delay is None:
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+    def summary(self):
+        '''Return a line with the throttle events and the effective request
+        rate'''
+
+        return 'Throttled {} times, waited {:.1f}s, {} requests at {:.1f} '\
+            'requests/s'.format(
+                self.throttled,
+                self.waited,
+                self.requests,
+                self.rate(),
+            )
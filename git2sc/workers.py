@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import queue
+import atexit
+import socket
+import threading
+import subprocess
+import requests
+
+# Ruby loop that loads asciidoctor once and converts the paths it reads from
+# stdin. A line with a NUL byte followed by a size, that can't be a path, is
+# followed by the source to convert instead. Each answer is a
+# "<status> <bytes>" line followed by the html, or the error message if the
+# status is error.
+ASCIIDOCTOR_WORKER = '''
+require 'asciidoctor'
+STDOUT.binmode
+STDOUT.write("ready\\n")
+STDOUT.flush
+while (path = STDIN.gets)
+  begin
+    options = {
+      backend: 'xhtml',
+      safe: :unsafe,
+      header_footer: true,
+      to_file: false,
+    }
+    if path.start_with?("\\0")
+      source = STDIN.read(path[1..-1].to_i).force_encoding('UTF-8')
+      output = Asciidoctor.convert(source, options)
+    else
+      output = Asciidoctor.convert_file(path.chomp, options)
+    end
+    status = 'ok'
+  rescue Exception => e
+    output = e.message
+    status = 'error'
+  end
+  output = output.b
+  STDOUT.write("#{status} #{output.bytesize}\\n")
+  STDOUT.write(output)
+  STDOUT.flush
+end
+'''
+
+
+class WorkerUnavailable(Exception):
+    '''The warm converter can't be started, the files have to be converted
+    starting a converter process for each of them'''
+
+
+class AsciidoctorWorker():
+    '''Long lived ruby process that converts asciidoc files to xhtml, it
+    saves the startup of ruby and the load of asciidoctor for each file'''
+
+    def __init__(self, command=None):
+        if command is None:
+            command = ['ruby', '-e', ASCIIDOCTOR_WORKER]
+        try:
+            self.process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as error:
+            raise WorkerUnavailable(str(error))
+        if self.process.stdout.readline() != b'ready\n':
+            self.close()
+            raise WorkerUnavailable('The asciidoctor worker did not start')
+
+    def convert(self, file_path, source=None):
+        '''Return the xhtml of an asciidoc file, or of its source bytes if
+        they are given'''
+
+        if source is None:
+            request = file_path.encode() + b'\n'
+        else:
+            request = '\0{}\n'.format(len(source)).encode() + source
+        try:
+            self.process.stdin.write(request)
+            self.process.stdin.flush()
+            header = self.process.stdout.readline().decode().split()
+            status, size = header[0], int(header[1])
+            output = self.process.stdout.read(size).decode()
+        except (OSError, IndexError, ValueError):
+            # Make sure the worker is stopped so it's not used again
+            self.process.kill()
+            self.process.wait()
+            raise RuntimeError(
+                'The asciidoctor worker exited converting {}'.format(
+                    file_path,
+                )
+            )
+        if status != 'ok':
+            raise RuntimeError(output)
+        return output
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class PandocServer():
+    '''pandoc running in server mode, available since pandoc 3.0, that
+    converts the markdown files sent to it through http. pandoc serves the
+    requests in parallel, so one server is enough. A conversion that takes
+    more than timeout seconds fails'''
+
+    def __init__(self, command=None, startup_timeout=10, timeout=60):
+        self.port = _free_port()
+        self.timeout = timeout
+        if command is None:
+            command = ['pandoc', 'server', '--port', '{port}']
+        try:
+            self.process = subprocess.Popen(
+                [part.replace('{port}', str(self.port)) for part in command],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as error:
+            raise WorkerUnavailable(str(error))
+        self.url = 'http://127.0.0.1:{}/'.format(self.port)
+        self.session = requests.Session()
+        self.session.trust_env = False
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if self.process.poll() is not None:
+                raise WorkerUnavailable('pandoc server mode is not available')
+            try:
+                self.session.get(self.url + 'version', timeout=1)
+                break
+            except requests.exceptions.ConnectionError:
+                if time.monotonic() > deadline:
+                    self.close()
+                    raise WorkerUnavailable('pandoc server did not start')
+                time.sleep(0.05)
+
+    def convert(self, file_path, to_format, text=None):
+        '''Return the conversion of a markdown file, or of its text if it's
+        given'''
+
+        if text is None:
+            with open(file_path, 'r') as f:
+                text = f.read()
+        try:
+            r = self.session.post(
+                self.url,
+                data=json.dumps({
+                    'text': text,
+                    'from': 'markdown',
+                    'to': to_format,
+                }),
+                headers={
+                    'Content-Type': 'application/json',
+                    'Accept': 'application/json',
+                },
+                timeout=self.timeout,
+            )
+            r.raise_for_status()
+        except requests.exceptions.ConnectionError:
+            raise RuntimeError(
+                'The pandoc server exited converting {}'.format(file_path)
+            )
+        except requests.exceptions.Timeout:
+            raise RuntimeError(
+                'The pandoc server took more than {}s converting {}'.format(
+                    self.timeout,
+                    file_path,
+                )
+            )
+        except requests.exceptions.HTTPError:
+            raise RuntimeError(r.text)
+        # pandoc answers the failed conversions with an error message
+        try:
+            return json.loads(r.text)['output']
+        except (ValueError, KeyError, TypeError):
+            raise RuntimeError(
+                'The pandoc server failed converting {}: {}'.format(
+                    file_path,
+                    r.text,
+                )
+            )
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+class WarmConverters():
+    '''Pool of long lived converters shared by all the conversions of the
+    process, so the upload, sync and incremental sync runs of a Git2SC
+    object reuse them.
+
+    The workers are started when they are first needed, up to size
+    asciidoctor workers and one pandoc server. If a converter can't be
+    started the convert methods raise WorkerUnavailable for the rest of the
+    run and the caller falls back to a process per file.
+    '''
+
+    def __init__(
+        self,
+        size=None,
+        asciidoctor_command=None,
+        pandoc_command=None,
+    ):
+        self.size = size or os.cpu_count()
+        self.asciidoctor_command = asciidoctor_command
+        self.pandoc_command = pandoc_command
+        self.lock = threading.Lock()
+        self.idle_asciidoctor_workers = queue.LifoQueue()
+        self.asciidoctor_workers = []
+        self.asciidoctor_available = True
+        self.pandoc_server = None
+        self.pandoc_available = True
+        atexit.register(self.close)
+
+    def _checkout_asciidoctor_worker(self):
+        while True:
+            with self.lock:
+                if not self.asciidoctor_available:
+                    raise WorkerUnavailable('asciidoctor worker not available')
+                try:
+                    return self.idle_asciidoctor_workers.get_nowait()
+                except queue.Empty:
+                    pass
+                if len(self.asciidoctor_workers) < self.size:
+                    try:
+                        worker = AsciidoctorWorker(self.asciidoctor_command)
+                    except WorkerUnavailable:
+                        self.asciidoctor_available = False
+                        raise
+                    self.asciidoctor_workers.append(worker)
+                    return worker
+            # All the workers are busy, wait for one of them. The timeout
+            # lets the waiting threads start a new worker if a busy one exits
+            try:
+                return self.idle_asciidoctor_workers.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def convert_adoc(self, file_path, source=None):
+        '''Return the xhtml of an asciidoc file, or of its source bytes, using
+        a warm worker'''
+
+        worker = self._checkout_asciidoctor_worker()
+        try:
+            html = worker.convert(file_path, source)
+        except RuntimeError:
+            if worker.process.poll() is not None:
+                # The next conversion will start a new worker
+                with self.lock:
+                    self.asciidoctor_workers.remove(worker)
+                worker.close()
+                raise
+            self.idle_asciidoctor_workers.put(worker)
+            raise
+        self.idle_asciidoctor_workers.put(worker)
+        return html
+
+    def convert_md(self, file_path, to_format, text=None):
+        '''Return the conversion of a markdown file, or of its text, using the
+        pandoc server'''
+
+        with self.lock:
+            if not self.pandoc_available:
+                raise WorkerUnavailable('pandoc server not available')
+            if self.pandoc_server is None:
+                try:
+                    self.pandoc_server = PandocServer(self.pandoc_command)
+                except WorkerUnavailable:
+                    self.pandoc_available = False
+                    raise
+            server = self.pandoc_server
+        return server.convert(file_path, to_format, text)
+
+    def close(self):
+        '''Stop the workers'''
+
+        with self.lock:
+            for worker in self.asciidoctor_workers:
+                worker.close()
+            self.asciidoctor_workers = []
+            self.idle_asciidoctor_workers = queue.LifoQueue()
+            if self.pandoc_server is not None:
+                self.pandoc_server.close()
+                self.pandoc_server = None
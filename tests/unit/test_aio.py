@@ -0,0 +1,491 @@
+import os
+import json
+import shutil
+import asyncio
+import threading
+import tempfile
+import unittest
+from urllib.parse import unquote
+from aiohttp import web
+from git2sc.aio import AsyncGit2SC, AsyncScheduler
+
+
+class FakeConfluence():
+    '''In memory confluence that answers the requests of AsyncGit2SC, it
+    delays each answer to let the client overlap them and records the
+    maximum number of requests in flight'''
+
+    def __init__(self, batch_size=2, delay=0.01):
+        self.batch_size = batch_size
+        self.delay = delay
+        self.next_id = 100
+        self.pages = {
+            '1': {
+                'id': '1',
+                'title': 'Home',
+                'version': {'number': 1},
+                'ancestors': [],
+                'body': {'storage': {'value': 'home'}},
+            },
+        }
+        self.requests = []
+        self.throttle_next = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.app = web.Application(middlewares=[self.track])
+        self.app.router.add_get('/space/TST', self.space)
+        self.app.router.add_get('/space/TST/content', self.space_content)
+        self.app.router.add_get('/content/search', self.search)
+        self.app.router.add_get('/content/{pageid}', self.get_page)
+        self.app.router.add_post('/content', self.create_page)
+        self.app.router.add_put('/content/{pageid}', self.update_page)
+        self.app.router.add_delete('/content/{pageid}', self.delete_page)
+
+    @web.middleware
+    async def track(self, request, handler):
+        self.requests.append((request.method, request.path))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.throttle_next > 0:
+                self.throttle_next -= 1
+                return web.json_response(
+                    {'statusCode': 429, 'message': 'Too many requests'},
+                    status=429,
+                    headers={'Retry-After': '0.05'},
+                )
+            return await handler(request)
+        finally:
+            self.in_flight -= 1
+
+    def _metadata(self, page):
+        return {
+            key: value
+            for key, value in page.items()
+            if key != 'body'
+        }
+
+    async def space(self, request):
+        return web.json_response(
+            {'_expandable': {'homepage': '/rest/api/content/1'}},
+        )
+
+    async def space_content(self, request):
+        start = int(request.query['start'])
+        pages = sorted(self.pages.values(), key=lambda page: int(page['id']))
+        results = pages[start:start + self.batch_size]
+        batch = {
+            'results': [self._metadata(page) for page in results],
+            'start': start,
+            'limit': self.batch_size,
+            'size': len(results),
+            '_links': {},
+        }
+        if start + self.batch_size < len(pages):
+            batch['_links']['next'] = '/next'
+        return web.json_response({'page': batch})
+
+    async def search(self, request):
+        cql = unquote(request.query['cql'])
+        page_ids = cql[len('id in ('):-1].split(',')
+        return web.json_response({
+            'results': [
+                self.pages[pageid]
+                for pageid in page_ids
+                if pageid in self.pages
+            ],
+        })
+
+    async def get_page(self, request):
+        return web.json_response(self.pages[request.match_info['pageid']])
+
+    async def create_page(self, request):
+        data = json.loads(await request.text())
+        pageid = str(self.next_id)
+        self.next_id += 1
+        ancestors = [
+            {'id': ancestor['id']}
+            for ancestor in data.get('ancestors', [])
+        ]
+        self.pages[pageid] = {
+            'id': pageid,
+            'title': data['title'],
+            'version': {'number': 1},
+            'ancestors': ancestors,
+            'body': {'storage': {'value': data['body']['storage']['value']}},
+        }
+        return web.json_response(self._metadata(self.pages[pageid]))
+
+    async def update_page(self, request):
+        data = json.loads(await request.text())
+        page = self.pages[request.match_info['pageid']]
+        page['title'] = data['title']
+        page['version'] = data['version']
+        page['body'] = {
+            'storage': {'value': data['body']['storage']['value']},
+        }
+        return web.json_response({'id': page['id']})
+
+    async def delete_page(self, request):
+        del self.pages[request.match_info['pageid']]
+        return web.Response(status=204)
+
+
+class TestAsyncGit2SC(unittest.TestCase):
+    '''Test class for the AsyncGit2SC class'''
+
+    def setUp(self):
+        self.confluence = FakeConfluence()
+        self.directory = tempfile.mkdtemp()
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        shutil.rmtree(self.directory)
+
+    def write(self, relative_path, content):
+        path = os.path.join(self.directory, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def run_client(self, function, **keyword_arguments):
+        '''Serve the fake confluence and run function with an opened client
+        in the same event loop'''
+
+        async def run():
+            runner = web.AppRunner(self.confluence.app)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            try:
+                async with AsyncGit2SC(
+                    'http://127.0.0.1:{}'.format(port),
+                    'user:password',
+                    'TST',
+                    **keyword_arguments
+                ) as client:
+                    return client, await function(client)
+            finally:
+                await runner.cleanup()
+
+        return self.loop.run_until_complete(run())
+
+    def titles(self):
+        return sorted(
+            page['title'] for page in self.confluence.pages.values()
+        )
+
+    def test_open_loads_all_the_pages_of_the_space(self):
+        '''Required to index the space in batches before syncing'''
+
+        for index in range(5):
+            self.confluence.pages[str(index + 10)] = {
+                'id': str(index + 10),
+                'title': 'page_{}'.format(index),
+                'version': {'number': 1},
+                'ancestors': [],
+            }
+
+        async def nothing(client):
+            pass
+
+        client, _ = self.run_client(nothing)
+
+        self.assertEqual(
+            sorted(client.pages.keys()),
+            ['1', '10', '11', '12', '13', '14'],
+        )
+
+    def test_has_no_blocking_operations_of_git2sc(self):
+        '''Required to not offer an operation of Git2SC that the async client
+        can't run, every inherited method is a helper that doesn't block'''
+
+        for name in (
+            'connection_stats',
+            'iter_space_articles',
+            'directory_incremental_update',
+            'plan_update',
+            'apply_plan',
+        ):
+            self.assertFalse(hasattr(AsyncGit2SC, name))
+
+    def test_page_operations(self):
+        '''Required to create, update and delete pages with coroutines'''
+
+        async def operations(client):
+            pageid = await client.create_page('page', '<p>one</p>')
+            await client.update_page(pageid, '<p>two</p>')
+            body = await client.get_page_body(pageid)
+            await client.delete_page('1')
+            return pageid, body
+
+        client, (pageid, body) = self.run_client(operations)
+
+        self.assertEqual(body, '<p>two</p>')
+        self.assertEqual(list(self.confluence.pages.keys()), [pageid])
+        self.assertEqual(
+            self.confluence.pages[pageid]['version'],
+            {'number': 2},
+        )
+        self.assertEqual(client.stats['created'], 1)
+        self.assertEqual(client.stats['updated'], 1)
+        self.assertEqual(client.stats['deleted'], 1)
+        self.assertEqual(
+            [request for request in self.confluence.requests
+             if request[1].startswith('/content')],
+            [
+                ('POST', '/content'),
+                ('PUT', '/content/{}'.format(pageid)),
+                ('GET', '/content/search'),
+                ('DELETE', '/content/1'),
+            ],
+        )
+
+    def test_requests_and_pages_are_recorded_in_the_run_report(self):
+        '''Required to know where the time of an async run goes'''
+
+        async def operations(client):
+            pageid = await client.create_page('page', '<p>one</p>')
+            await client.delete_page(pageid)
+
+        client, _ = self.run_client(operations)
+
+        self.assertEqual(
+            sorted(client.report.requests),
+            [
+                'DELETE /content/{id}',
+                'GET /space/{space}/content',
+                'POST /content',
+            ],
+        )
+        self.assertGreater(
+            client.report.requests['POST /content']['sent'],
+            0,
+        )
+        self.assertEqual(sorted(client.report.pages), ['page'])
+        self.assertIn('list', client.report.phases)
+
+    def test_directory_full_upload_overlaps_the_requests(self):
+        '''Required to create many pages without waiting for each request'''
+
+        for index in range(20):
+            self.write('docs/file_{}.html'.format(index), '<p>{}</p>'.format(
+                index,
+            ))
+
+        async def upload(client):
+            await client.directory_full_upload(self.directory, ['.git'])
+
+        client, _ = self.run_client(upload, concurrency=50)
+
+        self.assertEqual(
+            self.titles(),
+            ['Home', 'docs'] + sorted(
+                'file_{}'.format(index) for index in range(20)
+            ),
+        )
+        docs_id = client._get_article_id('docs')
+        for page in self.confluence.pages.values():
+            if page['title'].startswith('file_'):
+                self.assertEqual(page['ancestors'], [{'id': docs_id}])
+        self.assertGreater(self.confluence.max_in_flight, 10)
+
+    def test_one_job_doesnt_convert_on_the_event_loop(self):
+        '''Required to keep the requests in flight while the directory is
+        crawled and its files converted'''
+
+        self.write('docs/file.html', '<p>File</p>')
+        threads = []
+
+        async def upload(client):
+            convert_file = client._convert_file
+
+            def record_thread(file_path):
+                threads.append(threading.get_ident())
+                return convert_file(file_path)
+
+            client._convert_file = record_thread
+            await client.directory_full_upload(
+                self.directory,
+                ['.git'],
+                jobs=1,
+            )
+
+        self.run_client(upload)
+
+        self.assertIn('file', self.titles())
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_concurrency_bounds_the_requests_in_flight(self):
+        '''Required to not flood the confluence server'''
+
+        for index in range(10):
+            self.write('file_{}.html'.format(index), 'content')
+
+        async def upload(client):
+            await client.directory_full_upload(self.directory, ['.git'])
+
+        self.run_client(upload, concurrency=3)
+
+        self.assertLessEqual(self.confluence.max_in_flight, 3)
+
+    def test_directory_update_updates_creates_and_deletes(self):
+        '''Required to sync a directory with coroutines'''
+
+        self.confluence.pages['10'] = {
+            'id': '10',
+            'title': 'changed',
+            'version': {'number': 3},
+            'ancestors': [{'id': '1'}],
+            'body': {'storage': {'value': 'old'}},
+        }
+        self.confluence.pages['11'] = {
+            'id': '11',
+            'title': 'same',
+            'version': {'number': 1},
+            'ancestors': [{'id': '1'}],
+            'body': {'storage': {'value': 'content'}},
+        }
+        self.confluence.pages['12'] = {
+            'id': '12',
+            'title': 'removed',
+            'version': {'number': 1},
+            'ancestors': [{'id': '1'}],
+            'body': {'storage': {'value': 'content'}},
+        }
+        self.write('changed.html', 'new')
+        self.write('same.html', 'content')
+        self.write('new.html', 'content')
+
+        async def update(client):
+            await client.directory_update(self.directory, ['.git'])
+
+        client, _ = self.run_client(update)
+
+        self.assertEqual(self.titles(), ['Home', 'changed', 'new', 'same'])
+        self.assertEqual(
+            self.confluence.pages['10']['body']['storage']['value'],
+            'new',
+        )
+        self.assertEqual(
+            self.confluence.pages['11']['version'],
+            {'number': 1},
+        )
+        self.assertEqual(client.stats['created'], 1)
+        self.assertEqual(client.stats['deleted'], 1)
+        self.assertEqual(client.stats['skipped'], 1)
+
+    def test_throttled_requests_are_retried(self):
+        '''Required to not die partway through a throttled sync'''
+
+        for index in range(5):
+            self.write('file_{}.html'.format(index), 'content')
+
+        async def upload(client):
+            self.confluence.throttle_next = 3
+            await client.directory_full_upload(self.directory, ['.git'])
+
+        client, _ = self.run_client(upload, concurrency=8)
+
+        self.assertEqual(len(self.confluence.pages), 6)
+        self.assertEqual(client.throttle.throttled, 3)
+        self.assertLess(client.throttle.limit.limit, 8)
+
+    def test_errors_of_confluence_are_raised(self):
+        '''Required to stop the sync when confluence rejects a request'''
+
+        async def missing_page(client):
+            await client.update_page('404', 'html')
+
+        async def get_page(request):
+            return web.json_response(
+                {'statusCode': 404, 'message': 'Not found'},
+                status=404,
+            )
+
+        self.confluence.get_page = get_page
+        self.confluence.app = web.Application()
+        self.confluence.app.router.add_get(
+            '/space/TST/content',
+            self.confluence.space_content,
+        )
+        self.confluence.app.router.add_get('/content/{pageid}', get_page)
+
+        with self.assertRaisesRegex(Exception, 'Error 404: Not found'):
+            self.run_client(missing_page)
+
+
+class TestAsyncScheduler(unittest.TestCase):
+    '''Test class for the AsyncScheduler class'''
+
+    def test_tasks_receive_the_results_of_their_dependencies(self):
+        '''Required to create a page with the id of the page of its
+        directory'''
+
+        async def task(*arguments):
+            await asyncio.sleep(0.01)
+            return '/'.join(arguments)
+
+        async def run():
+            scheduler = AsyncScheduler()
+            parent = scheduler.submit(task, 'parent')
+            child = scheduler.submit(task, parent, 'child')
+            await scheduler.join()
+            return child.result()
+
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertEqual(
+                loop.run_until_complete(run()),
+                'parent/child',
+            )
+        finally:
+            loop.close()
+
+    def test_tasks_can_be_submitted_from_other_threads(self):
+        '''Required to crawl the directory outside of the event loop'''
+
+        async def task(*arguments):
+            return '/'.join(arguments)
+
+        async def run():
+            scheduler = AsyncScheduler()
+            parent = await asyncio.get_event_loop().run_in_executor(
+                None,
+                scheduler.submit,
+                task,
+                'parent',
+            )
+            child = scheduler.submit(task, parent, 'child')
+            await scheduler.join()
+            return child.result()
+
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertEqual(
+                loop.run_until_complete(run()),
+                'parent/child',
+            )
+        finally:
+            loop.close()
+
+    def test_join_raises_the_failed_tasks(self):
+        '''Required to not hide the errors of the requests'''
+
+        async def fail():
+            raise ValueError('failed')
+
+        async def run():
+            scheduler = AsyncScheduler()
+            scheduler.submit(fail)
+            await scheduler.join()
+
+        loop = asyncio.new_event_loop()
+        try:
+            with self.assertRaisesRegex(ValueError, 'failed'):
+                loop.run_until_complete(run())
+        finally:
+            loop.close()
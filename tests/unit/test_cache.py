@@ -0,0 +1,88 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from git2sc.cache import HtmlCache, cache_key, default_cache_path
+
+
+class TestCacheKey(unittest.TestCase):
+    '''Test class for the cache_key function'''
+
+    def test_key_changes_with_the_source_and_the_converter(self):
+        '''Required to convert the files again when their source, the
+        converter or its arguments change'''
+
+        key = cache_key(b'= Title', 'asciidoctor', '2.0.10', ['-b', 'xhtml'])
+
+        self.assertEqual(
+            key,
+            cache_key(b'= Title', 'asciidoctor', '2.0.10', ['-b', 'xhtml']),
+        )
+        for other_key in (
+            cache_key(b'= Other', 'asciidoctor', '2.0.10', ['-b', 'xhtml']),
+            cache_key(b'= Title', 'pandoc', '2.0.10', ['-b', 'xhtml']),
+            cache_key(b'= Title', 'asciidoctor', '2.0.11', ['-b', 'xhtml']),
+            cache_key(b'= Title', 'asciidoctor', '2.0.10', ['-b', 'html5']),
+        ):
+            self.assertNotEqual(key, other_key)
+
+
+class TestHtmlCache(unittest.TestCase):
+    '''Test class for the HtmlCache class'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = HtmlCache(os.path.join(self.directory, 'html'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_default_cache_path_uses_xdg_cache_home(self):
+        '''Required to store the cache with the rest of the user caches'''
+
+        os.environ['XDG_CACHE_HOME'] = '/tmp/cache'
+        try:
+            self.assertEqual(default_cache_path(), '/tmp/cache/git2sc/html')
+        finally:
+            del os.environ['XDG_CACHE_HOME']
+
+    def test_can_store_and_get_html(self):
+        '''Required to reuse the converted html'''
+
+        self.assertIsNone(self.cache.get('ab' * 32))
+
+        self.cache.put('ab' * 32, '<p>Cached</p>')
+
+        self.assertEqual(self.cache.get('ab' * 32), '<p>Cached</p>')
+
+    def test_entries_are_shared_between_caches_of_the_same_directory(self):
+        '''Required to share the cache between runners'''
+
+        self.cache.put('ab' * 32, '<p>Cached</p>')
+
+        other_cache = HtmlCache(os.path.join(self.directory, 'html'))
+
+        self.assertEqual(other_cache.get('ab' * 32), '<p>Cached</p>')
+        self.assertEqual(other_cache.size, len('<p>Cached</p>'))
+
+    def test_evicts_the_least_recently_used_entries(self):
+        '''Required to keep the size of the cache under its limit'''
+
+        self.cache.max_size = 130
+        for index in range(3):
+            self.cache.put('{:064d}'.format(index), 'x' * 40)
+            # The modification times need to be different
+            time.sleep(0.01)
+        # The first entry is used, so the second one is the least recently
+        # used
+        self.cache.get('{:064d}'.format(0))
+        time.sleep(0.01)
+
+        self.cache.put('{:064d}'.format(3), 'x' * 40)
+
+        self.assertIsNotNone(self.cache.get('{:064d}'.format(0)))
+        self.assertIsNone(self.cache.get('{:064d}'.format(1)))
+        self.assertIsNone(self.cache.get('{:064d}'.format(2)))
+        self.assertIsNotNone(self.cache.get('{:064d}'.format(3)))
+        self.assertLessEqual(self.cache.size, 130 * 0.9)
@@ -1,3 +1,4 @@
+import os
 import unittest
 from git2sc.cli import load_parser
 
@@ -160,6 +161,19 @@ class TestArgparse(unittest.TestCase):
         self.assertEqual(parsed.path, '/path/to/directory')
         self.assertEqual(parsed.exclude, ['.git', '.gitignore', '.gitmodules'])
 
+    def test_has_subcommand_sync_directory_can_specify_parent_id(self):
+        '''Required to sync a directory uploaded below a parent article'''
+        parsed = self.parser.parse_args(
+            [
+                'TST',
+                'sync',
+                '/path/to/directory',
+                '-p',
+                'parent_id',
+            ]
+        )
+        self.assertEqual(parsed.parent_id, 'parent_id')
+
     def test_has_subcommand_sync_directory_can_specify_excluded_dirs(self):
         '''Required to ensure that the parser is correctly configured to
         sync a directory with excluded directories'''
@@ -174,3 +188,228 @@ class TestArgparse(unittest.TestCase):
             ]
         )
         self.assertEqual(parsed.exclude, ['excluded_dir1', 'excluded_dir2'])
+
+    def test_has_subcommand_sync_directory_can_be_incremental(self):
+        '''Required to ensure that the parser is correctly configured to
+        sync only the files changed since a commit'''
+        parsed = self.parser.parse_args(
+            [
+                'TST',
+                'sync',
+                '/path/to/directory',
+                '--incremental',
+                '--since',
+                'v1.0.0',
+            ]
+        )
+        self.assertEqual(parsed.incremental, True)
+        self.assertEqual(parsed.since, 'v1.0.0')
+
+    def test_sync_directory_is_not_incremental_by_default(self):
+        '''Required to ensure that the default sync crawls all the files'''
+        parsed = self.parser.parse_args(['TST', 'sync', '/path/to/directory'])
+        self.assertEqual(parsed.incremental, False)
+        self.assertEqual(parsed.since, None)
+
+    def test_has_sync_state_options(self):
+        '''Required to ensure that the parser is correctly configured to
+        choose or disable the sync state database'''
+        parsed = self.parser.parse_args(
+            ['--state', '/tmp/state.sqlite', 'TST', 'sync', '/path'],
+        )
+        self.assertEqual(parsed.state, '/tmp/state.sqlite')
+        self.assertEqual(parsed.no_state, False)
+
+        parsed = self.parser.parse_args(['--no-state', 'TST', 'sync', '/path'])
+        self.assertEqual(parsed.state, None)
+        self.assertEqual(parsed.no_state, True)
+
+    def test_upload_and_sync_have_workers(self):
+        '''Required to ensure that the parser is correctly configured to
+        choose the number of pages created or updated in parallel'''
+        for subcommand in ('upload', 'sync'):
+            parsed = self.parser.parse_args(['TST', subcommand, '/path'])
+            self.assertEqual(parsed.workers, 4)
+            parsed = self.parser.parse_args(
+                ['TST', subcommand, '/path', '--workers', '16'],
+            )
+            self.assertEqual(parsed.workers, 16)
+
+    def test_upload_and_sync_have_conversion_jobs(self):
+        '''Required to ensure that the parser is correctly configured to
+        choose the number of parallel conversions and their limits'''
+        for subcommand in ('upload', 'sync'):
+            parsed = self.parser.parse_args(['TST', subcommand, '/path'])
+            self.assertEqual(parsed.jobs, os.cpu_count())
+            self.assertIsNone(parsed.converter_limit)
+            parsed = self.parser.parse_args([
+                'TST',
+                subcommand,
+                '/path',
+                '--jobs',
+                '16',
+                '--converter-limit',
+                'adoc=2',
+                '--converter-limit',
+                '.md=4',
+            ])
+            self.assertEqual(parsed.jobs, 16)
+            self.assertEqual(
+                parsed.converter_limit,
+                [('.adoc', 2), ('.md', 4)],
+            )
+
+    def test_has_html_cache_options(self):
+        '''Required to ensure that the parser is correctly configured to
+        choose, size or disable the converted html cache'''
+        parsed = self.parser.parse_args(['TST', 'sync', '/path'])
+        self.assertEqual(parsed.cache, None)
+        self.assertEqual(parsed.cache_size, 512)
+        self.assertEqual(parsed.no_cache, False)
+
+        parsed = self.parser.parse_args([
+            '--cache',
+            '/tmp/cache',
+            '--cache-size',
+            '64',
+            'TST',
+            'sync',
+            '/path',
+        ])
+        self.assertEqual(parsed.cache, '/tmp/cache')
+        self.assertEqual(parsed.cache_size, 64)
+
+        parsed = self.parser.parse_args(['--no-cache', 'TST', 'sync', '/'])
+        self.assertEqual(parsed.no_cache, True)
+
+    def test_can_disable_the_warm_converters(self):
+        '''Required to ensure that the parser is correctly configured to
+        disable the warm converter workers'''
+        parsed = self.parser.parse_args(['TST', 'sync', '/path'])
+        self.assertEqual(parsed.no_warm_converters, False)
+
+        parsed = self.parser.parse_args(
+            ['--no-warm-converters', 'TST', 'sync', '/path'],
+        )
+        self.assertEqual(parsed.no_warm_converters, True)
+
+    def test_can_choose_the_markdown_engine(self):
+        '''Required to ensure that the parser is correctly configured to
+        choose the engine that converts the markdown files'''
+        parsed = self.parser.parse_args(['TST', 'sync', '/path'])
+        self.assertEqual(parsed.markdown_engine, 'pandoc')
+
+        parsed = self.parser.parse_args(
+            ['--markdown-engine', 'native', 'TST', 'sync', '/path'],
+        )
+        self.assertEqual(parsed.markdown_engine, 'native')
+
+    def test_can_set_the_rate_limit(self):
+        '''Required to ensure that the parser is correctly configured to
+        limit the requests per second sent to confluence'''
+        parsed = self.parser.parse_args(['TST', 'sync', '/path'])
+        self.assertEqual(parsed.rate_limit, None)
+
+        parsed = self.parser.parse_args(
+            ['--rate-limit', '2.5', 'TST', 'sync', '/path'],
+        )
+        self.assertEqual(parsed.rate_limit, 2.5)
+
+    def test_can_ask_for_the_run_report(self):
+        '''Required to ensure that the parser is correctly configured to
+        print the run report or write it to a file'''
+        parsed = self.parser.parse_args(['TST', 'sync', '/path'])
+        self.assertEqual(parsed.report, None)
+        self.assertEqual(parsed.slowest, 10)
+
+        parsed = self.parser.parse_args(
+            ['--report', '-', 'TST', 'sync', '/path'],
+        )
+        self.assertEqual(parsed.report, '-')
+
+        parsed = self.parser.parse_args(
+            ['--report', 'report.json', '--slowest', '3', 'TST', 'sync',
+             '/path'],
+        )
+        self.assertEqual(parsed.report, 'report.json')
+        self.assertEqual(parsed.slowest, 3)
+
+    def test_can_export_the_metrics_of_the_run(self):
+        '''Required to ensure that the parser is correctly configured to
+        write the metrics for the node exporter or push them'''
+        parsed = self.parser.parse_args(['TST', 'sync', '/path'])
+        self.assertEqual(parsed.metrics, None)
+        self.assertEqual(parsed.pushgateway, None)
+
+        parsed = self.parser.parse_args(
+            ['--metrics', '/var/lib/node_exporter/git2sc.prom',
+             '--pushgateway', 'http://localhost:9091', 'TST', 'sync',
+             '/path'],
+        )
+        self.assertEqual(parsed.metrics, '/var/lib/node_exporter/git2sc.prom')
+        self.assertEqual(parsed.pushgateway, 'http://localhost:9091')
+
+    def test_can_resume_an_upload(self):
+        '''Required to ensure that the parser is correctly configured to
+        resume an interrupted upload'''
+        parsed = self.parser.parse_args(['TST', 'upload', '/path'])
+        self.assertEqual(parsed.resume, False)
+        self.assertEqual(parsed.journal, None)
+
+        parsed = self.parser.parse_args(
+            ['TST', 'upload', '/path', '--resume', '--journal', 'journal'],
+        )
+        self.assertEqual(parsed.resume, True)
+        self.assertEqual(parsed.journal, 'journal')
+
+    def test_has_subcommand_plan(self):
+        '''Required to ensure that the parser is correctly configured to
+        plan a sync without changing the space'''
+        parsed = self.parser.parse_args(
+            ['TST', 'plan', '/path', '-o', 'plan.json', '-j', '2'],
+        )
+        self.assertEqual(parsed.subcommand, 'plan')
+        self.assertEqual(parsed.path, '/path')
+        self.assertEqual(parsed.output, 'plan.json')
+        self.assertEqual(parsed.jobs, 2)
+        self.assertEqual(
+            parsed.exclude,
+            ['.git', '.gitignore', '.gitmodules'],
+        )
+
+    def test_has_subcommand_plan_can_specify_parent_id(self):
+        '''Required to plan the sync of a directory uploaded below a parent
+        article'''
+        parsed = self.parser.parse_args(['TST', 'plan', '/path', '-p', '1'])
+        self.assertEqual(parsed.parent_id, '1')
+
+    def test_has_subcommand_apply(self):
+        '''Required to ensure that the parser is correctly configured to
+        apply a saved plan'''
+        parsed = self.parser.parse_args(['TST', 'apply', 'plan.json'])
+        self.assertEqual(parsed.subcommand, 'apply')
+        self.assertEqual(parsed.plan, 'plan.json')
+        self.assertEqual(parsed.workers, 4)
+        self.assertEqual(parsed.max_deletes, None)
+
+    def test_can_disable_the_gitignore_files(self):
+        '''Required to ensure that the parser is correctly configured to
+        publish the files ignored by git'''
+        parsed = self.parser.parse_args(['TST', 'sync', '/path'])
+        self.assertEqual(parsed.no_gitignore, False)
+
+        parsed = self.parser.parse_args(
+            ['--no-gitignore', 'TST', 'sync', '/path'],
+        )
+        self.assertEqual(parsed.no_gitignore, True)
+
+    def test_upload_sync_and_plan_can_publish_a_git_ref(self):
+        '''Required to ensure that the parser is correctly configured to
+        publish a ref without checking it out'''
+        for subcommand in ('upload', 'sync', 'plan'):
+            parsed = self.parser.parse_args(['TST', subcommand, '/path'])
+            self.assertEqual(parsed.ref, None)
+            parsed = self.parser.parse_args(
+                ['TST', subcommand, '/mirror.git', '--ref', 'release/1.0'],
+            )
+            self.assertEqual(parsed.ref, 'release/1.0')
@@ -0,0 +1,58 @@
+import unittest
+from git2sc.content import normalize_storage, content_hash
+
+
+class TestNormalizeStorage(unittest.TestCase):
+    '''Test class for the normalize_storage function'''
+
+    def test_removes_the_doctype(self):
+        '''Confluence doesn't store the doctype of the documents'''
+
+        self.assertEqual(
+            normalize_storage('<!DOCTYPE html>\n<p>Text</p>'),
+            '<p>Text</p>',
+        )
+
+    def test_self_closes_the_void_tags(self):
+        '''Confluence stores the void tags self closed'''
+
+        self.assertEqual(
+            normalize_storage('<p>a<br>b<BR/>c</br><img src="x.png"></p>'),
+            '<p>a<br />b<br />c<img src="x.png" /></p>',
+        )
+
+    def test_does_not_touch_tags_starting_like_void_tags(self):
+        '''Required to avoid breaking tags like colgroup or brain'''
+
+        self.assertEqual(
+            normalize_storage('<colgroup><col></colgroup>'),
+            '<colgroup><col /></colgroup>',
+        )
+
+    def test_unescapes_entities_but_the_xml_ones(self):
+        '''Confluence replaces the entities with their characters'''
+
+        self.assertEqual(
+            normalize_storage('<p>it&rsquo;s &#8212; &lt;b&gt; &amp;</p>'),
+            '<p>it’s — &lt;b&gt; &amp;</p>',
+        )
+
+    def test_collapses_whitespace(self):
+        '''Confluence changes the whitespace between tags'''
+
+        self.assertEqual(
+            normalize_storage('\n<ul>\n  <li>One   item</li>\n</ul>\n'),
+            '<ul><li>One item</li></ul>',
+        )
+
+    def test_content_hash_is_equal_for_equivalent_html(self):
+        '''Required to skip the update of pages without changes'''
+
+        self.assertEqual(
+            content_hash('<p>Text<br></p>\n'),
+            content_hash('<p>Text<br /></p>'),
+        )
+        self.assertNotEqual(
+            content_hash('<p>Text</p>'),
+            content_hash('<p>Other text</p>'),
+        )
@@ -0,0 +1,108 @@
+import time
+import threading
+import unittest
+from git2sc.convert import ConversionPool, parse_converter_limit
+
+
+class TestConversionPool(unittest.TestCase):
+    '''Test class for the ConversionPool class'''
+
+    def test_converts_inline_with_one_job(self):
+        '''Required to keep the order of a plain loop by default'''
+
+        calls = []
+
+        def convert(file_path):
+            calls.append(file_path)
+            return '<p>{}</p>'.format(file_path)
+
+        pool = ConversionPool(convert)
+
+        future = pool.submit('README.adoc')
+
+        self.assertEqual(calls, ['README.adoc'])
+        self.assertEqual(future.result(), '<p>README.adoc</p>')
+        pool.shutdown()
+
+    def test_converts_files_in_parallel(self):
+        '''Required to use all the cores when converting big repositories'''
+
+        barrier = threading.Barrier(4, timeout=5)
+
+        def convert(file_path):
+            barrier.wait()
+            return file_path
+
+        pool = ConversionPool(convert, jobs=4)
+
+        futures = [
+            pool.submit('doc_{}.md'.format(index)) for index in range(4)
+        ]
+        pool.shutdown()
+
+        self.assertEqual(
+            [future.result() for future in futures],
+            ['doc_0.md', 'doc_1.md', 'doc_2.md', 'doc_3.md'],
+        )
+
+    def test_respects_the_limit_of_each_converter(self):
+        '''Required to avoid running more asciidoctor processes than the
+        runner can afford'''
+
+        lock = threading.Lock()
+        running = {'.adoc': 0, '.md': 0}
+        maximum = {'.adoc': 0, '.md': 0}
+
+        def convert(file_path):
+            extension = file_path[file_path.rindex('.'):]
+            with lock:
+                running[extension] += 1
+                maximum[extension] = max(
+                    maximum[extension],
+                    running[extension],
+                )
+            time.sleep(0.01)
+            with lock:
+                running[extension] -= 1
+            return file_path
+
+        pool = ConversionPool(convert, jobs=8, limits={'.adoc': 2})
+
+        for index in range(8):
+            pool.submit('doc_{}.adoc'.format(index))
+            pool.submit('doc_{}.md'.format(index))
+        pool.shutdown()
+
+        self.assertLessEqual(maximum['.adoc'], 2)
+        self.assertGreater(maximum['.md'], 2)
+
+    def test_errors_are_stored_in_the_future(self):
+        '''Required to let the caller decide what to do with a failed
+        conversion'''
+
+        def convert(file_path):
+            raise ValueError(file_path)
+
+        pool = ConversionPool(convert)
+
+        future = pool.submit('broken.adoc')
+
+        self.assertIsInstance(future.exception(), ValueError)
+
+    def test_interruptions_are_not_stored_in_the_future(self):
+        '''Required to stop a run with Ctrl-C during an inline conversion'''
+
+        def convert(file_path):
+            raise KeyboardInterrupt()
+
+        pool = ConversionPool(convert)
+
+        with self.assertRaises(KeyboardInterrupt):
+            pool.submit('slow.adoc')
+
+    def test_can_parse_converter_limits(self):
+        '''Required to configure the converter limits from the command
+        line'''
+
+        self.assertEqual(parse_converter_limit('adoc=2'), ('.adoc', 2))
+        self.assertEqual(parse_converter_limit('.md=4'), ('.md', 4))
@@ -0,0 +1,234 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import requests
+from collections import Counter
+from git2sc.fake import (
+    FakeConfluence,
+    FakeConfluenceServer,
+    change_files,
+    generate_repository,
+)
+from git2sc.git2sc import Git2SC
+from git2sc.state import SyncState
+
+
+class TestFakeConfluenceServer(unittest.TestCase):
+    '''Test class for the FakeConfluenceServer class, git2sc talks to it
+    through http'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = FakeConfluenceServer(space='TST').start()
+        self.confluence = self.server.confluence
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def git2sc(self, **kwargs):
+        return Git2SC(
+            self.server.url,
+            'user:password',
+            'TST',
+            markdown_engine='native',
+            **kwargs
+        )
+
+    def test_git2sc_can_upload_and_sync_a_repository(self):
+        '''Required to measure git2sc end to end without confluence'''
+
+        generate_repository(self.directory, depth=1, fan_out=2, files=3)
+
+        g = self.git2sc()
+        g.directory_full_upload(self.directory, ['.git'], workers=4)
+
+        # The homepage and the pages of 2 directories and 9 documents
+        self.assertEqual(len(self.confluence.pages), 12)
+        self.assertEqual(g.stats['created'], 11)
+        page = self.confluence.pages[self.confluence.titles['docs_0_page_1']]
+        self.assertEqual(
+            self.confluence.pages[page['parent']]['title'],
+            'docs_0',
+        )
+        self.assertIn('<h1>docs_0_page_1</h1>', page['body'])
+
+        self.assertEqual(change_files(self.directory, 0.5), 4)
+        g = self.git2sc()
+        g.directory_update(self.directory, ['.git'], workers=4)
+
+        self.assertEqual(g.stats['updated'], 4)
+        self.assertEqual(g.stats['deleted'], 0)
+        self.assertEqual(len(self.confluence.pages), 12)
+        self.assertGreater(self.confluence.requests['GET content search'], 0)
+
+    def test_repeated_sync_with_state_writes_nothing(self):
+        '''Required to not create a version of every directory page in each
+        sync of an unchanged repository'''
+
+        generate_repository(self.directory, depth=1, fan_out=2, files=3)
+        state = SyncState(':memory:', 'TST')
+        self.git2sc(state=state).directory_update(self.directory, ['.git'])
+        writes = Counter(self.confluence.requests)
+
+        g = self.git2sc(state=state)
+        g.directory_update(self.directory, ['.git'], workers=4)
+
+        for request in ('POST content', 'PUT content', 'DELETE content'):
+            self.assertEqual(
+                self.confluence.requests[request],
+                writes[request],
+            )
+        self.assertEqual(g.stats['skipped'], 12)
+
+    def test_plan_after_an_upload_with_state_changes_nothing(self):
+        '''Required to not update the homepage and the directory pages in
+        the first sync after an upload'''
+
+        generate_repository(self.directory, depth=1, fan_out=2, files=3)
+        state = SyncState(':memory:', 'TST')
+        self.git2sc(state=state).directory_full_upload(
+            self.directory,
+            ['.git'],
+        )
+
+        plan = self.git2sc(state=state).plan_update(self.directory, ['.git'])
+
+        self.assertEqual(
+            Counter(operation['op'] for operation in plan.operations),
+            {'skip': 12},
+        )
+
+    def test_throttled_requests_are_retried(self):
+        '''Required to measure git2sc when confluence throttles it'''
+
+        self.confluence.throttle_every = 3
+
+        g = self.git2sc()
+        g.create_page('page', '<p>Page</p>')
+        g.create_page('other', '<p>Other</p>')
+
+        self.assertEqual(g.stats['created'], 2)
+        self.assertEqual(self.confluence.throttled, 1)
+        self.assertEqual(g.throttle.throttled, 1)
+
+    def test_listings_are_capped_to_the_max_page_size(self):
+        '''Required to check that git2sc reads all the batches of a space'''
+
+        self.confluence.max_page_size = 2
+        for index in range(4):
+            self.confluence._add_page(str(index), '', '1')
+
+        g = self.git2sc(listing_concurrency=1)
+
+        self.assertEqual(len(g.pages), 5)
+        self.assertEqual(self.confluence.requests['GET space content'], 3)
+
+    def test_updates_need_the_next_version_and_unique_titles(self):
+        '''Required to behave as confluence when the client is wrong'''
+
+        pageid = self.confluence._add_page('page', '', None)
+        self.confluence._add_page('other', '', None)
+        url = '{}/content/{}'.format(self.server.url, pageid)
+
+        def update(version, title):
+            return requests.put(url, data=json.dumps({
+                'title': title,
+                'version': {'number': version},
+                'body': {'storage': {'value': '<p>New</p>'}},
+            }))
+
+        self.assertEqual(update(3, 'page').status_code, 409)
+        self.assertEqual(update(2, 'other').status_code, 400)
+        r = update(2, 'renamed')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()['version'], {'number': 2})
+        self.assertEqual(self.confluence.titles['renamed'], pageid)
+        self.assertEqual(requests.get(url + '0').status_code, 404)
+
+    def test_deleted_pages_leave_their_children_to_their_parent(self):
+        '''Required to keep the tree consistent whatever the order of the
+        deletions'''
+
+        parent_id = self.confluence._add_page('parent', '', '1')
+        child_id = self.confluence._add_page('child', '', parent_id)
+
+        r = requests.delete('{}/content/{}'.format(
+            self.server.url,
+            parent_id,
+        ))
+
+        self.assertEqual(r.status_code, 204)
+        self.assertEqual(
+            self.confluence._page(child_id)['ancestors'],
+            [{'id': '1', 'type': 'page', 'title': 'TST Home'}],
+        )
+
+
+class TestFakeConfluence(unittest.TestCase):
+    '''Test class for the FakeConfluence class'''
+
+    def test_counts_the_requests_by_endpoint(self):
+        '''Required to know the requests per page of a benchmark'''
+
+        confluence = FakeConfluence(space='TST')
+
+        confluence.handle('GET', '/rest/api/space/TST')
+        confluence.handle('GET', '/rest/api/content/1')
+        confluence.handle('GET', '/rest/api/content/2')
+
+        self.assertEqual(
+            confluence.requests,
+            {'GET space': 1, 'GET content': 2},
+        )
+
+
+class TestGenerateRepository(unittest.TestCase):
+    '''Test class for the generate_repository function'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_writes_a_tree_of_the_desired_size(self):
+        '''Required to benchmark repositories of different shapes'''
+
+        counts = generate_repository(
+            self.directory,
+            depth=2,
+            fan_out=3,
+            files=4,
+            file_size=1000,
+            adoc_ratio=0.5,
+        )
+
+        self.assertEqual(counts, {'directories': 13, 'documents': 52})
+        files = []
+        for root, directories, names in os.walk(self.directory):
+            files += names
+        self.assertEqual(len(files), 65)
+        self.assertEqual(len(set(files) - {'README.md'}), 52)
+        self.assertTrue(any(name.endswith('.adoc') for name in files))
+        self.assertTrue(any(name.endswith('.md') for name in files))
+        path = os.path.join(self.directory, 'docs_1', 'docs_1_page_0')
+        for extension in ('.md', '.adoc'):
+            if os.path.exists(path + extension):
+                self.assertGreater(os.path.getsize(path + extension), 1000)
+
+    def test_is_reproducible(self):
+        '''Required to compare the benchmarks of different versions'''
+
+        other = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, other)
+
+        generate_repository(self.directory, depth=1, seed=3)
+        generate_repository(other, depth=1, seed=3)
+
+        with open(os.path.join(self.directory, 'docs_2', 'README.md')) as f:
+            first = f.read()
+        with open(os.path.join(other, 'docs_2', 'README.md')) as f:
+            self.assertEqual(f.read(), first)
@@ -0,0 +1,193 @@
+import os
+import shutil
+import tempfile
+import unittest
+import subprocess
+from git2sc import git
+
+
+class TestGit(unittest.TestCase):
+    '''Test class for the git helpers, they run against a temporal git
+    repository'''
+
+    def setUp(self):
+        self.repository = tempfile.mkdtemp()
+        self._git('init', '-q')
+        self._git('config', 'user.email', 'test@example.com')
+        self._git('config', 'user.name', 'Test')
+        os.makedirs(os.path.join(self.repository, 'docs', 'guide'))
+        self._write('docs/README.md', 'Docs')
+        self._write('docs/guide/install.adoc', 'Install')
+        self._write('docs/guide/remove.adoc', 'Remove')
+        self._write('outside.md', 'Outside')
+        self._commit('Initial commit')
+        self.first_commit = git.head(self.repository)
+
+    def tearDown(self):
+        shutil.rmtree(self.repository)
+
+    def _git(self, *arguments):
+        subprocess.check_output(
+            ['git', '-C', self.repository] + list(arguments),
+        )
+
+    def _write(self, file_path, content):
+        with open(os.path.join(self.repository, file_path), 'w') as f:
+            f.write(content)
+
+    def _commit(self, message):
+        self._git('add', '-A')
+        self._git('commit', '-q', '-m', message)
+
+    def test_can_get_head(self):
+        '''Required to record the last published commit'''
+
+        self.assertEqual(len(git.head(self.repository)), 40)
+
+    def test_can_get_changed_files_relative_to_path(self):
+        '''Required to sync only the files that changed under the synced
+        directory'''
+
+        self._write('docs/guide/install.adoc', 'Install it')
+        self._write('docs/guide/new.md', 'New')
+        self._write('outside.md', 'Changed outside')
+        os.remove(os.path.join(self.repository, 'docs/guide/remove.adoc'))
+        self._commit('Change the docs')
+
+        changes = git.changed_files(
+            os.path.join(self.repository, 'docs'),
+            self.first_commit,
+        )
+
+        self.assertEqual(
+            changes,
+            {
+                'guide/install.adoc': 'M',
+                'guide/new.md': 'A',
+                'guide/remove.adoc': 'D',
+            },
+        )
+
+    def test_renames_are_a_deletion_and_an_addition(self):
+        '''Required to delete the page of the old file'''
+
+        self._git('mv', 'docs/guide/remove.adoc', 'docs/guide/renamed.adoc')
+        self._commit('Rename')
+
+        changes = git.changed_files(self.repository, self.first_commit)
+
+        self.assertEqual(
+            changes,
+            {
+                'docs/guide/remove.adoc': 'D',
+                'docs/guide/renamed.adoc': 'A',
+            },
+        )
+
+    def test_changed_files_are_not_quoted(self):
+        '''Required to find the files with non ascii characters in the sync
+        state and the index'''
+
+        self._write('docs/guide/caf\u00e9 "menu".md', 'Menu')
+        self._commit('Add the menu')
+
+        changes = git.changed_files(self.repository, self.first_commit)
+
+        self.assertEqual(changes, {'docs/guide/caf\u00e9 "menu".md': 'A'})
+
+    def test_can_list_the_directories_of_a_commit(self):
+        '''Required to know which directories an incremental sync removed'''
+
+        self._git('rm', '-q', '-r', 'docs/guide')
+        self._commit('Remove the guide')
+
+        self.assertEqual(
+            git.directories(
+                os.path.join(self.repository, 'docs'),
+                self.first_commit,
+            ),
+            {'guide'},
+        )
+        self.assertEqual(git.directories(self.repository), {'docs'})
+
+    def test_can_read_and_write_the_last_commit(self):
+        '''Required to know from which commit to sync'''
+
+        self.assertEqual(git.read_last_commit(self.repository, 'TST'), None)
+
+        git.write_last_commit(self.repository, 'TST', self.first_commit)
+
+        self.assertEqual(
+            git.read_last_commit(self.repository, 'TST'),
+            self.first_commit,
+        )
+        self.assertEqual(git.read_last_commit(self.repository, 'OTHER'), None)
+
+    def test_blob_hash_is_the_git_blob_id(self):
+        '''Required to hash the files outside the index like git does'''
+
+        self.assertEqual(
+            git.blob_hash(b'hello\n'),
+            'ce013625030ba8dba906f756967f9e9ca394464a',
+        )
+
+    def test_index_blobs_returns_the_unmodified_files_below_path(self):
+        '''Required to detect the changed files without opening them'''
+
+        self._write('docs/guide/install.adoc', 'Install it')
+        self._write('docs/untracked.md', 'Untracked')
+
+        blobs = git.index_blobs(os.path.join(self.repository, 'docs'))
+
+        self.assertEqual(
+            sorted(blobs.keys()),
+            ['README.md', 'guide/remove.adoc'],
+        )
+        self.assertEqual(blobs['README.md'], git.blob_hash(b'Docs'))
+
+    def test_prefix_is_the_path_relative_to_the_top(self):
+        '''Required to find the tree of the published directory in a ref'''
+
+        self.assertEqual(git.prefix(self.repository), '')
+        self.assertEqual(
+            git.prefix(os.path.join(self.repository, 'docs')),
+            'docs/',
+        )
+
+    def test_cat_file_reads_the_trees_and_blobs_of_a_ref(self):
+        '''Required to publish a ref without checking it out'''
+
+        self._write('docs/README.md', 'Changed in the working tree')
+        cat_file = git.CatFile(self.repository)
+        self.addCleanup(cat_file.close)
+
+        tree_id, entries = cat_file.tree('HEAD:docs')
+
+        self.assertEqual(len(tree_id), 40)
+        self.assertEqual(
+            [(mode, name) for mode, name, object_id in entries],
+            [('100644', 'README.md'), ('40000', 'guide')],
+        )
+        self.assertEqual(entries[0][2], git.blob_hash(b'Docs'))
+        self.assertEqual(
+            cat_file.read(entries[0][2]),
+            (entries[0][2], 'blob', b'Docs'),
+        )
+        guide_entries = cat_file.tree(entries[1][2])[1]
+        self.assertEqual(
+            [name for mode, name, object_id in guide_entries],
+            ['install.adoc', 'remove.adoc'],
+        )
+
+    def test_cat_file_raises_missing_object(self):
+        '''Required to report the refs that don't exist'''
+
+        cat_file = git.CatFile(self.repository)
+        self.addCleanup(cat_file.close)
+
+        with self.assertRaises(git.MissingObject):
+            cat_file.read('unknown:docs')
+        with self.assertRaises(git.MissingObject):
+            cat_file.tree('HEAD:outside.md')
+        # The process can still be used after a missing object
+        self.assertEqual(cat_file.read('HEAD:outside.md')[2], b'Outside')
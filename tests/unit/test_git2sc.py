@@ -1,8 +1,25 @@
 import os
 import json
+import time
+import shutil
+import tempfile
 import unittest
+import threading
+import subprocess
 from unittest.mock import patch, Mock, call
-from git2sc.git2sc import Git2SC, UnknownExtension
+from git2sc.git2sc import (
+    NO_README,
+    Git2SC,
+    TooManyDeletions,
+    UnknownExtension,
+)
+from git2sc.cache import HtmlCache
+from git2sc import git
+from git2sc.index import PageIndex
+from git2sc.journal import Journal
+from git2sc.plan import StalePlan, SyncPlan
+from git2sc.state import SyncState
+from git2sc.workers import WorkerUnavailable
 
 
 class TestGit2SC(unittest.TestCase):
@@ -14,8 +31,14 @@ class TestGit2SC(unittest.TestCase):
         self.auth = tuple(self.auth_string.split(':'))
         self.space = 'TST'
 
-        self.requests_patch = patch('git2sc.git2sc.requests', autospect=True)
-        self.requests = self.requests_patch.start()
+        self.build_session_patch = patch(
+            'git2sc.git2sc.build_session',
+            autospect=True,
+        )
+        self.build_session = self.build_session_patch.start()
+        self.session = Mock()
+        self.adapter = Mock()
+        self.build_session.return_value = (self.session, self.adapter)
         self.requests_error_patch = patch(
             'git2sc.git2sc.Git2SC._requests_error',
             autospect=True
@@ -39,7 +62,7 @@ class TestGit2SC(unittest.TestCase):
         self.git2sc = Git2SC(self.api_url, self.auth_string, self.space)
 
     def tearDown(self):
-        self.requests_patch.stop()
+        self.build_session_patch.stop()
         self.requests_error_patch.stop()
         self.print.stop()
         self.json_patch.stop()
@@ -61,11 +84,42 @@ class TestGit2SC(unittest.TestCase):
 
         self.assertEqual(self.git2sc.pages, {})
 
+    def test_pages_are_indexed(self):
+        '''Required to avoid scanning all the pages of the space for each
+        lookup'''
+
+        self.git2sc.pages = {'1': {'id': '1', 'title': 'Article1'}}
+
+        self.assertIsInstance(self.git2sc.pages, PageIndex)
+        self.assertEqual(self.git2sc.pages.get_id('Article1'), '1')
+
     def test_has_confluence_url_set(self):
         'Required attribute for some methods'
 
         self.assertEqual(self.git2sc.api_url, self.api_url)
 
+    def test_builds_pooled_session_on_init(self):
+        '''Required to reuse the connections between all the api calls'''
+
+        self.assertEqual(
+            self.build_session.assert_called_with(
+                self.auth,
+                pool_size=10,
+                timeout=(3.05, 60),
+                max_retries=3,
+                keep_alive=True,
+            ),
+            None,
+        )
+        self.assertEqual(self.git2sc.session, self.session)
+
+    def test_connection_stats_come_from_the_adapter(self):
+        '''Required to confirm that the connections are being reused'''
+
+        result = self.git2sc.connection_stats()
+
+        self.assertEqual(result, self.adapter.connection_stats.return_value)
+
     def test_get_space_articles_called_on_init(self):
         '''Required to test that get_space_articles get called on init, this
         is a requirement for create_page, update_page and other methods '''
@@ -79,33 +133,33 @@ class TestGit2SC(unittest.TestCase):
         page_id = '372274410'
         result = self.git2sc.get_page_info(page_id)
         self.assertEqual(
-            self.requests.get.assert_called_with(
+            self.session.request.assert_called_with(
+                'GET',
                 '{}/content/{}?expand=ancestors,body.storage,version'.format(
                     self.api_url,
                     page_id,
                 ),
-                auth=self.auth
             ),
             None,
         )
         self.assertTrue(self.requests_error.called)
-        self.assertEqual(result, self.requests.get.return_value.json())
+        self.assertEqual(result, self.session.request.return_value.json())
 
     def test_can_get_space_homepage(self):
         '''Required to ensure that the get_space_homepage method calls the
         correct api endpoint and returns the article id'''
 
-        self.requests.get.return_value.json.return_value = {
+        self.session.request.return_value.json.return_value = {
             '_expandable': {'homepage': '/rest/api/content/372334010'},
         }
         result = self.git2sc.get_space_homepage()
         self.assertEqual(
-            self.requests.get.assert_called_with(
+            self.session.request.assert_called_with(
+                'GET',
                 '{}/space/{}'.format(
                     self.api_url,
                     self.space,
                 ),
-                auth=self.auth
             ),
             None,
         )
@@ -118,7 +172,7 @@ class TestGit2SC(unittest.TestCase):
         pages as a dictionary of dictionaries'''
 
         self.getspacearticles_patch.stop()
-        self.requests.get.return_value.json.return_value = {
+        self.session.request.return_value.json.return_value = {
             "page": {
                 "results": [
                     {
@@ -148,13 +202,13 @@ class TestGit2SC(unittest.TestCase):
         }
         self.git2sc.get_space_articles()
         self.assertEqual(
-            self.requests.get.assert_called_with(
+            self.session.request.assert_called_with(
+                'GET',
                 '{}/space/{}/content'
-                '?expand=body.storage&limit=5000&start=0'.format(
+                '?expand=version,ancestors&limit=100&start=0'.format(
                     self.api_url,
                     self.space,
                 ),
-                auth=self.auth
             ),
             None,
         )
@@ -162,6 +216,147 @@ class TestGit2SC(unittest.TestCase):
         self.assertEqual(self.git2sc.pages, desired_pages)
         self.getspacearticles_patch.start()
 
+    def _space_articles_response(self, total=None, limit=2):
+        '''Build a requests side effect that serves the pages 0..total-1 of a
+        space in batches of limit pages'''
+
+        def request_side_effect(method, url):
+            start = int(url.split('start=')[1])
+            results = [
+                {'id': str(page_id), 'title': 'Page {}'.format(page_id)}
+                for page_id in range(start, min(start + limit, 5))
+            ]
+            batch = {
+                'results': results,
+                'start': start,
+                'limit': limit,
+                'size': len(results),
+                '_links': {},
+            }
+            if start + limit < 5:
+                batch['_links']['next'] = '/next'
+            if total is not None:
+                batch['totalSize'] = total
+            response = Mock()
+            response.json.return_value = {'page': batch}
+            return response
+        return request_side_effect
+
+    def test_get_space_articles_follows_pagination(self):
+        '''Required to ensure that big spaces are not truncated to the first
+        batch of pages'''
+
+        self.getspacearticles_patch.stop()
+        self.session.request.side_effect = self._space_articles_response()
+
+        self.git2sc.get_space_articles()
+
+        self.assertEqual(
+            sorted(self.git2sc.pages.keys()),
+            ['0', '1', '2', '3', '4'],
+        )
+        requested_starts = sorted(
+            int(request_call[1][1].split('start=')[1])
+            for request_call in self.session.request.mock_calls
+        )
+        self.assertEqual(requested_starts[:3], [0, 2, 4])
+        self.getspacearticles_patch.start()
+
+    def test_get_space_articles_uses_total_size_when_known(self):
+        '''Required to ensure that when the server tells us the total number
+        of pages we request exactly the batches we need'''
+
+        self.getspacearticles_patch.stop()
+        self.session.request.side_effect = self._space_articles_response(
+            total=5,
+        )
+
+        self.git2sc.get_space_articles()
+
+        self.assertEqual(len(self.git2sc.pages), 5)
+        self.assertEqual(self.session.request.call_count, 3)
+        self.getspacearticles_patch.start()
+
+    def test_get_space_articles_uses_the_limit_returned_by_the_server(self):
+        '''Confluence caps the page size, the next batches have to start where
+        the server stopped and not where we asked'''
+
+        self.getspacearticles_patch.stop()
+        self.git2sc.listing_concurrency = 1
+        self.session.request.side_effect = self._space_articles_response(
+            limit=1,
+        )
+
+        pages = list(self.git2sc.iter_space_articles())
+
+        self.assertEqual([page['id'] for page in pages], list('01234'))
+        self.assertEqual(
+            self.session.request.mock_calls[1][1][1].split('&', 1)[1],
+            'limit=1&start=1',
+        )
+        self.getspacearticles_patch.start()
+
+    def test_can_load_bodies_in_bulk(self):
+        '''Required to ensure that the bodies of the pages are requested in
+        batches and only for the pages that don't have it'''
+
+        self.git2sc.page_size = 2
+        self.git2sc.pages = {
+            '1': {'id': '1'},
+            '2': {'id': '2'},
+            '3': {'id': '3'},
+            '4': {'id': '4', 'body': {'storage': {'value': 'loaded'}}},
+        }
+
+        def request_side_effect(method, url):
+            ids = url.split('%28')[1].split('%29')[0].split('%2C')
+            response = Mock()
+            response.json.return_value = {
+                'results': [
+                    {'id': pageid, 'body': {'storage': {'value': pageid}}}
+                    for pageid in ids
+                ]
+            }
+            return response
+        self.session.request.side_effect = request_side_effect
+
+        self.git2sc.load_bodies(['1', '2', '3', '4'])
+
+        self.assertEqual(self.session.request.call_count, 2)
+        self.assertEqual(
+            sorted(
+                request_call[1][1]
+                for request_call in self.session.request.mock_calls
+            ),
+            [
+                '{}/content/search?cql=id%20in%20%281%2C2%29'
+                '&expand=body.storage&limit=2'.format(self.api_url),
+                '{}/content/search?cql=id%20in%20%283%29'
+                '&expand=body.storage&limit=1'.format(self.api_url),
+            ]
+        )
+        self.assertEqual(
+            [
+                self.git2sc.pages[pageid]['body']['storage']['value']
+                for pageid in ['1', '2', '3', '4']
+            ],
+            ['1', '2', '3', 'loaded'],
+        )
+
+    @patch('git2sc.git2sc.Git2SC.get_page_info')
+    def test_load_bodies_fetches_the_pages_missing_in_the_search(
+        self,
+        getPageInfoMock,
+    ):
+        '''The search endpoint can cap the number of expanded bodies, make sure
+        that the missing ones are fetched'''
+
+        self.git2sc.pages = {'1': {'id': '1'}}
+        self.session.request.return_value.json.return_value = {'results': []}
+        getPageInfoMock.return_value = {'body': {'storage': {'value': 'body'}}}
+
+        self.assertEqual(self.git2sc.get_page_body('1'), 'body')
+
     def test_can_detect_if_title_exist_in_pages(self):
         '''You can't create more than one article with a specified title, test
         if title exists in the existing pages. test that it detects one'''
@@ -225,13 +420,13 @@ class TestGit2SC(unittest.TestCase):
         self.git2sc.update_page(page_id, html)
 
         self.assertEqual(
-            self.requests.put.assert_called_with(
+            self.session.request.assert_called_with(
+                'PUT',
                 '{}/content/{}'.format(
                     self.api_url,
                     page_id,
                 ),
                 data=data_json,
-                auth=self.auth,
                 headers={'Content-Type': 'application/json'},
             ),
             None,
@@ -273,19 +468,184 @@ class TestGit2SC(unittest.TestCase):
         self.git2sc.update_page(page_id, html)
 
         self.assertEqual(
-            self.requests.put.assert_called_with(
+            self.session.request.assert_called_with(
+                'PUT',
                 '{}/content/{}'.format(
                     self.api_url,
                     page_id,
                 ),
                 data=data_json,
-                auth=self.auth,
                 headers={'Content-Type': 'application/json'},
             ),
             None,
         )
         self.assertTrue(self.requests_error.called)
 
+    def test_update_page_skips_unchanged_pages(self):
+        '''Required to avoid creating a new version of the pages that don't
+        have changes'''
+
+        page_id = '372274410'
+        self.git2sc.pages = {
+            page_id: {
+                'version': {'number': 1},
+                'title': 'Test page title',
+                'ancestors': [],
+                'body': {'storage': {'value': '<p>Same<br/> content</p>'}},
+            },
+        }
+
+        result = self.git2sc.update_page(
+            page_id,
+            '<!DOCTYPE html>\n<p>Same<br>\n  content</p>\n',
+        )
+
+        self.assertFalse(result)
+        self.assertFalse(self.session.request.called)
+        self.assertEqual(self.git2sc.stats['skipped'], 1)
+
+    def test_update_page_updates_changed_pages(self):
+        '''Required to ensure that the pages with a loaded body are updated if
+        the content changed'''
+
+        page_id = '372274410'
+        self.git2sc.pages = {
+            page_id: {
+                'version': {'number': 1},
+                'title': 'Test page title',
+                'ancestors': [],
+                'body': {'storage': {'value': '<p>Old content</p>'}},
+            },
+        }
+
+        result = self.git2sc.update_page(page_id, '<p>New content</p>')
+
+        self.assertTrue(result)
+        self.assertTrue(self.session.request.called)
+        self.assertEqual(self.git2sc.stats['updated'], 1)
+
+    def test_update_page_updates_unchanged_pages_with_new_title(self):
+        '''Required to ensure that a title change is not skipped'''
+
+        page_id = '372274410'
+        self.git2sc.pages = {
+            page_id: {
+                'version': {'number': 1},
+                'title': 'Test page title',
+                'ancestors': [],
+                'body': {'storage': {'value': '<p>Same</p>'}},
+            },
+        }
+
+        self.assertTrue(
+            self.git2sc.update_page(page_id, '<p>Same</p>', 'New title')
+        )
+
+    def test_summary_reports_the_stats(self):
+        '''Required to know what a sync did'''
+
+        self.git2sc.stats.update(
+            {'created': 1, 'updated': 2, 'skipped': 3, 'deleted': 4}
+        )
+
+        self.assertEqual(
+            self.git2sc.summary(),
+            '1 created, 2 updated, 3 skipped because they had no changes, '
+            '4 deleted',
+        )
+
+    def test_summary_reports_the_scanned_entries(self):
+        '''Required to know how much of the tree the exclusions pruned'''
+
+        self.git2sc.stats.update({'scanned': 10, 'pruned': 4})
+
+        self.assertEqual(
+            self.git2sc.summary(),
+            '0 created, 0 updated, 0 skipped because they had no changes, '
+            '0 deleted. Scanned 10 entries, pruned 4',
+        )
+
+    def test_summary_reports_the_conversions(self):
+        '''Required to check that no file was converted twice'''
+
+        self.git2sc.conversions.update(['a.md', 'b.adoc'])
+
+        self.assertEqual(
+            self.git2sc.summary(),
+            '0 created, 0 updated, 0 skipped because they had no changes, '
+            '0 deleted. 2 conversions of 2 files',
+        )
+
+    @patch('git2sc.throttle.time.sleep')
+    def test_requests_are_retried_while_throttled(self, sleepMock):
+        '''Required to not die partway through a sync when confluence
+        throttles the requests'''
+
+        throttled = Mock(status_code=429, headers={'Retry-After': '3'})
+        accepted = Mock(status_code=200, headers={})
+        self.session.request.side_effect = [throttled, accepted]
+
+        self.assertEqual(self.git2sc._request('GET', 'url'), accepted)
+        self.assertEqual(self.session.request.call_count, 2)
+        sleepMock.assert_any_call(3)
+        self.assertIn(
+            'Throttled 1 times, waited 3.0s, 2 requests',
+            self.git2sc.summary(),
+        )
+
+    def test_requests_are_recorded_in_the_run_report(self):
+        '''Required to know the latency and the traffic of each endpoint of
+        the confluence api'''
+
+        self.session.request.return_value.content = b'{"id": "1"}'
+
+        self.git2sc._request(
+            'PUT',
+            '{}/content/1'.format(self.api_url),
+            data='{"id": "1"}',
+        )
+        self.git2sc._request('GET', '{}/content/2'.format(self.api_url))
+
+        self.assertEqual(
+            self.git2sc.report.requests['PUT /content/{id}']['sent'],
+            11,
+        )
+        self.assertEqual(
+            self.git2sc.report.requests['GET /content/{id}']['received'],
+            11,
+        )
+        self.assertEqual(self.git2sc.report.to_dict()['requests'], 2)
+
+    def test_update_page_keeps_the_version_of_the_page_updated(self):
+        '''Required to be able to update the same page twice without asking
+        confluence for the new version'''
+
+        page_id = '372274410'
+        self.git2sc.pages = {}
+        self.git2sc.pages[page_id] = {
+            'version': {'number': 1},
+            'title': 'Test page title',
+            'ancestors': [
+                {
+                    'id': '1',
+                    '_links': 'link',
+                    '_expandable': 'expandable',
+                    'extensions': 'extensions',
+                }
+            ],
+            'body': {'storage': {'value': '<p>Old</p>'}},
+        }
+
+        self.git2sc.update_page(page_id, '<p>New</p>')
+        self.git2sc.update_page(page_id, '<p>Newer</p>')
+
+        self.assertEqual(self.git2sc.pages[page_id]['version']['number'], 3)
+        self.assertNotIn('body', self.git2sc.pages[page_id])
+        self.assertEqual(
+            self.git2sc.pages[page_id]['ancestors'][0]['_links'],
+            'link',
+        )
+
     @patch('git2sc.git2sc.Git2SC.get_page_info')
     def test_can_update_articles_not_in_pages(self, getPageInfoMock):
         '''Required to ensure that the update_page method can update a page
@@ -345,7 +705,7 @@ class TestGit2SC(unittest.TestCase):
 
         response_data = {'id': '412254212', 'type': 'page'}
         response_data_json = json.dumps(response_data)
-        self.requests.post.return_value.text = response_data_json
+        self.session.request.return_value.text = response_data_json
         self.json.loads.return_value = response_data
 
         page_id = self.git2sc.create_page('new title', html)
@@ -355,10 +715,10 @@ class TestGit2SC(unittest.TestCase):
             None,
         )
         self.assertEqual(
-            self.requests.post.assert_called_with(
-                '{}/content'.format(self.api_url),
+            self.session.request.assert_called_with(
+                'POST',
+                '{}/content?expand=ancestors,version'.format(self.api_url),
                 data=requests_data_json,
-                auth=self.auth,
                 headers={'Content-Type': 'application/json'},
             ),
             None,
@@ -374,7 +734,8 @@ class TestGit2SC(unittest.TestCase):
         )
         self.assertEqual(page_id, '412254212')
 
-    def test_can_create_articles_as_a_child(self):
+    @patch('git2sc.git2sc.Git2SC.get_page_info', autospect=True)
+    def test_can_create_articles_as_a_child(self, getPageInfoMock):
         '''Required to ensure that the create_page method posts to the
         correct api endpoint with the correct data structure if inheritance
         is set'''
@@ -399,7 +760,7 @@ class TestGit2SC(unittest.TestCase):
 
         response_data = {'id': '412254212', 'type': 'page'}
         response_data_json = json.dumps(response_data)
-        self.requests.post.return_value.text = response_data_json
+        self.session.request.return_value.text = response_data_json
         self.json.loads.return_value = response_data
 
         page_id = self.git2sc.create_page('new title', html, parent_id)
@@ -409,10 +770,10 @@ class TestGit2SC(unittest.TestCase):
             None,
         )
         self.assertEqual(
-            self.requests.post.assert_called_with(
-                '{}/content'.format(self.api_url),
+            self.session.request.assert_called_with(
+                'POST',
+                '{}/content?expand=ancestors,version'.format(self.api_url),
                 data=requests_data_json,
-                auth=self.auth,
                 headers={'Content-Type': 'application/json'},
             ),
             None,
@@ -424,8 +785,46 @@ class TestGit2SC(unittest.TestCase):
         )
         self.assertEqual(page_id, '412254212')
 
+    @patch('git2sc.git2sc.Git2SC.get_page_info', autospect=True)
+    def test_create_page_indexes_the_page_from_the_response(
+        self,
+        getPageInfoMock,
+    ):
+        '''Required to create a page with a single request'''
+
+        self.json.dumps.side_effect = json.dumps
+        response_data = {
+            'id': '412254212',
+            'type': 'page',
+            'title': 'new title',
+            'version': {'number': 1},
+            'ancestors': [{'id': '372274410'}],
+            'body': {'storage': {'value': '<p>html</p>'}},
+        }
+        self.json.loads.return_value = response_data
+
+        page_id = self.git2sc.create_page('new title', '<p>html</p>', '1')
+
+        self.assertFalse(getPageInfoMock.called)
+        self.assertEqual(self.session.request.call_count, 1)
+        self.assertEqual(
+            self.git2sc.pages[page_id],
+            {
+                'id': '412254212',
+                'title': 'new title',
+                'version': {'number': 1},
+                'ancestors': [{'id': '372274410'}],
+            },
+        )
+        self.assertEqual(self.git2sc._get_article_id('new title'), page_id)
+
+    @patch('git2sc.git2sc.Git2SC.get_page_info', autospect=True)
     @patch('git2sc.git2sc.Git2SC._title_exist', autospect=True)
-    def test_can_create_articles_when_name_exists(self, titleexistMock):
+    def test_can_create_articles_when_name_exists(
+        self,
+        titleexistMock,
+        getPageInfoMock,
+    ):
         '''In Confluence even though they use an article_id, you can't have two
         articles with the same name, so this test makes sure that in this case
         the title will be '{}_{}'.format(directoryname, filename) -.-'''
@@ -507,6 +906,65 @@ class TestGit2SC(unittest.TestCase):
             return_value.replace('<!DOCTYPE html>\n', '')
         )
 
+    @patch('git2sc.git2sc.Git2SC._safe_load_file', autospect=True)
+    @patch('git2sc.git2sc.subprocess', autospect=True)
+    def test_can_process_adoc_from_a_git_ref(
+        self,
+        subprocessMock,
+        loadfileMock,
+    ):
+        '''Required to feed asciidoctor through stdin the files of a git
+        ref, without writing them to disk'''
+        self.git2sc.cat_file = Mock()
+        self.git2sc.cat_file.read.return_value = ('blob_id', 'blob', b'= A')
+        self.git2sc.blobs = {'docs/file.adoc': 'blob_id'}
+
+        self.git2sc._process_adoc('docs/file.adoc')
+
+        self.assertEqual(
+            self.git2sc.cat_file.read.assert_called_with('blob_id'),
+            None,
+        )
+        self.assertEqual(
+            subprocessMock.check_output.assert_called_with(
+                ['asciidoctor', '-b', 'xhtml', '-', '-o', '-'],
+                input=b'= A',
+                shell=False,
+            ),
+            None,
+        )
+        self.assertFalse(loadfileMock.called)
+
+    @patch('git2sc.git2sc.Git2SC._safe_load_file', autospect=True)
+    @patch('git2sc.git2sc.pypandoc', autospect=True)
+    def test_can_process_md_and_html_from_a_git_ref(
+        self,
+        pypandocMock,
+        loadfileMock,
+    ):
+        '''Required to convert the files of a git ref without writing them
+        to disk'''
+        self.git2sc.cat_file = Mock()
+        self.git2sc.cat_file.read.return_value = ('blob_id', 'blob', b'# A')
+        self.git2sc.blobs = {
+            'docs/file.md': 'blob_id',
+            'docs/file.html': 'blob_id',
+        }
+
+        result = self.git2sc._process_md('docs/file.md')
+
+        self.assertEqual(result, pypandocMock.convert_text.return_value)
+        self.assertEqual(
+            pypandocMock.convert_text.assert_called_with(
+                '# A',
+                'html',
+                format='md',
+            ),
+            None,
+        )
+        self.assertEqual(self.git2sc._process_html('docs/file.html'), '# A')
+        self.assertFalse(loadfileMock.called)
+
     @patch('git2sc.git2sc.Git2SC._safe_load_file', autospect=True)
     @patch('git2sc.git2sc.open', autospect=True)
     def test_can_process_html(self, openMock, loadfileMock):
@@ -530,6 +988,100 @@ class TestGit2SC(unittest.TestCase):
             openMock.return_value.__enter__.return_value.read.return_value
         )
 
+    @patch('git2sc.git2sc.Git2SC._safe_load_file')
+    @patch('git2sc.git2sc.subprocess')
+    def test_can_process_adoc_with_warm_converters(
+        self,
+        subprocessMock,
+        loadfileMock,
+    ):
+        '''Required to ensure that the warm asciidoctor workers are used when
+        they are available'''
+        self.git2sc.warm_converters = Mock()
+        self.git2sc.warm_converters.convert_adoc.return_value = \
+            '<!DOCTYPE html>\n<html></html>'
+
+        result = self.git2sc._process_adoc('/path/to/file')
+
+        self.assertEqual(result, '<html></html>')
+        self.assertEqual(
+            self.git2sc.warm_converters.convert_adoc.assert_called_with(
+                loadfileMock.return_value,
+                None,
+            ),
+            None,
+        )
+        self.assertFalse(subprocessMock.check_output.called)
+
+    @patch('git2sc.git2sc.Git2SC._safe_load_file')
+    @patch('git2sc.git2sc.pypandoc')
+    def test_can_process_md_with_the_native_engine(
+        self,
+        pypandocMock,
+        loadfileMock,
+    ):
+        '''Required to ensure that the native engine converts the markdown
+        files without pandoc, and falls back to pandoc when they use syntax
+        it doesn't support'''
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        loadfileMock.side_effect = lambda path: path
+        supported_file = os.path.join(directory, 'supported.md')
+        with open(supported_file, 'w') as f:
+            f.write('# Title')
+        unsupported_file = os.path.join(directory, 'unsupported.md')
+        with open(unsupported_file, 'w') as f:
+            f.write('<div>Title</div>')
+        self.git2sc.markdown_engine = 'native'
+
+        self.assertEqual(
+            self.git2sc._process_md(supported_file),
+            '<h1>Title</h1>',
+        )
+        self.assertFalse(pypandocMock.convert_file.called)
+
+        self.assertEqual(
+            self.git2sc._process_md(unsupported_file),
+            pypandocMock.convert_file.return_value,
+        )
+        self.assertEqual(self.git2sc.stats['markdown_fallbacks'], 1)
+
+    @patch('git2sc.git2sc.pypandoc')
+    def test_native_engine_cache_key_works_without_pandoc(self, pypandocMock):
+        '''Required to ensure that the html of the native engine is cached
+        apart from the pandoc one, even if pandoc is not installed'''
+        pypandocMock.get_pandoc_version.side_effect = OSError
+        self.git2sc.markdown_engine = 'native'
+
+        self.assertEqual(
+            self.git2sc._converter('.md'),
+            ('git2sc-markdown', '1 pandoc None', ['storage']),
+        )
+
+    @patch('git2sc.git2sc.Git2SC._safe_load_file')
+    @patch('git2sc.git2sc.pypandoc')
+    def test_process_md_falls_back_if_no_warm_converters(
+        self,
+        pypandocMock,
+        loadfileMock,
+    ):
+        '''Required to ensure that the markdown files are converted with
+        pypandoc when pandoc has no server mode'''
+        self.git2sc.warm_converters = Mock()
+        self.git2sc.warm_converters.convert_md.side_effect = \
+            WorkerUnavailable
+
+        result = self.git2sc._process_md('/path/to/file')
+
+        self.assertEqual(result, pypandocMock.convert_file.return_value)
+        self.assertEqual(
+            pypandocMock.convert_file.assert_called_with(
+                loadfileMock.return_value,
+                'html',
+            ),
+            None,
+        )
+
     @patch('git2sc.git2sc.Git2SC._safe_load_file')
     @patch('git2sc.git2sc.pypandoc')
     def test_can_process_md(self, pypandocMock, loadfileMock):
@@ -601,42 +1153,200 @@ class TestGit2SC(unittest.TestCase):
             mdMock.return_value
         )
 
-    def test_import_file_exits_gracefully_if_extension_unknown(self):
-        '''Required to ensure that the import_file method doesn't crash if
-        the extension is unknown'''
-        path_to_file = '/path/to/file.unknown_extension'
-        with self.assertRaises(UnknownExtension):
-            self.git2sc.import_file(path_to_file)
-
-    def test_can_delete_articles(self):
-        '''Required to ensure that the delete_page method posts to the
-        correct api endpoint with the correct data structure'''
+    @patch('git2sc.git2sc.Git2SC._process_md', autospect=True)
+    @patch('git2sc.git2sc.Git2SC._process_adoc', autospect=True)
+    def test_import_file_records_the_conversions_in_the_run_report(
+        self,
+        adocMock,
+        mdMock,
+    ):
+        '''Required to know how long each converter and file takes'''
+        self.os.path.splitext.side_effect = os.path.splitext
+        self.git2sc.markdown_engine = 'native'
 
-        page_id = '372274410'
-        self.requests.delete.return_value.status_code = 204
+        self.git2sc.import_file('/path/to/file.adoc')
+        self.git2sc.import_file('/path/to/file.md')
 
-        self.git2sc.delete_page(page_id)
+        self.assertEqual(
+            sorted(self.git2sc.report.conversions),
+            ['asciidoctor', 'git2sc-markdown'],
+        )
+        self.assertEqual(
+            sorted(self.git2sc.report.files),
+            ['/path/to/file.adoc', '/path/to/file.md'],
+        )
 
+    @patch('git2sc.git2sc.pypandoc')
+    @patch('git2sc.git2sc.Git2SC._process_md', autospect=True)
+    def test_import_file_uses_the_html_cache(self, mdMock, pypandocMock):
+        '''Required to ensure that the files are only converted again when
+        their source or the converter change'''
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path_to_file = os.path.join(directory, 'file.md')
+        with open(path_to_file, 'w') as f:
+            f.write('# Title')
+        self.os.path.splitext.side_effect = os.path.splitext
+        pypandocMock.get_pandoc_version.return_value = '2.2.1'
+        mdMock.return_value = '<h1>Title</h1>'
+        self.git2sc.cache = HtmlCache(os.path.join(directory, 'cache'))
+
+        for _ in range(2):
+            self.assertEqual(
+                self.git2sc.import_file(path_to_file),
+                '<h1>Title</h1>',
+            )
+        self.assertEqual(mdMock.call_count, 1)
+
+        with open(path_to_file, 'w') as f:
+            f.write('# Other title')
+        self.git2sc.import_file(path_to_file)
+        self.assertEqual(mdMock.call_count, 2)
+
+        self.git2sc._converter_versions = {}
+        pypandocMock.get_pandoc_version.return_value = '2.3'
+        self.git2sc.import_file(path_to_file)
+        self.assertEqual(mdMock.call_count, 3)
+
+        self.assertEqual(self.git2sc.stats['cache_hits'], 1)
+        self.assertEqual(self.git2sc.stats['cache_misses'], 3)
         self.assertEqual(
-            self.requests.delete.assert_called_with(
-                '{}/content/{}'.format(self.api_url, page_id),
-                auth=self.auth,
-            ),
-            None,
+            self.git2sc.summary(),
+            '0 created, 0 updated, 0 skipped because they had no changes, '
+            '0 deleted. Html cache: 1 hits, 3 misses',
         )
-        self.assertFalse(self.requests_error.called)
+
+    @patch('git2sc.git2sc.open')
+    @patch('git2sc.git2sc.git', autospect=True)
+    def test_source_hash_comes_from_the_git_index(self, gitMock, openMock):
+        '''Required to detect the unchanged files without opening them'''
+
+        self.os.path.join.side_effect = os.path.join
+        self.git2sc.state = SyncState(':memory:', self.space)
+        gitMock.index_blobs.return_value = {'guide/install.md': 'blob_id'}
+
+        self.git2sc._load_blobs('docs')
+
+        self.assertEqual(
+            gitMock.index_blobs.assert_called_with('docs'),
+            None,
+        )
+        self.assertEqual(
+            self.git2sc._blob_id('docs/guide/install.md'),
+            'blob_id',
+        )
+        self.git2sc._source_hash('docs/guide/install.md')
+        self.assertFalse(openMock.called)
+
+        self.git2sc._source_hash('docs/guide/untracked.md')
+        self.assertEqual(
+            gitMock.blob_hash.assert_called_with(
+                openMock.return_value.__enter__.return_value.read.return_value,
+            ),
+            None,
+        )
+
+    @patch('git2sc.git2sc.pypandoc', autospect=True)
+    def test_source_hash_changes_with_the_converter(self, pypandocMock):
+        '''Required to publish again the unchanged files when the markdown
+        engine or the converter version changes'''
+
+        self.os.path.splitext.side_effect = os.path.splitext
+        self.git2sc.state = SyncState(':memory:', self.space)
+        self.git2sc.blobs = {'docs/install.md': 'blob_id'}
+        pypandocMock.get_pandoc_version.return_value = '2.5'
+        pandoc_hash = self.git2sc._source_hash('docs/install.md')
+
+        self.git2sc.markdown_engine = 'native'
+        native_hash = self.git2sc._source_hash('docs/install.md')
+
+        self.git2sc.markdown_engine = 'pandoc'
+        self.git2sc._converter_versions = {}
+        pypandocMock.get_pandoc_version.return_value = '3.1'
+        upgraded_hash = self.git2sc._source_hash('docs/install.md')
+
+        self.assertEqual(
+            len({pandoc_hash, native_hash, upgraded_hash}),
+            3,
+        )
+        self.assertEqual(
+            self.git2sc._source_hash('docs/install.md'),
+            upgraded_hash,
+        )
+
+    @patch('git2sc.git2sc.git', autospect=True)
+    def test_load_blobs_works_outside_git_repositories(self, gitMock):
+        '''Required to publish directories that are not in a repository'''
+
+        self.git2sc.state = SyncState(':memory:', self.space)
+        gitMock.index_blobs.side_effect = subprocess.CalledProcessError(
+            128,
+            ['git'],
+        )
+
+        self.git2sc._load_blobs('docs')
+
+        self.assertEqual(self.git2sc.blobs, {})
+
+    def test_import_file_exits_gracefully_if_extension_unknown(self):
+        '''Required to ensure that the import_file method doesn't crash if
+        the extension is unknown'''
+        path_to_file = '/path/to/file.unknown_extension'
+        with self.assertRaises(UnknownExtension):
+            self.git2sc.import_file(path_to_file)
+
+    def test_can_delete_articles(self):
+        '''Required to ensure that the delete_page method posts to the
+        correct api endpoint with the correct data structure'''
+
+        page_id = '372274410'
+        self.session.request.return_value.status_code = 204
+
+        self.git2sc.delete_page(page_id)
+
+        self.assertEqual(
+            self.session.request.assert_called_with(
+                'DELETE',
+                '{}/content/{}'.format(self.api_url, page_id),
+            ),
+            None,
+        )
+        self.assertFalse(self.requests_error.called)
 
     def test_delete_articles_calls_requests_error_if_rc_not_204(self):
         '''If the deletion of article works it returns a 204 as stated by the
         docs, we need to make sure that requests_error gets called otherwise'''
 
         page_id = '372274410'
-        self.requests.delete.return_value.status_code = 404
+        self.session.request.return_value.status_code = 404
 
         self.git2sc.delete_page(page_id)
 
         self.assertTrue(self.requests_error.called)
 
+    def test_page_writes_are_recorded_in_the_run_report(self):
+        '''Required to find the pages that take longer to write'''
+
+        page_id = '372274410'
+        self.git2sc.pages = {page_id: {'id': page_id, 'title': 'Article'}}
+        self.session.request.return_value.status_code = 204
+
+        self.git2sc.delete_page(page_id)
+
+        self.assertEqual(list(self.git2sc.report.pages), ['Article'])
+
+    def test_delete_page_removes_the_page_from_the_index(self):
+        '''Required to ensure that a deleted title can be used again'''
+
+        page_id = '372274410'
+        self.git2sc.pages = {page_id: {'id': page_id, 'title': 'Article'}}
+        self.session.request.return_value.status_code = 204
+
+        self.git2sc.delete_page(page_id)
+
+        self.assertNotIn(page_id, self.git2sc.pages)
+        self.assertFalse(self.git2sc._title_exist('Article'))
+
     @patch('git2sc.git2sc.Git2SC.update_page', autospect=True)
     @patch('git2sc.git2sc.Git2SC._discover_directory_readme', autospect=True)
     @patch('git2sc.git2sc.Git2SC.get_space_homepage', autospect=True)
@@ -758,6 +1468,46 @@ class TestGit2SC(unittest.TestCase):
             "No README here, keep on looking :("
         )
 
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    def test_discover_directory_readme_records_the_failed_conversions(
+        self,
+        importfileMock,
+    ):
+        '''Required to publish the directory and the rest of the files when
+        its README can't be converted'''
+
+        self.os.path.join.side_effect = os.path.join
+        self.os.path.isfile.return_value = True
+        importfileMock.side_effect = RuntimeError('pandoc died')
+
+        result = self.git2sc._discover_directory_readme('/path/to/directory')
+
+        self.assertEqual(result, NO_README)
+        self.assertEqual(
+            self.git2sc.conversion_errors,
+            {'/path/to/directory/README.adoc': importfileMock.side_effect},
+        )
+        self.assertEqual(self.git2sc.stats['failed'], 1)
+
+    @patch('git2sc.git2sc.Git2SC.update_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC._discover_directory_readme', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.get_space_homepage', autospect=True)
+    def test_mainpage_does_not_convert_again_a_failed_readme(
+        self,
+        gethomepageMock,
+        discoverreadmeMock,
+        updatepageMock,
+    ):
+        '''Required to not convert twice a README whose conversion failed,
+        the None html is the result of the failed conversion'''
+
+        gethomepageMock.return_value = '372223610'
+
+        self.git2sc._process_mainpage('.', None)
+
+        self.assertFalse(discoverreadmeMock.called)
+        updatepageMock.assert_called_with('372223610', NO_README)
+
     @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
     @patch('git2sc.git2sc.Git2SC._discover_directory_readme', autospect=True)
     def test_can_process_directory_readme(
@@ -932,7 +1682,7 @@ class TestGit2SC(unittest.TestCase):
         they are in the excluded list
         '''
 
-        def create_side_effect(directory_name, parent_id=None):
+        def create_side_effect(directory_name, parent_id=None, html=None):
             return 'id_{}'.format(os.path.basename(directory_name))
 
         def import_side_effect(file_name):
@@ -963,18 +1713,25 @@ class TestGit2SC(unittest.TestCase):
         self.assertEqual(
             readmeMock.mock_calls,
             [
-                call('tests/data/repository_example/formation', None),
+                call(
+                    'tests/data/repository_example/formation',
+                    None,
+                    'article_id',
+                ),
                 call(
                     'tests/data/repository_example/formation/aws',
                     'id_formation',
+                    'article_id',
                 ),
                 call(
                     'tests/data/repository_example/formation/ansible',
                     'id_formation',
+                    'article_id',
                 ),
                 call(
                     'tests/data/repository_example/formation/ansible/molecule',
                     'id_ansible',
+                    'article_id',
                 )
             ]
         )
@@ -990,7 +1747,11 @@ class TestGit2SC(unittest.TestCase):
 
         # Assert that the homepage is created
         self.assertEqual(
-            mainpageMock.assert_called_with('tests/data/repository_example'),
+            mainpageMock.assert_called_with(
+                'tests/data/repository_example',
+                'article_id',
+                None,
+            ),
             None,
         )
 
@@ -1008,7 +1769,7 @@ class TestGit2SC(unittest.TestCase):
         '''Test that we can upload the whole directory but hanging from an
         confluence article'''
 
-        def create_side_effect(directory_name, parent_id=None):
+        def create_side_effect(directory_name, parent_id=None, html=None):
             return 'id_{}'.format(os.path.basename(directory_name))
 
         def import_side_effect(file_name):
@@ -1040,22 +1801,30 @@ class TestGit2SC(unittest.TestCase):
         self.assertEqual(
             readmeMock.mock_calls,
             [
-                call('tests/data/repository_example', 'initial_parent_id'),
+                call(
+                    'tests/data/repository_example',
+                    'initial_parent_id',
+                    'article_id',
+                ),
                 call(
                     'tests/data/repository_example/formation',
-                    'id_repository_example'
+                    'id_repository_example',
+                    'article_id',
                 ),
                 call(
                     'tests/data/repository_example/formation/aws',
                     'id_formation',
+                    'article_id',
                 ),
                 call(
                     'tests/data/repository_example/formation/ansible',
                     'id_formation',
+                    'article_id',
                 ),
                 call(
                     'tests/data/repository_example/formation/ansible/molecule',
                     'id_ansible',
+                    'article_id',
                 )
             ]
         )
@@ -1114,6 +1883,7 @@ class TestGit2SC(unittest.TestCase):
         result = self.git2sc._get_article_id('Non existing title')
         self.assertEqual(result, None)
 
+    @patch('git2sc.git2sc.Git2SC.load_bodies', autospect=True)
     @patch('git2sc.git2sc.Git2SC._get_article_id', autospect=True)
     @patch('git2sc.git2sc.Git2SC.delete_page', autospect=True)
     @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
@@ -1132,6 +1902,7 @@ class TestGit2SC(unittest.TestCase):
         createpageMock,
         deletepageMock,
         getarticleidMock,
+        loadbodiesMock,
     ):
         '''Test that we can update a whole directory. For this testcase we'll
         assume that all the following directories were already uploaded
@@ -1153,7 +1924,8 @@ class TestGit2SC(unittest.TestCase):
         directory and the excluded_file.adoc file
         '''
 
-        def createreadme_side_effect(directory_name, parent_id=None):
+        def createreadme_side_effect(directory_name, parent_id=None,
+                                     html=None):
             return 'id_{}'.format(os.path.basename(directory_name))
 
         def createpage_side_effect(directory_name, html, parent_id=None):
@@ -1185,13 +1957,22 @@ class TestGit2SC(unittest.TestCase):
                 "id": "371111110",
                 "type": "page",
                 "status": "current",
+                "ancestors": [{"id": "id_homepage"}],
             },
             'id_formation': {
                 "id": "372222220",
                 "type": "page",
                 "status": "current",
+                "ancestors": [{"id": "id_homepage"}],
+            },
+            'id_homepage': {
+                "id": "370000000",
+                "type": "page",
+                "status": "current",
+                "ancestors": [],
             },
         }
+        process_mainpageMock.return_value = 'id_homepage'
 
         self.git2sc.directory_update(
             'tests/data/repository_example',
@@ -1200,7 +1981,9 @@ class TestGit2SC(unittest.TestCase):
 
         self.assertEqual(
             process_mainpageMock.assert_called_with(
-                'tests/data/repository_example'
+                'tests/data/repository_example',
+                'README.md.html',
+                None,
                 ),
             None
         )
@@ -1209,11 +1992,25 @@ class TestGit2SC(unittest.TestCase):
         self.assertEqual(
             updatereadmeMock.mock_calls,
             [
-                call('tests/data/repository_example/formation'),
-                call('tests/data/repository_example/formation/aws'),
-                call('tests/data/repository_example/formation/ansible'),
+                call(
+                    'tests/data/repository_example/formation',
+                    'README.md.html',
+                    None,
+                ),
+                call(
+                    'tests/data/repository_example/formation/aws',
+                    'README.md.html',
+                    None,
+                ),
+                call(
+                    'tests/data/repository_example/formation/ansible',
+                    'README.md.html',
+                    None,
+                ),
                 call(
                     'tests/data/repository_example/formation/ansible/molecule',
+                    'README.md.html',
+                    None,
                 ),
             ]
         )
@@ -1225,6 +2022,7 @@ class TestGit2SC(unittest.TestCase):
                 call(
                     'tests/data/repository_example/formation/excluded_dir',
                     'id_formation',
+                    'README.md.html',
                 ),
             ]
         )
@@ -1251,6 +2049,14 @@ class TestGit2SC(unittest.TestCase):
             [call('id_page_to_delete')],
         )
 
+        # Assert that the bodies are loaded to skip the unchanged pages
+        self.assertEqual(
+            loadbodiesMock.assert_called_with(
+                ['id_page_to_delete', 'id_formation', 'id_homepage'],
+            ),
+            None,
+        )
+
     @patch('git2sc.git2sc.Git2SC._get_article_id', autospect=True)
     @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
     @patch('git2sc.git2sc.Git2SC.update_page', autospect=True)
@@ -1278,7 +2084,8 @@ class TestGit2SC(unittest.TestCase):
         And we'll assume that child_child_doc.adoc is already uploaded
         '''
 
-        def createreadme_side_effect(directory_name, parent_id=None):
+        def createreadme_side_effect(directory_name, parent_id=None,
+                                     html=None):
             return 'id_{}'.format(os.path.basename(directory_name))
 
         def createpage_side_effect(directory_name, html, parent_id=None):
@@ -1320,6 +2127,7 @@ class TestGit2SC(unittest.TestCase):
                 call(
                     'tests/data/repository_example/formation/ansible/molecule',
                     'initial_parent_id',
+                    'README.md.html',
                 ),
             ]
         )
@@ -1394,6 +2202,8 @@ class TestGit2SC(unittest.TestCase):
             [
                 call(
                     'tests/data/repository_example/formation/ansible/molecule',
+                    'README.md.html',
+                    None,
                 ),
             ]
         )
@@ -1405,3 +2215,1214 @@ class TestGit2SC(unittest.TestCase):
                 call('id_child_child_doc', 'child_child_doc.adoc.html')
             ]
         )
+
+    @patch('git2sc.git2sc.git', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.directory_update', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.delete_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.update_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    @patch('git2sc.git2sc.Git2SC._update_directory_readme', autospect=True)
+    @patch('git2sc.git2sc.Git2SC._create_directory_readme', autospect=True)
+    @patch('git2sc.git2sc.Git2SC._process_mainpage', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.get_space_homepage', autospect=True)
+    def test_can_update_a_directory_incrementally(
+        self,
+        gethomepageMock,
+        process_mainpageMock,
+        createreadmeMock,
+        updatereadmeMock,
+        importfileMock,
+        updatepageMock,
+        createpageMock,
+        deletepageMock,
+        directoryupdateMock,
+        gitMock,
+    ):
+        '''Test that only the files changed since the last published commit
+        are synced, creating the pages of the new directories'''
+
+        self.os.path.normpath.side_effect = os.path.normpath
+        self.os.path.splitext.side_effect = os.path.splitext
+        self.os.path.join.side_effect = os.path.join
+        self.os.path.basename.side_effect = os.path.basename
+        self.os.path.dirname.side_effect = os.path.dirname
+        gethomepageMock.return_value = 'id_home'
+        createreadmeMock.side_effect = \
+            lambda directory, parent_id=None, html=None: 'id_{}'.format(
+                os.path.basename(directory)
+            )
+        importfileMock.side_effect = \
+            lambda file_path: '{}.html'.format(os.path.basename(file_path))
+        gitMock.head.return_value = 'new_commit'
+        gitMock.read_last_commit.return_value = 'last_commit'
+        gitMock.changed_files.return_value = {
+            'README.md': 'M',
+            'formation/formation_guide.adoc': 'M',
+            'formation/new_dir/new_doc.md': 'A',
+            'formation/new_dir/README.md': 'A',
+            'formation/excluded_dir/doc.md': 'A',
+            'formation/deleted.adoc': 'D',
+            'formation/removed/README.md': 'D',
+            'formation/gone/image.png': 'D',
+            'unknown.file': 'A',
+        }
+        gitMock.directories.return_value = {
+            'formation',
+            'formation/new_dir',
+            'formation/excluded_dir',
+        }
+        self.git2sc.pages = {
+            'id_formation': {'id': 'id_formation', 'title': 'formation'},
+            'id_formation_guide': {
+                'id': 'id_formation_guide',
+                'title': 'formation_guide',
+                'ancestors': [{'id': 'id_formation'}],
+            },
+            'id_deleted': {'id': 'id_deleted', 'title': 'deleted'},
+            'id_removed': {'id': 'id_removed', 'title': 'removed'},
+            'id_gone': {'id': 'id_gone', 'title': 'gone'},
+        }
+
+        self.git2sc.directory_incremental_update(
+            'tests/data/repository_example/',
+            ['excluded_dir'],
+        )
+
+        self.assertEqual(
+            gitMock.changed_files.assert_called_with(
+                'tests/data/repository_example',
+                'last_commit',
+                'new_commit',
+            ),
+            None,
+        )
+        self.assertEqual(
+            updatepageMock.mock_calls,
+            [call('id_formation_guide', 'formation_guide.adoc.html')],
+        )
+        self.assertEqual(
+            createreadmeMock.mock_calls,
+            [
+                call(
+                    'tests/data/repository_example/formation/new_dir',
+                    'id_formation',
+                ),
+            ],
+        )
+        self.assertEqual(
+            createpageMock.mock_calls,
+            [call('new_doc', 'new_doc.md.html', 'id_new_dir')],
+        )
+        # The directories without README are removed too
+        self.assertEqual(
+            deletepageMock.mock_calls,
+            [call('id_deleted'), call('id_gone'), call('id_removed')],
+        )
+        self.assertEqual(
+            gitMock.directories.assert_called_with(
+                'tests/data/repository_example',
+                'new_commit',
+            ),
+            None,
+        )
+        self.assertEqual(
+            process_mainpageMock.assert_called_with(
+                'tests/data/repository_example',
+            ),
+            None,
+        )
+        # The README of the new directory is already in the created page
+        self.assertFalse(updatereadmeMock.called)
+        self.assertFalse(directoryupdateMock.called)
+        self.assertEqual(
+            gitMock.write_last_commit.assert_called_with(
+                'tests/data/repository_example',
+                self.space,
+                'new_commit',
+            ),
+            None,
+        )
+
+    @patch('git2sc.git2sc.git', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.delete_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    def test_incremental_update_refuses_to_delete_too_many_pages(
+        self,
+        importfileMock,
+        createpageMock,
+        deletepageMock,
+        gitMock,
+    ):
+        '''Required to not wipe a space by a wrong since commit, before
+        changing any page'''
+
+        self.os.path.normpath.side_effect = os.path.normpath
+        self.os.path.splitext.side_effect = os.path.splitext
+        self.os.path.join.side_effect = os.path.join
+        self.os.path.basename.side_effect = os.path.basename
+        gitMock.head.return_value = 'new_commit'
+        gitMock.read_last_commit.return_value = 'last_commit'
+        gitMock.changed_files.return_value = {
+            'first.adoc': 'D',
+            'second.adoc': 'D',
+            'new.adoc': 'A',
+        }
+        self.git2sc.pages = {
+            'id_first': {'id': 'id_first', 'title': 'first'},
+            'id_second': {'id': 'id_second', 'title': 'second'},
+        }
+
+        with self.assertRaises(TooManyDeletions):
+            self.git2sc.directory_incremental_update(
+                'docs',
+                ['.git'],
+                'parent_id',
+                max_deletes=1,
+            )
+
+        self.assertFalse(createpageMock.called)
+        self.assertFalse(deletepageMock.called)
+        self.assertFalse(gitMock.write_last_commit.called)
+
+    @patch('git2sc.git2sc.git', autospect=True)
+    @patch('git2sc.git2sc.Git2SC._source_hash', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.delete_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.update_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    def test_incremental_update_moves_the_page_of_a_moved_file(
+        self,
+        importfileMock,
+        updatepageMock,
+        deletepageMock,
+        sourcehashMock,
+        gitMock,
+    ):
+        '''Required to keep the page, its history and its comments when a file
+        is moved to another directory, instead of deleting it'''
+
+        self.os.path.normpath.side_effect = os.path.normpath
+        self.os.path.splitext.side_effect = os.path.splitext
+        self.os.path.join.side_effect = os.path.join
+        self.os.path.basename.side_effect = os.path.basename
+        self.os.path.relpath.side_effect = os.path.relpath
+        self.os.sep = os.sep
+        importfileMock.return_value = '<p>Guide</p>'
+        sourcehashMock.return_value = 'new_hash'
+        gitMock.head.return_value = 'new_commit'
+        gitMock.changed_files.return_value = {
+            'old/guide.adoc': 'D',
+            'new/guide.adoc': 'A',
+        }
+        self.git2sc.pages = {
+            'id_old': {'id': 'id_old', 'title': 'old'},
+            'id_new': {'id': 'id_new', 'title': 'new'},
+            'id_guide': {
+                'id': 'id_guide',
+                'title': 'guide',
+                'ancestors': [{'id': 'id_old'}],
+            },
+        }
+        self.git2sc.state = SyncState(':memory:', self.space)
+        self.git2sc.state.record('old/guide.adoc', 'id_guide', 'id_old')
+        self.git2sc.state.record_last_commit('last_commit')
+
+        self.git2sc.directory_incremental_update('docs', ['.git'])
+
+        self.assertFalse(deletepageMock.called)
+        self.assertEqual(
+            updatepageMock.mock_calls,
+            [call('id_guide', '<p>Guide</p>', parent_id='id_new')],
+        )
+        self.assertEqual(
+            self.git2sc.state.get('new/guide.adoc')['page_id'],
+            'id_guide',
+        )
+        self.assertEqual(self.git2sc.state.get('old/guide.adoc'), None)
+
+    @patch('git2sc.git2sc.git', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.delete_page', autospect=True)
+    def test_incremental_update_deletes_only_the_pages_of_the_state(
+        self,
+        deletepageMock,
+        gitMock,
+    ):
+        '''Required to not delete the page of another file with the same title
+        when the state doesn't know the page of a deleted file'''
+
+        self.os.path.normpath.side_effect = os.path.normpath
+        self.os.path.splitext.side_effect = os.path.splitext
+        self.os.path.join.side_effect = os.path.join
+        self.os.path.relpath.side_effect = os.path.relpath
+        self.os.sep = os.sep
+        gitMock.head.return_value = 'new_commit'
+        gitMock.changed_files.return_value = {
+            'first.adoc': 'D',
+            'second.adoc': 'D',
+        }
+        self.git2sc.pages = {
+            'id_first': {'id': 'id_first', 'title': 'first'},
+            'id_second': {'id': 'id_second', 'title': 'second'},
+        }
+        self.git2sc.state = SyncState(':memory:', self.space)
+        self.git2sc.state.record('first.adoc', 'id_first')
+        self.git2sc.state.record_last_commit('last_commit')
+
+        self.git2sc.directory_incremental_update('docs', ['.git'])
+
+        self.assertEqual(deletepageMock.mock_calls, [call('id_first')])
+        self.assertEqual(self.git2sc.state.last_commit(), 'new_commit')
+        self.assertFalse(gitMock.read_last_commit.called)
+        self.assertFalse(gitMock.write_last_commit.called)
+
+    @patch('git2sc.git2sc.git', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.directory_update', autospect=True)
+    def test_incremental_update_does_a_full_sync_the_first_time(
+        self,
+        directoryupdateMock,
+        gitMock,
+    ):
+        '''If the space was never published from the repository all the files
+        have to be synced'''
+
+        self.os.path.normpath.side_effect = os.path.normpath
+        gitMock.head.return_value = 'new_commit'
+        gitMock.read_last_commit.return_value = None
+
+        self.git2sc.directory_incremental_update(
+            'docs',
+            ['.git'],
+            workers=4,
+            max_deletes=10,
+        )
+
+        self.assertEqual(
+            directoryupdateMock.assert_called_with(
+                'docs',
+                ['.git'],
+                None,
+                workers=4,
+                jobs=1,
+                converter_limits=None,
+                max_deletes=10,
+            ),
+            None,
+        )
+        self.assertEqual(
+            gitMock.write_last_commit.assert_called_with(
+                'docs',
+                self.space,
+                'new_commit',
+            ),
+            None,
+        )
+
+    def _molecule_state(self, synced_version, page_version):
+        '''Prepare a sync state where child_child_doc.adoc was synced with the
+        synced_version of the page, while confluence has page_version'''
+
+        directory = 'tests/data/repository_example/formation/ansible/molecule'
+        self.git2sc.pages = {
+            'id_molecule': {
+                'id': 'id_molecule',
+                'title': 'molecule',
+                'version': {'number': 1},
+                'ancestors': [{'id': 'initial_parent_id'}],
+            },
+            'id_child': {
+                'id': 'id_child',
+                'title': 'child_child_doc',
+                'version': {'number': page_version},
+                'ancestors': [{'id': 'id_molecule'}],
+            },
+        }
+        self.os.walk.side_effect = os.walk
+        self.os.path.basename.side_effect = os.path.basename
+        self.os.path.splitext.side_effect = os.path.splitext
+        self.os.path.dirname.side_effect = os.path.dirname
+        self.os.path.join.side_effect = os.path.join
+        self.os.path.relpath.side_effect = os.path.relpath
+        self.os.path.isfile.side_effect = os.path.isfile
+        self.os.sep = os.sep
+        self.git2sc.state = SyncState(':memory:', self.space)
+        self.git2sc.state.record(
+            'child_child_doc.adoc',
+            'id_child',
+            'id_molecule',
+            synced_version,
+            self.git2sc._file_hash(
+                os.path.join(directory, 'child_child_doc.adoc'),
+            ),
+        )
+        return directory
+
+    @patch('git2sc.git2sc.Git2SC.load_bodies', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.update_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    @patch('git2sc.git2sc.Git2SC._update_directory_readme', autospect=True)
+    def test_update_directory_skips_files_unchanged_since_last_sync(
+        self,
+        updatereadmeMock,
+        importfileMock,
+        updatepageMock,
+        loadbodiesMock,
+    ):
+        '''If the source of a file and the version of its page are the ones
+        recorded in the sync state, the file is neither converted nor
+        updated, and the body of its page is not loaded'''
+
+        directory = self._molecule_state(synced_version=2, page_version=2)
+        updatereadmeMock.return_value = 'id_molecule'
+        importfileMock.return_value = '<p>Molecule</p>'
+
+        self.git2sc.directory_update(directory, ['.git'], 'initial_parent_id')
+
+        # Only the README of the directory page is converted
+        self.assertEqual(
+            importfileMock.mock_calls,
+            [call(os.path.join(directory, 'README.md'))],
+        )
+        self.assertFalse(updatepageMock.called)
+        self.assertEqual(self.git2sc.stats['skipped'], 1)
+        self.assertEqual(
+            loadbodiesMock.assert_called_with(['id_molecule']),
+            None,
+        )
+        self.assertEqual(
+            self.git2sc.state.get('.')['page_id'],
+            'id_molecule',
+        )
+
+    @patch('git2sc.git2sc.Git2SC.load_bodies', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.update_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    @patch('git2sc.git2sc.Git2SC._update_directory_readme', autospect=True)
+    def test_update_directory_records_directories_once_updated(
+        self,
+        updatereadmeMock,
+        importfileMock,
+        updatepageMock,
+        loadbodiesMock,
+    ):
+        '''The state of a directory has to be recorded after the update of
+        its page, or it keeps the version the update replaced'''
+
+        directory = self._molecule_state(synced_version=2, page_version=2)
+
+        def update_readme(directory_path, html, relative_path):
+            time.sleep(0.05)
+            self.git2sc.pages['id_molecule'] = dict(
+                self.git2sc.pages['id_molecule'],
+                version={'number': 2},
+            )
+            return 'id_molecule'
+
+        updatereadmeMock.side_effect = update_readme
+
+        self.git2sc.directory_update(
+            directory,
+            ['.git'],
+            'initial_parent_id',
+            workers=4,
+        )
+
+        self.assertEqual(self.git2sc.state.get('.')['version'], 2)
+
+    @patch('git2sc.git2sc.Git2SC.load_bodies', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.update_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    @patch('git2sc.git2sc.Git2SC._update_directory_readme', autospect=True)
+    def test_update_directory_updates_files_edited_in_confluence(
+        self,
+        updatereadmeMock,
+        importfileMock,
+        updatepageMock,
+        loadbodiesMock,
+    ):
+        '''If someone edited the page of a file in confluence after the last
+        sync the file has to be converted and compared with the page'''
+
+        directory = self._molecule_state(synced_version=2, page_version=3)
+        importfileMock.return_value = '<p>Child</p>'
+
+        self.git2sc.directory_update(directory, ['.git'], 'initial_parent_id')
+
+        self.assertEqual(
+            updatepageMock.assert_called_with('id_child', '<p>Child</p>'),
+            None,
+        )
+        self.assertEqual(
+            sorted(loadbodiesMock.call_args[0][0]),
+            ['id_child', 'id_molecule'],
+        )
+        self.assertEqual(
+            self.git2sc.state.get('child_child_doc.adoc')['version'],
+            3,
+        )
+
+    @patch('git2sc.git2sc.Git2SC.load_bodies', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.update_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    @patch('git2sc.git2sc.Git2SC._update_directory_readme', autospect=True)
+    def test_update_directory_moves_the_pages_of_moved_files(
+        self,
+        updatereadmeMock,
+        importfileMock,
+        updatepageMock,
+        loadbodiesMock,
+    ):
+        '''If a file is now in another directory its page has to be moved
+        below the page of the directory, even if it didn't change'''
+
+        directory = self._molecule_state(synced_version=2, page_version=2)
+        self.git2sc.pages['id_child'] = dict(
+            self.git2sc.pages['id_child'],
+            ancestors=[{'id': 'id_other'}],
+        )
+        importfileMock.return_value = '<p>Child</p>'
+
+        self.git2sc.directory_update(directory, ['.git'], 'initial_parent_id')
+
+        self.assertEqual(
+            updatepageMock.assert_called_with(
+                'id_child',
+                '<p>Child</p>',
+                parent_id='id_molecule',
+            ),
+            None,
+        )
+
+    @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC._create_directory_readme', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    def test_can_full_upload_directory_with_several_workers(
+        self,
+        importfileMock,
+        readmeMock,
+        createpageMock,
+    ):
+        '''Test that the pages are created in parallel but always after the
+        page of their directory'''
+
+        created = []
+        lock = threading.Lock()
+
+        def create(name, parent_id):
+            time.sleep(0.01)
+            with lock:
+                created.append((name, parent_id))
+            return 'id_{}'.format(name)
+
+        readmeMock.side_effect = \
+            lambda directory, parent_id=None, html=None: create(
+                os.path.basename(directory),
+                parent_id,
+            )
+        createpageMock.side_effect = lambda title, html, parent_id=None: \
+            create(title, parent_id)
+        importfileMock.side_effect = lambda file_name: 'html'
+        self.os.walk.side_effect = os.walk
+        self.os.path.basename.side_effect = os.path.basename
+        self.os.path.splitext.side_effect = os.path.splitext
+        self.os.path.dirname.side_effect = os.path.dirname
+        self.os.path.join.side_effect = os.path.join
+
+        self.git2sc.directory_full_upload(
+            'tests/data/repository_example',
+            ['.git', '.gitignore', 'excluded_dir', 'excluded_file.adoc'],
+            'initial_parent_id',
+            workers=4,
+        )
+
+        names = [name for name, parent_id in created]
+        self.assertEqual(
+            sorted(created),
+            sorted([
+                ('repository_example', 'initial_parent_id'),
+                ('formation', 'id_repository_example'),
+                ('aws', 'id_formation'),
+                ('ansible', 'id_formation'),
+                ('molecule', 'id_ansible'),
+                ('parent_article', 'id_repository_example'),
+                ('formation_guide', 'id_formation'),
+                ('child_child_doc', 'id_molecule'),
+            ])
+        )
+        for name, parent_id in created:
+            if parent_id != 'initial_parent_id':
+                self.assertLess(
+                    names.index(parent_id[3:]),
+                    names.index(name),
+                )
+
+    @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC._create_directory_readme', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    def test_resumed_full_upload_skips_the_uploaded_pages(
+        self,
+        importfileMock,
+        readmeMock,
+        createpageMock,
+    ):
+        '''Required to continue an interrupted upload without uploading
+        again the pages it already created'''
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        journal_path = os.path.join(directory, 'TST.journal')
+        self.os.walk.side_effect = os.walk
+        self.os.path.basename.side_effect = os.path.basename
+        self.os.path.splitext.side_effect = os.path.splitext
+        self.os.path.dirname.side_effect = os.path.dirname
+        self.os.path.join.side_effect = os.path.join
+        self.os.path.relpath.side_effect = os.path.relpath
+        self.os.sep = os.sep
+        parent_article_hash = self.git2sc._file_hash(
+            'tests/data/repository_example/parent_article.adoc',
+        )
+        journal = Journal(journal_path)
+        journal.start('tests/data/repository_example', 'initial_parent_id')
+        journal.done('.', 'id_repository_example')
+        journal.done('formation', 'id_formation')
+        journal.done(
+            'parent_article.adoc',
+            'id_parent_article',
+            parent_article_hash,
+        )
+        journal.plan('formation/aws', 'aws')
+        journal.close()
+        for page_id in (
+            'id_repository_example',
+            'id_formation',
+            'id_parent_article',
+        ):
+            self.git2sc.pages[page_id] = {
+                'id': page_id,
+                'title': page_id[3:],
+                'ancestors': [],
+            }
+
+        readmeMock.side_effect = \
+            lambda directory, parent_id=None, html=None: \
+            'id_{}'.format(os.path.basename(directory))
+        createpageMock.side_effect = lambda title, html, parent_id=None: \
+            'id_{}'.format(title)
+        importfileMock.side_effect = lambda file_name: 'html'
+
+        resumed_journal = Journal(journal_path, resume=True)
+        self.git2sc.directory_full_upload(
+            'tests/data/repository_example',
+            ['.git', '.gitignore', 'excluded_dir', 'excluded_file.adoc'],
+            'initial_parent_id',
+            journal=resumed_journal,
+        )
+        resumed_journal.close()
+
+        self.assertEqual(
+            sorted(
+                (os.path.basename(args[0]), args[1])
+                for args, kwargs in readmeMock.call_args_list
+            ),
+            [
+                ('ansible', 'id_formation'),
+                ('aws', 'id_formation'),
+                ('molecule', 'id_ansible'),
+            ],
+        )
+        self.assertEqual(
+            sorted(createpageMock.mock_calls),
+            sorted([
+                call('formation_guide', 'html', 'id_formation'),
+                call('child_child_doc', 'html', 'id_molecule'),
+            ]),
+        )
+        self.assertEqual(self.git2sc.stats['skipped'], 1)
+        self.assertEqual(
+            sorted(Journal(journal_path, resume=True).planned.keys()),
+            [
+                'formation/ansible',
+                'formation/ansible/molecule',
+                'formation/ansible/molecule/child_child_doc.adoc',
+                'formation/aws',
+                'formation/formation_guide.adoc',
+            ],
+        )
+
+    @patch('git2sc.git2sc.Git2SC.update_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
+    def test_resumed_upload_adopts_the_pages_missing_in_the_journal(
+        self,
+        createpageMock,
+        updatepageMock,
+    ):
+        '''Required to not duplicate the pages created right before the
+        upload was interrupted'''
+
+        self.git2sc.journal = Mock()
+        self.git2sc.journal.resuming = True
+        self.git2sc.journal.page_ids.return_value = {'journaled'}
+        self.git2sc.pages = {
+            'journaled': {
+                'id': 'journaled',
+                'title': 'guide',
+                'ancestors': [{'id': 'parent'}],
+            },
+            'other_parent': {
+                'id': 'other_parent',
+                'title': 'guide_1',
+                'ancestors': [{'id': 'other'}],
+            },
+            'created': {
+                'id': 'created',
+                'title': 'guide_2',
+                'ancestors': [{'id': 'parent'}],
+            },
+        }
+
+        self.assertEqual(
+            self.git2sc._create_page_once('guide', 'html', 'parent'),
+            'created',
+        )
+        updatepageMock.assert_called_once_with('created', 'html')
+        self.assertFalse(createpageMock.called)
+
+        self.git2sc.journal.resuming = False
+        self.git2sc._create_page_once('guide', 'html', 'parent')
+        createpageMock.assert_called_once_with('guide', 'html', 'parent')
+
+    @patch('git2sc.git2sc.Git2SC.load_bodies', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.delete_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.update_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    def test_plan_update_plans_the_sync_without_changing_the_space(
+        self,
+        importfileMock,
+        updatepageMock,
+        createpageMock,
+        deletepageMock,
+        loadbodiesMock,
+    ):
+        '''Required to review the changes of a sync before applying them'''
+
+        directory = self._molecule_state(synced_version=2, page_version=3)
+        self.git2sc.pages['id_child'] = dict(
+            self.git2sc.pages['id_child'],
+            ancestors=[{'id': 'id_other'}],
+        )
+        self.git2sc.pages['id_old'] = {
+            'id': 'id_old',
+            'title': 'old',
+            'version': {'number': 4},
+            'ancestors': [{'id': 'initial_parent_id'}, {'id': 'id_molecule'}],
+        }
+        importfileMock.return_value = '<p>Child</p>'
+
+        plan = self.git2sc.plan_update(
+            directory,
+            ['.git'],
+            'initial_parent_id',
+        )
+
+        self.assertEqual(
+            [
+                (operation['op'], operation['page_id'], operation['path'])
+                for operation in plan.operations
+                if operation['op'] != 'delete'
+            ],
+            [
+                ('update', 'id_molecule', '.'),
+                ('move', 'id_child', 'child_child_doc.adoc'),
+            ],
+        )
+        self.assertEqual(plan.operations[1]['parent'], 'id_molecule')
+        self.assertEqual(plan.operations[1]['html'], '<p>Child</p>')
+        self.assertEqual(plan.operations[1]['version'], 3)
+        self.assertEqual(plan.operations[2]['op'], 'delete')
+        self.assertEqual(plan.operations[2]['page_id'], 'id_old')
+        self.assertEqual(plan.operations[2]['depth'], 2)
+        self.assertFalse(updatepageMock.called)
+        self.assertFalse(createpageMock.called)
+        self.assertFalse(deletepageMock.called)
+
+    @patch('git2sc.git2sc.Git2SC.load_bodies', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    def test_plan_update_plans_a_skip_for_the_unchanged_files(
+        self,
+        importfileMock,
+        loadbodiesMock,
+    ):
+        '''Required to count the pages that the plan doesn't touch'''
+
+        directory = self._molecule_state(synced_version=2, page_version=2)
+        importfileMock.return_value = '<p>Molecule</p>'
+
+        plan = self.git2sc.plan_update(
+            directory,
+            ['.git'],
+            'initial_parent_id',
+        )
+
+        self.assertEqual(importfileMock.call_count, 1)
+        self.assertEqual(
+            [
+                (operation['op'], operation['page_id'])
+                for operation in plan.operations
+            ],
+            [('update', 'id_molecule'), ('skip', 'id_child')],
+        )
+
+    def _planned_tree(self):
+        '''Prepare a space and a plan that creates a directory and a file
+        in it, moves a page into the directory and deletes another'''
+
+        self.git2sc.pages = {
+            'id_docs': {
+                'id': 'id_docs',
+                'title': 'docs',
+                'version': {'number': 1},
+                'ancestors': [],
+            },
+            'id_moved': {
+                'id': 'id_moved',
+                'title': 'moved',
+                'version': {'number': 3},
+                'ancestors': [{'id': 'id_docs'}],
+            },
+            'id_old': {
+                'id': 'id_old',
+                'title': 'old',
+                'version': {'number': 1},
+                'ancestors': [{'id': 'id_docs'}],
+            },
+        }
+        plan = SyncPlan(self.space, 'docs')
+        directory = plan.add(
+            'create',
+            kind='directory',
+            title='guides',
+            parent='id_docs',
+            html='<p>Guides</p>',
+        )
+        plan.add(
+            'create',
+            kind='file',
+            title='install',
+            parent=directory,
+            html='<p>Install</p>',
+        )
+        plan.add(
+            'move',
+            kind='file',
+            page_id='id_moved',
+            version=3,
+            parent=directory,
+            html='<p>Moved</p>',
+        )
+        plan.add('delete', page_id='id_old', version=1, depth=1)
+        return plan
+
+    @patch('git2sc.git2sc.Git2SC.delete_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.update_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    def test_apply_plan_writes_the_planned_pages(
+        self,
+        importfileMock,
+        updatepageMock,
+        createpageMock,
+        deletepageMock,
+    ):
+        '''Required to publish a plan without converting the files again'''
+
+        plan = self._planned_tree()
+
+        def createpage_side_effect(title, html, parent_id=None):
+            return 'id_{}'.format(title)
+        createpageMock.side_effect = createpage_side_effect
+
+        self.git2sc.apply_plan(plan, workers=4)
+
+        self.assertFalse(importfileMock.called)
+        self.assertEqual(
+            createpageMock.mock_calls,
+            [
+                call('guides', '<p>Guides</p>', 'id_docs'),
+                call('install', '<p>Install</p>', 'id_guides'),
+            ],
+        )
+        self.assertEqual(
+            updatepageMock.assert_called_with(
+                'id_moved',
+                '<p>Moved</p>',
+                parent_id='id_guides',
+            ),
+            None,
+        )
+        self.assertEqual(
+            deletepageMock.assert_called_with('id_old'),
+            None,
+        )
+
+    @patch('git2sc.git2sc.Git2SC.delete_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.update_page', autospect=True)
+    def test_apply_plan_refuses_stale_plans(
+        self,
+        updatepageMock,
+        createpageMock,
+        deletepageMock,
+    ):
+        '''Required to not overwrite the pages edited after the plan'''
+
+        plan = self._planned_tree()
+        self.git2sc.pages['id_moved']['version']['number'] = 4
+
+        with self.assertRaises(StalePlan):
+            self.git2sc.apply_plan(plan)
+        self.assertFalse(createpageMock.called)
+        self.assertFalse(updatepageMock.called)
+        self.assertFalse(deletepageMock.called)
+
+    @patch('git2sc.git2sc.Git2SC.delete_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
+    def test_apply_plan_refuses_to_delete_too_many_pages(
+        self,
+        createpageMock,
+        deletepageMock,
+    ):
+        '''Required to not change the space if the plan would delete too
+        many pages'''
+
+        plan = self._planned_tree()
+
+        with self.assertRaises(TooManyDeletions):
+            self.git2sc.apply_plan(plan, max_deletes=0)
+        self.assertFalse(createpageMock.called)
+        self.assertFalse(deletepageMock.called)
+
+    def deletion_tree(self):
+        self.git2sc.pages = {
+            'root': {'id': 'root', 'title': 'root', 'ancestors': []},
+            'docs': {
+                'id': 'docs',
+                'title': 'docs',
+                'ancestors': [{'id': 'root'}],
+            },
+            'old_directory': {
+                'id': 'old_directory',
+                'title': 'old_directory',
+                'ancestors': [{'id': 'root'}, {'id': 'docs'}],
+            },
+            'old_file': {
+                'id': 'old_file',
+                'title': 'old_file',
+                'ancestors': [
+                    {'id': 'root'},
+                    {'id': 'docs'},
+                    {'id': 'old_directory'},
+                ],
+            },
+            'kept': {
+                'id': 'kept',
+                'title': 'kept',
+                'ancestors': [{'id': 'root'}, {'id': 'docs'}],
+            },
+            'unrelated': {
+                'id': 'unrelated',
+                'title': 'unrelated',
+                'ancestors': [{'id': 'root'}],
+            },
+        }
+
+    def test_only_the_pages_below_the_parent_are_deleted(self):
+        '''Required to not delete the pages of the space that the sync
+        doesn't own'''
+
+        self.deletion_tree()
+
+        self.assertEqual(
+            sorted(self.git2sc._pages_to_delete({'kept'}, 'docs')),
+            ['old_directory', 'old_file'],
+        )
+        self.assertEqual(
+            sorted(self.git2sc._pages_to_delete({'root', 'kept', 'docs'})),
+            ['old_directory', 'old_file', 'unrelated'],
+        )
+
+    def test_sync_to_the_homepage_keeps_the_pages_outside_of_it(self):
+        '''Required to not delete the orphan pages of the space, that hang
+        from its root instead of from the homepage'''
+
+        self.deletion_tree()
+        self.git2sc.pages['orphan'] = {
+            'id': 'orphan',
+            'title': 'orphan',
+            'ancestors': [],
+        }
+
+        self.assertEqual(
+            sorted(self.git2sc._pages_to_delete({'root', 'docs', 'kept'})),
+            ['old_directory', 'old_file', 'unrelated'],
+        )
+
+    @patch('git2sc.git2sc.Git2SC.delete_page', autospect=True)
+    def test_delete_pages_deletes_the_leaves_first(self, deletepageMock):
+        '''Required to not delete a page before its children'''
+
+        self.deletion_tree()
+        deleted = []
+        deletepageMock.side_effect = deleted.append
+
+        self.git2sc.delete_pages(
+            ['old_directory', 'unrelated', 'old_file'],
+            workers=4,
+        )
+
+        self.assertEqual(deleted[0], 'old_file')
+        self.assertEqual(deleted[1], 'old_directory')
+        self.assertEqual(deleted[2], 'unrelated')
+        self.assertEqual(
+            [
+                (batch['depth'], batch['pages'])
+                for batch in self.git2sc.deletions
+            ],
+            [
+                (3, [('old_file', 'old_file')]),
+                (2, [('old_directory', 'old_directory')]),
+                (1, [('unrelated', 'unrelated')]),
+            ],
+        )
+        for batch in self.git2sc.deletions:
+            self.assertGreaterEqual(batch['seconds'], 0)
+        self.assertIn('delete', self.git2sc.report.phases)
+
+    @patch('git2sc.git2sc.Git2SC.delete_page', autospect=True)
+    def test_delete_pages_refuses_to_delete_too_many_pages(
+        self,
+        deletepageMock,
+    ):
+        '''Required to not wipe a space by a wrong path or parent'''
+
+        self.deletion_tree()
+
+        with self.assertRaises(TooManyDeletions):
+            self.git2sc.delete_pages(
+                ['old_directory', 'old_file'],
+                max_deletes=1,
+            )
+        self.assertFalse(deletepageMock.called)
+
+    @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    def test_full_upload_converts_each_published_file_once(
+        self,
+        importfileMock,
+        createpageMock,
+    ):
+        '''Required to not convert the excluded files nor convert the READMEs
+        twice'''
+
+        importfileMock.side_effect = \
+            lambda file_path: '<p>{}</p>'.format(file_path)
+        createpageMock.side_effect = \
+            lambda title, html, parent_id=None: 'id_{}'.format(title)
+        self.os.walk.side_effect = os.walk
+        self.os.path.basename.side_effect = os.path.basename
+        self.os.path.splitext.side_effect = os.path.splitext
+        self.os.path.dirname.side_effect = os.path.dirname
+        self.os.path.join.side_effect = os.path.join
+        self.os.path.isfile.side_effect = os.path.isfile
+
+        self.git2sc.directory_full_upload(
+            'tests/data/repository_example',
+            ['.git', '.gitignore', 'excluded_dir', 'excluded_file.adoc'],
+            'initial_parent_id',
+            workers=4,
+            jobs=4,
+        )
+
+        directory = 'tests/data/repository_example'
+        self.assertEqual(
+            sorted(self.git2sc.conversions.items()),
+            [
+                (os.path.join(directory, path), 1)
+                for path in sorted([
+                    'README.md',
+                    'formation/README.md',
+                    'formation/ansible/README.md',
+                    'formation/ansible/molecule/README.md',
+                    'formation/ansible/molecule/child_child_doc.adoc',
+                    'formation/aws/README.md',
+                    'formation/formation_guide.adoc',
+                    'parent_article.adoc',
+                ])
+            ],
+        )
+        self.assertEqual(
+            importfileMock.call_count,
+            len(self.git2sc.conversions),
+        )
+        self.assertIn(
+            call(
+                'molecule',
+                '<p>{}/formation/ansible/molecule/README.md</p>'.format(
+                    directory,
+                ),
+                'id_ansible',
+            ),
+            createpageMock.mock_calls,
+        )
+
+    @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
+    def test_can_full_upload_a_git_ref(self, createpageMock):
+        '''Required to publish a ref of a bare mirror without checking it
+        out'''
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        repository = os.path.join(directory, 'repository')
+        mirror = os.path.join(directory, 'docs')
+
+        def run_git(*arguments):
+            subprocess.check_output(['git'] + list(arguments))
+
+        run_git('init', '-q', repository)
+        run_git('-C', repository, 'config', 'user.email', 'test@example.com')
+        run_git('-C', repository, 'config', 'user.name', 'Test')
+        os.makedirs(os.path.join(repository, 'api'))
+        for path, content in [
+            ('README.md', '# Docs'),
+            ('guide.md', '# Guide'),
+            ('api/page.html', '<p>Api</p>'),
+        ]:
+            with open(os.path.join(repository, path), 'w') as f:
+                f.write(content)
+        run_git('-C', repository, 'add', '-A')
+        run_git('-C', repository, 'commit', '-q', '-m', 'Release')
+        run_git('-C', repository, 'branch', 'release')
+        run_git('clone', '-q', '--bare', repository, mirror)
+
+        createpageMock.side_effect = \
+            lambda title, html, parent_id=None: 'id_{}'.format(title)
+        self.os.path.basename.side_effect = os.path.basename
+        self.os.path.splitext.side_effect = os.path.splitext
+        self.os.path.dirname.side_effect = os.path.dirname
+        self.os.path.join.side_effect = os.path.join
+        self.git2sc.markdown_engine = 'native'
+
+        self.git2sc.directory_full_upload(
+            mirror,
+            ['.git'],
+            'initial_parent_id',
+            ref='release',
+        )
+
+        self.assertEqual(createpageMock.call_count, 4)
+        createpageMock.assert_has_calls(
+            [
+                call('docs', '<h1>Docs</h1>', 'initial_parent_id'),
+                call('guide', '<h1>Guide</h1>', 'id_docs'),
+                call('api', 'No README here, keep on looking :(', 'id_docs'),
+                call('page', '<p>Api</p>', 'id_api'),
+            ],
+            any_order=True,
+        )
+        self.assertEqual(self.git2sc.cat_file, None)
+        self.assertEqual(self.git2sc.tree, None)
+
+    def test_open_ref_raises_missing_object_if_the_ref_does_not_exist(self):
+        '''Required to report the refs that are not in the mirror'''
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        subprocess.check_output(['git', 'init', '-q', '--bare', directory])
+
+        with self.assertRaises(git.MissingObject):
+            self.git2sc._open_ref(directory, 'release')
+        self.assertEqual(self.git2sc.cat_file, None)
+
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    def test_convert_file_stores_the_converter_failures(self, importfileMock):
+        '''Required to publish the rest of the files when one of them can't
+        be converted'''
+
+        importfileMock.side_effect = subprocess.CalledProcessError(
+            1,
+            ['asciidoctor'],
+        )
+
+        self.assertIsNone(self.git2sc._convert_file('docs/broken.adoc'))
+        self.assertIsInstance(
+            self.git2sc.conversion_errors['docs/broken.adoc'],
+            subprocess.CalledProcessError,
+        )
+        self.assertEqual(self.git2sc.stats['failed'], 1)
+        self.assertEqual(
+            self.git2sc.summary(),
+            '0 created, 0 updated, 0 skipped because they had no changes, '
+            '0 deleted, 1 failed to convert. 1 conversions of 1 files',
+        )
+
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    def test_convert_file_ignores_unknown_extensions(self, importfileMock):
+        '''Required to skip the files that are not documentation'''
+
+        importfileMock.side_effect = UnknownExtension
+
+        self.assertIsNone(self.git2sc._convert_file('docs/image.png'))
+        self.assertEqual(self.git2sc.conversion_errors, {})
+
+    @patch('git2sc.git2sc.Git2SC.create_page', autospect=True)
+    @patch('git2sc.git2sc.Git2SC._create_directory_readme', autospect=True)
+    @patch('git2sc.git2sc.Git2SC.import_file', autospect=True)
+    def test_full_upload_converts_in_parallel_and_skips_failures(
+        self,
+        importfileMock,
+        readmeMock,
+        createpageMock,
+    ):
+        '''Test that the files are converted by several jobs and that a
+        failed conversion only skips its file'''
+
+        def import_side_effect(file_name):
+            if 'formation_guide' in file_name:
+                raise subprocess.CalledProcessError(1, ['asciidoctor'])
+            return '<p>{}</p>'.format(os.path.basename(file_name))
+
+        readmeMock.side_effect = \
+            lambda directory, parent_id=None, html=None: \
+            'id_{}'.format(os.path.basename(directory))
+        importfileMock.side_effect = import_side_effect
+        self.os.walk.side_effect = os.walk
+        self.os.path.basename.side_effect = os.path.basename
+        self.os.path.splitext.side_effect = os.path.splitext
+        self.os.path.dirname.side_effect = os.path.dirname
+        self.os.path.join.side_effect = os.path.join
+
+        self.git2sc.directory_full_upload(
+            'tests/data/repository_example',
+            ['.git', '.gitignore', 'excluded_dir', 'excluded_file.adoc'],
+            'initial_parent_id',
+            workers=4,
+            jobs=4,
+        )
+
+        self.assertEqual(
+            sorted(createpageMock.mock_calls),
+            sorted([
+                call(
+                    'parent_article',
+                    '<p>parent_article.adoc</p>',
+                    'id_repository_example',
+                ),
+                call(
+                    'child_child_doc',
+                    '<p>child_child_doc.adoc</p>',
+                    'id_molecule',
+                ),
+            ])
+        )
+        self.assertEqual(
+            list(self.git2sc.conversion_errors.keys()),
+            ['tests/data/repository_example/formation/formation_guide.adoc'],
+        )
@@ -0,0 +1,92 @@
+import unittest
+from git2sc.index import PageIndex, parent_id
+
+
+class TestPageIndex(unittest.TestCase):
+    '''Test class for the PageIndex class'''
+
+    def setUp(self):
+        self.index = PageIndex({
+            '1': {'id': '1', 'title': 'Home', 'ancestors': []},
+            '2': {'id': '2', 'title': 'Child', 'ancestors': [{'id': '1'}]},
+            '3': {
+                'id': '3',
+                'title': 'Grandchild',
+                'ancestors': [{'id': '1'}, {'id': '2'}],
+            },
+        })
+
+    def test_behaves_like_a_dictionary(self):
+        '''Required to keep the pages attribute interface'''
+
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index['2']['title'], 'Child')
+        self.assertEqual(sorted(self.index.keys()), ['1', '2', '3'])
+        self.assertEqual(PageIndex(), {})
+
+    def test_can_get_id_by_title(self):
+        '''Required to find the article of a file without scanning the
+        pages'''
+
+        self.assertEqual(self.index.get_id('Child'), '2')
+        self.assertEqual(self.index.get_id('Unknown'), None)
+        self.assertTrue(self.index.title_exists('Home'))
+        self.assertFalse(self.index.title_exists('Unknown'))
+
+    def test_can_get_children_and_descendants(self):
+        '''Required to know which pages hang below a page'''
+
+        self.assertEqual(self.index.children('1'), {'2'})
+        self.assertEqual(sorted(self.index.descendants('1')), ['2', '3'])
+        self.assertEqual(self.index.parent('3'), '2')
+        self.assertEqual(self.index.children(None), {'1'})
+
+    def test_indexes_are_updated_on_set(self):
+        '''Required to keep the indexes coherent when a page changes'''
+
+        self.index['2'] = {'id': '2', 'title': 'Moved', 'ancestors': []}
+
+        self.assertEqual(self.index.get_id('Moved'), '2')
+        self.assertFalse(self.index.title_exists('Child'))
+        self.assertEqual(self.index.children(None), {'1', '2'})
+        self.assertEqual(self.index.children('1'), set())
+
+    def test_indexes_are_updated_on_delete(self):
+        '''Required to keep the indexes coherent when a page is deleted'''
+
+        del self.index['3']
+
+        self.assertFalse(self.index.title_exists('Grandchild'))
+        self.assertEqual(self.index.children('2'), set())
+        self.assertEqual(self.index.pop('2')['title'], 'Child')
+        self.assertEqual(self.index.children('1'), set())
+
+    def test_can_rename_pages(self):
+        '''Required to keep the title index coherent when a page changes its
+        title'''
+
+        self.index.rename('2', 'New title')
+
+        self.assertEqual(self.index['2']['title'], 'New title')
+        self.assertEqual(self.index.get_id('New title'), '2')
+        self.assertFalse(self.index.title_exists('Child'))
+
+    def test_can_move_pages(self):
+        '''Required to keep the children index coherent when a page is moved
+        below another parent'''
+
+        self.index.move('3', '1')
+
+        self.assertEqual(
+            self.index['3']['ancestors'],
+            [{'id': '1'}],
+        )
+        self.assertEqual(self.index.parent('3'), '1')
+        self.assertEqual(self.index.children('1'), {'2', '3'})
+        self.assertEqual(self.index.children('2'), set())
+
+    def test_parent_id_of_a_root_page_is_none(self):
+        '''Required to index the pages without ancestors'''
+
+        self.assertEqual(parent_id({'id': '1'}), None)
+        self.assertEqual(parent_id({'ancestors': [{'id': '1'}]}), '1')
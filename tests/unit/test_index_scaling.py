@@ -0,0 +1,20 @@
+import unittest
+from collections import Counter
+from benchmarks.index_scaling import measure
+
+
+class TestIndexScaling(unittest.TestCase):
+    '''Test class for the index_scaling benchmark'''
+
+    def test_plans_the_synthetic_space(self):
+        '''Required to keep the benchmark running as git2sc changes'''
+
+        seconds, plan = measure(pages=100, fan_out=10)
+
+        self.assertGreater(seconds, 0)
+        self.assertEqual(
+            Counter(operation['op'] for operation in plan.operations),
+            # The pages of the directories and of half of the files exist
+            # and are unchanged, the homepage has no README
+            {'create': 50, 'skip': 60, 'update': 1},
+        )
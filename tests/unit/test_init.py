@@ -1,7 +1,11 @@
 import unittest
-from unittest.mock import patch, PropertyMock
+from unittest.mock import call, patch, PropertyMock
 
 from git2sc import main
+from git2sc.git import MissingObject
+from git2sc.git2sc import TooManyDeletions
+from git2sc.metrics import PushError
+from git2sc.plan import StalePlan
 
 
 class TestMain(unittest.TestCase):
@@ -24,8 +28,21 @@ class TestMain(unittest.TestCase):
         self.print = self.print_patch.start()
 
         self.args.space = 'TST'
+        self.args.no_state = True
+        self.args.no_cache = True
+        self.args.no_warm_converters = True
+        self.args.markdown_engine = 'pandoc'
+        self.args.rate_limit = None
+        self.args.no_gitignore = False
+        self.args.ref = None
+        self.args.report = None
+        self.args.slowest = 10
+        self.args.metrics = None
+        self.args.pushgateway = None
         self.git2sc_patch = patch('git2sc.Git2SC', autospect=True)
         self.git2sc = self.git2sc_patch.start()
+        self.git2sc.return_value.conversion_errors = {}
+        self.git2sc.return_value.deletions = []
 
     def tearDown(self):
         self.os_patch.stop()
@@ -49,7 +66,10 @@ class TestMain(unittest.TestCase):
                 'GIT2SC_AUTH': 'user:password',
             },
         )
-        main()
+        with self.assertRaises(SystemExit) as context:
+            main()
+        self.assertEqual(context.exception.code, 1)
+
         self.assertEqual(
             self.print.assert_called_with(
                 'GIT2SC_API_URL environmental variable not set'
@@ -66,7 +86,10 @@ class TestMain(unittest.TestCase):
                 'GIT2SC_API_URL': 'https://confluence.sucks.com/wiki/rest/api',
             },
         )
-        main()
+        with self.assertRaises(SystemExit) as context:
+            main()
+        self.assertEqual(context.exception.code, 1)
+
         self.assertEqual(
             self.print.assert_called_with(
                 'GIT2SC_AUTH environmental variable not set'
@@ -91,11 +114,104 @@ class TestMain(unittest.TestCase):
                 'https://confluence.sucks.com/wiki/rest/api',
                 'user:password',
                 'TST',
+                state=None,
+                cache=None,
+                warm_converters=None,
+                markdown_engine='pandoc',
+                rate_limit=None,
+                gitignore=True,
             ),
             None,
         )
         self.assertTrue(self.git2sc.called)
 
+    @patch('git2sc.SyncState', autospect=True)
+    def test_main_loads_the_sync_state(self, syncstateMock):
+        '''Required to ensure that the main program gives the sync state to
+        the git2sc object'''
+
+        self.args.no_state = False
+        self.args.state = '/path/to/state.sqlite'
+
+        main()
+        self.assertEqual(
+            syncstateMock.assert_called_with('/path/to/state.sqlite', 'TST'),
+            None,
+        )
+        self.assertEqual(
+            self.git2sc.call_args[1]['state'],
+            syncstateMock.return_value,
+        )
+
+    @patch('git2sc.HtmlCache', autospect=True)
+    def test_main_loads_the_html_cache(self, htmlcacheMock):
+        '''Required to ensure that the main program gives the html cache to
+        the git2sc object'''
+
+        self.args.no_cache = False
+        self.args.cache = '/path/to/cache'
+        self.args.cache_size = 10
+
+        main()
+        self.assertEqual(
+            htmlcacheMock.assert_called_with(
+                '/path/to/cache',
+                max_size=10 * 1024 * 1024,
+            ),
+            None,
+        )
+        self.assertEqual(
+            self.git2sc.call_args[1]['cache'],
+            htmlcacheMock.return_value,
+        )
+
+    @patch('git2sc.WarmConverters', autospect=True)
+    def test_main_starts_and_stops_the_warm_converters(
+        self,
+        warmconvertersMock,
+    ):
+        '''Required to ensure that the main program gives the warm converters
+        to the git2sc object and stops them at the end'''
+
+        self.args.no_warm_converters = False
+        self.args.subcommand = 'article'
+        self.args.article_command = 'delete'
+
+        main()
+        self.assertEqual(
+            self.git2sc.call_args[1]['warm_converters'],
+            warmconvertersMock.return_value,
+        )
+        self.assertTrue(warmconvertersMock.return_value.close.called)
+
+    @patch('git2sc.push', autospect=True)
+    @patch('git2sc.openmetrics', autospect=True)
+    @patch('git2sc.WarmConverters', autospect=True)
+    def test_failed_sync_exports_the_metrics_and_stops_the_converters(
+        self,
+        warmconvertersMock,
+        openmetricsMock,
+        pushMock,
+    ):
+        '''Required to alert on the failed syncs and to not leave converter
+        processes behind'''
+
+        self.args.no_warm_converters = False
+        self.args.subcommand = 'sync'
+        self.args.incremental = False
+        self.args.converter_limit = None
+        self.args.max_deletes = 10
+        self.args.pushgateway = 'http://localhost:9091'
+        self.git2sc.return_value.directory_update.side_effect = \
+            MissingObject('release is not an object of the repository')
+
+        with self.assertRaises(SystemExit) as context:
+            main()
+        self.assertEqual(context.exception.code, 1)
+
+        self.assertTrue(pushMock.called)
+        self.assertTrue(warmconvertersMock.return_value.close.called)
+
     def test_article_update_subcommand_with_html(self):
         '''Required to ensure that the main program reacts as expected when
         called with the update page arguments'''
@@ -217,23 +333,117 @@ class TestMain(unittest.TestCase):
             None
         )
 
-    def test_upload_directory_subcommand(self):
+    @patch('git2sc.Journal', autospect=True)
+    def test_upload_directory_subcommand(self, journalMock):
         '''Required to ensure that the main program reacts as expected when
         called with the upload directory arguments'''
         self.args.subcommand = 'upload'
         self.args.path = '/path/to/directory'
         self.args.exclude = ['.git']
         self.args.parent_id = None
+        self.args.workers = 4
+        self.args.jobs = 8
+        self.args.converter_limit = [('.adoc', 2)]
+        self.args.resume = False
+        self.args.journal = '/path/to/journal'
 
         main()
         self.assertEqual(
             self.git2sc.return_value.directory_full_upload.assert_called_with(
                 self.args.path,
                 self.args.exclude,
-                None
+                None,
+                workers=4,
+                jobs=8,
+                converter_limits={'.adoc': 2},
+                journal=journalMock.return_value,
+                ref=None,
             ),
             None
         )
+        journalMock.assert_called_once_with('/path/to/journal', resume=False)
+        self.assertTrue(journalMock.return_value.remove.called)
+
+    @patch('git2sc.Journal', autospect=True)
+    def test_upload_reports_the_missing_refs(self, journalMock):
+        '''Required to publish a ref of a bare mirror, and to know that the
+        ref doesn't exist'''
+        self.args.subcommand = 'upload'
+        self.args.converter_limit = None
+        self.args.ref = 'release/1.0'
+        self.git2sc.return_value.directory_full_upload.side_effect = \
+            MissingObject('release/1.0: is not an object of the repository')
+
+        with self.assertRaises(SystemExit) as context:
+            main()
+        self.assertEqual(context.exception.code, 1)
+
+        self.assertEqual(
+            self.git2sc.return_value.directory_full_upload.call_args[1]['ref'],
+            'release/1.0',
+        )
+        self.print.assert_called_once_with(
+            self.git2sc.return_value.directory_full_upload.side_effect,
+        )
+        self.assertFalse(journalMock.return_value.remove.called)
+
+    @patch('git2sc.Journal', autospect=True)
+    def test_upload_keeps_the_journal_if_it_fails(self, journalMock):
+        '''Required to be able to resume the upload'''
+        self.args.subcommand = 'upload'
+        self.args.converter_limit = None
+        self.args.resume = True
+        self.args.journal = None
+        self.git2sc.return_value.directory_full_upload.side_effect = \
+            Exception('Error 500: Internal error')
+
+        with self.assertRaises(Exception):
+            main()
+        path, = journalMock.call_args[0]
+        self.assertTrue(path.endswith('TST.journal'))
+        self.assertEqual(journalMock.call_args[1], {'resume': True})
+        self.assertFalse(journalMock.return_value.remove.called)
+
+    def test_sync_prints_the_deleted_pages(self):
+        '''Required to know what a sync removed and how long it took'''
+        self.args.subcommand = 'sync'
+        self.args.incremental = False
+        self.args.converter_limit = None
+        self.args.max_deletes = None
+        self.git2sc.return_value.deletions = [
+            {'depth': 2, 'pages': [('2', 'child')], 'seconds': 0.5},
+            {'depth': 1, 'pages': [('1', 'parent')], 'seconds': 0.25},
+        ]
+
+        main()
+
+        self.assertEqual(
+            self.print.mock_calls[:4],
+            [
+                call('Deleted child (2)'),
+                call('Deleted 1 pages at depth 2 in 0.50s'),
+                call('Deleted parent (1)'),
+                call('Deleted 1 pages at depth 1 in 0.25s'),
+            ],
+        )
+
+    def test_sync_stops_if_it_would_delete_too_many_pages(self):
+        '''Required to not wipe a space by a wrong path or parent'''
+        self.args.subcommand = 'sync'
+        self.args.incremental = False
+        self.args.converter_limit = None
+        self.args.max_deletes = 10
+        self.git2sc.return_value.directory_update.side_effect = \
+            TooManyDeletions('The sync would delete 20 pages')
+
+        with self.assertRaises(SystemExit) as context:
+            main()
+        self.assertEqual(context.exception.code, 1)
+
+        self.print.assert_called_once_with(
+            self.git2sc.return_value.directory_update.side_effect,
+        )
+        self.assertFalse(self.git2sc.return_value.summary.called)
 
     def test_sync_directory_subcommand(self):
         '''Required to ensure that the main program reacts as expected when
@@ -242,12 +452,290 @@ class TestMain(unittest.TestCase):
         self.args.path = '/path/to/directory'
         self.args.exclude = ['.git']
         self.args.parent_id = None
+        self.args.incremental = False
+        self.args.workers = 4
+        self.args.jobs = 8
+        self.args.converter_limit = None
+        self.args.max_deletes = None
 
         main()
         self.assertEqual(
             self.git2sc.return_value.directory_update.assert_called_with(
                 self.args.path,
                 self.args.exclude,
+                None,
+                workers=4,
+                jobs=8,
+                converter_limits={},
+                max_deletes=None,
+                ref=None,
+            ),
+            None
+        )
+        self.assertEqual(
+            self.print.assert_called_with(
+                self.git2sc.return_value.summary.return_value,
+            ),
+            None
+        )
+
+    def test_sync_prints_the_run_report(self):
+        '''Required to know where the time of a slow sync goes'''
+        self.args.subcommand = 'sync'
+        self.args.incremental = False
+        self.args.converter_limit = None
+        self.args.max_deletes = None
+        self.args.report = '-'
+        self.args.slowest = 5
+
+        main()
+
+        self.git2sc.return_value.report.format.assert_called_once_with(5)
+        self.print.assert_called_with(
+            self.git2sc.return_value.report.format.return_value,
+        )
+
+    def test_failed_sync_prints_the_run_report(self):
+        '''Required to know where the time of a sync that failed went'''
+        self.args.subcommand = 'sync'
+        self.args.incremental = False
+        self.args.converter_limit = None
+        self.args.max_deletes = 10
+        self.args.report = '-'
+        self.git2sc.return_value.directory_update.side_effect = \
+            TooManyDeletions('The sync would delete 20 pages')
+
+        with self.assertRaises(SystemExit) as context:
+            main()
+        self.assertEqual(context.exception.code, 1)
+
+        self.print.assert_called_with(
+            self.git2sc.return_value.report.format.return_value,
+        )
+
+    def test_sync_writes_the_run_report_to_a_file(self):
+        '''Required to compare the reports of several runs'''
+        self.args.subcommand = 'sync'
+        self.args.incremental = False
+        self.args.converter_limit = None
+        self.args.max_deletes = None
+        self.args.report = 'report.json'
+
+        main()
+
+        self.git2sc.return_value.report.save.assert_called_once_with(
+            'report.json',
+            10,
+        )
+        self.assertFalse(self.git2sc.return_value.report.format.called)
+
+    @patch('git2sc.push', autospect=True)
+    @patch('git2sc.write_textfile', autospect=True)
+    @patch('git2sc.openmetrics', autospect=True)
+    def test_sync_exports_the_metrics(
+        self,
+        openmetricsMock,
+        writetextfileMock,
+        pushMock,
+    ):
+        '''Required to keep the trends of the syncs of each space'''
+        self.args.subcommand = 'sync'
+        self.args.incremental = False
+        self.args.converter_limit = None
+        self.args.max_deletes = None
+        self.args.metrics = 'git2sc.prom'
+        self.args.pushgateway = 'http://localhost:9091'
+
+        main()
+
+        openmetricsMock.assert_called_once_with(self.git2sc.return_value)
+        writetextfileMock.assert_called_once_with(
+            'git2sc.prom',
+            openmetricsMock.return_value,
+        )
+        pushMock.assert_called_once_with(
+            'http://localhost:9091',
+            'TST',
+            openmetricsMock.return_value,
+        )
+
+    @patch('git2sc.push', autospect=True)
+    @patch('git2sc.openmetrics', autospect=True)
+    def test_sync_prints_the_failed_pushes(self, openmetricsMock, pushMock):
+        '''Required to not hide a lost push of the metrics'''
+        self.args.subcommand = 'sync'
+        self.args.incremental = False
+        self.args.converter_limit = None
+        self.args.max_deletes = None
+        self.args.pushgateway = 'http://localhost:9091'
+        pushMock.side_effect = PushError('Error pushing the metrics')
+
+        main()
+
+        self.print.assert_called_with(pushMock.side_effect)
+
+    def test_incremental_sync_directory_subcommand(self):
+        '''Required to ensure that the main program reacts as expected when
+        called with the incremental sync directory arguments'''
+        self.args.subcommand = 'sync'
+        self.args.path = '/path/to/directory'
+        self.args.exclude = ['.git']
+        self.args.parent_id = '12345'
+        self.args.incremental = True
+        self.args.since = 'v1.0.0'
+        self.args.workers = 4
+        self.args.jobs = 8
+        self.args.converter_limit = None
+        self.args.max_deletes = 10
+
+        main()
+        self.assertEqual(
+            self.git2sc.return_value.directory_incremental_update.
+            assert_called_with(
+                self.args.path,
+                self.args.exclude,
+                '12345',
+                since='v1.0.0',
+                workers=4,
+                jobs=8,
+                converter_limits={},
+                max_deletes=10,
             ),
             None
         )
+        self.assertFalse(self.git2sc.return_value.directory_update.called)
+
+    def test_incremental_sync_refuses_a_ref(self):
+        '''Required to not mix the working tree of an incremental sync with
+        a ref'''
+        self.args.subcommand = 'sync'
+        self.args.incremental = True
+        self.args.ref = 'release/1.0'
+        parser = self.load_parser.return_value
+        parser.error.side_effect = SystemExit(2)
+
+        with self.assertRaises(SystemExit):
+            main()
+
+        self.assertEqual(
+            parser.error.assert_called_with(
+                "--ref can't be used with --incremental",
+            ),
+            None,
+        )
+        self.assertFalse(self.git2sc.called)
+
+    def test_sync_prints_the_files_that_failed_to_convert(self):
+        '''Required to ensure that the conversion errors are reported file by
+        file'''
+        self.args.subcommand = 'sync'
+        self.args.incremental = False
+        self.args.converter_limit = None
+        self.git2sc.return_value.conversion_errors = {
+            'docs/broken.adoc': 'asciidoctor returned 1',
+        }
+
+        main()
+        self.assertEqual(
+            self.print.mock_calls[0],
+            call('Error converting docs/broken.adoc: asciidoctor returned 1'),
+        )
+        self.assertEqual(
+            self.print.mock_calls[1],
+            call(self.git2sc.return_value.summary.return_value),
+        )
+
+    def test_plan_subcommand_saves_and_prints_the_plan(self):
+        '''Required to review the changes of a sync before applying them'''
+        self.args.subcommand = 'plan'
+        self.args.path = 'docs'
+        self.args.exclude = ['.git']
+        self.args.parent_id = 'parent_id'
+        self.args.jobs = 2
+        self.args.converter_limit = None
+        self.args.output = 'plan.json'
+        plan = self.git2sc.return_value.plan_update.return_value
+
+        main()
+
+        self.assertEqual(
+            self.git2sc.return_value.plan_update.assert_called_with(
+                'docs',
+                ['.git'],
+                'parent_id',
+                jobs=2,
+                converter_limits={},
+                ref=None,
+            ),
+            None,
+        )
+        self.assertEqual(plan.save.assert_called_with('plan.json'), None)
+        self.assertEqual(
+            self.print.mock_calls,
+            [call(plan.summary.return_value)],
+        )
+
+    @patch('git2sc.SyncPlan', autospect=True)
+    def test_apply_subcommand_applies_the_saved_plan(self, syncplanMock):
+        '''Required to publish a reviewed plan'''
+        self.args.subcommand = 'apply'
+        self.args.plan = 'plan.json'
+        self.args.workers = 8
+        self.args.max_deletes = 5
+        plan = syncplanMock.load.return_value
+        plan.space = 'TST'
+
+        main()
+
+        self.assertEqual(
+            syncplanMock.load.assert_called_with('plan.json'),
+            None,
+        )
+        self.assertEqual(
+            self.git2sc.return_value.apply_plan.assert_called_with(
+                plan,
+                workers=8,
+                max_deletes=5,
+            ),
+            None,
+        )
+        self.assertEqual(
+            self.print.mock_calls,
+            [call(self.git2sc.return_value.summary.return_value)],
+        )
+
+    @patch('git2sc.SyncPlan', autospect=True)
+    def test_apply_subcommand_refuses_stale_plans(self, syncplanMock):
+        '''Required to not overwrite the pages edited after the plan'''
+        self.args.subcommand = 'apply'
+        self.args.plan = 'plan.json'
+        self.args.workers = 8
+        self.args.max_deletes = None
+        syncplanMock.load.return_value.space = 'TST'
+        error = StalePlan('The page 1 changed to version 3')
+        self.git2sc.return_value.apply_plan.side_effect = error
+
+        with self.assertRaises(SystemExit) as context:
+            main()
+        self.assertEqual(context.exception.code, 1)
+
+        self.print.assert_called_once_with(error)
+
+    @patch('git2sc.SyncPlan', autospect=True)
+    def test_apply_subcommand_refuses_plans_of_other_spaces(
+        self,
+        syncplanMock,
+    ):
+        '''Required to not apply the plan of a space to another one'''
+        self.args.subcommand = 'apply'
+        self.args.plan = 'plan.json'
+        syncplanMock.load.return_value.space = 'OTHER'
+
+        with self.assertRaises(SystemExit) as context:
+            main()
+        self.assertEqual(context.exception.code, 1)
+
+        self.assertFalse(self.git2sc.return_value.apply_plan.called)
+        self.print.assert_called_once_with(
+            'The plan plan.json belongs to the space OTHER',
+        )
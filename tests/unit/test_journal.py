@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from git2sc.journal import Journal, JournalMismatch, default_journal_path
+
+
+class TestJournal(unittest.TestCase):
+    '''Test class for the Journal class'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'TST.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_default_path_is_in_the_cache_directory(self):
+        '''Required to keep a journal for each space'''
+
+        with patch.dict(os.environ, {'XDG_CACHE_HOME': '/cache'}):
+            self.assertEqual(
+                default_journal_path('TST'),
+                '/cache/git2sc/TST.journal',
+            )
+
+    def test_resume_loads_the_planned_and_completed_paths(self):
+        '''Required to skip the pages uploaded before the interruption'''
+
+        journal = Journal(self.path)
+        journal.start('docs', 'parent')
+        journal.plan('guide.adoc', 'guide', 'hash')
+        journal.done('guide.adoc', '1', 'hash')
+        journal.plan('other.adoc', 'other', 'other_hash')
+        journal.close()
+
+        resumed = Journal(self.path, resume=True)
+
+        self.assertTrue(resumed.resuming)
+        self.assertEqual(resumed.page_id('guide.adoc'), '1')
+        self.assertIsNone(resumed.page_id('other.adoc'))
+        self.assertEqual(resumed.page_ids(), {'1'})
+        self.assertEqual(
+            resumed.planned['other.adoc']['title'],
+            'other',
+        )
+        resumed.start('docs', 'parent')
+        resumed.close()
+
+    def test_ignores_the_line_cut_by_a_crash(self):
+        '''Required to resume after a crash in the middle of a write'''
+
+        journal = Journal(self.path)
+        journal.done('guide.adoc', '1')
+        journal.close()
+        with open(self.path, 'a') as f:
+            f.write('{"op": "done", "pa')
+
+        self.assertEqual(
+            Journal(self.path, resume=True).completed.keys(),
+            {'guide.adoc'},
+        )
+
+    def test_without_resume_the_journal_starts_empty(self):
+        '''Required to not skip pages of an old upload'''
+
+        journal = Journal(self.path)
+        journal.done('guide.adoc', '1')
+        journal.close()
+
+        journal = Journal(self.path)
+
+        self.assertFalse(journal.resuming)
+        journal.close()
+        self.assertEqual(os.path.getsize(self.path), 0)
+
+    def test_resume_refuses_the_journal_of_another_upload(self):
+        '''Required to not skip the pages of another directory'''
+
+        journal = Journal(self.path)
+        journal.start('docs')
+        journal.close()
+
+        journal = Journal(self.path, resume=True)
+        with self.assertRaises(JournalMismatch):
+            journal.start('other_docs')
+        journal.close()
+
+    @patch('git2sc.journal.os.fsync')
+    def test_fsyncs_the_records_in_batches(self, fsyncMock):
+        '''Required to not slow down the upload with a fsync per page'''
+
+        journal = Journal(self.path, sync_every=10, sync_interval=3600)
+        for index in range(25):
+            journal.done('file_{}.adoc'.format(index), str(index))
+
+        self.assertEqual(fsyncMock.call_count, 2)
+        journal.close()
+        self.assertEqual(fsyncMock.call_count, 3)
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 25)
+
+    def test_remove_deletes_the_journal(self):
+        '''Required to start the next upload from scratch'''
+
+        journal = Journal(self.path)
+        journal.done('guide.adoc', '1')
+        journal.remove()
+
+        self.assertFalse(os.path.exists(self.path))
@@ -0,0 +1,148 @@
+import unittest
+from git2sc.markdown import render, UnsupportedMarkdown
+
+
+class TestRender(unittest.TestCase):
+    '''Test class for the markdown renderer'''
+
+    def test_renders_headings(self):
+        '''Required to convert the ATX and setext headings'''
+
+        self.assertEqual(
+            render('# Title #\n\nSubtitle\n--------\n\n### Section'),
+            '<h1>Title</h1>\n<h2>Subtitle</h2>\n<h3>Section</h3>',
+        )
+
+    def test_renders_paragraphs_with_inline_markup(self):
+        '''Required to convert the inline syntax'''
+
+        self.assertEqual(
+            render(
+                'Some *emphasis*, __strong__, ***both***, ~~deleted~~ and\n'
+                '`a < b` code.'
+            ),
+            '<p>Some <em>emphasis</em>, <strong>strong</strong>, '
+            '<strong><em>both</em></strong>, <del>deleted</del> and\n'
+            '<code>a &lt; b</code> code.</p>',
+        )
+
+    def test_underscores_inside_words_are_not_emphasis(self):
+        '''Required to keep the snake_case names'''
+
+        self.assertEqual(
+            render('Call snake_case_function'),
+            '<p>Call snake_case_function</p>',
+        )
+
+    def test_escapes_the_text(self):
+        '''Required to produce valid storage format'''
+
+        self.assertEqual(
+            render('Fish &amp; chips & 1 < 2 &copy; \\*not emphasis\\*'),
+            '<p>Fish &amp; chips &amp; 1 &lt; 2 \u00a9 *not emphasis*</p>',
+        )
+
+    def test_renders_hard_line_breaks_as_self_closed_tags(self):
+        '''Required as the storage format is xhtml'''
+
+        self.assertEqual(
+            render('First line  \nSecond line\\\nThird line\n\n***'),
+            '<p>First line<br />Second line<br />Third line</p>\n<hr />',
+        )
+
+    def test_renders_links(self):
+        '''Required to convert the inline, reference and automatic links'''
+
+        self.assertEqual(
+            render(
+                '[inline](http://a.com "Title"), [reference][ref], '
+                '[ref] and <http://c.com>\n\n'
+                '[ref]: http://b.com?a=1&b=2'
+            ),
+            '<p><a href="http://a.com" title="Title">inline</a>, '
+            '<a href="http://b.com?a=1&amp;b=2">reference</a>, '
+            '<a href="http://b.com?a=1&amp;b=2">ref</a> and '
+            '<a href="http://c.com">http://c.com</a></p>',
+        )
+
+    def test_renders_images_as_confluence_images(self):
+        '''Required to show the images in confluence'''
+
+        self.assertEqual(
+            render('![The *logo*](http://a.com/logo.png)'),
+            '<p><ac:image ac:alt="The logo">'
+            '<ri:url ri:value="http://a.com/logo.png" /></ac:image></p>',
+        )
+
+    def test_renders_code_blocks_as_code_macros(self):
+        '''Required to show the code blocks with the confluence code
+        macro'''
+
+        self.assertEqual(
+            render('```python\nif a < b:\n    print("]]>")\n```'),
+            '<ac:structured-macro ac:name="code">'
+            '<ac:parameter ac:name="language">py</ac:parameter>'
+            '<ac:plain-text-body><![CDATA[if a < b:\n    print("]]]]>'
+            '<![CDATA[>")]]></ac:plain-text-body></ac:structured-macro>',
+        )
+
+    def test_renders_indented_code_blocks_without_language(self):
+        '''Required to convert the indented code blocks and the languages
+        confluence doesn't know'''
+
+        expected = '<ac:structured-macro ac:name="code">'\
+            '<ac:plain-text-body><![CDATA[make install]]>'\
+            '</ac:plain-text-body></ac:structured-macro>'
+        self.assertEqual(render('    make install\n'), expected)
+        self.assertEqual(render('~~~brainfuck\nmake install\n~~~'), expected)
+
+    def test_renders_block_quotes(self):
+        '''Required to convert the block quotes and their lazy lines'''
+
+        self.assertEqual(
+            render('> # Quote\n> First\nlazy line\n\nOut'),
+            '<blockquote><h1>Quote</h1>\n<p>First\nlazy line</p>'
+            '</blockquote>\n<p>Out</p>',
+        )
+
+    def test_renders_tight_nested_lists(self):
+        '''Required to convert the lists without wrapping their items in
+        paragraphs'''
+
+        self.assertEqual(
+            render('* One\n* Two\n  1. Nested\n  2. List\n* Three'),
+            '<ul><li>One</li><li>Two\n<ol><li>Nested</li><li>List</li></ol>'
+            '</li><li>Three</li></ul>',
+        )
+
+    def test_renders_loose_lists(self):
+        '''Required to convert the lists whose items are separated by blank
+        lines'''
+
+        self.assertEqual(
+            render('3. One\n\n4. Two\n\n   More text'),
+            '<ol start="3"><li><p>One</p></li>'
+            '<li><p>Two</p>\n<p>More text</p></li></ol>',
+        )
+
+    def test_renders_tables(self):
+        '''Required to convert the pipe tables'''
+
+        self.assertEqual(
+            render('| Name | Size |\n|:-----|-----:|\n| a \\| b | 1 |'),
+            '<table><tbody><tr><th style="text-align: left;">Name</th>'
+            '<th style="text-align: right;">Size</th></tr>'
+            '<tr><td style="text-align: left;">a | b</td>'
+            '<td style="text-align: right;">1</td></tr></tbody></table>',
+        )
+
+    def test_raises_unsupported_for_raw_html_and_footnotes(self):
+        '''Required to convert with pandoc the files the renderer can't'''
+
+        for text in (
+            '<div class="note">Note</div>',
+            'Inline <span>html</span>',
+            'Note[^1]\n\n[^1]: The footnote',
+        ):
+            with self.assertRaises(UnsupportedMarkdown):
+                render(text)
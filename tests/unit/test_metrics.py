@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import unittest
+import requests
+from collections import Counter
+from unittest.mock import patch, Mock
+from git2sc.metrics import (
+    PUSH_CONTENT_TYPE,
+    PushError,
+    openmetrics,
+    push,
+    write_textfile,
+)
+from git2sc.report import RunReport
+
+
+class TestOpenMetrics(unittest.TestCase):
+    '''Test class for the openmetrics function'''
+
+    def setUp(self):
+        self.now = 0.0
+        self.g = Mock()
+        self.g.space = 'TST'
+        self.g.stats = Counter({'created': 2, 'updated': 3, 'failed': 1})
+        self.g.throttle.throttled = 4
+        self.g.report = RunReport(clock=lambda: self.now)
+
+    def test_has_the_pages_and_the_run_duration_of_the_space(self):
+        '''Required to alert when the sync of a space regresses'''
+
+        self.now = 12.5
+
+        text = openmetrics(self.g, now=1000)
+
+        self.assertIn('# TYPE git2sc_pages gauge\n', text)
+        self.assertIn(
+            'git2sc_pages{space="TST",operation="created"} 2\n',
+            text,
+        )
+        self.assertIn(
+            'git2sc_pages{space="TST",operation="deleted"} 0\n',
+            text,
+        )
+        self.assertIn('git2sc_conversion_failures{space="TST"} 1\n', text)
+        self.assertIn('git2sc_throttled_requests{space="TST"} 4\n', text)
+        self.assertIn('git2sc_run_duration_seconds{space="TST"} 12.5\n', text)
+        self.assertIn(
+            'git2sc_last_run_timestamp_seconds{space="TST"} 1000.0\n',
+            text,
+        )
+        self.assertTrue(text.endswith('\n# EOF\n'))
+
+    def test_has_the_conversion_seconds_by_converter(self):
+        '''Required to follow the cost of each converter'''
+
+        self.g.report.conversion('asciidoctor', 'a.adoc', 1.5)
+        self.g.report.conversion('asciidoctor', 'b.adoc', 0.5)
+
+        text = openmetrics(self.g)
+
+        self.assertIn(
+            'git2sc_conversion_seconds{space="TST",converter="asciidoctor"} '
+            '2.0\n',
+            text,
+        )
+        self.assertIn(
+            'git2sc_conversions{space="TST",converter="asciidoctor"} 2\n',
+            text,
+        )
+
+    def test_has_a_histogram_of_the_requests_by_endpoint(self):
+        '''Required to follow the latency of confluence'''
+
+        for seconds in (0.01, 0.3, 20):
+            self.g.report.request('GET', '/content/1', seconds, status=200)
+        self.g.report.request('GET', '/content/2', 0.1, status=429)
+
+        text = openmetrics(self.g)
+
+        self.assertIn('# TYPE git2sc_http_request_duration_seconds '
+                      'histogram\n', text)
+        for le, count in (('0.05', 1), ('0.5', 3), ('10.0', 3),
+                          ('+Inf', 4)):
+            self.assertIn(
+                'git2sc_http_request_duration_seconds_bucket{space="TST",'
+                'endpoint="GET /content/{id}",le="' + le + '"} ' +
+                str(count) + '\n',
+                text,
+            )
+        self.assertIn(
+            'git2sc_http_request_duration_seconds_count{space="TST",'
+            'endpoint="GET /content/{id}"} 4\n',
+            text,
+        )
+        self.assertIn(
+            'git2sc_http_responses{space="TST",code="429"} 1\n',
+            text,
+        )
+
+    def test_escapes_the_label_values(self):
+        '''Required to not break the file with odd space keys'''
+
+        self.g.space = 'a"b\\c'
+
+        text = openmetrics(self.g)
+
+        self.assertIn('git2sc_throttled_requests{space="a\\"b\\\\c"} 4', text)
+
+
+class TestWriteTextfile(unittest.TestCase):
+    '''Test class for the write_textfile function'''
+
+    def test_replaces_the_file(self):
+        '''Required to not let the node exporter read a half written file'''
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'git2sc.prom')
+        with open(path, 'w') as f:
+            f.write('old')
+
+        write_textfile(path, '# EOF\n')
+
+        with open(path) as f:
+            self.assertEqual(f.read(), '# EOF\n')
+        self.assertEqual(os.listdir(directory), ['git2sc.prom'])
+
+
+class TestPush(unittest.TestCase):
+    '''Test class for the push function'''
+
+    @patch('git2sc.metrics.requests.put')
+    def test_puts_the_metrics_in_the_group_of_the_space(self, putMock):
+        '''Required to replace the metrics of the last run of the space'''
+
+        push('http://localhost:9091/', 'MY SPACE', '# EOF\n')
+
+        putMock.assert_called_once_with(
+            'http://localhost:9091/metrics/job/git2sc/space/MY%20SPACE',
+            data=b'# EOF\n',
+            headers={'Content-Type': PUSH_CONTENT_TYPE},
+            timeout=10,
+        )
+        self.assertTrue(putMock.return_value.raise_for_status.called)
+
+    @patch('git2sc.metrics.requests.put')
+    def test_raises_push_error_if_it_fails(self, putMock):
+        '''Required to report the failure without losing the sync'''
+
+        putMock.side_effect = requests.exceptions.ConnectionError('refused')
+
+        with self.assertRaises(PushError):
+            push('http://localhost:9091', 'TST', '# EOF\n')
@@ -0,0 +1,175 @@
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import Future
+from unittest.mock import Mock
+from git2sc.plan import PlanningScheduler, StalePlan, SyncPlan
+
+
+class TestSyncPlan(unittest.TestCase):
+    '''Test class for the SyncPlan class'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.plan = SyncPlan('TST', 'docs', 'parent')
+        self.directory_ref = self.plan.add(
+            'create',
+            kind='directory',
+            title='guides',
+            parent='parent',
+            html='<p>Guides</p>',
+        )
+        self.plan.add(
+            'create',
+            kind='file',
+            title='install',
+            parent=self.directory_ref,
+            path='guides/install.md',
+            html='<p>Install</p>',
+        )
+        self.plan.add(
+            'update',
+            kind='file',
+            page_id='1',
+            version=2,
+            path='usage.md',
+            html='<p>Usage</p>',
+        )
+        self.plan.add('skip', kind='file', page_id='2', path='faq.md')
+        self.plan.add('delete', page_id='3', version=1, depth=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_creates_are_referenced_by_their_position(self):
+        '''Required to create the pages below the pages created by the plan'''
+
+        self.assertEqual(self.directory_ref, '@0')
+        self.assertEqual(self.plan.operations[1]['parent'], '@0')
+
+    def test_estimates_the_requests_and_bytes(self):
+        '''Required to know the cost of a sync before applying it'''
+
+        self.assertEqual(
+            self.plan.estimates(),
+            {
+                'operations': {
+                    'create': 2,
+                    'update': 1,
+                    'move': 0,
+                    'delete': 1,
+                    'skip': 1,
+                },
+                'requests': 4,
+                'bytes': 39,
+            },
+        )
+        self.assertEqual(
+            self.plan.summary(),
+            '2 create, 1 update, 0 move, 1 delete, 1 skip. Estimated 4 '
+            'requests and 0.0 KB of html',
+        )
+
+    def test_can_be_saved_and_loaded(self):
+        '''Required to apply the plan in another run'''
+
+        path = os.path.join(self.directory, 'plan.json')
+
+        self.plan.save(path)
+        loaded = SyncPlan.load(path)
+
+        self.assertEqual(loaded.space, 'TST')
+        self.assertEqual(loaded.directory, 'docs')
+        self.assertEqual(loaded.parent_id, 'parent')
+        self.assertEqual(loaded.operations, self.plan.operations)
+
+    def test_load_refuses_unknown_formats(self):
+        '''Required to not apply the plans of other versions of git2sc'''
+
+        path = os.path.join(self.directory, 'plan.json')
+        with open(path, 'w') as f:
+            f.write('{"format": 99}')
+
+        with self.assertRaises(ValueError):
+            SyncPlan.load(path)
+
+    def test_check_accepts_the_planned_versions(self):
+        '''Required to apply the plans of unchanged pages'''
+
+        self.plan.check({
+            'parent': {'version': {'number': 1}},
+            '1': {'version': {'number': 2}},
+            '3': {'version': {'number': '1'}},
+        })
+
+    def test_check_refuses_pages_changed_since_the_plan(self):
+        '''Required to not overwrite the edits made after the plan'''
+
+        with self.assertRaises(StalePlan):
+            self.plan.check({
+                'parent': {'version': {'number': 1}},
+                '1': {'version': {'number': 3}},
+                '3': {'version': {'number': 1}},
+            })
+        with self.assertRaises(StalePlan):
+            self.plan.check({
+                'parent': {'version': {'number': 1}},
+                '1': {'version': {'number': 2}},
+            })
+
+    def test_check_refuses_plans_whose_parent_was_removed(self):
+        '''Required to not publish the directory outside of the page it was
+        planned below'''
+
+        with self.assertRaises(StalePlan):
+            self.plan.check({
+                '1': {'version': {'number': 2}},
+                '3': {'version': {'number': 1}},
+            })
+
+
+class TestPlanningScheduler(unittest.TestCase):
+    '''Test class for the PlanningScheduler class'''
+
+    def test_tasks_are_planned_in_order_with_their_arguments_resolved(self):
+        '''Required to plan the pages of a directory after the directory'''
+
+        planner = Mock()
+        planner._create_directory_readme.return_value = '@0'
+
+        def _create_directory_readme(directory_path, parent_id=None):
+            pass
+
+        def _create_file_page(relative_path, source_hash, filename, html,
+                              parent_id):
+            pass
+
+        scheduler = PlanningScheduler(planner)
+        html = Future()
+        directory = scheduler.submit(_create_directory_readme, 'docs', None)
+        page = scheduler.submit(
+            _create_file_page,
+            'guide.md',
+            'hash',
+            'guide',
+            html,
+            directory,
+        )
+        html.set_result('<p>Guide</p>')
+
+        self.assertFalse(planner._create_directory_readme.called)
+        scheduler.join()
+
+        planner._create_file_page.assert_called_with(
+            'guide.md',
+            'hash',
+            'guide',
+            '<p>Guide</p>',
+            '@0',
+        )
+        self.assertEqual(directory.result(), '@0')
+        self.assertEqual(
+            page.result(),
+            planner._create_file_page.return_value,
+        )
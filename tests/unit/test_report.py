@@ -0,0 +1,188 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from git2sc.report import RunReport, endpoint, percentile
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPercentile(unittest.TestCase):
+    '''Test class for the percentile function'''
+
+    def test_returns_the_nearest_rank(self):
+        '''Required to report the latency of the slow requests without
+        interpolating values that didn't happen'''
+
+        values = [0.5, 0.1, 0.4, 0.2, 0.3]
+
+        self.assertEqual(percentile(values, 0.5), 0.3)
+        self.assertEqual(percentile(values, 0.9), 0.5)
+        self.assertEqual(percentile(values, 0.1), 0.1)
+        self.assertEqual(percentile([], 0.5), None)
+
+
+class TestEndpoint(unittest.TestCase):
+    '''Test class for the endpoint function'''
+
+    def test_groups_the_requests_to_different_pages(self):
+        '''Required to get the latency of each endpoint and not of each
+        page'''
+
+        self.assertEqual(
+            endpoint('GET', '/content/1234?expand=ancestors,version'),
+            'GET /content/{id}',
+        )
+        self.assertEqual(
+            endpoint('GET', '/space/TST/content?limit=100&start=0'),
+            'GET /space/{space}/content',
+        )
+        self.assertEqual(
+            endpoint('GET', '/content/search?cql=id%20in%20(1)'),
+            'GET /content/search',
+        )
+        self.assertEqual(endpoint('POST', '/content'), 'POST /content')
+
+
+class TestRunReport(unittest.TestCase):
+    '''Test class for the RunReport class'''
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.report = RunReport(clock=self.clock)
+
+    def test_times_the_phases(self):
+        '''Required to know which phase of a run takes the time'''
+
+        with self.report.phase('list'):
+            self.clock.now += 2
+        with self.report.phase('delete'):
+            self.clock.now += 1
+        with self.report.phase('list'):
+            self.clock.now += 0.5
+
+        self.assertEqual(
+            self.report.to_dict()['phases'],
+            {'list': 2.5, 'delete': 1},
+        )
+
+    def test_iterate_times_only_the_production_of_the_items(self):
+        '''Required to time the scan of a directory that is consumed while
+        the pages are published'''
+
+        def walk():
+            for item in range(3):
+                self.clock.now += 1
+                yield item
+
+        for item in self.report.iterate('scan', walk()):
+            # Time of the consumer
+            self.clock.now += 10
+
+        self.assertEqual(self.report.phases, {'scan': 3})
+
+    def test_aggregates_the_requests_by_endpoint(self):
+        '''Required to know the latency and the traffic of each endpoint'''
+
+        for seconds in (0.1, 0.2, 0.3, 0.4):
+            self.report.request(
+                'GET',
+                '/content/1?expand=version',
+                seconds,
+                None,
+                b'{"id": "1"}',
+            )
+        self.report.request('PUT', '/content/1', 1, 'caf\xe9', 'ok', 409)
+
+        result = self.report.to_dict()
+
+        self.assertEqual(result['requests'], 5)
+        self.assertEqual(result['sent'], 5)
+        self.assertEqual(result['received'], 46)
+        get = result['endpoints']['GET /content/{id}']
+        self.assertEqual(get['requests'], 4)
+        self.assertEqual(get['p50'], 0.2)
+        self.assertEqual(get['p90'], 0.4)
+        self.assertEqual(get['max'], 0.4)
+        self.assertAlmostEqual(get['seconds'], 1)
+        self.assertEqual(result['endpoints']['PUT /content/{id}']['sent'], 5)
+        self.assertEqual(self.report.statuses, {409: 1})
+        self.assertEqual(
+            self.report.latencies()['GET /content/{id}'],
+            [0.1, 0.2, 0.3, 0.4],
+        )
+
+    def test_reports_the_converters_and_the_slowest_files(self):
+        '''Required to find the files that slow down the conversions'''
+
+        self.report.conversion('asciidoctor', 'a.adoc', 3)
+        self.report.conversion('asciidoctor', 'b.adoc', 1)
+        self.report.conversion('pandoc', 'c.md', 2)
+
+        result = self.report.to_dict(slowest=2)
+
+        self.assertEqual(result['converters']['asciidoctor']['files'], 2)
+        self.assertEqual(result['converters']['asciidoctor']['seconds'], 4)
+        self.assertEqual(result['converters']['pandoc']['p99'], 2)
+        self.assertEqual(
+            result['slowest_files'],
+            [{'path': 'a.adoc', 'seconds': 3}, {'path': 'c.md', 'seconds': 2}],
+        )
+
+    def test_reports_the_slowest_pages(self):
+        '''Required to find the pages that take longer to write'''
+
+        with self.report.page('slow'):
+            self.clock.now += 5
+        with self.report.page('fast'):
+            self.clock.now += 1
+
+        self.assertEqual(
+            self.report.to_dict(slowest=1)['slowest_pages'],
+            [{'title': 'slow', 'seconds': 5}],
+        )
+        self.assertEqual(self.report.to_dict()['seconds'], 6)
+
+    def test_format_shows_every_section(self):
+        '''Required to print the report at the end of a run'''
+
+        with self.report.phase('list'):
+            self.clock.now += 1
+        self.report.conversion('pandoc', 'c.md', 2)
+        self.report.request('GET', '/space/TST', 0.5, None, 'body')
+        with self.report.page('page'):
+            self.clock.now += 1
+
+        text = self.report.format()
+
+        self.assertIn('Run took 2.00s', text)
+        self.assertIn('list', text)
+        self.assertIn('pandoc', text)
+        self.assertIn('Requests: 1 sent 0 bytes and received 4 bytes', text)
+        self.assertIn('GET /space/{space}', text)
+        self.assertIn('2.000s c.md', text)
+        self.assertIn('1.000s page', text)
+
+    def test_can_be_saved_as_json(self):
+        '''Required to compare the reports of several runs'''
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'report.json')
+        self.report.request('DELETE', '/content/1', 0.5)
+
+        self.report.save(path)
+
+        with open(path) as f:
+            result = json.load(f)
+        self.assertEqual(
+            result['endpoints']['DELETE /content/{id}']['requests'],
+            1,
+        )
@@ -0,0 +1,227 @@
+import os
+import shutil
+import tempfile
+import unittest
+import subprocess
+from git2sc import git
+from git2sc.scan import GitTreeScanner, IgnoreRules, TreeScanner, translate
+
+
+class TestTranslate(unittest.TestCase):
+    '''Test class for the translate function'''
+
+    def test_wildcards_do_not_cross_directories(self):
+        '''Required to match the globs like git does'''
+
+        self.assertEqual(translate('*.md'), '[^/]*\\.md')
+        self.assertEqual(translate('doc?'), 'doc[^/]')
+        self.assertEqual(translate('**/build'), '(?:.*/)?build')
+        self.assertEqual(translate('docs/**'), 'docs/.*')
+        self.assertEqual(translate('[!a]x'), '[^a]x')
+
+
+class TestIgnoreRules(unittest.TestCase):
+    '''Test class for the IgnoreRules class'''
+
+    def test_patterns_without_slash_match_the_name_at_any_depth(self):
+        '''Required to exclude node_modules wherever it is'''
+
+        rules = IgnoreRules(['# Dependencies', '', 'node_modules', '*.pyc'])
+
+        self.assertTrue(rules.match('node_modules', True))
+        self.assertTrue(rules.match('docs/node_modules', True))
+        self.assertTrue(rules.match('docs/cache.pyc', False))
+        self.assertIsNone(rules.match('docs/guide.md', False))
+
+    def test_patterns_with_slash_match_the_relative_path(self):
+        '''Required to exclude a single directory of the tree'''
+
+        rules = IgnoreRules(['/build', 'docs/*.tmp'])
+
+        self.assertTrue(rules.match('build', True))
+        self.assertIsNone(rules.match('docs/build', True))
+        self.assertTrue(rules.match('docs/draft.tmp', False))
+        self.assertIsNone(rules.match('other/draft.tmp', False))
+
+    def test_trailing_slash_matches_only_directories(self):
+        '''Required to follow the gitignore syntax'''
+
+        rules = IgnoreRules(['out/'])
+
+        self.assertTrue(rules.match('out', True))
+        self.assertIsNone(rules.match('out', False))
+
+    def test_negated_patterns_include_again_the_entries(self):
+        '''Required to follow the gitignore syntax'''
+
+        rules = IgnoreRules(['*.md', '!README.md'])
+
+        self.assertTrue(rules.match('guide.md', False))
+        self.assertFalse(rules.match('README.md', False))
+
+    def test_rules_of_a_subdirectory_match_relative_to_it(self):
+        '''Required to apply the .gitignore files of the subdirectories'''
+
+        rules = IgnoreRules(['/generated'], 'docs')
+
+        self.assertTrue(rules.match('docs/generated', True))
+        self.assertIsNone(rules.match('docs/api/generated', True))
+
+    def test_excludes_checks_the_parent_directories(self):
+        '''Required to exclude the changed files of an excluded directory'''
+
+        rules = IgnoreRules(['.git', 'drafts/'])
+
+        self.assertTrue(rules.excludes('docs/drafts/guide.md'))
+        self.assertTrue(rules.excludes('.git'))
+        self.assertFalse(rules.excludes('docs/guide.md'))
+        self.assertFalse(rules.excludes('docs/drafts'))
+
+
+class TestTreeScanner(unittest.TestCase):
+    '''Test class for the TreeScanner class'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for path in [
+            'README.md',
+            'guide.md',
+            'a/excluded.md',
+            'b/excluded.md',
+            'c/README.md',
+            'c/draft.tmp',
+            'node_modules/package/index.md',
+            'docs/generated/api.md',
+            'docs/usage.md',
+        ]:
+            path = os.path.join(self.directory, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write('content')
+        with open(os.path.join(self.directory, '.gitignore'), 'w') as f:
+            f.write('node_modules/\n*.tmp\n')
+        with open(os.path.join(self.directory, 'docs', '.gitignore'), 'w') \
+                as f:
+            f.write('/generated\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def scan(self, scanner):
+        return {
+            os.path.relpath(root, self.directory): (
+                sorted(directories),
+                sorted(files),
+            )
+            for root, directories, files in scanner.walk()
+        }
+
+    def test_prunes_the_excluded_and_ignored_entries(self):
+        '''Required to not walk the ignored trees nor publish their files,
+        even if several excluded directories are next to each other'''
+
+        scanner = TreeScanner(self.directory, ['.gitignore', 'a', 'b'])
+
+        self.assertEqual(
+            self.scan(scanner),
+            {
+                '.': (['c', 'docs'], ['README.md', 'guide.md']),
+                'c': ([], ['README.md']),
+                'docs': ([], ['usage.md']),
+            },
+        )
+        # The entries of the root, c and docs, the contents of the pruned
+        # directories are never read
+        self.assertEqual(scanner.visited, 13)
+        self.assertEqual(scanner.pruned, 7)
+
+    def test_can_ignore_the_gitignore_files(self):
+        '''Required to publish the files ignored by git'''
+
+        scanner = TreeScanner(self.directory, ['.gitignore'], gitignore=False)
+
+        tree = self.scan(scanner)
+
+        self.assertEqual(tree['c'], ([], ['README.md', 'draft.tmp']))
+        self.assertIn('node_modules/package', tree)
+        self.assertIn('docs/generated', tree)
+
+    def test_removed_directories_are_not_walked(self):
+        '''Required to keep the os.walk interface'''
+
+        walked = []
+        for root, directories, files in TreeScanner(self.directory).walk():
+            walked.append(os.path.relpath(root, self.directory))
+            if 'docs' in directories:
+                directories.remove('docs')
+
+        self.assertNotIn('docs', walked)
+        self.assertIn('c', walked)
+
+
+class TestGitTreeScanner(unittest.TestCase):
+    '''Test class for the GitTreeScanner class, it runs against a temporal
+    git repository'''
+
+    def setUp(self):
+        self.repository = tempfile.mkdtemp()
+        self._git('init', '-q')
+        self._git('config', 'user.email', 'test@example.com')
+        self._git('config', 'user.name', 'Test')
+        for path, content in [
+            ('docs/README.md', 'Docs'),
+            ('docs/.gitignore', '*.tmp\n'),
+            ('docs/guide.md', 'Guide'),
+            ('docs/draft.tmp', 'Draft'),
+            ('docs/api/index.md', 'Api'),
+            ('docs/build/out.md', 'Out'),
+        ]:
+            path = os.path.join(self.repository, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+        os.symlink('guide.md', os.path.join(self.repository, 'docs', 'link'))
+        self._git('add', '-A', '-f')
+        self._git('commit', '-q', '-m', 'Initial commit')
+        # The working tree is not read
+        shutil.rmtree(os.path.join(self.repository, 'docs'))
+        self.cat_file = git.CatFile(self.repository)
+
+    def tearDown(self):
+        self.cat_file.close()
+        shutil.rmtree(self.repository)
+
+    def _git(self, *arguments):
+        subprocess.check_output(
+            ['git', '-C', self.repository] + list(arguments),
+        )
+
+    def test_walks_the_tree_of_a_ref(self):
+        '''Required to publish a ref without checking it out, applying the
+        exclude patterns and the committed .gitignore files'''
+
+        path = os.path.join(self.repository, 'docs')
+        scanner = GitTreeScanner(
+            self.cat_file,
+            'HEAD:docs',
+            path,
+            ['.gitignore', 'build'],
+        )
+
+        tree = {
+            os.path.relpath(root, path): (sorted(directories), sorted(files))
+            for root, directories, files in scanner.walk()
+        }
+
+        self.assertEqual(
+            tree,
+            {
+                '.': (['api'], ['README.md', 'guide.md']),
+                'api': ([], ['index.md']),
+            },
+        )
+        self.assertEqual(scanner.pruned, 3)
+        self.assertEqual(
+            scanner.blobs[os.path.join(path, 'api', 'index.md')],
+            git.blob_hash(b'Api'),
+        )
@@ -0,0 +1,133 @@
+import time
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from git2sc.scheduler import Scheduler
+
+
+class TestScheduler(unittest.TestCase):
+    '''Test class for the Scheduler class'''
+
+    def test_runs_tasks_inline_with_one_worker(self):
+        '''Required to keep the order of a plain loop by default'''
+
+        calls = []
+        scheduler = Scheduler()
+
+        future = scheduler.submit(calls.append, 'first')
+        scheduler.submit(calls.append, 'second')
+
+        self.assertEqual(calls, ['first', 'second'])
+        self.assertTrue(future.done())
+        scheduler.join()
+
+    def test_one_worker_runs_the_tasks_on_its_thread(self):
+        '''Required to publish one page at a time with one worker even if
+        the html is converted by several threads'''
+
+        threads = []
+        scheduler = Scheduler()
+        converter = ThreadPoolExecutor(2)
+        self.addCleanup(converter.shutdown)
+
+        for index in range(4):
+            html = converter.submit(time.sleep, 0.01)
+            scheduler.submit(
+                lambda html: threads.append(threading.get_ident()),
+                html,
+            )
+        scheduler.join()
+
+        self.assertEqual(threads, [threading.get_ident()] * 4)
+
+    def test_interruptions_stop_the_inline_tasks(self):
+        '''Required to stop an upload with Ctrl-C instead of storing the
+        interruption in the page that was being published'''
+
+        calls = []
+        scheduler = Scheduler()
+
+        def interrupt():
+            raise KeyboardInterrupt()
+
+        with self.assertRaises(KeyboardInterrupt):
+            scheduler.submit(interrupt)
+            scheduler.submit(calls.append, 'next page')
+
+        self.assertEqual(calls, [])
+
+    def test_tasks_receive_the_results_of_their_dependencies(self):
+        '''Required to create a page with the id of the page of its
+        directory'''
+
+        scheduler = Scheduler(4)
+
+        parent = scheduler.submit(lambda: 'parent_id')
+        child = scheduler.submit(
+            lambda parent_id: parent_id + '/child',
+            parent,
+        )
+        scheduler.join()
+
+        self.assertEqual(child.result(), 'parent_id/child')
+
+    def test_tasks_start_after_their_dependencies(self):
+        '''Required to create the page of a directory before its children'''
+
+        finished = []
+        scheduler = Scheduler(8)
+
+        def task(name, *parents):
+            time.sleep(0.01)
+            finished.append(name)
+            return name
+
+        root = scheduler.submit(task, 'root')
+        directories = [
+            scheduler.submit(task, 'directory_{}'.format(index), root)
+            for index in range(3)
+        ]
+        files = [
+            scheduler.submit(task, 'file_{}'.format(index), directory)
+            for index, directory in enumerate(directories)
+        ]
+        scheduler.join()
+
+        self.assertEqual(finished[0], 'root')
+        for index in range(3):
+            self.assertLess(
+                finished.index('directory_{}'.format(index)),
+                finished.index('file_{}'.format(index)),
+            )
+        self.assertTrue(all(future.done() for future in files))
+
+    def test_runs_independent_tasks_in_parallel(self):
+        '''Required to overlap the latency of the requests'''
+
+        scheduler = Scheduler(4)
+        barrier = threading.Barrier(4, timeout=5)
+
+        for _ in range(4):
+            scheduler.submit(barrier.wait)
+
+        scheduler.join()
+
+    def test_failures_propagate_to_dependent_tasks(self):
+        '''Required to avoid creating the children of a page that couldn't be
+        created'''
+
+        calls = []
+        scheduler = Scheduler(2)
+
+        def fail():
+            raise ValueError('Error 400: Bad request')
+
+        parent = scheduler.submit(fail)
+        child = scheduler.submit(calls.append, parent)
+        independent = scheduler.submit(calls.append, 'independent')
+
+        with self.assertRaises(ValueError):
+            scheduler.join()
+        self.assertEqual(calls, ['independent'])
+        self.assertIsInstance(child.exception(), ValueError)
+        self.assertTrue(independent.done())
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch, Mock
+from git2sc.fake import FakeConfluenceServer
+from git2sc.session import PooledHTTPAdapter, build_session
+
+
+class TestPooledHTTPAdapter(unittest.TestCase):
+    '''Test class for the PooledHTTPAdapter class'''
+
+    def setUp(self):
+        self.adapter = PooledHTTPAdapter(pool_size=4, timeout=(1, 2))
+
+    def test_has_pool_size_set(self):
+        '''Required to keep as many connections alive as workers we have'''
+
+        self.assertEqual(self.adapter._pool_connections, 4)
+        self.assertEqual(self.adapter._pool_maxsize, 4)
+
+    def test_has_retry_policy(self):
+        '''Required to retry the transient server errors'''
+
+        self.assertEqual(self.adapter.max_retries.total, 3)
+        self.assertIn(502, self.adapter.max_retries.status_forcelist)
+
+    def test_leaves_the_throttled_requests_to_the_throttle(self):
+        '''Required to slow down all the requests when confluence throttles
+        them instead of retrying each one on its own'''
+
+        self.assertNotIn(429, self.adapter.max_retries.status_forcelist)
+        self.assertNotIn(503, self.adapter.max_retries.status_forcelist)
+
+    def test_returns_the_throttled_requests_with_retry_after(self):
+        '''Required to let the Throttle see the 429 of the requests that
+        urllib3 could retry, as the GET, PUT and DELETE ones'''
+
+        server = FakeConfluenceServer(space='TST', throttle_every=1).start()
+        self.addCleanup(server.stop)
+        session, adapter = build_session(('user', 'password'))
+
+        for method in ('GET', 'PUT', 'DELETE'):
+            r = session.request(method, '{}/content/1'.format(server.url))
+            self.assertEqual(r.status_code, 429)
+            self.assertIn('Retry-After', r.headers)
+        self.assertEqual(server.confluence.throttled, 3)
+
+    @patch('git2sc.session.HTTPAdapter.send')
+    def test_send_uses_default_timeout(self, sendMock):
+        '''Required to ensure that no request can hang forever'''
+
+        request = Mock()
+        self.adapter.send(request)
+        self.assertEqual(
+            sendMock.assert_called_with(request, timeout=(1, 2)),
+            None,
+        )
+
+    @patch('git2sc.session.HTTPAdapter.send')
+    def test_send_respects_explicit_timeout(self, sendMock):
+        '''Required to allow a call to override the default timeout'''
+
+        request = Mock()
+        self.adapter.send(request, timeout=10)
+        self.assertEqual(
+            sendMock.assert_called_with(request, timeout=10),
+            None,
+        )
+
+    def test_connection_stats_counts_reused_connections(self):
+        '''Required to confirm that the keep-alive connections are reused'''
+
+        pool = Mock()
+        pool.num_requests = 10
+        pool.num_connections = 2
+        self.adapter.poolmanager.pools['key'] = pool
+
+        self.assertEqual(
+            self.adapter.connection_stats(),
+            {'requests': 10, 'new_connections': 2, 'reused_connections': 8},
+        )
+
+    def test_connection_stats_empty_pool(self):
+        '''Required to report zero before the first request'''
+
+        self.assertEqual(
+            self.adapter.connection_stats(),
+            {'requests': 0, 'new_connections': 0, 'reused_connections': 0},
+        )
+
+
+class TestBuildSession(unittest.TestCase):
+    '''Test class for the build_session function'''
+
+    def test_session_shares_adapter_for_http_and_https(self):
+        '''Required to share one connection pool between all the calls'''
+
+        session, adapter = build_session(('user', 'password'))
+
+        self.assertIs(session.get_adapter('https://example.com'), adapter)
+        self.assertIs(session.get_adapter('http://example.com'), adapter)
+        self.assertEqual(session.auth, ('user', 'password'))
+
+    def test_session_can_disable_keep_alive(self):
+        '''Required to allow closing the connection after each request'''
+
+        session, adapter = build_session(
+            ('user', 'password'),
+            keep_alive=False,
+        )
+
+        self.assertEqual(session.headers['Connection'], 'close')
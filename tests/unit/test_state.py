@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from git2sc.state import SyncState, default_state_path
+
+
+class TestSyncState(unittest.TestCase):
+    '''Test class for the SyncState class'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database_path = os.path.join(self.directory, 'db', 'TST.sqlite')
+        self.state = SyncState(self.database_path, 'TST')
+
+    def tearDown(self):
+        self.state.close()
+        shutil.rmtree(self.directory)
+
+    def test_can_record_and_get_paths(self):
+        '''Required to map the synced files to their pages'''
+
+        self.state.record('docs/guide.adoc', '1', '2', 3, 'source', 'html')
+
+        self.assertEqual(
+            self.state.get('docs/guide.adoc'),
+            {
+                'space': 'TST',
+                'path': 'docs/guide.adoc',
+                'page_id': '1',
+                'parent_id': '2',
+                'version': 3,
+                'source_hash': 'source',
+                'rendered_hash': 'html',
+            },
+        )
+        self.assertEqual(self.state.get('unknown.adoc'), None)
+        self.assertEqual(self.state.versions(), {'1': 3})
+
+    def test_state_is_persisted(self):
+        '''Required to reuse the state in the next runs'''
+
+        self.state.record('guide.adoc', '1', version=1)
+        self.state.close()
+
+        self.state = SyncState(self.database_path, 'TST')
+
+        self.assertEqual(self.state.get('guide.adoc')['page_id'], '1')
+
+    def test_spaces_are_isolated(self):
+        '''Required to share a database between spaces'''
+
+        self.state.record('guide.adoc', '1', version=1)
+        other_state = SyncState(self.database_path, 'OTHER')
+
+        self.assertEqual(other_state.get('guide.adoc'), None)
+        other_state.close()
+
+    def test_moving_a_page_to_another_path_removes_the_old_path(self):
+        '''Required to keep only one path per page'''
+
+        self.state.record('old.adoc', '1', version=1)
+        self.state.record('new.adoc', '1', version=2)
+
+        self.assertEqual(list(self.state.records().keys()), ['new.adoc'])
+
+    def test_can_forget_deleted_pages(self):
+        '''Required to clean the state of the deleted pages'''
+
+        self.state.record('guide.adoc', '1', version=1)
+        self.state.forget_page('1')
+
+        self.assertEqual(self.state.records(), {})
+
+    def test_can_record_the_last_published_commit(self):
+        '''Required to sync incrementally from a fresh clone of the
+        repository, that has no record of the last published commit'''
+
+        self.assertEqual(self.state.last_commit(), None)
+
+        self.state.record_last_commit('first')
+        self.state.record_last_commit('second')
+        self.state.close()
+        self.state = SyncState(self.database_path, 'TST')
+        other_state = SyncState(self.database_path, 'OTHER')
+
+        self.assertEqual(self.state.last_commit(), 'second')
+        self.assertEqual(other_state.last_commit(), None)
+        other_state.close()
+
+    @patch.dict(os.environ, {'XDG_CACHE_HOME': '/cache'})
+    def test_default_path_is_in_the_cache_directory(self):
+        '''Required to keep the state between runs without polluting the
+        repository'''
+
+        self.assertEqual(
+            default_state_path('TST'),
+            '/cache/git2sc/TST.sqlite',
+        )
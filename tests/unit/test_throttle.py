@@ -0,0 +1,231 @@
+import unittest
+from unittest.mock import patch, Mock
+from git2sc.throttle import (
+    AdaptiveLimit,
+    Throttle,
+    TokenBucket,
+    parse_retry_after,
+)
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def response(status_code, retry_after=None):
+    headers = {}
+    if retry_after is not None:
+        headers['Retry-After'] = retry_after
+    return Mock(status_code=status_code, headers=headers)
+
+
+class TestParseRetryAfter(unittest.TestCase):
+    '''Test class for the parse_retry_after function'''
+
+    def test_parses_seconds(self):
+        '''Required to wait the seconds confluence asks for'''
+
+        self.assertEqual(parse_retry_after('3'), 3)
+        self.assertEqual(parse_retry_after('-1'), 0)
+
+    def test_parses_http_dates(self):
+        '''Required to support the other format of the header'''
+
+        self.assertEqual(
+            parse_retry_after(
+                'Wed, 21 Oct 2015 07:28:10 GMT',
+                now=1445412480,
+            ),
+            10,
+        )
+
+    def test_returns_none_if_it_cant_be_parsed(self):
+        '''Required to fall back to the exponential backoff'''
+
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after('soon'))
+
+
+class TestTokenBucket(unittest.TestCase):
+    '''Test class for the TokenBucket class'''
+
+    def test_allows_a_burst_and_then_the_sustained_rate(self):
+        '''Required to keep the requests under the rate limit'''
+
+        clock = FakeClock()
+        bucket = TokenBucket(2, burst=2, clock=clock)
+
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0.5)
+        self.assertEqual(bucket.reserve(), 1)
+
+        clock.now += 1
+        self.assertEqual(bucket.reserve(), 0.5)
+
+
+class TestAdaptiveLimit(unittest.TestCase):
+    '''Test class for the AdaptiveLimit class'''
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limit = AdaptiveLimit(8, clock=self.clock)
+
+    def test_throttles_halve_the_limit_once_per_cooldown(self):
+        '''Required to not collapse the concurrency when all the requests in
+        flight are throttled at the same time'''
+
+        self.limit.on_throttle()
+        self.limit.on_throttle()
+        self.assertEqual(self.limit.limit, 4)
+
+        self.clock.now += 1
+        self.limit.on_throttle()
+        self.assertEqual(self.limit.limit, 2)
+
+    def test_successes_increase_the_limit_one_per_window(self):
+        '''Required to recover the concurrency after a throttle'''
+
+        self.limit.on_throttle()
+        for _ in range(4):
+            self.limit.on_success(0.1)
+
+        self.assertEqual(int(self.limit.limit), 4)
+        self.assertGreater(self.limit.limit, 4.9)
+
+        for _ in range(100):
+            self.limit.on_success(0.1)
+        self.assertEqual(self.limit.limit, 8)
+
+    def test_latency_spikes_decrease_the_limit(self):
+        '''Required to back off when confluence starts to slow down'''
+
+        for _ in range(50):
+            self.limit.on_success(0.1)
+        for _ in range(10):
+            self.limit.on_success(2)
+
+        self.assertEqual(self.limit.limit, 4)
+
+    def test_slots_are_bounded_by_the_limit(self):
+        '''Required to bound the requests in flight'''
+
+        limit = AdaptiveLimit(2)
+
+        self.assertTrue(limit.try_acquire())
+        self.assertTrue(limit.try_acquire())
+        self.assertFalse(limit.try_acquire())
+        limit.release()
+        self.assertTrue(limit.try_acquire())
+
+
+class TestThrottle(unittest.TestCase):
+    '''Test class for the Throttle class'''
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.throttle = Throttle(concurrency=8, clock=self.clock)
+        self.send = Mock()
+        self.sleep_patch = patch('git2sc.throttle.time.sleep')
+        self.sleep = self.sleep_patch.start()
+        self.sleeps = []
+        self.sleep.side_effect = self.fake_sleep
+
+    def tearDown(self):
+        self.sleep_patch.stop()
+
+    def fake_sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.clock.now += seconds
+
+    def test_sends_the_request(self):
+        '''Required to not change the requests that are not throttled'''
+
+        self.send.return_value = response(200)
+
+        result = self.throttle.request(self.send, 'GET', 'url', data='data')
+
+        self.assertEqual(result, self.send.return_value)
+        self.send.assert_called_once_with('GET', 'url', data='data')
+        self.assertEqual(self.throttle.throttled, 0)
+
+    def test_retries_after_the_retry_after_header(self):
+        '''Required to not die partway through a throttled sync'''
+
+        self.send.side_effect = [response(429, '7'), response(200)]
+
+        with self.assertLogs('git2sc.throttle', 'WARNING') as logs:
+            result = self.throttle.request(self.send, 'GET', 'url')
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(self.send.call_count, 2)
+        self.assertEqual(self.sleeps, [0, 7, 0])
+        self.assertEqual(self.throttle.throttled, 1)
+        self.assertEqual(self.throttle.waited, 7)
+        self.assertEqual(int(self.throttle.limit.limit), 4)
+        self.assertIn('retrying in 7.0s', logs.output[0])
+        self.assertIn('requests/s', logs.output[0])
+
+    def test_throttles_pause_the_other_requests(self):
+        '''Required to respect the Retry-After in all the threads'''
+
+        self.assertEqual(self.throttle.record(response(503, '5'), 1, 0), 5)
+
+        self.assertEqual(self.throttle.delay(), 5)
+        self.clock.now += 5
+        self.assertEqual(self.throttle.delay(), 0)
+
+    def test_backs_off_exponentially_without_retry_after(self):
+        '''Required to slow down when confluence doesn't say how much'''
+
+        self.send.side_effect = [
+            response(429),
+            response(429),
+            response(429),
+            response(200),
+        ]
+
+        self.throttle.request(self.send, 'GET', 'url')
+
+        self.assertEqual(
+            [seconds for seconds in self.sleeps if seconds],
+            [1, 2, 4],
+        )
+
+    def test_returns_the_throttled_response_after_the_retries(self):
+        '''Required to report the error if confluence keeps throttling'''
+
+        throttle = Throttle(max_retries=2, clock=self.clock)
+        self.send.return_value = response(429, '1')
+
+        result = throttle.request(self.send, 'GET', 'url')
+
+        self.assertEqual(result.status_code, 429)
+        self.assertEqual(self.send.call_count, 3)
+        self.assertEqual(throttle.throttled, 3)
+
+    def test_waits_for_the_tokens_of_the_rate(self):
+        '''Required to keep the sustained rate under the rate limit'''
+
+        throttle = Throttle(rate=1, clock=self.clock)
+        self.send.return_value = response(200)
+
+        throttle.request(self.send, 'GET', 'url')
+        throttle.request(self.send, 'GET', 'url')
+
+        self.assertEqual(self.sleeps, [0, 1])
+
+    def test_summary_reports_the_rate(self):
+        '''Required to know how close the sync ran to the rate limit'''
+
+        self.send.side_effect = [response(429, '2'), response(200)]
+        self.throttle.request(self.send, 'GET', 'url')
+
+        self.assertEqual(
+            self.throttle.summary(),
+            'Throttled 1 times, waited 2.0s, 2 requests at 1.0 requests/s',
+        )
@@ -0,0 +1,249 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import threading
+from git2sc.workers import (
+    AsciidoctorWorker,
+    PandocServer,
+    WarmConverters,
+    WorkerUnavailable,
+)
+
+# Python stand in of the ruby asciidoctor worker that speaks the same
+# protocol, it counts the files it converts to check that it's reused
+FAKE_ASCIIDOCTOR_WORKER = '''
+import sys
+sys.stdout.buffer.write(b'ready\\n')
+sys.stdout.flush()
+converted = 0
+for line in sys.stdin.buffer:
+    path = line.decode().rstrip('\\n')
+    if path.startswith('\\0'):
+        path = sys.stdin.buffer.read(int(path[1:])).decode()
+    if path.endswith('exit.adoc'):
+        sys.exit(1)
+    converted += 1
+    if path.endswith('broken.adoc'):
+        status, output = 'error', 'invalid document'
+    else:
+        status, output = 'ok', '<p>{} {}</p>'.format(path, converted)
+    output = output.encode()
+    sys.stdout.buffer.write('{} {}\\n'.format(status, len(output)).encode())
+    sys.stdout.buffer.write(output)
+    sys.stdout.flush()
+'''
+
+# Python stand in of pandoc server
+FAKE_PANDOC_SERVER = '''
+import sys
+import json
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b'3.1')
+
+    def do_POST(self):
+        data = json.loads(
+            self.rfile.read(int(self.headers['Content-Length'])),
+        )
+        if data['text'] == 'slow':
+            time.sleep(1)
+        if data['text'] == 'broken':
+            output = json.dumps({'error': 'Unknown reader'}).encode()
+        else:
+            output = json.dumps({
+                'output': '<{to}>{text}</{to}>'.format(**data),
+            }).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(output)))
+        self.end_headers()
+        self.wfile.write(output)
+
+    def log_message(self, *arguments):
+        pass
+
+
+HTTPServer(('127.0.0.1', int(sys.argv[1])), Handler).serve_forever()
+'''
+
+
+class TestAsciidoctorWorker(unittest.TestCase):
+    '''Test class for the AsciidoctorWorker class'''
+
+    def setUp(self):
+        self.worker = AsciidoctorWorker(
+            [sys.executable, '-c', FAKE_ASCIIDOCTOR_WORKER],
+        )
+
+    def tearDown(self):
+        self.worker.close()
+
+    def test_converts_several_files_with_the_same_process(self):
+        '''Required to avoid the startup of asciidoctor for each file'''
+
+        self.assertEqual(self.worker.convert('a.adoc'), '<p>a.adoc 1</p>')
+        self.assertEqual(self.worker.convert('b.adoc'), '<p>b.adoc 2</p>')
+
+    def test_converts_sources_sent_through_stdin(self):
+        '''Required to convert the files of a git ref without writing them to
+        disk, even if they have several lines'''
+
+        self.assertEqual(
+            self.worker.convert('a.adoc', '= Title\n\nText'.encode()),
+            '<p>= Title\n\nText 1</p>',
+        )
+        self.assertEqual(self.worker.convert('b.adoc'), '<p>b.adoc 2</p>')
+
+    def test_conversion_errors_raise_runtime_error(self):
+        '''Required to report the files that can't be converted'''
+
+        with self.assertRaisesRegex(RuntimeError, 'invalid document'):
+            self.worker.convert('broken.adoc')
+        self.assertEqual(self.worker.convert('a.adoc'), '<p>a.adoc 2</p>')
+
+    def test_worker_exit_raises_runtime_error(self):
+        '''Required to report the file that made the worker exit'''
+
+        with self.assertRaisesRegex(RuntimeError, 'exit.adoc'):
+            self.worker.convert('exit.adoc')
+
+    def test_raises_unavailable_if_the_worker_cant_start(self):
+        '''Required to fall back to a process per file when ruby or the
+        asciidoctor gem are not installed'''
+
+        with self.assertRaises(WorkerUnavailable):
+            AsciidoctorWorker(['git2sc-command-that-does-not-exist'])
+        with self.assertRaises(WorkerUnavailable):
+            AsciidoctorWorker([sys.executable, '-c', 'import sys'])
+
+
+class TestPandocServer(unittest.TestCase):
+    '''Test class for the PandocServer class'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.directory, 'file.md')
+        with open(self.file_path, 'w') as f:
+            f.write('# Title')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_converts_through_the_server(self):
+        '''Required to avoid the startup of pandoc for each file'''
+
+        server = PandocServer([sys.executable, '-c', FAKE_PANDOC_SERVER,
+                               '{port}'])
+        self.addCleanup(server.close)
+
+        self.assertEqual(
+            server.convert(self.file_path, 'html'),
+            '<html># Title</html>',
+        )
+        self.assertEqual(
+            server.convert('ref.md', 'html', '# From a ref'),
+            '<html># From a ref</html>',
+        )
+
+    def test_failed_conversions_raise_a_conversion_error(self):
+        '''Required to fall back or record the error of the file instead of
+        stopping the run when pandoc can't convert it or hangs'''
+
+        server = PandocServer(
+            [sys.executable, '-c', FAKE_PANDOC_SERVER, '{port}'],
+            timeout=0.2,
+        )
+        self.addCleanup(server.close)
+
+        with self.assertRaises(RuntimeError):
+            server.convert('broken.md', 'html', 'broken')
+        with self.assertRaises(RuntimeError):
+            server.convert('slow.md', 'html', 'slow')
+
+    def test_raises_unavailable_if_pandoc_has_no_server_mode(self):
+        '''Required to fall back to pypandoc with pandoc older than 3.0'''
+
+        with self.assertRaises(WorkerUnavailable):
+            PandocServer([sys.executable, '-c', 'import sys; sys.exit(1)'])
+
+
+class TestWarmConverters(unittest.TestCase):
+    '''Test class for the WarmConverters class'''
+
+    def test_reuses_the_workers(self):
+        '''Required to keep the converters warm between conversions'''
+
+        converters = WarmConverters(
+            size=2,
+            asciidoctor_command=[sys.executable, '-c',
+                                 FAKE_ASCIIDOCTOR_WORKER],
+        )
+        self.addCleanup(converters.close)
+
+        for index in range(5):
+            converters.convert_adoc('{}.adoc'.format(index))
+
+        self.assertEqual(len(converters.asciidoctor_workers), 1)
+
+    def test_starts_up_to_size_workers_in_parallel(self):
+        '''Required to convert several files at the same time'''
+
+        converters = WarmConverters(
+            size=2,
+            asciidoctor_command=[sys.executable, '-c',
+                                 FAKE_ASCIIDOCTOR_WORKER],
+        )
+        self.addCleanup(converters.close)
+        threads = [
+            threading.Thread(
+                target=converters.convert_adoc,
+                args=('{}.adoc'.format(index),),
+            )
+            for index in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLessEqual(len(converters.asciidoctor_workers), 2)
+
+    def test_replaces_the_workers_that_exit(self):
+        '''Required to keep converting after a worker crash'''
+
+        converters = WarmConverters(
+            size=1,
+            asciidoctor_command=[sys.executable, '-c',
+                                 FAKE_ASCIIDOCTOR_WORKER],
+        )
+        self.addCleanup(converters.close)
+
+        with self.assertRaises(RuntimeError):
+            converters.convert_adoc('exit.adoc')
+
+        self.assertEqual(converters.convert_adoc('a.adoc'), '<p>a.adoc 1</p>')
+
+    def test_remembers_the_unavailable_converters(self):
+        '''Required to avoid trying to start a missing converter for each
+        file'''
+
+        converters = WarmConverters(
+            asciidoctor_command=['git2sc-command-that-does-not-exist'],
+            pandoc_command=['git2sc-command-that-does-not-exist'],
+        )
+        self.addCleanup(converters.close)
+
+        for _ in range(2):
+            with self.assertRaises(WorkerUnavailable):
+                converters.convert_adoc('a.adoc')
+            with self.assertRaises(WorkerUnavailable):
+                converters.convert_md('a.md', 'html')
+        self.assertFalse(converters.asciidoctor_available)
+        self.assertFalse(converters.pandoc_available)